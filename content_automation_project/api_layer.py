@@ -15,6 +15,7 @@ import threading
 from typing import Optional, Dict, List, Any, Callable
 from datetime import datetime
 
+import llm_telemetry
 from openrouter_models import OPENROUTER_MODEL_CHOICE_IDS
 
 try:
@@ -645,6 +646,13 @@ class GeminiAPIClient:
                 full_prompt,
                 generation_config=generation_config
             )
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                llm_telemetry.note_usage({
+                    "prompt_tokens": getattr(usage, "prompt_token_count", None),
+                    "completion_tokens": getattr(usage, "candidates_token_count", None),
+                    "total_tokens": getattr(usage, "total_token_count", None),
+                })
             
             processed_text = response.text
             self.logger.info(f"Text processed successfully with {model_name}")
@@ -655,26 +663,37 @@ class GeminiAPIClient:
         max_retries = 3
         timeout_delay = 10.0  # Shorter delay for timeouts (10 seconds)
         
-        for attempt in range(max_retries):
-            try:
-                result = _do_process()
-                if result:
-                    return result
-            except Exception as e:
-                if self._is_timeout_error(e):
-                    if attempt < max_retries - 1:
-                        self.logger.warning(f"⚠️ Timeout error (504) - Attempt {attempt + 1}/{max_retries}")
-                        self.logger.warning(f"   Waiting {timeout_delay:.1f}s before retry...")
-                        time.sleep(timeout_delay)
-                        timeout_delay *= 1.5  # Exponential backoff
+        with llm_telemetry.track_request(
+            "gemini",
+            model_name,
+            prompt_chars=len(text or "") + len(system_prompt or ""),
+            max_tokens=max_tokens,
+        ) as call:
+            for attempt in range(max_retries):
+                if attempt:
+                    llm_telemetry.note_retry()
+                try:
+                    result = _do_process()
+                    if result:
+                        call.set_result(result)
+                        return result
+                except Exception as e:
+                    llm_telemetry.note_error(str(e))
+                    if self._is_timeout_error(e):
+                        if attempt < max_retries - 1:
+                            self.logger.warning(f"⚠️ Timeout error (504) - Attempt {attempt + 1}/{max_retries}")
+                            self.logger.warning(f"   Waiting {timeout_delay:.1f}s before retry...")
+                            time.sleep(timeout_delay)
+                            timeout_delay *= 1.5  # Exponential backoff
+                        else:
+                            # Last attempt failed
+                            self.logger.error(f"Text processing failed after {max_retries} attempts: {str(e)}")
+                            break
                     else:
-                        # Last attempt failed
-                        self.logger.error(f"Text processing failed after {max_retries} attempts: {str(e)}")
-                        return None
-                else:
-                    # Not a timeout error, log and return None
-                    self.logger.error(f"Text processing failed: {str(e)}")
-                    return None
+                        # Not a timeout error, log and return None
+                        self.logger.error(f"Text processing failed: {str(e)}")
+                        break
+            call.set_result(None)
         
         return None
     
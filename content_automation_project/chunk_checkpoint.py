@@ -0,0 +1,91 @@
+"""
+Per-chunk checkpoints for chunked LLM stages (Stage J Importance & Type, Stage H Flashcards).
+
+A chunked run only writes its output once every chunk has succeeded, so one failed chunk used to
+throw away (and a rerun used to pay again for) every chunk that worked. ``ChunkCheckpointStore``
+persists each chunk's parsed rows as soon as they arrive, one JSON file per chunk, keyed by a
+SHA-256 of the chunk's input rows and context, the prompt and the model. A rerun over the same
+inputs finds those files and only calls the LLM for chunks that are missing.
+
+Files are written atomically (temp file + ``os.replace``), so a crash never leaves a torn
+checkpoint; unreadable files are treated as missing. Callers ``clear()`` the store once the
+stage output is saved, so checkpoints only ever hold the state of an unfinished run.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from llm_response_cache import request_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkCheckpointStore:
+    """Directory of ``<sha256>.json`` files, each holding the parsed rows of one chunk."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = os.path.abspath(root_dir)
+        self._lock = threading.Lock()
+        self.restored = 0
+        self.saved = 0
+
+    @staticmethod
+    def chunk_key(chunk_input: Dict[str, Any], prompt: str, model_name: str) -> str:
+        return request_cache_key({"input": chunk_input, "prompt": prompt or "", "model": model_name or ""})
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}.json")
+
+    def load(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                doc = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable chunk checkpoint %s: %s", path, e)
+            return None
+        rows = doc.get("rows") if isinstance(doc, dict) else None
+        if not isinstance(rows, list):
+            return None
+        with self._lock:
+            self.restored += 1
+        return rows
+
+    def save(self, key: str, rows: List[Dict[str, Any]]) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root_dir, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"rows": rows}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write chunk checkpoint %s: %s", path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.saved += 1
+
+    def get_or_run(
+        self, key: str, run: Callable[[], Optional[List[Dict[str, Any]]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rows checkpointed under ``key``, else ``run()``'s result (checkpointed unless None)."""
+        rows = self.load(key)
+        if rows is not None:
+            return rows
+        rows = run()
+        if rows is not None:
+            self.save(key, rows)
+        return rows
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root_dir, ignore_errors=True)
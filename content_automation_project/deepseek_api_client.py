@@ -9,6 +9,7 @@ import json
 import time
 import requests
 from typing import Optional, Dict, List, Any, Callable
+import llm_telemetry
 from api_layer import APIKeyManager, APIConfig
 
 
@@ -99,6 +100,27 @@ class DeepSeekAPIClient:
         Returns:
             Processed text or None if failed
         """
+        with llm_telemetry.track_request(
+            "deepseek",
+            model_name,
+            prompt_chars=len(text or "") + len(system_prompt or ""),
+            max_tokens=max_tokens,
+        ) as call:
+            content = self._process_text(
+                text, system_prompt, model_name, temperature, max_tokens, api_key, auto_fallback_model
+            )
+            call.set_result(content)
+            return content
+
+    def _process_text(self,
+                      text: str,
+                      system_prompt: Optional[str],
+                      model_name: str,
+                      temperature: float,
+                      max_tokens: int,
+                      api_key: Optional[str],
+                      auto_fallback_model: bool) -> Optional[str]:
+        """Request with retries (and the deepseek-chat fallback) behind process_text."""
         max_retries = 3
         timeout_delay = 10.0
         
@@ -135,6 +157,8 @@ class DeepSeekAPIClient:
         fallback_model = "deepseek-chat" if model_name == "deepseek-reasoner" else None
         
         for attempt in range(max_retries):
+            if attempt:
+                llm_telemetry.note_retry()
             try:
                 key = api_key or self.key_manager.get_next_key()
                 if not key:
@@ -233,6 +257,7 @@ class DeepSeekAPIClient:
                 if response.status_code == 200:
                     try:
                         result = response.json()
+                        llm_telemetry.note_usage(result.get("usage") if isinstance(result, dict) else None)
                         if "choices" in result and len(result["choices"]) > 0:
                             content = result["choices"][0]["message"]["content"]
                             if content:
@@ -262,6 +287,7 @@ class DeepSeekAPIClient:
                 elif response.status_code == 429:
                     # Rate limit error
                     self._rate_limit_error_count += 1
+                    llm_telemetry.note_error("Rate limit (429)")
                     if self._rate_limit_error_count >= self._max_rate_limit_errors:
                         self.logger.error("Max rate limit errors reached. Stopping.")
                         return None
@@ -279,6 +305,7 @@ class DeepSeekAPIClient:
                 elif response.status_code == 401:
                     # Invalid API key
                     self.logger.error("Invalid API key (401)")
+                    llm_telemetry.note_error("Invalid API key (401)")
                     # Try next key
                     if attempt < max_retries - 1:
                         continue
@@ -287,12 +314,14 @@ class DeepSeekAPIClient:
                 else:
                     error_msg = f"API error {response.status_code}: {response.text}"
                     self.logger.error(error_msg)
+                    llm_telemetry.note_error(error_msg)
                     if attempt < max_retries - 1:
                         time.sleep(timeout_delay)
                         continue
                     return None
                     
             except requests.exceptions.Timeout as e:
+                llm_telemetry.note_error(f"Timeout: {e}")
                 if attempt < max_retries - 1:
                     self.logger.warning(f"⚠️ Timeout error - Attempt {attempt + 1}/{max_retries}")
                     self.logger.warning(f"   Waiting {timeout_delay:.1f}s before retry...")
@@ -305,6 +334,7 @@ class DeepSeekAPIClient:
             except requests.exceptions.ChunkedEncodingError as e:
                 # Response ended prematurely - connection was closed before complete response
                 error_msg = f"Response ended prematurely (ChunkedEncodingError) - connection closed before complete response"
+                llm_telemetry.note_error(error_msg)
                 self.logger.error(f"[DeepSeek API] {error_msg}")
                 self.logger.error(f"[DeepSeek API] Error details: {str(e)}")
                 if attempt < max_retries - 1:
@@ -319,6 +349,7 @@ class DeepSeekAPIClient:
             except requests.exceptions.ConnectionError as e:
                 # Connection error - network issue or server unreachable
                 error_msg = f"Connection error - network issue or server unreachable"
+                llm_telemetry.note_error(error_msg)
                 self.logger.error(f"[DeepSeek API] {error_msg}")
                 self.logger.error(f"[DeepSeek API] Error details: {str(e)}")
                 if attempt < max_retries - 1:
@@ -332,6 +363,7 @@ class DeepSeekAPIClient:
                     
             except Exception as e:
                 error_msg = str(e)
+                llm_telemetry.note_error(error_msg)
                 # Check if it's a premature end error
                 if 'prematurely' in error_msg.lower() or 'ended' in error_msg.lower() or 'incomplete' in error_msg.lower():
                     self.logger.error(f"[DeepSeek API] Response ended prematurely: {error_msg}")
@@ -357,7 +389,7 @@ class DeepSeekAPIClient:
         # This helps when deepseek-reasoner fails but deepseek-chat might work
         if auto_fallback_model and fallback_model and model_name == "deepseek-reasoner":
             self.logger.warning(f"[DeepSeek API] All retries with {model_name} failed. Attempting fallback to {fallback_model}...")
-            return self.process_text(
+            return self._process_text(
                 text=text,
                 system_prompt=system_prompt,
                 model_name=fallback_model,
@@ -0,0 +1,43 @@
+"""
+SHA-256 digests of files on disk.
+
+Content-addressed caches (PDF page text in ``pdf_page_cache``, audio peaks in
+``webapp.audio_peaks``) key their entries by :func:`file_sha256`, which remembers each digest
+per process by path, size and mtime so an unchanged file is read once. Artifact registration
+(``webapp.artifact_hashing``) hashes every file exactly once and uses :func:`sha256_of_file`.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict, Tuple
+
+_BLOCK_SIZE = 1024 * 1024
+
+_digest_lock = threading.Lock()
+# (realpath, size, mtime_ns) -> sha256 hex; avoids re-hashing unchanged files in one process.
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def sha256_of_file(file_path: str) -> str:
+    """SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file, memoized per process by path, size and mtime."""
+    real = os.path.realpath(file_path)
+    st = os.stat(real)
+    key = (real, st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        cached = _digest_memo.get(key)
+    if cached:
+        return cached
+    digest = sha256_of_file(real)
+    with _digest_lock:
+        _digest_memo[key] = digest
+    return digest
@@ -0,0 +1,239 @@
+"""
+Append-only writer for large nested JSON outputs (OCR Extraction, Document Processing).
+
+Processors used to re-read the whole output JSON, append one unit and re-dump it with
+indent=2 after every LLM response, which is O(n²) I/O on large chapters. This writer keeps
+the document in memory, records every change as one line in a JSONL sidecar journal
+(``<output>.journal.jsonl``) and writes the nested JSON at start, at finalize and at most
+every ``MATERIALIZE_INTERVAL_S`` seconds in between, so the output file readers see never
+lags the run by much.
+
+Journal lines:
+
+    {"op": "base", "doc": {...}}                         initial document
+    {"op": "append", "path": ["points"], "value": ...}   append value to the list at path
+    {"op": "set", "path": ["metadata", "k"], "value": v} set a key / index at path
+
+If the process dies mid-run, ``recover_from_journal`` replays the journal into the output
+file (``recover_journals_under`` does it for every journal left in a directory tree). A torn
+last line (crash during write) is ignored.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# Longest gap between two writes of the output file while a run is journaling
+MATERIALIZE_INTERVAL_S = 30.0
+
+PathKey = Union[str, int]
+
+
+def journal_path_for(output_path: str) -> str:
+    return f"{output_path}{JOURNAL_SUFFIX}"
+
+
+def _resolve_parent(doc: Any, path: Sequence[PathKey]) -> Any:
+    node = doc
+    for key in path[:-1]:
+        node = node[key]
+    return node
+
+
+def _apply(doc: Any, entry: Dict[str, Any]) -> Any:
+    op = entry.get("op")
+    if op == "base":
+        return entry.get("doc")
+    path = list(entry.get("path") or [])
+    if not path:
+        raise ValueError(f"Journal entry has no path: {entry!r}")
+    parent = _resolve_parent(doc, path)
+    key = path[-1]
+    if op == "append":
+        if isinstance(parent, dict):
+            parent.setdefault(key, []).append(entry.get("value"))
+        else:
+            parent[key].append(entry.get("value"))
+    elif op == "set":
+        parent[key] = entry.get("value")
+    else:
+        raise ValueError(f"Unknown journal op: {op!r}")
+    return doc
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def replay_journal(journal_path: str) -> Optional[Any]:
+    """Rebuild the document from a journal; returns None if there is no usable base entry."""
+    if not os.path.isfile(journal_path):
+        return None
+    doc: Any = None
+    have_base = False
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Ignoring torn journal line %s in %s", line_no, journal_path)
+                break
+            if entry.get("op") == "base":
+                have_base = True
+            elif not have_base:
+                continue
+            try:
+                doc = _apply(doc, entry)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.warning("Skipping journal line %s in %s: %s", line_no, journal_path, e)
+    return doc if have_base else None
+
+
+def load_journaled_json(output_path: str) -> Optional[Any]:
+    """
+    Load an output JSON, preferring its live journal when a run is still in progress
+    (or crashed) so readers see every unit written so far.
+    """
+    doc = replay_journal(journal_path_for(output_path))
+    if doc is not None:
+        return doc
+    if not os.path.isfile(output_path):
+        return None
+    with open(output_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def recover_from_journal(output_path: str, remove_journal: bool = False) -> bool:
+    """Materialize ``output_path`` from its journal (crash recovery). Returns True if written."""
+    jpath = journal_path_for(output_path)
+    doc = replay_journal(jpath)
+    if doc is None:
+        return False
+    _write_json_atomic(output_path, doc)
+    logger.info("Recovered %s from journal %s", output_path, jpath)
+    if remove_journal:
+        try:
+            os.remove(jpath)
+        except OSError:
+            pass
+    return True
+
+
+def recover_journals_under(root: str, recursive: bool = True) -> int:
+    """Recover and remove every journal left under ``root`` (interrupted runs). Returns the count."""
+    if not os.path.isdir(root):
+        return 0
+    if recursive:
+        dirs = ((d, files) for d, _subdirs, files in os.walk(root))
+    else:
+        dirs = [(root, os.listdir(root))]
+    recovered = 0
+    for directory, files in dirs:
+        for name in files:
+            if not name.endswith(JOURNAL_SUFFIX):
+                continue
+            output_path = os.path.join(directory, name[: -len(JOURNAL_SUFFIX)])
+            try:
+                if recover_from_journal(output_path, remove_journal=True):
+                    recovered += 1
+            except (OSError, ValueError) as e:
+                logger.warning("Could not recover %s from its journal: %s", output_path, e)
+    return recovered
+
+
+class JournaledJsonWriter:
+    """In-memory JSON document whose mutations are journaled to a JSONL sidecar."""
+
+    def __init__(self, output_path: str, materialize_interval_s: float = MATERIALIZE_INTERVAL_S):
+        self.output_path = str(output_path)
+        self.journal_path = journal_path_for(self.output_path)
+        self.materialize_interval_s = materialize_interval_s
+        self.doc: Any = None
+        self._journal = None
+        self._materialized_at = 0.0
+
+    def begin(self, initial_doc: Any) -> None:
+        """Write the initial document and start a fresh journal (truncates any previous one)."""
+        self.doc = json.loads(json.dumps(initial_doc, ensure_ascii=False))
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._log({"op": "base", "doc": self.doc})
+        self.materialize()
+
+    def _log(self, entry: Dict[str, Any]) -> None:
+        if self._journal is None:
+            raise RuntimeError("JournaledJsonWriter.begin() was not called")
+        self._journal.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        self._journal.write("\n")
+        self._journal.flush()
+
+    def append(self, path: Sequence[PathKey], value: Any, journal_only: bool = False) -> None:
+        """
+        Append ``value`` to the list at ``path``.
+
+        journal_only: record it in the journal (for crash recovery) without keeping it in the
+        in-memory document, e.g. raw LLM responses that the final output drops anyway.
+        """
+        entry = {"op": "append", "path": list(path), "value": value}
+        self._log(entry)
+        if not journal_only:
+            _apply(self.doc, entry)
+            self._materialize_if_due()
+
+    def set(self, path: Sequence[PathKey], value: Any) -> None:
+        entry = {"op": "set", "path": list(path), "value": value}
+        self._log(entry)
+        _apply(self.doc, entry)
+        self._materialize_if_due()
+
+    def get(self, path: Sequence[PathKey], default: Any = None) -> Any:
+        node = self.doc
+        try:
+            for key in path:
+                node = node[key]
+        except (KeyError, IndexError, TypeError):
+            return default
+        return node
+
+    def materialize(self) -> str:
+        """Write the current in-memory document to ``output_path`` (atomic replace)."""
+        _write_json_atomic(self.output_path, self.doc)
+        self._materialized_at = time.monotonic()
+        return self.output_path
+
+    def _materialize_if_due(self) -> None:
+        if time.monotonic() - self._materialized_at >= self.materialize_interval_s:
+            self.materialize()
+
+    def finalize(self, drop_keys: Sequence[str] = ()) -> str:
+        """Materialize the final document once and remove the journal."""
+        if isinstance(self.doc, dict):
+            for key in drop_keys:
+                self.doc.pop(key, None)
+        self.materialize()
+        self.close(remove_journal=True)
+        return self.output_path
+
+    def close(self, remove_journal: bool = False) -> None:
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            finally:
+                self._journal = None
+        if remove_journal:
+            try:
+                os.remove(self.journal_path)
+            except OSError:
+                pass
+
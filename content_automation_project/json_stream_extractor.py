@@ -0,0 +1,300 @@
+"""
+Single-pass JSON block extractor and repairer for LLM responses.
+
+Model responses wrap JSON in prose and markdown fences, emit several blocks, leave trailing
+commas, or get cut off at ``max_tokens``. ``StreamingJsonExtractor`` finds every top-level JSON
+object/array in one linear scan: it tracks strings, escapes and bracket nesting, jumping between
+structural characters with compiled regexes, and records safe cut points (after each complete
+element) as it goes. A balanced block is parsed once; a truncated one is repaired by closing the
+open brackets at the last cut point, so no trial-and-error over prefixes is needed.
+
+Text can be fed in pieces (``feed``), e.g. OpenRouter SSE deltas as they arrive, and the result
+is the same as scanning the joined text. ``remember_scan`` keeps the blocks of a recently streamed
+response so a later ``scan_json_blocks`` on the same text re-parses the block strings instead of
+rescanning the whole response.
+
+Rules, in order of preference:
+
+- a ``{`` / ``[`` opens a candidate block only if the next non-space character can start JSON
+  content (``[1]``-style citations still parse, but prose such as ``{x}`` is skipped at once);
+- a backtick outside a string inside a block ends the block (truncated block followed by a fence);
+- a block that fails to parse is retried without trailing commas, then repaired from its cut
+  points (newest first).
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, List, Optional, Tuple
+
+_OPEN_RE = re.compile(r"[\[{]")
+_STRUCT_RE = re.compile(r'["{}\[\],`]')
+_STRING_RE = re.compile(r'["\\]')
+_NONSPACE_RE = re.compile(r"\S")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+_CLOSER = {"{": "}", "[": "]"}
+_OBJECT_FIRST = frozenset('"}')
+_ARRAY_FIRST = frozenset('{["-0123456789tfn]')
+
+# Recently streamed responses whose blocks can be reused by scan_json_blocks
+_MEMO_SIZE = 16
+
+DEFAULT_MAX_REPAIR_ATTEMPTS = 16
+
+
+@dataclass
+class JsonBlock:
+    # Offset of the block's first character in the scanned text
+    start: int
+    # Source text of the block as it appeared (may be truncated)
+    text: str
+    # String that parsed to ``value`` (``text`` unless repaired)
+    parsed_text: str
+    value: Any
+    # The block's brackets balanced in the source
+    complete: bool
+    # ``value`` came from a repair (trailing commas removed or truncated block closed)
+    repaired: bool
+
+
+def _strip_trailing_commas(text: str) -> str:
+    return _TRAILING_COMMA_RE.sub(r"\1", text)
+
+
+def _loads(text: str) -> Tuple[bool, Any, str]:
+    try:
+        return True, json.loads(text), text
+    except ValueError:
+        pass
+    if _TRAILING_COMMA_RE.search(text):
+        fixed = _strip_trailing_commas(text)
+        try:
+            return True, json.loads(fixed), fixed
+        except ValueError:
+            pass
+    return False, None, text
+
+
+class StreamingJsonExtractor:
+    """Incremental scanner; ``feed`` text pieces, then ``finish`` to close a truncated block."""
+
+    def __init__(self, max_repair_attempts: int = DEFAULT_MAX_REPAIR_ATTEMPTS):
+        self.max_repair_attempts = max(1, int(max_repair_attempts))
+        self.blocks: List[JsonBlock] = []
+        self._offset = 0
+        self._in_block = False
+        self._finished = False
+        self._reset_block(0)
+
+    def _reset_block(self, start: int) -> None:
+        self._parts: List[str] = []
+        self._block_len = 0
+        self._block_start = start
+        self._stack: List[str] = []
+        self._cuts: List[Tuple[int, Tuple[str, ...]]] = []
+        self._pending_first: Optional[str] = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[JsonBlock]:
+        """Scan the next piece of text; returns blocks that were closed by it."""
+        if self._finished:
+            raise ValueError("feed() after finish()")
+        if not chunk:
+            return []
+        found_before = len(self.blocks)
+        c = chunk
+        n = len(c)
+        i = 0
+        seg = 0
+        while i < n:
+            if not self._in_block:
+                m = _OPEN_RE.search(c, i)
+                if m is None:
+                    break
+                j = m.start()
+                self._reset_block(self._offset + j)
+                self._stack.append(_CLOSER[c[j]])
+                self._pending_first = c[j]
+                self._in_block = True
+                seg = j
+                i = j + 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_RE.search(c, i)
+                if m is None:
+                    break
+                j = m.start()
+                if c[j] == "\\":
+                    if j + 1 < n:
+                        i = j + 2
+                    else:
+                        self._escape = True
+                        i = n
+                    continue
+                self._in_string = False
+                i = j + 1
+                continue
+
+            if self._pending_first is not None:
+                m = _NONSPACE_RE.search(c, i)
+                if m is None:
+                    break
+                j = m.start()
+                allowed = _OBJECT_FIRST if self._pending_first == "{" else _ARRAY_FIRST
+                if c[j] not in allowed:
+                    # Prose bracket, not JSON: drop it and rescan from here.
+                    self._in_block = False
+                    i = j
+                    continue
+                self._pending_first = None
+                i = j
+                continue
+
+            m = _STRUCT_RE.search(c, i)
+            if m is None:
+                break
+            j = m.start()
+            ch = c[j]
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                self._stack.append(_CLOSER[ch])
+            elif ch == ",":
+                self._cuts.append((self._block_len + j - seg, tuple(self._stack)))
+            elif ch == "`":
+                self._close_block(c[seg:j], complete=False)
+                i = j + 1
+                continue
+            else:
+                stack = self._stack
+                if stack[-1] == ch:
+                    stack.pop()
+                elif ch in stack:
+                    while stack.pop() != ch:
+                        pass
+                else:
+                    i = j + 1
+                    continue
+                if not stack:
+                    self._close_block(c[seg : j + 1], complete=True)
+                    i = j + 1
+                    continue
+                self._cuts.append((self._block_len + j + 1 - seg, tuple(stack)))
+            i = j + 1
+
+        if self._in_block:
+            self._parts.append(c[seg:])
+            self._block_len += n - seg
+        self._offset += n
+        return self.blocks[found_before:]
+
+    def finish(self) -> List[JsonBlock]:
+        """Close (and repair) a block left open at the end of the text; returns it if it parsed."""
+        if self._finished:
+            return []
+        self._finished = True
+        found_before = len(self.blocks)
+        if self._in_block and self._pending_first is None:
+            self._close_block("", complete=False)
+        self._in_block = False
+        return self.blocks[found_before:]
+
+    def _close_block(self, tail: str, *, complete: bool) -> None:
+        self._in_block = False
+        text = "".join(self._parts) + tail if self._parts else tail
+        if self._pending_first is not None:
+            return
+        ok, value, parsed_text = _loads(text) if complete else (False, None, text)
+        repaired = ok and parsed_text is not text
+        if not ok:
+            ok, value, parsed_text = self._repair(text, complete)
+            repaired = ok
+        if ok:
+            self.blocks.append(
+                JsonBlock(self._block_start, text, parsed_text, value, complete=complete, repaired=repaired)
+            )
+
+    def _repair(self, text: str, complete: bool) -> Tuple[bool, Any, str]:
+        candidates: List[str] = []
+        if not complete:
+            open_closers = "".join(reversed(self._stack))
+            if self._in_string:
+                candidates.append(text + '"' + open_closers)
+            else:
+                candidates.append(text.rstrip().rstrip(",") + open_closers)
+        for pos, stack in reversed(self._cuts):
+            candidates.append(text[:pos].rstrip().rstrip(",") + "".join(reversed(stack)))
+            if len(candidates) >= self.max_repair_attempts:
+                break
+        for cand in candidates:
+            ok, value, parsed_text = _loads(cand)
+            if ok:
+                return True, value, parsed_text
+        return False, None, text
+
+
+_memo: "OrderedDict[str, List[JsonBlock]]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def remember_scan(text: str, blocks: List[JsonBlock]) -> None:
+    """Keep ``blocks`` (e.g. from a streamed response) for a later ``scan_json_blocks(text)``."""
+    if not text:
+        return
+    with _memo_lock:
+        _memo[text] = list(blocks)
+        _memo.move_to_end(text)
+        while len(_memo) > _MEMO_SIZE:
+            _memo.popitem(last=False)
+
+
+def _unescape_json_string(text: str) -> str:
+    stripped = text.strip()
+    if len(stripped) >= 2 and stripped[0] == '"' and stripped[-1] == '"':
+        try:
+            inner = json.loads(stripped)
+        except ValueError:
+            return text
+        if isinstance(inner, str):
+            return inner
+    return text
+
+
+def scan_json_blocks(text: str) -> List[JsonBlock]:
+    """Every top-level JSON block in ``text`` that parses (directly or after repair), in order."""
+    if not text:
+        return []
+    with _memo_lock:
+        cached = _memo.get(text)
+    if cached is not None:
+        # Fresh objects per call: callers may mutate the parsed values.
+        return [replace(b, value=json.loads(b.parsed_text)) for b in cached]
+    extractor = StreamingJsonExtractor()
+    extractor.feed(_unescape_json_string(text))
+    extractor.finish()
+    return extractor.blocks
+
+
+def extract_json_values(text: str) -> List[Any]:
+    """Parsed values of every JSON block in ``text``, in document order."""
+    return [b.value for b in scan_json_blocks(text)]
+
+
+def extract_primary_json(text: str) -> Optional[Any]:
+    """The largest JSON object/array in ``text`` (by source length), or None."""
+    best: Optional[JsonBlock] = None
+    for block in scan_json_blocks(text):
+        if not isinstance(block.value, (dict, list)):
+            continue
+        if best is None or len(block.text) > len(best.text):
+            best = block
+    return best.value if best is not None else None
@@ -0,0 +1,224 @@
+"""
+Token-budget chunk planner for row-batched LLM stages (Stage J / Stage H web runners).
+
+Fixed row counts give uneven prompts: a chunk of long Persian rows whose topics carry many
+table/image captions can overflow the model window while a chunk of short rows is tiny.
+``plan_chunks`` packs consecutive rows until an estimated token budget is reached, counting
+per-group payloads (e.g. a topic's captions, which the prompt carries once per topic per chunk)
+only the first time a group appears in a chunk. It then evens out chunk sizes so the tail
+chunk is not a handful of rows.
+
+Token counts are estimates (no tokenizer dependency): ASCII text is counted at ~4 characters
+per token and other scripts at ~2, which errs on the high side for Persian.
+
+``run_with_bisect`` is the safety net: when a chunk still fails with a context-limit error
+(the runner raises ``ContextLimitExceeded``) it is split in half and each half is retried.
+
+Configuration (environment):
+
+    LLM_CHUNK_BUDGETS   JSON, e.g.
+        {"default": {"context_tokens": 128000, "chunk_tokens": 24000, "max_rows": 100},
+         "z-ai/glm-5": {"chunk_tokens": 16000}}
+"""
+
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, TypeVar
+
+from openrouter_models import resolve_openrouter_model_choice
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BUDGETS_ENV = "LLM_CHUNK_BUDGETS"
+
+# Share of the context window the planner will fill (estimates are not exact)
+_CONTEXT_SAFETY = 0.85
+# Balanced chunks may exceed the even share by this factor before a new chunk is opened
+_BALANCE_SLACK = 1.1
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ChunkBudget:
+    # Model context window (prompt + completion)
+    context_tokens: int = 128000
+    # Target per-chunk payload: row/group prompt tokens + expected completion tokens
+    chunk_tokens: int = 24000
+    # Hard cap on rows per chunk, whatever their size
+    max_rows: int = 100
+
+
+_BUILTIN_BUDGETS: Dict[str, ChunkBudget] = {
+    "z-ai/glm-5": ChunkBudget(context_tokens=200000),
+    "z-ai/glm-5.1": ChunkBudget(context_tokens=200000),
+    "google/gemini-2.5-pro": ChunkBudget(context_tokens=1000000, chunk_tokens=32000),
+}
+
+
+class ContextLimitExceeded(Exception):
+    """Raised by a chunk runner when the provider rejects the prompt as too long."""
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4 + other_chars / 2)
+
+
+def estimate_json_tokens(value: Any) -> int:
+    """Estimate for ``value`` as serialized into prompts (compact JSON, UTF-8 kept)."""
+    return estimate_tokens(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+
+
+def load_chunk_budgets_from_env() -> Dict[str, ChunkBudget]:
+    """Built-in budgets overlaid with LLM_CHUNK_BUDGETS; "default" applies to unlisted models."""
+    budgets: Dict[str, ChunkBudget] = {"default": ChunkBudget(), **_BUILTIN_BUDGETS}
+    raw = (os.environ.get(CHUNK_BUDGETS_ENV) or "").strip()
+    if not raw:
+        return budgets
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError as e:
+        logger.warning("Ignoring invalid %s: %s", CHUNK_BUDGETS_ENV, e)
+        return budgets
+    if not isinstance(parsed, dict):
+        return budgets
+    default_spec = parsed.get("default") if isinstance(parsed.get("default"), dict) else {}
+    budgets["default"] = _budget_from_spec(budgets["default"], default_spec)
+    for model, spec in parsed.items():
+        if model != "default" and isinstance(spec, dict):
+            budgets[model] = _budget_from_spec(budgets.get(model, budgets["default"]), spec)
+    return budgets
+
+
+def _budget_from_spec(base: ChunkBudget, spec: dict) -> ChunkBudget:
+    fields = {}
+    try:
+        for name in ("context_tokens", "chunk_tokens", "max_rows"):
+            if name in spec:
+                fields[name] = max(1, int(spec[name]))
+    except (TypeError, ValueError) as e:
+        logger.warning("Ignoring invalid chunk budget spec %r: %s", spec, e)
+        return base
+    return replace(base, **fields)
+
+
+def chunk_budget_for_model(model_name: str) -> ChunkBudget:
+    budgets = load_chunk_budgets_from_env()
+    api_model, _ = resolve_openrouter_model_choice(model_name or "")
+    for key in (model_name, api_model):
+        if key and key in budgets:
+            return budgets[key]
+    return budgets["default"]
+
+
+def chunk_token_limit(budget: ChunkBudget, fixed_tokens: int, reserved_output_tokens: int = 0) -> int:
+    """Tokens available to row/group payloads in one chunk after the fixed prompt parts."""
+    room = int(budget.context_tokens * _CONTEXT_SAFETY) - fixed_tokens - reserved_output_tokens
+    return max(1, min(budget.chunk_tokens, room))
+
+
+def _pack(
+    rows: Sequence[T],
+    costs: List[int],
+    keys: List[Optional[Hashable]],
+    group_cost: Callable[[Hashable], int],
+    limit: int,
+    max_rows: int,
+) -> List[List[T]]:
+    chunks: List[List[T]] = []
+    current: List[T] = []
+    seen: set = set()
+    used = 0
+    for row, cost, key in zip(rows, costs, keys):
+        extra = cost
+        if key is not None and key not in seen:
+            extra += group_cost(key)
+        if current and (used + extra > limit or len(current) >= max_rows):
+            chunks.append(current)
+            current, seen, used = [], set(), 0
+            extra = cost + (group_cost(key) if key is not None else 0)
+        current.append(row)
+        used += extra
+        if key is not None:
+            seen.add(key)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def plan_chunks(
+    rows: Sequence[T],
+    *,
+    row_tokens: Callable[[T], int],
+    limit_tokens: int,
+    max_rows: int,
+    group_key: Optional[Callable[[T], Optional[Hashable]]] = None,
+    group_tokens: Optional[Callable[[Hashable], int]] = None,
+) -> List[List[T]]:
+    """
+    Split ``rows`` into consecutive chunks whose estimated cost stays within ``limit_tokens``.
+
+    A chunk's cost is the sum of ``row_tokens`` plus ``group_tokens(key)`` once for each distinct
+    ``group_key`` in it. A single row larger than the limit still gets its own chunk.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    max_rows = max(1, int(max_rows))
+    costs = [max(0, int(row_tokens(r))) for r in rows]
+    keys: List[Optional[Hashable]] = [group_key(r) if group_key else None for r in rows]
+    group_cache: Dict[Hashable, int] = {}
+
+    def _group_cost(key: Hashable) -> int:
+        if group_tokens is None:
+            return 0
+        if key not in group_cache:
+            group_cache[key] = max(0, int(group_tokens(key)))
+        return group_cache[key]
+
+    chunks = _pack(rows, costs, keys, _group_cost, limit_tokens, max_rows)
+    if len(chunks) < 2:
+        return chunks
+
+    # Second pass with an even share of the work per chunk, so the last chunk is not a stub.
+    n = len(chunks)
+    total = sum(costs) + sum(_group_cost(k) for k in set(keys) if k is not None)
+    share = min(limit_tokens, int(math.ceil(total / n * _BALANCE_SLACK)))
+    row_share = min(max_rows, int(math.ceil(len(rows) / n * _BALANCE_SLACK)))
+    balanced = _pack(rows, costs, keys, _group_cost, share, row_share)
+    return balanced if len(balanced) == n else chunks
+
+
+def run_with_bisect(
+    rows: List[T],
+    run: Callable[[List[T]], Optional[List[Any]]],
+    *,
+    on_split: Optional[Callable[[int, int], None]] = None,
+) -> Optional[List[Any]]:
+    """
+    Call ``run(rows)``; if it raises ``ContextLimitExceeded``, split ``rows`` in half and run
+    each half the same way, concatenating results in row order. Returns None when any part
+    fails (``run`` returned None, or a single row is still over the limit).
+    """
+    try:
+        return run(rows)
+    except ContextLimitExceeded:
+        if len(rows) <= 1:
+            return None
+    mid = len(rows) // 2
+    if on_split:
+        on_split(len(rows), mid)
+    left = run_with_bisect(rows[:mid], run, on_split=on_split)
+    if left is None:
+        return None
+    right = run_with_bisect(rows[mid:], run, on_split=on_split)
+    if right is None:
+        return None
+    return list(left) + list(right)
@@ -0,0 +1,182 @@
+"""
+Content-addressed, disk-backed cache for LLM text responses (opt-in).
+
+Reruns, retry passes and repeated pipeline runs send byte-identical requests through
+``UnifiedAPIClient.process_text``. When enabled, the response for each request is stored under
+a SHA-256 of the full request (model, system prompt, user text, temperature, max tokens and
+payload options), so an identical request is answered from disk without an API call.
+
+Entries expire after a TTL; the directory is kept under a size budget by evicting the least
+recently used entries (a hit refreshes the entry's mtime).
+
+Configuration (environment):
+
+    LLM_RESPONSE_CACHE_DIR            enable the cache, rooted here (unset = disabled)
+    LLM_RESPONSE_CACHE_TTL_SECONDS    default 604800 (7 days)
+    LLM_RESPONSE_CACHE_MAX_MB         default 512
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "LLM_RESPONSE_CACHE_DIR"
+TTL_ENV = "LLM_RESPONSE_CACHE_TTL_SECONDS"
+MAX_MB_ENV = "LLM_RESPONSE_CACHE_MAX_MB"
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_MB = 512
+
+# Cache modes accepted by UnifiedAPIClient.process_text(response_cache=...)
+CACHE_USE = "use"  # read and write
+CACHE_REFRESH = "refresh"  # always call the API, then store the new response
+CACHE_BYPASS = "bypass"  # neither read nor write
+
+_MODE_STRENGTH = {CACHE_USE: 0, CACHE_REFRESH: 1, CACHE_BYPASS: 2}
+
+
+def mode_for_attempt(attempt: int) -> str:
+    """Cache mode for the ``attempt``-th (1-based) try of one request.
+
+    ``process_text`` stores a non-empty response before the caller has parsed it. A retry (or a
+    re-queued work item) means the caller rejected that answer, so every attempt after the first
+    skips the lookup and overwrites the rejected entry with the new response.
+    """
+    return CACHE_USE if attempt <= 1 else CACHE_REFRESH
+
+
+def strictest_mode(*modes: Optional[str]) -> str:
+    """The most restrictive of ``modes`` (bypass > refresh > use); None entries are ignored."""
+    return max((m for m in modes if m), key=lambda m: _MODE_STRENGTH.get(m, 0), default=CACHE_USE)
+
+
+def request_cache_key(request: Dict[str, Any]) -> str:
+    """SHA-256 of the canonical JSON form of a request description."""
+    canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """TTL + size-bounded LRU response cache stored as one JSON file per request hash."""
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = os.path.abspath(os.path.expanduser(str(cache_dir)))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        root = (os.environ.get(CACHE_DIR_ENV) or "").strip()
+        if not root:
+            return None
+        try:
+            ttl = float(os.environ.get(TTL_ENV) or DEFAULT_TTL_SECONDS)
+            max_mb = float(os.environ.get(MAX_MB_ENV) or DEFAULT_MAX_MB)
+        except ValueError as e:
+            logger.warning("Invalid LLM response cache setting (%s); using defaults", e)
+            ttl, max_mb = DEFAULT_TTL_SECONDS, DEFAULT_MAX_MB
+        return cls(root, ttl_seconds=ttl, max_bytes=int(max_mb * 1024 * 1024))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stores": self.stores}
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and time.time() - float(entry.get("created_at") or 0) > self.ttl_seconds:
+            self._remove(path)
+            entry = None
+        response = entry.get("response") if isinstance(entry, dict) else None
+        with self._lock:
+            if isinstance(response, str):
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not isinstance(response, str):
+            return None
+        try:
+            os.utime(path, None)  # LRU: mark as recently used
+        except OSError:
+            pass
+        return response
+
+    def put(self, key: str, response: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        path = self._path(key)
+        entry = {"created_at": time.time(), "meta": meta or {}, "response": response}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write LLM response cache entry: %s", e)
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            self.stores += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            over_budget = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under 90% of the budget."""
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+            logger.info("LLM response cache evicted entries down to %s bytes", total)
+        elif self.ttl_seconds > 0:
+            for mtime, size, path in entries:
+                # mtime >= created_at, so anything untouched for longer than the TTL is expired
+                if now - mtime > self.ttl_seconds:
+                    self._remove(path)
+                    total -= size
+        with self._lock:
+            self._approx_bytes = total
@@ -0,0 +1,368 @@
+"""
+Structured per-request telemetry for LLM provider calls.
+
+Provider clients (OpenRouter, DeepSeek, Gemini) wrap each logical request in
+:func:`track_request`; the code inside reports what happened through the module-level
+``note_*`` helpers (retries, credit-cap reductions, first streamed token, usage, errors),
+which are no-ops outside a tracked request. When the request ends one
+:class:`LLMRequestRecord` is built and handed to every registered sink.
+
+Who is asking is not known to the provider client, so callers higher up describe the call
+with :func:`request_context`: ``UnifiedAPIClient`` sets the stage and the webapp's prompt
+capture wrapper sets job, pair, unit, job type and pipeline step. Contexts nest and are
+per thread (``contextvars``), so parallel units never see each other's values.
+
+Sinks: the webapp stores records in its ``llm_requests`` table
+(``webapp.llm_telemetry_store``); any process can also append them as JSON lines to a
+rolling file.
+
+Configuration (environment):
+
+    LLM_TELEMETRY_FILE             path of a JSONL file to append records to (default: off)
+    LLM_TELEMETRY_FILE_MAX_BYTES   rotate the file at this size (default: 10 MB, 5 backups kept)
+"""
+
+import asyncio
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+FILE_ENV = "LLM_TELEMETRY_FILE"
+FILE_MAX_BYTES_ENV = "LLM_TELEMETRY_FILE_MAX_BYTES"
+_FILE_BACKUPS = 5
+
+OUTCOME_OK = "ok"
+OUTCOME_EMPTY = "empty"
+OUTCOME_ERROR = "error"
+OUTCOME_ABORTED = "aborted"
+
+_CONTEXT_FIELDS = ("stage", "job_id", "pair_index", "unit_index", "job_type", "step")
+
+_context: ContextVar[Dict[str, Any]] = ContextVar("llm_telemetry_context", default={})
+_current: ContextVar[Optional["RequestTracker"]] = ContextVar("llm_telemetry_request", default=None)
+
+_sinks_lock = threading.Lock()
+_sinks: List[Callable[["LLMRequestRecord"], None]] = []
+_file_logger: Optional[logging.Logger] = None
+_file_path: Optional[str] = None
+
+
+@dataclass
+class LLMRequestRecord:
+    """One provider request as seen by the caller (retries included)."""
+
+    ts: str
+    provider: str
+    model: str
+    stage: str
+    outcome: str
+    job_id: Optional[str] = None
+    pair_index: Optional[int] = None
+    unit_index: Optional[int] = None
+    job_type: Optional[str] = None
+    step: Optional[str] = None
+    prompt_chars: int = 0
+    response_chars: int = 0
+    max_tokens: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    cost: Optional[float] = None
+    queue_ms: Optional[int] = None
+    ttft_ms: Optional[int] = None
+    latency_ms: int = 0
+    retries: int = 0
+    credit_cap_reductions: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@contextmanager
+def request_context(**fields: Any) -> Iterator[None]:
+    """Describe the LLM calls made inside the block (stage, job_id, pair_index, unit_index, job_type, step)."""
+    unknown = set(fields) - set(_CONTEXT_FIELDS)
+    if unknown:
+        raise TypeError(f"Unknown telemetry context fields: {sorted(unknown)}")
+    merged = dict(_context.get())
+    merged.update({k: v for k, v in fields.items() if v is not None})
+    token = _context.set(merged)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> Dict[str, Any]:
+    return dict(_context.get())
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestTracker:
+    """Timing and counters of one tracked request; see :func:`track_request`."""
+
+    def __init__(self, provider: str, model: str, prompt_chars: int, max_tokens: Optional[int]):
+        self.provider = provider
+        self.model = model
+        self.prompt_chars = int(prompt_chars or 0)
+        self.max_tokens = max_tokens
+        self.context = current_context()
+        self.started = time.monotonic()
+        self.queue_ms: Optional[int] = None
+        self.ttft_ms: Optional[int] = None
+        self.retries = 0
+        self.credit_cap_reductions = 0
+        self.usage: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.outcome: Optional[str] = None
+        self.response_chars = 0
+
+    def _elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+    def mark_dispatched(self) -> None:
+        """The request left the local queue (rate-governor slot acquired)."""
+        if self.queue_ms is None:
+            self.queue_ms = self._elapsed_ms()
+
+    def mark_first_token(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = self._elapsed_ms()
+
+    def set_usage(self, usage: Optional[Mapping[str, Any]]) -> None:
+        if isinstance(usage, Mapping):
+            self.usage.update({k: v for k, v in usage.items() if v is not None})
+
+    def set_result(self, text: Optional[str]) -> None:
+        self.response_chars = len(text) if isinstance(text, str) else 0
+        if text:
+            self.outcome = OUTCOME_OK
+        elif self.outcome is None:
+            self.outcome = OUTCOME_ERROR if self.error else OUTCOME_EMPTY
+
+    def record(self) -> LLMRequestRecord:
+        ctx = self.context
+        usage = self.usage
+        return LLMRequestRecord(
+            ts=datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            provider=self.provider,
+            model=self.model or "",
+            stage=str(ctx.get("stage") or ctx.get("job_type") or "unknown"),
+            outcome=self.outcome or (OUTCOME_ERROR if self.error else OUTCOME_EMPTY),
+            job_id=ctx.get("job_id"),
+            pair_index=_int_or_none(ctx.get("pair_index")),
+            unit_index=_int_or_none(ctx.get("unit_index")),
+            job_type=ctx.get("job_type"),
+            step=ctx.get("step"),
+            prompt_chars=self.prompt_chars,
+            response_chars=self.response_chars,
+            max_tokens=_int_or_none(self.max_tokens),
+            prompt_tokens=_int_or_none(usage.get("prompt_tokens")),
+            completion_tokens=_int_or_none(usage.get("completion_tokens")),
+            total_tokens=_int_or_none(usage.get("total_tokens")),
+            cost=_float_or_none(usage.get("cost")),
+            queue_ms=self.queue_ms,
+            ttft_ms=self.ttft_ms,
+            latency_ms=self._elapsed_ms(),
+            retries=self.retries,
+            credit_cap_reductions=self.credit_cap_reductions,
+            error=self.error[:500] if self.error else None,
+        )
+
+
+@contextmanager
+def track_request(
+    provider: str,
+    model: str,
+    *,
+    prompt_chars: int = 0,
+    max_tokens: Optional[int] = None,
+    abort_errors: Tuple[Type[BaseException], ...] = (),
+) -> Iterator[RequestTracker]:
+    """
+    Track one provider request; emits its record when the block exits.
+
+    Call ``tracker.set_result(text)`` with what the request returned. An exception leaving
+    the block marks the request as aborted (``abort_errors``, e.g. a user stop) or failed.
+    Nested ``track_request`` blocks are recorded separately; the ``note_*`` helpers report
+    to the innermost one.
+    """
+    tracker = RequestTracker(provider, model, prompt_chars, max_tokens)
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    except BaseException as e:
+        tracker.outcome = OUTCOME_ABORTED if isinstance(e, abort_errors) else OUTCOME_ERROR
+        if tracker.outcome == OUTCOME_ERROR:
+            tracker.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        emit(tracker.record())
+
+
+def note_retry() -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.retries += 1
+
+
+def note_credit_cap() -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.credit_cap_reductions += 1
+
+
+def note_first_token() -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.mark_first_token()
+
+
+def note_usage(usage: Optional[Mapping[str, Any]]) -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.set_usage(usage)
+
+
+def note_error(message: str) -> None:
+    """Last error seen by the request; it ends as "error" unless it still returns text."""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.error = str(message)
+
+
+def add_sink(sink: Callable[[LLMRequestRecord], None]) -> None:
+    with _sinks_lock:
+        if sink not in _sinks:
+            _sinks.append(sink)
+
+
+def remove_sink(sink: Callable[[LLMRequestRecord], None]) -> None:
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+def _file_sink_logger() -> Optional[logging.Logger]:
+    """Logger writing bare JSON lines to $LLM_TELEMETRY_FILE (re-created if the path changes)."""
+    global _file_logger, _file_path
+    path = (os.environ.get(FILE_ENV) or "").strip()
+    if not path:
+        return None
+    if _file_logger is not None and path == _file_path:
+        return _file_logger
+    with _sinks_lock:
+        if _file_logger is None or path != _file_path:
+            try:
+                max_bytes = int(os.environ.get(FILE_MAX_BYTES_ENV) or 10 * 1024 * 1024)
+            except ValueError:
+                max_bytes = 10 * 1024 * 1024
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=_FILE_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            file_logger = logging.getLogger(f"{__name__}.file")
+            for old in list(file_logger.handlers):
+                file_logger.removeHandler(old)
+                old.close()
+            file_logger.addHandler(handler)
+            file_logger.setLevel(logging.INFO)
+            file_logger.propagate = False
+            _file_logger, _file_path = file_logger, path
+    return _file_logger
+
+
+def emit(record: LLMRequestRecord) -> None:
+    """Hand ``record`` to the rolling file and every sink; telemetry never fails a request."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        # Inside a coroutine (openrouter_async): file and DB writes must not stall the event loop
+        loop.run_in_executor(None, _emit_now, record)
+    else:
+        _emit_now(record)
+
+
+def _emit_now(record: LLMRequestRecord) -> None:
+    try:
+        file_logger = _file_sink_logger()
+        if file_logger is not None:
+            file_logger.info(json.dumps(record.to_dict(), ensure_ascii=False))
+    except Exception as e:
+        logger.warning("LLM telemetry file write failed: %s", e)
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        try:
+            sink(record)
+        except Exception as e:
+            logger.warning("LLM telemetry sink %r failed: %s", sink, e)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (``q`` in 0..100) of ``values``; None when empty."""
+    ordered = sorted(v for v in values if v is not None)
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(min(rank, len(ordered))) - 1]
+
+
+def summarize(records: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-stage request counts, p50/p95 latency and TTFT, tokens and cost (stages by total latency, descending)."""
+    groups: Dict[str, List[Mapping[str, Any]]] = {}
+    for r in records:
+        groups.setdefault(str(r.get("stage") or "unknown"), []).append(r)
+    out = []
+    for stage, rows in groups.items():
+        latencies = [r.get("latency_ms") for r in rows if r.get("latency_ms") is not None]
+        ttfts = [r.get("ttft_ms") for r in rows if r.get("ttft_ms") is not None]
+        costs = [r.get("cost") for r in rows if r.get("cost") is not None]
+        out.append(
+            {
+                "stage": stage,
+                "requests": len(rows),
+                "errors": sum(1 for r in rows if r.get("outcome") in (OUTCOME_ERROR, OUTCOME_EMPTY)),
+                "retries": sum(int(r.get("retries") or 0) for r in rows),
+                "credit_cap_reductions": sum(int(r.get("credit_cap_reductions") or 0) for r in rows),
+                "latency_p50_ms": percentile(latencies, 50),
+                "latency_p95_ms": percentile(latencies, 95),
+                "latency_total_ms": sum(latencies),
+                "ttft_p50_ms": percentile(ttfts, 50),
+                "prompt_chars": sum(int(r.get("prompt_chars") or 0) for r in rows),
+                "prompt_tokens": sum(int(r.get("prompt_tokens") or 0) for r in rows),
+                "completion_tokens": sum(int(r.get("completion_tokens") or 0) for r in rows),
+                "cost": round(sum(costs), 6) if costs else None,
+                "models": sorted({str(r.get("model") or "") for r in rows}),
+            }
+        )
+    out.sort(key=lambda s: (-s["latency_total_ms"], s["stage"]))
+    return out
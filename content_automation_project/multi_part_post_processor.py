@@ -13,6 +13,10 @@ import os
 import re
 from typing import Dict, Any, List, Optional, Tuple
 
+from journaled_json_writer import JournaledJsonWriter
+from json_stream_extractor import extract_json_values
+from prompt_payload import encode_payload
+
 
 class MultiPartPostProcessor:
     """Post-process an existing final_output.json file part-by-part."""
@@ -222,7 +226,7 @@ class MultiPartPostProcessor:
                 continue
 
             # Build text payload: just the JSON for this part
-            part_json_text = json.dumps(part_rows, ensure_ascii=False, indent=2)
+            part_json_text = encode_payload(part_rows, stage="post_process", label=f"part {part_num}")
 
             # Use only user's prompt, no additions
             self.logger.info(f"Processing Part {part_num} ({len(part_rows)} rows) with second-stage prompt...")
@@ -444,53 +448,12 @@ class MultiPartPostProcessor:
         
         return result
 
-    def _find_balanced_json_end(self, text: str, start: int, open_char: str, close_char: str) -> int:
-        """
-        Find the index of the matching closing bracket/brace, respecting strings and nesting.
-        open_char is '{' or '[', close_char is '}' or ']'.
-        Returns -1 if not found.
-        """
-        depth = 0
-        i = start
-        in_string = False
-        escape_next = False
-        quote_char = None
-        n = len(text)
-        while i < n:
-            c = text[i]
-            if escape_next:
-                escape_next = False
-                i += 1
-                continue
-            if c == '\\' and in_string:
-                escape_next = True
-                i += 1
-                continue
-            if c in ('"', "'") and not escape_next:
-                if not in_string:
-                    in_string = True
-                    quote_char = c
-                elif c == quote_char:
-                    in_string = False
-                i += 1
-                continue
-            if in_string:
-                i += 1
-                continue
-            if c == open_char:
-                depth += 1
-            elif c == close_char:
-                depth -= 1
-                if depth == 0:
-                    return i
-            i += 1
-        return -1
-
     def _extract_json_blocks_from_text(self, text: str) -> List[Dict[str, Any]]:
         """
         Extract JSON blocks from a single text response.
-        Handles: whole-text JSON, markdown code blocks (```json / ```), raw JSON by braces,
-        escaped JSON strings, and fallback (ThirdStageConverter).
+        Handles whole-text JSON, markdown code blocks, raw JSON among prose, escaped JSON strings,
+        trailing commas and truncated output in one pass (json_stream_extractor).
+        Top-level arrays contribute their object items.
 
         Returns:
             List of JSON objects (dicts) extracted from the text
@@ -501,114 +464,14 @@ class MultiPartPostProcessor:
         if not text:
             return []
 
-        # Strategy 0: Escaped JSON string (e.g. from raw_responses)
-        try:
-            if text.startswith('"') and text.endswith('"'):
-                unescaped = json.loads(text)
-                if isinstance(unescaped, str):
-                    return self._extract_json_blocks_from_text(unescaped)
-        except (json.JSONDecodeError, TypeError):
-            pass
-
         json_blocks: List[Dict[str, Any]] = []
-        matches: List[str] = []
-
-        # Strategy 1: Whole text is a single JSON object or array (raw model output, no markdown)
-        stripped = text.strip()
-        if stripped.startswith('{') or stripped.startswith('['):
-            try:
-                obj = json.loads(stripped)
-                if isinstance(obj, dict):
-                    json_blocks.append(obj)
-                    self.logger.debug("Extracted single JSON object from whole response (no markdown)")
-                    return json_blocks
-                if isinstance(obj, list):
-                    for item in obj:
-                        if isinstance(item, dict):
-                            json_blocks.append(item)
-                    if json_blocks:
-                        self.logger.debug("Extracted %d JSON object(s) from whole response array", len(json_blocks))
-                        return json_blocks
-            except json.JSONDecodeError:
-                pass
-
-        # Strategy 2: Markdown code blocks (case-insensitive ```json and plain ```)
-        code_block_patterns = [
-            r'```\s*[jJ][sS][oO][nN]\s*\n?(.*?)```',
-            r'```\s*(.*?)```',
-        ]
-        for pattern in code_block_patterns:
-            found = re.findall(pattern, text, re.DOTALL)
-            if found:
-                matches = [m.strip() for m in found if m and m.strip()]
-                break
-
-        # Strategy 3: No code blocks — extract by balanced braces
-        if not matches:
-            pos = 0
-            while pos < len(text):
-                start_obj = text.find('{', pos)
-                start_arr = text.find('[', pos)
-                if start_obj == -1 and start_arr == -1:
-                    break
-                start = start_obj if (start_arr == -1 or (start_obj != -1 and start_obj < start_arr)) else start_arr
-                open_c, close_c = ('{', '}') if text[start] == '{' else ('[', ']')
-                end = self._find_balanced_json_end(text, start, open_c, close_c)
-                if end != -1:
-                    candidate = text[start:end + 1].strip()
-                    if candidate:
-                        matches.append(candidate)
-                    pos = end + 1
-                else:
-                    pos = start + 1
-
-        for raw in matches:
-            json_str = raw.strip()
-            if not json_str:
-                continue
-            try:
-                obj = json.loads(json_str)
-                if isinstance(obj, dict):
-                    json_blocks.append(obj)
-                elif isinstance(obj, list):
-                    for item in obj:
-                        if isinstance(item, dict):
-                            json_blocks.append(item)
-            except json.JSONDecodeError:
-                start_obj = json_str.find('{')
-                start_arr = json_str.find('[')
-                if start_obj != -1 or start_arr != -1:
-                    start = start_obj if (start_arr == -1 or (start_obj != -1 and start_obj < start_arr)) else start_arr
-                    open_c, close_c = ('{', '}') if json_str[start] == '{' else ('[', ']')
-                    end = self._find_balanced_json_end(json_str, start, open_c, close_c)
-                    if end != -1:
-                        try:
-                            obj = json.loads(json_str[start:end + 1])
-                            if isinstance(obj, dict):
-                                json_blocks.append(obj)
-                            elif isinstance(obj, list):
-                                for item in obj:
-                                    if isinstance(item, dict):
-                                        json_blocks.append(item)
-                        except json.JSONDecodeError:
-                            pass
-
-        # Strategy 4: Fallback — ThirdStageConverter (repair, largest valid JSON)
-        if not json_blocks:
-            try:
-                from third_stage_converter import ThirdStageConverter
-                converter = ThirdStageConverter()
-                parsed = converter._extract_json_from_response(text)
-                if parsed is not None:
-                    if isinstance(parsed, dict):
-                        json_blocks.append(parsed)
-                    elif isinstance(parsed, list):
-                        for item in parsed:
-                            if isinstance(item, dict):
-                                json_blocks.append(item)
-            except Exception as e:
-                self.logger.debug(f"ThirdStageConverter fallback failed: {e}")
-
+        for obj in extract_json_values(text):
+            if isinstance(obj, dict):
+                json_blocks.append(obj)
+            elif isinstance(obj, list):
+                for item in obj:
+                    if isinstance(item, dict):
+                        json_blocks.append(item)
         return json_blocks
 
     def _combine_json_blocks(self, json_blocks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -743,7 +606,7 @@ class MultiPartPostProcessor:
                 continue
 
             # Build text payload: just the JSON for this part
-            part_json_text = json.dumps(part_rows, ensure_ascii=False, indent=2)
+            part_json_text = encode_payload(part_rows, stage="post_process", label=f"part {part_num}")
 
             # Use only user's prompt, no additions
             self.logger.info(f"Processing Part {part_num} ({len(part_rows)} rows) with second-stage prompt...")
@@ -971,7 +834,7 @@ class MultiPartPostProcessor:
             self.logger.info(f"[{subchapter_idx}/{len(sorted_subchapters)}] Processing Subchapter '{subchapter_name}' ({len(subchapter_rows)} rows)...")
 
             # Build text payload: just the JSON for this subchapter
-            subchapter_json_text = json.dumps(subchapter_rows, ensure_ascii=False, indent=2)
+            subchapter_json_text = encode_payload(subchapter_rows, stage="post_process", label=subchapter_name)
 
             # Use only user's prompt, no additions
             response_text = self.api_client.process_text(
@@ -1560,13 +1423,14 @@ class MultiPartPostProcessor:
             "raw_responses": []  # Store all raw responses to ensure nothing is lost
         }
         
-        # Write initial file
+        # Write initial file; each unit is journaled and the nested JSON is materialized periodically and at the end
+        writer = JournaledJsonWriter(output_path)
         try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(initial_output, f, ensure_ascii=False, indent=2)
+            writer.begin(initial_output)
             self.logger.info(f"Initialized Document Processing JSON file: {output_path}")
         except Exception as e:
             self.logger.error(f"Failed to initialize output file: {e}")
+            writer.close()
             return None
         
         # Process each item (topic or paragraph) individually
@@ -1574,6 +1438,7 @@ class MultiPartPostProcessor:
         response_paragraph_info = []  # List of { chapter, subchapter, paragraph } per response
         
         prompt_seq_counter = 0
+        paragraphs_processed = 0
         for paragraph_idx, item in enumerate(process_list, 1):
             if is_ocr_extraction_paragraph:
                 chapter_name_for_paragraph, subchapter_name, topic_info = item
@@ -1582,7 +1447,7 @@ class MultiPartPostProcessor:
                 paragraph_prompt = user_prompt.replace("{Subchapter_Name}", subchapter_name).replace("[SUBCHAPTER_NAME]", subchapter_name)
                 paragraph_prompt = paragraph_prompt.replace("{Paragraph_NAME}", paragraph_name).replace("[TOPIC_NAME]", paragraph_name)
                 paragraph_prompt = paragraph_prompt.replace("{Topic_NAME}", paragraph_name)
-                paragraph_json_text = json.dumps(input_json, ensure_ascii=False, indent=2)
+                paragraph_json_text = encode_payload(input_json, stage="document_processing", label=paragraph_name)
                 num_extractions = len(input_json["chapters"][0]["subchapters"][0]["topics"][0].get("extractions", []))
             else:
                 chapter_name_for_paragraph, subchapter_name, paragraph_data = item
@@ -1599,7 +1464,7 @@ class MultiPartPostProcessor:
                     paragraph_data,
                     use_paragraphs_key=use_paragraphs_key,
                 )
-                paragraph_json_text = json.dumps(paragraph_json, ensure_ascii=False, indent=2)
+                paragraph_json_text = encode_payload(paragraph_json, stage="document_processing", label=paragraph_name)
             
             self.logger.info("")
             self.logger.info("=" * 80)
@@ -1684,12 +1549,8 @@ class MultiPartPostProcessor:
             }
             response_paragraph_info.append(paragraph_info)
             
-            # Immediately convert response to points and add to file (incremental conversion)
+            # Immediately convert response to points and add to journal (incremental conversion)
             try:
-                # Read current file
-                with open(output_path, "r", encoding="utf-8") as f:
-                    current_data = json.load(f)
-                
                 # Extract JSON blocks from this response
                 blocks = self._extract_json_blocks_from_text(response_text or "")
                 new_points = []  # Initialize to avoid NameError
@@ -1714,7 +1575,7 @@ class MultiPartPostProcessor:
                     
                     if new_points:
                         # Get current next_free_index for PointId assignment
-                        current_meta = current_data.get("metadata", {})
+                        current_meta = writer.get(("metadata",), {})
                         book_id = int(current_meta.get("book_id") or 1)
                         chapter_id = int(current_meta.get("chapter_id") or 1)
                         next_free_idx = int(current_meta.get("next_free_index") or current_meta.get("start_point_index") or 1)
@@ -1729,14 +1590,14 @@ class MultiPartPostProcessor:
                                 point.pop("PointId", None)
                         
                         # Add new points to existing points array
-                        if "points" not in current_data:
-                            current_data["points"] = []
-                        current_data["points"].extend(new_points)
+                        for point in new_points:
+                            writer.append(("points",), point)
+                        total_points = len(writer.get(("points",), []))
                         
                         # Update metadata
-                        current_data["metadata"]["next_free_index"] = next_free_idx
-                        current_data["metadata"]["total_points"] = len(current_data["points"])
-                        self.logger.info(f"  ✓ Converted {len(new_points)} points from paragraph '{paragraph_name}' (total points: {len(current_data['points'])})")
+                        writer.set(("metadata", "next_free_index"), next_free_idx)
+                        writer.set(("metadata", "total_points"), total_points)
+                        self.logger.info(f"  ✓ Converted {len(new_points)} points from paragraph '{paragraph_name}' (total points: {total_points})")
                     else:
                         self.logger.warning(f"  No points extracted from paragraph '{paragraph_name}'")
                 
@@ -1763,19 +1624,15 @@ class MultiPartPostProcessor:
                 except (json.JSONDecodeError, TypeError, Exception):
                     raw_response_entry["response"] = None
                 
-                if "raw_responses" not in current_data:
-                    current_data["raw_responses"] = []
-                current_data["raw_responses"].append(raw_response_entry)
+                # Raw responses only live in the journal (for recovery); the final output drops them
+                writer.append(("raw_responses",), raw_response_entry, journal_only=True)
+                paragraphs_processed += 1
                 
                 # Update metadata
-                current_data["metadata"]["paragraphs_processed"] = len(current_data["raw_responses"])
-                current_data["metadata"]["processed_at"] = datetime.now().isoformat()
+                writer.set(("metadata", "paragraphs_processed"), paragraphs_processed)
+                writer.set(("metadata", "processed_at"), datetime.now().isoformat())
                 
-                # Write back immediately with converted points
-                with open(output_path, "w", encoding="utf-8") as f:
-                    json.dump(current_data, f, ensure_ascii=False, indent=2)
-                
-                self.logger.info(f"  ✓ Added {len(new_points) if blocks else 0} points and raw response for paragraph '{paragraph_name}' to JSON file immediately")
+                self.logger.info(f"  ✓ Added {len(new_points) if blocks else 0} points and raw response for paragraph '{paragraph_name}' to JSON journal immediately")
                 if unit_hooks and new_points:
                     unit_hooks.after_unit(
                         paragraph_idx,
@@ -1804,19 +1661,19 @@ class MultiPartPostProcessor:
         
         if not all_responses:
             self.logger.error("No responses produced by Document Processing")
+            writer.finalize()
             return None
         
-        # Finalize: Read final file, update metadata, optionally remove raw_responses
+        # Finalize: update metadata, drop raw_responses and materialize the output once
         self.logger.info("=" * 80)
         self.logger.info("FINALIZING DOCUMENT PROCESSING OUTPUT")
         self.logger.info("=" * 80)
         try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                final_data = json.load(f)
+            final_data = writer.doc
             
             final_meta = final_data.get("metadata", {})
             final_points = final_data.get("points", [])
-            topics_processed = int(final_meta.get("paragraphs_processed") or final_meta.get("topics_processed") or len(final_data.get("raw_responses", [])))
+            topics_processed = int(final_meta.get("paragraphs_processed") or final_meta.get("topics_processed") or paragraphs_processed)
             total_topics = int(final_meta.get("total_paragraphs") or final_meta.get("total_topics") or total_items)
             
             # Update metadata to match sample format
@@ -1831,15 +1688,11 @@ class MultiPartPostProcessor:
             final_meta.pop("total_paragraphs", None)
             
             # Remove raw_responses from final output (only keep converted points)
-            if "raw_responses" in final_data:
-                del final_data["raw_responses"]
-                self.logger.info("Removed raw_responses from final output file")
-            
             final_data["metadata"] = final_meta
             
-            # Write finalized file
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(final_data, f, ensure_ascii=False, indent=2)
+            # Write finalized file (raw_responses stay out of the final output)
+            writer.finalize(drop_keys=("raw_responses",))
+            self.logger.info("Removed raw_responses from final output file")
             
             self.logger.info(f"✓ Document Processing finalized: {len(final_points)} points from {topics_processed}/{total_topics} topics")
             if progress_callback:
@@ -1854,6 +1707,7 @@ class MultiPartPostProcessor:
                 unit_hooks.set_output_relpath(rel_out)
         except Exception as e:
             self.logger.error(f"Failed to finalize output file: {e}", exc_info=True)
+            writer.close()
             return None
         
         return output_path
@@ -1909,7 +1763,7 @@ class MultiPartPostProcessor:
             paragraph_prompt = user_prompt.replace("{Subchapter_Name}", subchapter_name).replace("[SUBCHAPTER_NAME]", subchapter_name)
             paragraph_prompt = paragraph_prompt.replace("{Paragraph_NAME}", paragraph_name).replace("[TOPIC_NAME]", paragraph_name)
             paragraph_prompt = paragraph_prompt.replace("{Topic_NAME}", paragraph_name)
-            paragraph_json_text = json.dumps(input_json, ensure_ascii=False, indent=2)
+            paragraph_json_text = encode_payload(input_json, stage="document_processing", label=paragraph_name)
         else:
             chapter_name_for_paragraph, subchapter_name, paragraph_data = item
             paragraph_name = paragraph_data.get("paragraph", "") or paragraph_data.get("Paragraph") or paragraph_data.get("topic", "") or paragraph_data.get("Topic", "")
@@ -1922,7 +1776,7 @@ class MultiPartPostProcessor:
                 paragraph_data,
                 use_paragraphs_key=subchapter_has_paragraphs.get(subchapter_name, False),
             )
-            paragraph_json_text = json.dumps(paragraph_json, ensure_ascii=False, indent=2)
+            paragraph_json_text = encode_payload(paragraph_json, stage="document_processing", label=paragraph_name)
         # Drop cached plan before the (possibly large) LLM call.
         self._docproc_plan = None
         gc.collect()
@@ -7,10 +7,13 @@ import json
 import logging
 import os
 import csv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from base_stage_processor import BaseStageProcessor
+from journaled_json_writer import JournaledJsonWriter, recover_from_journal
+from json_stream_extractor import extract_primary_json
 
 
 class MultiPartProcessor:
@@ -392,6 +395,8 @@ class MultiPartProcessor:
         progress_callback: Optional[Callable[[str], None]] = None,
         output_dir: Optional[str] = None,
         unit_hooks: Optional[Any] = None,
+        concurrency: int = 1,
+        page_window_margin: Optional[int] = None,
     ) -> Optional[str]:
         """
         Process OCR Extraction: For each Subchapter, send PDF + prompt (with topics list) to model.
@@ -414,6 +419,12 @@ class MultiPartProcessor:
             temperature: Temperature for generation
             progress_callback: Optional callback for progress updates
             output_dir: Optional output directory
+            unit_hooks: Optional per-subchapter manifest hooks (called on the caller thread only)
+            concurrency: Max subchapter LLM calls in flight (1 = serial). Results are still
+                written to the output JSON in Subchapter order.
+            page_window_margin: Non-Gemini path only. When set, each subchapter call sends only
+                the pages located for that subchapter (plus this many pages on each side)
+                instead of the whole PDF text; None sends the whole text every time.
             
         Returns:
             Path to final JSON file, or None on error
@@ -528,6 +539,12 @@ class MultiPartProcessor:
         
         # Get total pages from PDF
         total_pages = pdf_proc.count_pages(pdf_path)
+
+        page_windows: List[Optional[Tuple[int, int]]] = [None] * len(topics_list)
+        if not use_pdf_upload and page_window_margin is not None:
+            if progress_callback:
+                progress_callback("Locating subchapter pages in PDF...")
+            page_windows = pdf_proc.locate_subchapter_pages(pdf_path, topics_list, margin=page_window_margin)
         
         # Initialize output JSON file immediately (incremental writing)
         # Generate unique filename with PDF name: OCR Extraction_{pdf_name}.json
@@ -555,13 +572,14 @@ class MultiPartProcessor:
             }]
         }
         
-        # Write initial file
+        # Write initial file; subchapters are journaled and the nested JSON is materialized periodically and at the end
+        writer = JournaledJsonWriter(str(final_json_path))
         try:
-            with open(final_json_path, "w", encoding="utf-8") as f:
-                json.dump(initial_output, f, ensure_ascii=False, indent=2)
+            writer.begin(initial_output)
             self.logger.info(f"Initialized OCR Extraction JSON file: {final_json_path}")
         except Exception as e:
             self.logger.error(f"Failed to initialize output file: {e}")
+            writer.close()
             return None
 
         if unit_hooks and hasattr(unit_hooks, "set_output_relpath") and hasattr(unit_hooks, "job_id"):
@@ -573,7 +591,16 @@ class MultiPartProcessor:
         # Process each Subchapter - اضافه کردن هر response بلافاصله به فایل JSON
         total_subchapters = len(topics_list)
         all_subchapters = []  # Keep track for final metadata update
-        
+
+        # Determine max tokens based on model
+        if '2.5' in model_name or '2.0' in model_name:
+            model_max_tokens = 32768
+        elif '1.5' in model_name:
+            model_max_tokens = 8192
+        else:
+            model_max_tokens = 32768
+
+        subchapter_jobs: List[Dict[str, Any]] = []
         for subchapter_idx, subchapter_item in enumerate(topics_list, 1):
             subchapter_name = subchapter_item.get("Subchapter", "")
             topics = subchapter_item.get("Topics", [])
@@ -587,19 +614,6 @@ class MultiPartProcessor:
                 self.logger.info(f"Subchapter '{subchapter_name}' has no Topics, processing with empty topics")
                 topics = []
             
-            num_topics = len(topics) if topics else 0
-            if progress_callback:
-                progress_callback(f"Processing Subchapter {subchapter_idx}/{total_subchapters}: {subchapter_name} ({num_topics} topics)")
-
-            if unit_hooks:
-                unit_hooks.before_unit(
-                    subchapter_idx,
-                    chapter_name or "",
-                    subchapter_name,
-                    subchapter_name,
-                    subchapter_idx,
-                )
-            
             # Replace {SUBCHAPTER_NAME} in prompt
             subchapter_prompt = base_prompt.replace("{SUBCHAPTER_NAME}", subchapter_name)
             
@@ -617,179 +631,197 @@ class MultiPartProcessor:
                 "- Keep the original language exactly as printed in the PDF for all `content` fields.\n"
                 "- Persian is allowed only for provided structure labels (chapter/subchapter/topic names) when those labels are already Persian in the input.\n"
             )
-            
-            try:
-                # Determine max tokens based on model
-                if '2.5' in model_name or '2.0' in model_name:
-                    model_max_tokens = 32768
-                elif '1.5' in model_name:
-                    model_max_tokens = 8192
-                else:
-                    model_max_tokens = 32768
+            source_text = extracted_pdf_text or ""
+            window = page_windows[subchapter_idx - 1]
+            if window is not None:
+                window_text = pdf_proc.extract_text_range(pdf_path, window[0], window[1])
+                if window_text:
+                    source_text = window_text
+                    self.logger.info(
+                        f"Subchapter '{subchapter_name}': sending pages {window[0]}-{window[1]} of {total_pages} "
+                        f"({len(window_text):,} of {len(extracted_pdf_text or ''):,} characters)"
+                    )
+            elif page_window_margin is not None and not use_pdf_upload:
+                self.logger.info(f"Subchapter '{subchapter_name}': pages not located, sending whole PDF text")
+            subchapter_jobs.append(
+                {
+                    "subchapter_idx": subchapter_idx,
+                    "subchapter_name": subchapter_name,
+                    "num_topics": len(topics),
+                    "prompt": subchapter_prompt,
+                    "source_text": source_text,
+                }
+            )
 
-                if progress_callback:
-                    progress_callback(f"Calling model for Subchapter: {subchapter_name}...")
+        def _start_subchapter(job: Dict[str, Any]) -> None:
+            """Progress + unit hook for a subchapter about to be sent (caller thread only)."""
+            if progress_callback:
+                progress_callback(
+                    f"Processing Subchapter {job['subchapter_idx']}/{total_subchapters}: "
+                    f"{job['subchapter_name']} ({job['num_topics']} topics)"
+                )
+            if unit_hooks:
+                unit_hooks.before_unit(
+                    job["subchapter_idx"],
+                    chapter_name or "",
+                    job["subchapter_name"],
+                    job["subchapter_name"],
+                    job["subchapter_idx"],
+                )
 
-                response_text = None
-                if use_pdf_upload:
-                    # Gemini path: prompt + actual PDF file (best quality)
-                    content_parts = [subchapter_prompt, pdf_file]
-                    generation_config = genai.types.GenerationConfig(
-                        temperature=temperature,
-                        max_output_tokens=model_max_tokens,
-                    )
-                    response = self.api_client.text_client.generate_content(
-                        content_parts,
-                        generation_config=generation_config,
-                        stream=False
-                    )
-                    response_text = response.text if hasattr(response, 'text') and response.text else None
-                else:
-                    # Non-Gemini path (DeepSeek/OpenRouter): send extracted text + prompt
-                    response_text = self.api_client.process_text(
-                        text=extracted_pdf_text or "",
-                        system_prompt=subchapter_prompt,
-                        model_name=model_name,
-                        temperature=temperature,
-                        max_tokens=model_max_tokens,
+        def _call_subchapter_model(job: Dict[str, Any]) -> Optional[str]:
+            """One LLM round-trip; safe to run on a worker thread (no hooks / progress callbacks)."""
+            if hasattr(self.api_client, "set_current_unit"):
+                # Prompt capture tracks the unit per thread, so parallel calls keep their own label.
+                self.api_client.set_current_unit(job["subchapter_idx"], job["subchapter_name"])
+            if use_pdf_upload:
+                # Gemini path: prompt + actual PDF file (best quality)
+                content_parts = [job["prompt"], pdf_file]
+                generation_config = genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=model_max_tokens,
+                )
+                response = self.api_client.text_client.generate_content(
+                    content_parts,
+                    generation_config=generation_config,
+                    stream=False
+                )
+                return response.text if hasattr(response, 'text') and response.text else None
+            # Non-Gemini path (DeepSeek/OpenRouter): send extracted text + prompt
+            return self.api_client.process_text(
+                text=job["source_text"],
+                system_prompt=job["prompt"],
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=model_max_tokens,
+            )
+
+        def _commit_subchapter(job: Dict[str, Any], response_text: Optional[str]) -> None:
+            """Parse one response and append it to the output file (caller thread only, in Subchapter order)."""
+            nonlocal chapter_name
+            subchapter_idx = job["subchapter_idx"]
+            subchapter_name = job["subchapter_name"]
+
+            if not response_text:
+                self.logger.warning(f"No response for subchapter: {subchapter_name}")
+                if unit_hooks:
+                    unit_hooks.after_unit(
+                        subchapter_idx,
+                        chapter_name or "",
+                        subchapter_name,
+                        subchapter_name,
+                        [],
+                        subchapter_idx,
+                        status="failed",
                     )
+                return
+            
+            self.logger.info(f"Received response for subchapter '{subchapter_name}' ({len(response_text)} characters)")
+            
+            # Extract JSON from response immediately (using Google/Gemini method - original method)
+            try:
+                subchapter_json = self.base_processor.extract_json_from_response_google(response_text)
+                if not subchapter_json:
+                    subchapter_json = self.base_processor.load_txt_as_json_from_text_google(response_text)
+                if not subchapter_json:
+                    subchapter_json = self._extract_json_from_persian_text(response_text)
                 
-                if not response_text:
-                    self.logger.warning(f"No response for subchapter: {subchapter_name}")
-                    if unit_hooks:
-                        unit_hooks.after_unit(
-                            subchapter_idx,
-                            chapter_name or "",
-                            subchapter_name,
-                            subchapter_name,
-                            [],
-                            subchapter_idx,
-                            status="failed",
-                        )
-                    continue
-                
-                self.logger.info(f"Received response for subchapter '{subchapter_name}' ({len(response_text)} characters)")
+                if not subchapter_json:
+                    self.logger.warning(f"Failed to extract JSON from response for subchapter '{subchapter_name}'")
+                    # Store raw response as fallback
+                    subchapter_json = {
+                        "subchapter": subchapter_name,
+                        "raw_response": response_text,
+                        "extraction_failed": True
+                    }
                 
-                # Extract JSON from response immediately (using Google/Gemini method - original method)
-                try:
-                    subchapter_json = self.base_processor.extract_json_from_response_google(response_text)
-                    if not subchapter_json:
-                        subchapter_json = self.base_processor.load_txt_as_json_from_text_google(response_text)
-                    if not subchapter_json:
-                        subchapter_json = self._extract_json_from_persian_text(response_text)
-                    
-                    if not subchapter_json:
-                        self.logger.warning(f"Failed to extract JSON from response for subchapter '{subchapter_name}'")
-                        # Store raw response as fallback
-                        subchapter_json = {
+                # Extract subchapter from JSON
+                extracted_subchapter = self._get_subchapter_from_json(subchapter_json, subchapter_name)
+                if not extracted_subchapter:
+                    # If subchapter not found, use JSON as-is
+                    if isinstance(subchapter_json, dict):
+                        extracted_subchapter = subchapter_json
+                    else:
+                        # Create a wrapper
+                        extracted_subchapter = {
                             "subchapter": subchapter_name,
-                            "raw_response": response_text,
-                            "extraction_failed": True
+                            "data": subchapter_json
                         }
+                
+                # Add to list for tracking
+                all_subchapters.append(extracted_subchapter)
+                
+                # Extract chapter name from model response (priority: model response > topic file metadata)
+                if isinstance(extracted_subchapter, dict):
+                    # Try to extract chapter from subchapter structure
+                    chapter_from_response = (
+                        extracted_subchapter.get("chapter", "") or
+                        extracted_subchapter.get("Chapter", "") or
+                        ""
+                    )
                     
-                    # Extract subchapter from JSON
-                    extracted_subchapter = self._get_subchapter_from_json(subchapter_json, subchapter_name)
-                    if not extracted_subchapter:
-                        # If subchapter not found, use JSON as-is
-                        if isinstance(subchapter_json, dict):
-                            extracted_subchapter = subchapter_json
-                        else:
-                            # Create a wrapper
-                            extracted_subchapter = {
-                                "subchapter": subchapter_name,
-                                "data": subchapter_json
-                            }
-                    
-                    # Add to list for tracking
-                    all_subchapters.append(extracted_subchapter)
+                    # If not found in subchapter, try to extract from chapters structure in JSON
+                    if not chapter_from_response and isinstance(subchapter_json, dict):
+                        if "chapters" in subchapter_json:
+                            chapters_list = subchapter_json.get("chapters", [])
+                            if chapters_list and len(chapters_list) > 0:
+                                chapter_from_response = (
+                                    chapters_list[0].get("chapter", "") or
+                                    chapters_list[0].get("Chapter", "") or
+                                    ""
+                                )
                     
-                    # Extract chapter name from model response (priority: model response > topic file metadata)
-                    if isinstance(extracted_subchapter, dict):
-                        # Try to extract chapter from subchapter structure
-                        chapter_from_response = (
-                            extracted_subchapter.get("chapter", "") or
-                            extracted_subchapter.get("Chapter", "") or
-                            ""
-                        )
+                    # If chapter found in response, update it
+                    if chapter_from_response and chapter_from_response.strip():
+                        chapter_name = chapter_from_response.strip()
+                        self.logger.info(f"Extracted chapter name from model response: {chapter_name}")
+                
+                # Immediately add to JSON journal (incremental write)
+                try:
+                    # Add new subchapter
+                    if writer.get(("chapters", 0)) is not None:
+                        writer.append(("chapters", 0, "subchapters"), extracted_subchapter)
                         
-                        # If not found in subchapter, try to extract from chapters structure in JSON
-                        if not chapter_from_response and isinstance(subchapter_json, dict):
-                            if "chapters" in subchapter_json:
-                                chapters_list = subchapter_json.get("chapters", [])
-                                if chapters_list and len(chapters_list) > 0:
-                                    chapter_from_response = (
-                                        chapters_list[0].get("chapter", "") or
-                                        chapters_list[0].get("Chapter", "") or
-                                        ""
-                                    )
+                        # Update metadata
+                        writer.set(
+                            ("metadata", "total_subchapters"),
+                            len(writer.get(("chapters", 0, "subchapters"), [])),
+                        )
+                        if isinstance(extracted_subchapter, dict) and "topics" in extracted_subchapter:
+                            if isinstance(extracted_subchapter["topics"], list):
+                                writer.set(
+                                    ("metadata", "total_topics"),
+                                    writer.get(("metadata", "total_topics"), 0) + len(extracted_subchapter["topics"]),
+                                )
                         
-                        # If chapter found in response, update it
-                        if chapter_from_response and chapter_from_response.strip():
-                            chapter_name = chapter_from_response.strip()
-                            self.logger.info(f"Extracted chapter name from model response: {chapter_name}")
-                    
-                    # Immediately add to JSON file (incremental write)
-                    try:
-                        # Read current file
-                        with open(final_json_path, "r", encoding="utf-8") as f:
-                            current_data = json.load(f)
+                        # Update chapter name if extracted from model response
+                        if chapter_name and chapter_name.strip() and writer.get(("metadata", "chapter")) != chapter_name:
+                            writer.set(("metadata", "chapter"), chapter_name)
+                            writer.set(("chapters", 0, "chapter"), chapter_name)
                         
-                        # Add new subchapter
-                        if "chapters" in current_data and len(current_data["chapters"]) > 0:
-                            current_data["chapters"][0]["subchapters"].append(extracted_subchapter)
-                            
-                            # Update metadata
-                            current_data["metadata"]["total_subchapters"] = len(current_data["chapters"][0]["subchapters"])
-                            if isinstance(extracted_subchapter, dict) and "topics" in extracted_subchapter:
-                                if isinstance(extracted_subchapter["topics"], list):
-                                    current_data["metadata"]["total_topics"] += len(extracted_subchapter["topics"])
-                            
-                            # Update chapter name if extracted from model response
-                            if chapter_name and chapter_name.strip():
-                                current_data["metadata"]["chapter"] = chapter_name
-                                current_data["chapters"][0]["chapter"] = chapter_name
-                            
-                            # Write back immediately
-                            with open(final_json_path, "w", encoding="utf-8") as f:
-                                json.dump(current_data, f, ensure_ascii=False, indent=2)
-                            
-                            self.logger.info(f"✓ Added subchapter '{subchapter_name}' to JSON file immediately")
-                            if unit_hooks:
-                                pts = (
-                                    extracted_subchapter.get("topics")
-                                    if isinstance(extracted_subchapter, dict)
-                                    and isinstance(extracted_subchapter.get("topics"), list)
-                                    else [extracted_subchapter]
-                                    if isinstance(extracted_subchapter, dict)
-                                    else []
-                                )
-                                unit_hooks.after_unit(
-                                    subchapter_idx,
-                                    chapter_name or "",
-                                    subchapter_name,
-                                    subchapter_name,
-                                    pts,
-                                    subchapter_idx,
-                                    status="succeeded",
-                                )
-                        else:
-                            self.logger.warning(f"Unexpected JSON structure in output file")
-                    except Exception as e:
-                        self.logger.error(f"Failed to write subchapter '{subchapter_name}' to file: {e}", exc_info=True)
+                        self.logger.info(f"✓ Added subchapter '{subchapter_name}' to JSON journal immediately")
                         if unit_hooks:
+                            pts = (
+                                extracted_subchapter.get("topics")
+                                if isinstance(extracted_subchapter, dict)
+                                and isinstance(extracted_subchapter.get("topics"), list)
+                                else [extracted_subchapter]
+                                if isinstance(extracted_subchapter, dict)
+                                else []
+                            )
                             unit_hooks.after_unit(
                                 subchapter_idx,
                                 chapter_name or "",
                                 subchapter_name,
                                 subchapter_name,
-                                [],
+                                pts,
                                 subchapter_idx,
-                                status="failed",
+                                status="succeeded",
                             )
-                        # Continue processing other subchapters
-                        
+                    else:
+                        self.logger.warning(f"Unexpected JSON structure in output file")
                 except Exception as e:
-                    self.logger.error(f"Error processing subchapter '{subchapter_name}': {str(e)}")
+                    self.logger.error(f"Failed to write subchapter '{subchapter_name}' to file: {e}", exc_info=True)
                     if unit_hooks:
                         unit_hooks.after_unit(
                             subchapter_idx,
@@ -800,43 +832,120 @@ class MultiPartProcessor:
                             subchapter_idx,
                             status="failed",
                         )
-                    # Create fallback subchapter
-                    extracted_subchapter = {
-                        "subchapter": subchapter_name,
-                        "raw_response": response_text,
-                        "extraction_failed": True,
-                        "error": str(e)
-                    }
-                    all_subchapters.append(extracted_subchapter)
+                    # Continue processing other subchapters
                     
-                    # Immediately add to JSON file (incremental write) - for error case too
-                    try:
-                        # Read current file
-                        with open(final_json_path, "r", encoding="utf-8") as f:
-                            current_data = json.load(f)
+            except Exception as e:
+                self.logger.error(f"Error processing subchapter '{subchapter_name}': {str(e)}")
+                if unit_hooks:
+                    unit_hooks.after_unit(
+                        subchapter_idx,
+                        chapter_name or "",
+                        subchapter_name,
+                        subchapter_name,
+                        [],
+                        subchapter_idx,
+                        status="failed",
+                    )
+                # Create fallback subchapter
+                extracted_subchapter = {
+                    "subchapter": subchapter_name,
+                    "raw_response": response_text,
+                    "extraction_failed": True,
+                    "error": str(e)
+                }
+                all_subchapters.append(extracted_subchapter)
+                
+                # Immediately add to JSON journal (incremental write) - for error case too
+                try:
+                    # Add new subchapter
+                    if writer.get(("chapters", 0)) is not None:
+                        writer.append(("chapters", 0, "subchapters"), extracted_subchapter)
                         
-                        # Add new subchapter
-                        if "chapters" in current_data and len(current_data["chapters"]) > 0:
-                            current_data["chapters"][0]["subchapters"].append(extracted_subchapter)
-                            
-                            # Update metadata
-                            current_data["metadata"]["total_subchapters"] = len(current_data["chapters"][0]["subchapters"])
-                            
-                            # Write back immediately
-                            with open(final_json_path, "w", encoding="utf-8") as f:
-                                json.dump(current_data, f, ensure_ascii=False, indent=2)
-                            
-                            self.logger.info(f"✓ Added subchapter '{subchapter_name}' (with error) to JSON file immediately")
-                        else:
-                            self.logger.warning(f"Unexpected JSON structure in output file")
-                    except Exception as e2:
-                        self.logger.error(f"Failed to write subchapter '{subchapter_name}' to file: {e2}", exc_info=True)
-                        # Continue processing other subchapters
-                    
+                        # Update metadata
+                        writer.set(
+                            ("metadata", "total_subchapters"),
+                            len(writer.get(("chapters", 0, "subchapters"), [])),
+                        )
+                        
+                        self.logger.info(f"✓ Added subchapter '{subchapter_name}' (with error) to JSON journal immediately")
+                    else:
+                        self.logger.warning(f"Unexpected JSON structure in output file")
+                except Exception as e2:
+                    self.logger.error(f"Failed to write subchapter '{subchapter_name}' to file: {e2}", exc_info=True)
+                    # Continue processing other subchapters
+
+        try:
+            workers = max(1, min(int(concurrency or 1), len(subchapter_jobs) or 1))
+            if workers == 1:
+                for job in subchapter_jobs:
+                    _start_subchapter(job)
+                    try:
+                        if progress_callback:
+                            progress_callback(f"Calling model for Subchapter: {job['subchapter_name']}...")
+                        response_text = _call_subchapter_model(job)
+                        _commit_subchapter(job, response_text)
+                    except Exception as e:
+                        self.logger.error(f"Error processing subchapter {job['subchapter_name']}: {e}", exc_info=True)
+                        continue
+            else:
+                if progress_callback:
+                    progress_callback(
+                        f"Processing {len(subchapter_jobs)} subchapter(s) with concurrency={workers}..."
+                    )
+                # Bounded window: at most `workers` calls in flight; responses are committed in
+                # Subchapter order so the output file and unit manifest match the serial path.
+                executor = ThreadPoolExecutor(max_workers=workers)
+                in_flight: Dict[int, Any] = {}
+                done_results: Dict[int, Tuple[Optional[str], Optional[BaseException]]] = {}
+                next_submit = 0
+                next_commit = 0
+                try:
+                    while next_commit < len(subchapter_jobs):
+                        while next_submit < len(subchapter_jobs) and len(in_flight) < workers:
+                            job = subchapter_jobs[next_submit]
+                            _start_subchapter(job)
+                            in_flight[next_submit] = executor.submit(_call_subchapter_model, job)
+                            next_submit += 1
+
+                        done, _pending = wait(list(in_flight.values()), return_when=FIRST_COMPLETED)
+                        for pos in [p for p, fut in in_flight.items() if fut in done]:
+                            fut = in_flight.pop(pos)
+                            try:
+                                done_results[pos] = (fut.result(), None)
+                            except Exception as e:
+                                done_results[pos] = (None, e)
+
+                        while next_commit in done_results:
+                            job = subchapter_jobs[next_commit]
+                            response_text, err = done_results.pop(next_commit)
+                            next_commit += 1
+                            if err is not None:
+                                self.logger.error(
+                                    f"Error processing subchapter {job['subchapter_name']}: {err}",
+                                    exc_info=err,
+                                )
+                                continue
+                            if progress_callback:
+                                progress_callback(
+                                    f"Received model response for Subchapter {job['subchapter_idx']}/"
+                                    f"{total_subchapters}: {job['subchapter_name']}"
+                                )
+                            try:
+                                _commit_subchapter(job, response_text)
+                            except Exception as e:
+                                self.logger.error(
+                                    f"Error processing subchapter {job['subchapter_name']}: {e}", exc_info=True
+                                )
+                finally:
+                    executor.shutdown(wait=False, cancel_futures=True)
+        except BaseException:
+            # Cancelled or crashed mid-run: keep everything committed so far in the output file.
+            try:
+                writer.finalize()
             except Exception as e:
-                self.logger.error(f"Error processing subchapter {subchapter_name}: {e}", exc_info=True)
-                continue
-        
+                self.logger.warning(f"Could not materialize partial OCR Extraction JSON: {e}")
+            raise
+
         # Final update: Try to extract chapter name from subchapters if not found yet
         # This is a fallback - priority is model response, then topic file metadata
         if not chapter_name or not chapter_name.strip():
@@ -858,13 +967,9 @@ class MultiPartProcessor:
                 # Update file with chapter name if found
                 if chapter_name and chapter_name.strip():
                     try:
-                        with open(final_json_path, "r", encoding="utf-8") as f:
-                            current_data = json.load(f)
-                        current_data["metadata"]["chapter"] = chapter_name
-                        if "chapters" in current_data and len(current_data["chapters"]) > 0:
-                            current_data["chapters"][0]["chapter"] = chapter_name
-                        with open(final_json_path, "w", encoding="utf-8") as f:
-                            json.dump(current_data, f, ensure_ascii=False, indent=2)
+                        writer.set(("metadata", "chapter"), chapter_name)
+                        if writer.get(("chapters", 0)) is not None:
+                            writer.set(("chapters", 0, "chapter"), chapter_name)
                         self.logger.info(f"Updated chapter name in file (fallback): {chapter_name}")
                     except Exception as e:
                         self.logger.warning(f"Could not update chapter name in file: {e}")
@@ -873,23 +978,18 @@ class MultiPartProcessor:
         
         # Final metadata update
         try:
-            with open(final_json_path, "r", encoding="utf-8") as f:
-                current_data = json.load(f)
-            
             # Recalculate total_topics from all subchapters
             total_topics = 0
-            if "chapters" in current_data and len(current_data["chapters"]) > 0:
-                for sub in current_data["chapters"][0].get("subchapters", []):
-                    if isinstance(sub, dict) and "topics" in sub:
-                        if isinstance(sub["topics"], list):
-                            total_topics += len(sub["topics"])
+            for sub in writer.get(("chapters", 0, "subchapters"), []):
+                if isinstance(sub, dict) and "topics" in sub:
+                    if isinstance(sub["topics"], list):
+                        total_topics += len(sub["topics"])
             
-            current_data["metadata"]["total_topics"] = total_topics
-            current_data["metadata"]["total_subchapters"] = len(all_subchapters)
-            current_data["metadata"]["processed_at"] = datetime.now().isoformat()
+            writer.set(("metadata", "total_topics"), total_topics)
+            writer.set(("metadata", "total_subchapters"), len(all_subchapters))
+            writer.set(("metadata", "processed_at"), datetime.now().isoformat())
             
-            with open(final_json_path, "w", encoding="utf-8") as f:
-                json.dump(current_data, f, ensure_ascii=False, indent=2)
+            writer.finalize()
             
             self.logger.info(f"✓ OCR Extraction completed. {len(all_subchapters)} subchapters processed and saved incrementally.")
             
@@ -899,7 +999,9 @@ class MultiPartProcessor:
             return str(final_json_path)
         except Exception as e:
             self.logger.error(f"Failed to finalize OCR Extraction JSON: {e}")
-            # File still exists with incremental data, return path anyway
+            writer.close()
+            # Journal still holds every subchapter; rebuild the file from it
+            recover_from_journal(str(final_json_path), remove_journal=True)
             if final_json_path.exists():
                 return str(final_json_path)
             return None
@@ -907,7 +1009,8 @@ class MultiPartProcessor:
     def _extract_json_from_persian_text(self, text: str) -> Optional[Dict | List]:
         """
         Extract JSON from Persian text response.
-        Handles Persian keys and values in JSON.
+        Handles Persian keys and values in JSON, markdown code blocks and truncated output;
+        the largest JSON object/array in the text wins.
         
         Args:
             text: Text containing JSON (may be in Persian)
@@ -918,118 +1021,14 @@ class MultiPartProcessor:
         if not text or not text.strip():
             return None
         
-        try:
-            # سعی کن JSON را مستقیماً parse کنی
-            # ابتدا سعی کن کل متن را parse کنی
-            parsed = json.loads(text)
-            self.logger.info("Successfully parsed JSON directly from text")
+        parsed = extract_primary_json(text)
+        if parsed is not None:
+            self.logger.info("Successfully extracted JSON from text")
             return parsed
-        except json.JSONDecodeError:
-            pass
-        
-        # سعی کن JSON را از markdown code block استخراج کنی
-        import re
-        
-        # جستجوی ```json ... ```
-        json_pattern = r'```json\s*(.*?)\s*```'
-        match = re.search(json_pattern, text, re.DOTALL)
-        if match:
-            json_str = match.group(1).strip()
-            try:
-                parsed = json.loads(json_str)
-                self.logger.info("Successfully extracted JSON from markdown code block")
-                return parsed
-            except json.JSONDecodeError:
-                pass
-        
-        # جستجوی ``` ... ``` (بدون json)
-        code_pattern = r'```\s*(.*?)\s*```'
-        match = re.search(code_pattern, text, re.DOTALL)
-        if match:
-            json_str = match.group(1).strip()
-            # اگر با { یا [ شروع می‌شود، احتمالاً JSON است
-            if json_str.startswith(('{', '[')):
-                try:
-                    parsed = json.loads(json_str)
-                    self.logger.info("Successfully extracted JSON from code block")
-                    return parsed
-                except json.JSONDecodeError:
-                    pass
-        
-        # سعی کن بزرگترین JSON object یا array را پیدا کنی
-        # پیدا کردن اولین {
-        start_obj = text.find('{')
-        start_arr = text.find('[')
-        
-        if start_obj != -1 and (start_arr == -1 or start_obj < start_arr):
-            # پیدا کردن آخرین }
-            end_obj = text.rfind('}')
-            if end_obj > start_obj:
-                candidate = text[start_obj:end_obj + 1]
-                try:
-                    parsed = json.loads(candidate)
-                    self.logger.info("Successfully extracted JSON object from text")
-                    return parsed
-                except json.JSONDecodeError:
-                    # سعی کن با تعادل براکت‌ها parse کنی
-                    try:
-                        balanced = self._balance_json_string(candidate)
-                        if balanced:
-                            parsed = json.loads(balanced)
-                            self.logger.info("Successfully parsed JSON after balancing")
-                            return parsed
-                    except:
-                        pass
-        
-        elif start_arr != -1:
-            # پیدا کردن آخرین ]
-            end_arr = text.rfind(']')
-            if end_arr > start_arr:
-                candidate = text[start_arr:end_arr + 1]
-                try:
-                    parsed = json.loads(candidate)
-                    self.logger.info("Successfully extracted JSON array from text")
-                    return parsed
-                except json.JSONDecodeError:
-                    pass
         
         self.logger.warning("Failed to extract JSON from Persian text")
         return None
     
-    def _balance_json_string(self, text: str) -> Optional[str]:
-        """
-        Try to balance JSON brackets/braces.
-        
-        Args:
-            text: Potentially unbalanced JSON string
-            
-        Returns:
-            Balanced JSON string or None
-        """
-        if not text:
-            return None
-        
-        # شمارش براکت‌ها و بریس‌ها
-        open_braces = text.count('{') - text.count('}')
-        open_brackets = text.count('[') - text.count(']')
-        
-        if open_braces == 0 and open_brackets == 0:
-            return text
-        
-        # بستن براکت‌ها و بریس‌ها
-        balanced = text
-        if open_brackets > 0:
-            balanced += ']' * open_brackets
-        if open_braces > 0:
-            balanced += '}' * open_braces
-        
-        try:
-            # تست کن که آیا valid است
-            json.loads(balanced)
-            return balanced
-        except json.JSONDecodeError:
-            return None
-    
     def _get_subchapter_from_json(
         self,
         json_data: Dict | List,
@@ -1618,6 +1617,7 @@ class MultiPartProcessor:
         output_json_path: str,
         temperature: float = 0.7,
         progress_callback: Optional[Callable[[str], None]] = None,
+        page_window_margin: Optional[int] = None,
     ) -> bool:
         """Re-run one subchapter (1-based index) and replace it in the existing OCR output JSON."""
         with open(topic_file_path, "r", encoding="utf-8") as f:
@@ -1642,7 +1642,15 @@ class MultiPartProcessor:
         from pdf_processor import PDFProcessor
 
         pdf_proc = PDFProcessor()
-        extracted_pdf_text = pdf_proc.extract_text(pdf_path)
+        extracted_pdf_text = None
+        if page_window_margin is not None:
+            window = pdf_proc.locate_subchapter_pages(pdf_path, topics_list, margin=page_window_margin)[
+                subchapter_index - 1
+            ]
+            if window is not None:
+                extracted_pdf_text = pdf_proc.extract_text_range(pdf_path, window[0], window[1])
+        if not extracted_pdf_text:
+            extracted_pdf_text = pdf_proc.extract_text(pdf_path)
         subchapter_prompt = base_prompt.replace("{SUBCHAPTER_NAME}", subchapter_name)
         topics_str = ", ".join(topics) if topics else ""
         subchapter_prompt = subchapter_prompt.replace("{TOPIC_NAME}", topics_str)
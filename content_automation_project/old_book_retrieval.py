@@ -0,0 +1,158 @@
+"""
+Old-book context retrieval for Stage X change detection.
+
+Stage X Part 2 splits Stage A into parts of 200 records and used to send the whole extracted
+old book (``pdf_extracted_rows``) with every part, so input tokens grew as parts x book and long
+chapters overflowed the context window. ``OldBookIndex`` is a small in-memory BM25 index over
+the old-book rows (word tokens, no external dependencies); ``rows_for`` returns, in book order,
+only the old rows that best match a part's records plus a few neighbouring rows on each side,
+so the prompt size per part stays roughly constant whatever the book length.
+
+Because both books follow the same sequence, the neighbourhood margin catches rows whose
+wording changed too much to score well on their own (splits, merges, rewrites).
+
+Old books small enough to send whole (``OLD_BOOK_FULL_CONTEXT_CHARS``) are still sent whole.
+
+``partition_rows`` serves Stage Y deletion detection, where every old row must be checked by
+exactly one shard: it splits the book between the shards instead.
+"""
+
+import bisect
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Best-matching old rows kept per Stage A record
+OLD_BOOK_TOP_K = 3
+# Old rows kept on each side of a matched row (both books follow the same order)
+OLD_BOOK_NEIGHBOR_MARGIN = 2
+# Old books whose serialized rows are shorter than this are sent whole with every part
+OLD_BOOK_FULL_CONTEXT_CHARS = 60000
+
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Arabic code points that Persian PDFs/OCR mix with their Persian equivalents
+_CHAR_FOLD = str.maketrans({"ي": "ی", "ك": "ک", "ة": "ه"})
+
+
+def _row_text(value: Any) -> str:
+    """All string/number leaves of a row, space-joined."""
+    if isinstance(value, dict):
+        return " ".join(_row_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_row_text(v) for v in value)
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value)
+    return ""
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _WORD_RE.findall(text.lower().translate(_CHAR_FOLD)) if len(t) > 1]
+
+
+class OldBookIndex:
+    """BM25 index over old-book rows; rows are addressed by their position in the book."""
+
+    def __init__(self, rows: Sequence[Any]):
+        self.rows = list(rows)
+        self._postings: Dict[str, List[tuple]] = defaultdict(list)
+        self._lengths: List[int] = []
+        for i, row in enumerate(self.rows):
+            counts = Counter(tokenize(_row_text(row)))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term].append((i, tf))
+        n = len(self.rows)
+        self._avg_len = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1.0 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self._postings.items()
+        }
+
+    def scores(self, record: Any) -> Dict[int, float]:
+        """``{row_index: BM25 score}`` for old rows sharing at least one term with ``record``."""
+        out: Dict[int, float] = defaultdict(float)
+        avg = self._avg_len or 1.0
+        # Terms in most rows barely move the ranking but dominate the cost; skip them.
+        common = max(10, len(self.rows) // 2)
+        for term in set(tokenize(_row_text(record))):
+            postings = self._postings.get(term)
+            if not postings or len(postings) > common:
+                continue
+            idf = self._idf[term]
+            for i, tf in postings:
+                norm = tf + _BM25_K1 * (1.0 - _BM25_B + _BM25_B * self._lengths[i] / avg)
+                out[i] += idf * tf * (_BM25_K1 + 1.0) / norm
+        return out
+
+    def select(
+        self,
+        records: Sequence[Any],
+        *,
+        top_k: int = OLD_BOOK_TOP_K,
+        margin: int = OLD_BOOK_NEIGHBOR_MARGIN,
+    ) -> List[int]:
+        """Sorted indices of the old rows relevant to ``records``: each record's top hits plus neighbours."""
+        n = len(self.rows)
+        hits = set()
+        for record in records:
+            scored = self.scores(record)
+            if scored:
+                hits.update(sorted(scored, key=lambda i: (-scored[i], i))[:top_k])
+        if not hits:
+            return []
+        selected = set()
+        for i in hits:
+            selected.update(range(max(0, i - margin), min(n, i + margin + 1)))
+        return sorted(selected)
+
+    def rows_for(self, records: Sequence[Any], **kwargs: Any) -> List[Any]:
+        return [self.rows[i] for i in self.select(records, **kwargs)]
+
+
+def partition_rows(
+    index: OldBookIndex,
+    shards: Sequence[Sequence[Any]],
+    *,
+    top_k: int = OLD_BOOK_TOP_K,
+) -> Optional[List[List[int]]]:
+    """
+    Split the old book between shards of current records (one stretch of rows per shard).
+
+    Each old row goes to the shard whose best-matching row is nearest in book order (ties to
+    the earlier shard), so every old row - including rows with no match anywhere, i.e.
+    deleted content - is sent to exactly one shard. Returns None when nothing matches.
+    """
+    anchors: List[Tuple[int, int]] = []
+    for shard_idx, records in enumerate(shards):
+        hits = set()
+        for record in records:
+            scored = index.scores(record)
+            hits.update(sorted(scored, key=lambda i: (-scored[i], i))[:top_k])
+        anchors.extend((i, shard_idx) for i in hits)
+    if not anchors:
+        return None
+    anchors.sort()
+    positions = [a[0] for a in anchors]
+    out: List[List[int]] = [[] for _ in shards]
+    for i in range(len(index.rows)):
+        j = bisect.bisect_left(positions, i)
+        candidates = []
+        if j < len(anchors):
+            candidates.append((positions[j] - i, anchors[j][1]))
+        if j > 0:
+            candidates.append((i - positions[j - 1], anchors[j - 1][1]))
+        out[min(candidates)[1]].append(i)
+    return out
+
+
+def needs_retrieval(rows: Sequence[Any]) -> bool:
+    """True when the old book is too large to send whole with every part."""
+    size = 0
+    for row in rows:
+        size += len(json.dumps(row, ensure_ascii=False))
+        if size > OLD_BOOK_FULL_CONTEXT_CHARS:
+            return True
+    return False
@@ -11,12 +11,17 @@ import json
 import logging
 import os
 import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Optional, Dict, Any, Callable, List
 
 import requests
 
+import llm_telemetry
 from api_layer import APIKeyManager, APIConfig
+from json_stream_extractor import StreamingJsonExtractor, remember_scan
 from openrouter_models import merge_openrouter_payload_extras, resolve_openrouter_model_choice
+from openrouter_rate_governor import RateGovernor, get_rate_governor
 
 OPENROUTER_LOG_PREFIX = "[openrouter]"
 
@@ -92,11 +97,11 @@ def _reduce_max_tokens_for_credit_cap(requested: int, api_message: str) -> Optio
     return None
 
 
-def _parse_openrouter_error_body(resp: requests.Response) -> str:
-    """Extract human-readable error text from OpenRouter error JSON or raw body."""
+def _parse_openrouter_error_body(resp: Any) -> str:
+    """Extract human-readable error text from OpenRouter error JSON or raw body (requests or httpx response)."""
     text = (resp.text or "").strip()
     if not text:
-        return resp.reason or f"HTTP {resp.status_code}"
+        return getattr(resp, "reason", None) or getattr(resp, "reason_phrase", None) or f"HTTP {resp.status_code}"
     try:
         data = resp.json()
     except json.JSONDecodeError:
@@ -109,13 +114,31 @@ def _parse_openrouter_error_body(resp: requests.Response) -> str:
     return (data.get("message") or text)[:4000]
 
 
-def _build_openrouter_error_message(*, resp: requests.Response) -> tuple[str, str]:
+def _build_openrouter_error_message(*, resp: Any) -> tuple[str, str]:
     """Return (exception_message, parsed_provider_message). Provider text only in the user-facing line."""
     api_msg = _parse_openrouter_error_body(resp)
     full = f"OpenRouter HTTP {resp.status_code}: {api_msg}"
     return full, api_msg
 
 
+def _parse_retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds (delta-seconds or HTTP date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
 def _log_openrouter_request_context(
     logger: logging.Logger,
     *,
@@ -281,13 +304,23 @@ def _log_openrouter_completion_ok(
 class OpenRouterAPIClient:
     """API client for OpenRouter (chat/completions)."""
 
-    def __init__(self, api_key_manager: Optional[APIKeyManager] = None):
+    # 429 responses retried under the rate governor before the error is surfaced
+    RATE_LIMIT_RETRIES = 4
+
+    def __init__(
+        self,
+        api_key_manager: Optional[APIKeyManager] = None,
+        rate_governor: Optional[RateGovernor] = None,
+    ):
         self.key_manager = api_key_manager or APIKeyManager()
         self.logger = logging.getLogger(__name__)
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         self._current_model_name: Optional[str] = None
+        # Process-wide (optionally Redis-shared) per-model rate limit + in-flight cap
+        self.rate_governor = rate_governor or get_rate_governor()
 
-        # Session with retries (similar to DeepSeek client)
+        # Session with retries (similar to DeepSeek client). 429 is left to the rate governor,
+        # which honours Retry-After and slows every caller of the model down, not just this one.
         self.session = requests.Session()
         from requests.adapters import HTTPAdapter
         from urllib3.util.retry import Retry
@@ -295,7 +328,7 @@ class OpenRouterAPIClient:
         retry_strategy = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=[500, 502, 503, 504],
             allowed_methods=["POST"],
         )
         adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=10)
@@ -343,6 +376,35 @@ class OpenRouterAPIClient:
             )
         return api_model, merged_extra
 
+    def _post_chat_completions(
+        self,
+        model_name: str,
+        cancel_check: Optional[Callable[[], bool]],
+        **post_kwargs: Any,
+    ) -> requests.Response:
+        """POST once the model's token bucket allows it; 429s feed the governor and are retried."""
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            if not self.rate_governor.wait_for_token(model_name, cancel_check=cancel_check):
+                raise OpenRouterRequestAborted()
+            resp = self.session.post(self.base_url, **post_kwargs)
+            if resp.status_code != 429 or attempt == self.RATE_LIMIT_RETRIES:
+                if resp.status_code < 400:
+                    self.rate_governor.report_success(model_name)
+                return resp
+            retry_after = _parse_retry_after_seconds(resp.headers.get("Retry-After"))
+            self.rate_governor.report_rate_limited(model_name, retry_after)
+            llm_telemetry.note_retry()
+            self.logger.warning(
+                "%s HTTP 429 model=%s retry=%s/%s retry_after=%s",
+                OPENROUTER_LOG_PREFIX,
+                model_name,
+                attempt + 1,
+                self.RATE_LIMIT_RETRIES,
+                retry_after,
+            )
+            resp.close()
+        return resp
+
     def extract_from_code_block(self, text: str) -> str:
         """Compatibility helper shared by processors."""
         if not text:
@@ -368,7 +430,7 @@ class OpenRouterAPIClient:
         self.logger.info(f"OpenRouter client initialized with model: {model_name}")
         return True
 
-    def _stream_chat_completions(
+    def _build_chat_request(
         self,
         *,
         model_name: str,
@@ -377,16 +439,15 @@ class OpenRouterAPIClient:
         temperature: float,
         max_tokens: int,
         api_key: Optional[str],
-        timeout_s: float,
-        cancel_check: Callable[[], bool],
-        reasoning_effort_none: bool = False,
-        openrouter_payload_extra: Optional[Dict[str, Any]] = None,
-        content_only: bool = False,
-    ) -> Optional[str]:
-        """Stream tokens from OpenRouter and check cancel between SSE lines (enables user stop)."""
+        stream: bool,
+        reasoning_effort_none: bool,
+        openrouter_payload_extra: Optional[Dict[str, Any]],
+    ) -> Optional[tuple[Dict[str, str], Dict[str, Any], int]]:
+        """(headers, payload, prompt_char_len) for one chat/completions call; None without an API key."""
         key = self._resolve_api_key(api_key)
         if not key:
             self.logger.error("No OpenRouter API key available")
+            llm_telemetry.note_error("No OpenRouter API key available")
             return None
 
         messages: List[Dict[str, str]] = []
@@ -394,11 +455,10 @@ class OpenRouterAPIClient:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": user_text})
 
-        prompt_char_len = len(user_text) + len(system_prompt or "")
-
         headers = {
             "Authorization": f"Bearer {key}",
             "Content-Type": "application/json",
+            # Optional attribution headers (safe defaults)
             "HTTP-Referer": "https://content-automation.local",
             "X-Title": "Content Automation",
         }
@@ -407,13 +467,154 @@ class OpenRouterAPIClient:
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
-            "stream": True,
+            "stream": stream,
         }
         _merge_openrouter_payload(
             payload,
             reasoning_effort_none=reasoning_effort_none,
             openrouter_payload_extra=openrouter_payload_extra,
         )
+        return headers, payload, len(user_text) + len(system_prompt or "")
+
+    def _log_payload_options(self, payload: Dict[str, Any], reasoning_effort_none: bool, content_only: bool) -> None:
+        self.logger.info(
+            "%s payload_options reasoning_effort_none=%s content_only=%s response_format=%s",
+            OPENROUTER_LOG_PREFIX,
+            reasoning_effort_none,
+            content_only,
+            payload.get("response_format"),
+        )
+
+    def _credit_cap_or_raise(
+        self,
+        resp: Any,
+        *,
+        model_name: str,
+        prompt_char_len: int,
+        max_tokens: int,
+        credit_retry: int,
+    ) -> int:
+        """For an HTTP error response: the reduced max_tokens to retry a credit cap with, else raise."""
+        _log_openrouter_request_context(
+            self.logger,
+            model_name=model_name,
+            prompt_char_len=prompt_char_len,
+            max_tokens=max_tokens,
+        )
+        full, api_msg = _build_openrouter_error_message(resp=resp)
+        reduced = (
+            _reduce_max_tokens_for_credit_cap(max_tokens, api_msg)
+            if _is_openrouter_insufficient_credits_error(resp.status_code, api_msg)
+            else None
+        )
+        if reduced is not None and credit_retry == 0:
+            self.logger.warning(
+                "%s HTTP %s credit cap: retrying with max_tokens=%s (was %s): %s",
+                OPENROUTER_LOG_PREFIX,
+                resp.status_code,
+                reduced,
+                max_tokens,
+                api_msg,
+            )
+            llm_telemetry.note_credit_cap()
+            return reduced
+        self.logger.error(full)
+        raise OpenRouterAPIError(
+            full,
+            status_code=resp.status_code,
+            api_message=api_msg,
+            model_name=model_name,
+        )
+
+    def _text_from_completion_data(
+        self,
+        data: Any,
+        *,
+        model_name: str,
+        prompt_char_len: int,
+        max_tokens: int,
+        content_only: bool,
+    ) -> Optional[str]:
+        """Assistant text of a non-streamed completion body; raises OpenRouterAPIError on an error payload."""
+        if not isinstance(data, dict):
+            self.logger.error("%s invalid_response_type type=%s", OPENROUTER_LOG_PREFIX, type(data).__name__)
+            return None
+        llm_telemetry.note_usage(data.get("usage") if isinstance(data.get("usage"), dict) else None)
+        err = data.get("error")
+        if err:
+            api_msg = err.get("message", str(err)) if isinstance(err, dict) else str(err)
+            _log_openrouter_request_context(
+                self.logger,
+                model_name=model_name,
+                prompt_char_len=prompt_char_len,
+                max_tokens=max_tokens,
+            )
+            full = f"OpenRouter response JSON error: {api_msg}"
+            self.logger.error(full)
+            raise OpenRouterAPIError(
+                full,
+                status_code=None,
+                api_message=api_msg,
+                model_name=model_name,
+            )
+        text, source = _extract_assistant_text_from_completion_data(data, content_only=content_only)
+        if source == "reasoning_skipped":
+            self.logger.warning(
+                "%s content_empty_reasoning_present model=%s finish_reason=%s "
+                "(use reasoning_effort_none; reasoning text is not used for JSON stages)",
+                OPENROUTER_LOG_PREFIX,
+                model_name,
+                (data.get("choices") or [{}])[0].get("finish_reason") if data.get("choices") else None,
+            )
+        if text:
+            _log_openrouter_completion_ok(
+                self.logger,
+                model_name=model_name,
+                data=data,
+                text=text,
+                source_field=source,
+            )
+            return text
+        _log_openrouter_completion_diag(
+            self.logger,
+            model_name=model_name,
+            data=data,
+            extracted_text=text,
+            prompt_char_len=prompt_char_len,
+            max_tokens=max_tokens,
+        )
+        return None
+
+    def _stream_chat_completions(
+        self,
+        *,
+        model_name: str,
+        user_text: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        api_key: Optional[str],
+        timeout_s: float,
+        cancel_check: Callable[[], bool],
+        reasoning_effort_none: bool = False,
+        openrouter_payload_extra: Optional[Dict[str, Any]] = None,
+        content_only: bool = False,
+    ) -> Optional[str]:
+        """Stream tokens from OpenRouter and check cancel between SSE lines (enables user stop)."""
+        request = self._build_chat_request(
+            model_name=model_name,
+            user_text=user_text,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=api_key,
+            stream=True,
+            reasoning_effort_none=reasoning_effort_none,
+            openrouter_payload_extra=openrouter_payload_extra,
+        )
+        if request is None:
+            return None
+        headers, payload, prompt_char_len = request
 
         if cancel_check():
             raise OpenRouterRequestAborted()
@@ -421,46 +622,26 @@ class OpenRouterAPIClient:
         try:
             for credit_retry in range(2):
                 payload["max_tokens"] = effective_max_tokens
-                resp = self.session.post(
-                    self.base_url, headers=headers, json=payload, stream=True, timeout=timeout_s
+                resp = self._post_chat_completions(
+                    model_name, cancel_check, headers=headers, json=payload, stream=True, timeout=timeout_s
                 )
                 if resp.status_code >= 400:
-                    _log_openrouter_request_context(
-                        self.logger,
+                    effective_max_tokens = self._credit_cap_or_raise(
+                        resp,
                         model_name=model_name,
                         prompt_char_len=prompt_char_len,
                         max_tokens=effective_max_tokens,
+                        credit_retry=credit_retry,
                     )
-                    full, api_msg = _build_openrouter_error_message(resp=resp)
-                    reduced = (
-                        _reduce_max_tokens_for_credit_cap(effective_max_tokens, api_msg)
-                        if _is_openrouter_insufficient_credits_error(resp.status_code, api_msg)
-                        else None
-                    )
-                    if reduced is not None and credit_retry == 0:
-                        self.logger.warning(
-                            "%s HTTP %s credit cap: retrying with max_tokens=%s (was %s): %s",
-                            OPENROUTER_LOG_PREFIX,
-                            resp.status_code,
-                            reduced,
-                            effective_max_tokens,
-                            api_msg,
-                        )
-                        effective_max_tokens = reduced
-                        continue
-                    self.logger.error(full)
-                    raise OpenRouterAPIError(
-                        full,
-                        status_code=resp.status_code,
-                        api_message=api_msg,
-                        model_name=model_name,
-                    )
+                    continue
                 break
             resp.raise_for_status()
             # text/event-stream often has no charset; requests defaults to ISO-8859-1 and mojibakes UTF-8
             # (e.g. Persian) before json.loads. Force UTF-8 for iter_lines decode.
             resp.encoding = "utf-8"
             chunks: List[str] = []
+            # Scan JSON blocks as deltas arrive so callers' extraction reuses them
+            json_scan = StreamingJsonExtractor()
             stream_source = "none"
             last_stream_obj: Optional[Dict[str, Any]] = None
             for raw in resp.iter_lines(decode_unicode=True):
@@ -481,6 +662,8 @@ class OpenRouterAPIClient:
                     continue
                 if isinstance(obj, dict):
                     last_stream_obj = obj
+                    if isinstance(obj.get("usage"), dict):
+                        llm_telemetry.note_usage(obj["usage"])
                 err = obj.get("error")
                 if err:
                     msg = err.get("message", str(err)) if isinstance(err, dict) else str(err)
@@ -505,9 +688,13 @@ class OpenRouterAPIClient:
                         if isinstance(piece, str) and piece:
                             if stream_source == "none":
                                 stream_source = key
+                                llm_telemetry.note_first_token()
                             chunks.append(piece)
+                            json_scan.feed(piece)
             text = "".join(chunks) if chunks else None
             if text:
+                json_scan.finish()
+                remember_scan(text, json_scan.blocks)
                 self.logger.info(
                     "%s stream_ok model=%s source=%s response_chars=%s",
                     OPENROUTER_LOG_PREFIX,
@@ -531,9 +718,38 @@ class OpenRouterAPIClient:
             raise
         except Exception as e:
             self.logger.error("OpenRouter streaming failed: %s", e)
+            llm_telemetry.note_error(str(e))
             return None
 
     def _call_chat_completions(
+        self,
+        *,
+        model_name: str,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        **kwargs: Any,
+    ) -> Optional[str]:
+        """Chat completion under the rate governor's per-model in-flight cap (one telemetry record per call)."""
+        with llm_telemetry.track_request(
+            "openrouter",
+            model_name,
+            prompt_chars=len(kwargs.get("user_text") or "") + len(kwargs.get("system_prompt") or ""),
+            max_tokens=kwargs.get("max_tokens"),
+            abort_errors=(OpenRouterRequestAborted,),
+        ) as call:
+            lease = self.rate_governor.acquire_slot(model_name, cancel_check=cancel_check)
+            if lease is None:
+                raise OpenRouterRequestAborted()
+            call.mark_dispatched()
+            try:
+                text = self._call_chat_completions_unthrottled(
+                    model_name=model_name, cancel_check=cancel_check, **kwargs
+                )
+            finally:
+                self.rate_governor.release_slot(model_name, lease)
+            call.set_result(text)
+            return text
+
+    def _call_chat_completions_unthrottled(
         self,
         *,
         model_name: str,
@@ -564,137 +780,53 @@ class OpenRouterAPIClient:
                 content_only=content_only,
             )
 
-        key = self._resolve_api_key(api_key)
-        if not key:
-            self.logger.error("No OpenRouter API key available")
-            return None
-
-        messages: List[Dict[str, str]] = []
-        if system_prompt and system_prompt.strip():
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": user_text})
-
-        prompt_char_len = len(user_text) + len(system_prompt or "")
-
-        headers = {
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
-            # Optional attribution headers (safe defaults)
-            "HTTP-Referer": "https://content-automation.local",
-            "X-Title": "Content Automation",
-        }
-
-        payload: Dict[str, Any] = {
-            "model": model_name,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "stream": False,
-        }
-        _merge_openrouter_payload(
-            payload,
+        request = self._build_chat_request(
+            model_name=model_name,
+            user_text=user_text,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=api_key,
+            stream=False,
             reasoning_effort_none=reasoning_effort_none,
             openrouter_payload_extra=openrouter_payload_extra,
         )
+        if request is None:
+            return None
+        headers, payload, prompt_char_len = request
         if reasoning_effort_none or content_only:
-            self.logger.info(
-                "%s payload_options reasoning_effort_none=%s content_only=%s response_format=%s",
-                OPENROUTER_LOG_PREFIX,
-                reasoning_effort_none,
-                content_only,
-                payload.get("response_format"),
-            )
+            self._log_payload_options(payload, reasoning_effort_none, content_only)
 
         effective_max_tokens = max_tokens
         try:
             for credit_retry in range(2):
                 payload["max_tokens"] = effective_max_tokens
-                resp = self.session.post(self.base_url, headers=headers, json=payload, timeout=timeout_s)
+                resp = self._post_chat_completions(
+                    model_name, cancel_check, headers=headers, json=payload, timeout=timeout_s
+                )
                 if resp.status_code >= 400:
-                    _log_openrouter_request_context(
-                        self.logger,
+                    effective_max_tokens = self._credit_cap_or_raise(
+                        resp,
                         model_name=model_name,
                         prompt_char_len=prompt_char_len,
                         max_tokens=effective_max_tokens,
+                        credit_retry=credit_retry,
                     )
-                    full, api_msg = _build_openrouter_error_message(resp=resp)
-                    reduced = (
-                        _reduce_max_tokens_for_credit_cap(effective_max_tokens, api_msg)
-                        if _is_openrouter_insufficient_credits_error(resp.status_code, api_msg)
-                        else None
-                    )
-                    if reduced is not None and credit_retry == 0:
-                        self.logger.warning(
-                            "%s HTTP %s credit cap: retrying with max_tokens=%s (was %s): %s",
-                            OPENROUTER_LOG_PREFIX,
-                            resp.status_code,
-                            reduced,
-                            effective_max_tokens,
-                            api_msg,
-                        )
-                        effective_max_tokens = reduced
-                        continue
-                    self.logger.error(full)
-                    raise OpenRouterAPIError(
-                        full,
-                        status_code=resp.status_code,
-                        api_message=api_msg,
-                        model_name=model_name,
-                    )
+                    continue
                 break
             resp.raise_for_status()
-            data = resp.json()
-            if not isinstance(data, dict):
-                self.logger.error("%s invalid_response_type type=%s", OPENROUTER_LOG_PREFIX, type(data).__name__)
-                return None
-            err = data.get("error")
-            if err:
-                api_msg = err.get("message", str(err)) if isinstance(err, dict) else str(err)
-                _log_openrouter_request_context(
-                    self.logger,
-                    model_name=model_name,
-                    prompt_char_len=prompt_char_len,
-                    max_tokens=max_tokens,
-                )
-                full = f"OpenRouter response JSON error: {api_msg}"
-                self.logger.error(full)
-                raise OpenRouterAPIError(
-                    full,
-                    status_code=None,
-                    api_message=api_msg,
-                    model_name=model_name,
-                )
-            text, source = _extract_assistant_text_from_completion_data(data, content_only=content_only)
-            if source == "reasoning_skipped":
-                self.logger.warning(
-                    "%s content_empty_reasoning_present model=%s finish_reason=%s "
-                    "(use reasoning_effort_none; reasoning text is not used for JSON stages)",
-                    OPENROUTER_LOG_PREFIX,
-                    model_name,
-                    (data.get("choices") or [{}])[0].get("finish_reason") if data.get("choices") else None,
-                )
-            if text:
-                _log_openrouter_completion_ok(
-                    self.logger,
-                    model_name=model_name,
-                    data=data,
-                    text=text,
-                    source_field=source,
-                )
-                return text
-            _log_openrouter_completion_diag(
-                self.logger,
+            return self._text_from_completion_data(
+                resp.json(),
                 model_name=model_name,
-                data=data,
-                extracted_text=text,
                 prompt_char_len=prompt_char_len,
                 max_tokens=max_tokens,
+                content_only=content_only,
             )
-            return None
-        except OpenRouterAPIError:
+        except (OpenRouterAPIError, OpenRouterRequestAborted):
             raise
         except Exception as e:
             self.logger.error(f"OpenRouter request failed: {e}")
+            llm_telemetry.note_error(str(e))
             return None
 
     def process_text(
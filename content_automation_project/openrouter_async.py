@@ -0,0 +1,393 @@
+"""
+Asyncio transport for OpenRouter chat/completions and a bounded fan-out helper.
+
+The blocking client (``openrouter_api_client.py``) ties up one thread per in-flight request,
+and each client has its own 10-connection pool. ``AsyncOpenRouterTransport`` sends the same
+non-streamed requests as coroutines over one process-wide ``httpx.AsyncClient``: a single
+keep-alive pool owned by one event-loop thread, so hundreds of requests can be in flight from
+one worker without hundreds of threads.
+
+Behaviour matches the blocking client: same payloads, the same rate governor (coroutine
+waits, see ``RateGovernor.acquire_slot_async``), 429 retries, credit-cap max_tokens reduction,
+3 retries with backoff on 5xx/transport errors (the blocking session's urllib3 policy), and
+one telemetry record per request. Nothing blocking runs on the loop thread: Redis governor
+calls, telemetry sinks and the (database-backed) cancel checks go to the default executor.
+
+:func:`fan_out` runs a list of request factories with at most ``concurrency`` in flight and
+per-item retry and cancel; ``UnifiedAPIClient.process_text_many`` is the public entry point.
+When ``httpx`` is not installed the fan-out runs the blocking client on a thread pool instead.
+
+Configuration (environment):
+
+    OPENROUTER_ASYNC_MAX_CONNECTIONS   size of the shared keep-alive pool (default: 100)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import llm_telemetry
+from api_layer import APIConfig
+from openrouter_api_client import (
+    OPENROUTER_LOG_PREFIX,
+    OpenRouterAPIClient,
+    OpenRouterAPIError,
+    OpenRouterRequestAborted,
+    _parse_retry_after_seconds,
+)
+
+try:
+    import httpx
+
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS_ENV = "OPENROUTER_ASYNC_MAX_CONNECTIONS"
+DEFAULT_MAX_CONNECTIONS = 100
+
+# Same policy as the blocking session's urllib3 Retry(total=3, backoff_factor=1)
+_SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+_TRANSPORT_RETRIES = 3
+_TRANSPORT_ERRORS = (httpx.TransportError,) if HTTPX_AVAILABLE else ()
+
+# Errors a retry cannot fix (bad request, auth, credits, payload too large)
+_FINAL_STATUSES = (400, 401, 402, 403, 404, 413)
+
+
+class _LoopThread:
+    """Daemon thread running the event loop that owns the shared HTTP pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.http: Any = None
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self.http = None
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="openrouter-async", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """Run ``coro`` on the loop thread and block the calling thread until it finishes."""
+        loop = self.loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("openrouter_async.run() called from its own event loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+_loop_thread = _LoopThread()
+
+
+def run(coro: Awaitable[Any]) -> Any:
+    return _loop_thread.run(coro)
+
+
+def _shared_http() -> Any:
+    """The process-wide ``httpx.AsyncClient`` (created on first use, on the loop thread)."""
+    if _loop_thread.http is None:
+        try:
+            size = int(os.environ.get(MAX_CONNECTIONS_ENV) or DEFAULT_MAX_CONNECTIONS)
+        except ValueError:
+            size = DEFAULT_MAX_CONNECTIONS
+        _loop_thread.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=600),
+        )
+    return _loop_thread.http
+
+
+async def _cancellable(aw: Awaitable[Any], cancel_check: Optional[Callable[[], bool]], poll_s: float) -> Any:
+    """Await ``aw``, polling ``cancel_check``; cancels it and raises OpenRouterRequestAborted on stop."""
+    if cancel_check is None:
+        return await aw
+    task = asyncio.ensure_future(aw)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=poll_s)
+        if done:
+            return task.result()
+        if cancel_check():
+            task.cancel()
+            raise OpenRouterRequestAborted()
+
+
+class AsyncOpenRouterTransport:
+    """Coroutine ``process_text`` for an :class:`OpenRouterAPIClient` (keys, governor, parsing)."""
+
+    def __init__(self, client: OpenRouterAPIClient):
+        self.client = client
+        self.logger = client.logger
+
+    async def _post(
+        self,
+        model_name: str,
+        cancel_check: Optional[Callable[[], bool]],
+        **post_kwargs: Any,
+    ) -> Any:
+        """Async counterpart of ``OpenRouterAPIClient._post_chat_completions`` (plus 5xx/transport retries)."""
+        gov = self.client.rate_governor
+        rate_limited = 0
+        transport_retries = 0
+        while True:
+            if not await gov.wait_for_token_async(model_name, cancel_check=cancel_check):
+                raise OpenRouterRequestAborted()
+            try:
+                resp = await _cancellable(
+                    _shared_http().post(self.client.base_url, **post_kwargs), cancel_check, gov.poll_interval_s
+                )
+            except _TRANSPORT_ERRORS as e:
+                if transport_retries >= _TRANSPORT_RETRIES:
+                    raise
+                transport_retries += 1
+                llm_telemetry.note_retry()
+                self.logger.warning(
+                    "%s transport error model=%s retry=%s/%s: %s",
+                    OPENROUTER_LOG_PREFIX,
+                    model_name,
+                    transport_retries,
+                    _TRANSPORT_RETRIES,
+                    e,
+                )
+                if not await gov.sleep_async(2 ** (transport_retries - 1), cancel_check):
+                    raise OpenRouterRequestAborted()
+                continue
+            if resp.status_code in _SERVER_ERROR_STATUSES and transport_retries < _TRANSPORT_RETRIES:
+                transport_retries += 1
+                llm_telemetry.note_retry()
+                if not await gov.sleep_async(2 ** (transport_retries - 1), cancel_check):
+                    raise OpenRouterRequestAborted()
+                continue
+            if resp.status_code != 429 or rate_limited == self.client.RATE_LIMIT_RETRIES:
+                if resp.status_code < 400:
+                    await gov.report_success_async(model_name)
+                return resp
+            rate_limited += 1
+            retry_after = _parse_retry_after_seconds(resp.headers.get("Retry-After"))
+            await gov.report_rate_limited_async(model_name, retry_after)
+            llm_telemetry.note_retry()
+            self.logger.warning(
+                "%s HTTP 429 model=%s retry=%s/%s retry_after=%s",
+                OPENROUTER_LOG_PREFIX,
+                model_name,
+                rate_limited,
+                self.client.RATE_LIMIT_RETRIES,
+                retry_after,
+            )
+
+    async def _complete(
+        self,
+        *,
+        model_name: str,
+        user_text: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        api_key: Optional[str],
+        timeout_s: float,
+        cancel_check: Optional[Callable[[], bool]],
+        reasoning_effort_none: bool,
+        openrouter_payload_extra: Optional[Dict[str, Any]],
+        content_only: bool,
+    ) -> Optional[str]:
+        c = self.client
+        request = c._build_chat_request(
+            model_name=model_name,
+            user_text=user_text,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=api_key,
+            stream=False,
+            reasoning_effort_none=reasoning_effort_none,
+            openrouter_payload_extra=openrouter_payload_extra,
+        )
+        if request is None:
+            return None
+        headers, payload, prompt_char_len = request
+        if reasoning_effort_none or content_only:
+            c._log_payload_options(payload, reasoning_effort_none, content_only)
+
+        effective_max_tokens = max_tokens
+        try:
+            for credit_retry in range(2):
+                payload["max_tokens"] = effective_max_tokens
+                resp = await self._post(model_name, cancel_check, headers=headers, json=payload, timeout=timeout_s)
+                if resp.status_code >= 400:
+                    effective_max_tokens = c._credit_cap_or_raise(
+                        resp,
+                        model_name=model_name,
+                        prompt_char_len=prompt_char_len,
+                        max_tokens=effective_max_tokens,
+                        credit_retry=credit_retry,
+                    )
+                    continue
+                break
+            return c._text_from_completion_data(
+                resp.json(),
+                model_name=model_name,
+                prompt_char_len=prompt_char_len,
+                max_tokens=max_tokens,
+                content_only=content_only,
+            )
+        except (OpenRouterAPIError, OpenRouterRequestAborted):
+            raise
+        except Exception as e:
+            self.logger.error(f"OpenRouter request failed: {e}")
+            llm_telemetry.note_error(str(e))
+            return None
+
+    async def process_text(
+        self,
+        text: str,
+        system_prompt: Optional[str] = None,
+        model_name: str = APIConfig.DEFAULT_OPENROUTER_MODEL,
+        temperature: float = APIConfig.DEFAULT_TEMPERATURE,
+        max_tokens: int = APIConfig.DEFAULT_OPENROUTER_MAX_TOKENS,
+        api_key: Optional[str] = None,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        timeout_s: float = 600.0,
+        reasoning_effort_none: bool = False,
+        openrouter_payload_extra: Optional[Dict[str, Any]] = None,
+        content_only: bool = False,
+    ) -> Optional[str]:
+        """
+        Same contract as ``OpenRouterAPIClient.process_text`` (non-streamed); run on the shared loop.
+
+        ``cancel_check`` is polled on the event loop and must not block (no DB or Redis reads);
+        :func:`fan_out` hands each call a cached flag.
+        """
+        api_model, effective_payload_extra = self.client._resolve_request_model(
+            model_name or APIConfig.DEFAULT_OPENROUTER_MODEL,
+            reasoning_effort_none=reasoning_effort_none,
+            openrouter_payload_extra=openrouter_payload_extra,
+        )
+        gov = self.client.rate_governor
+        with llm_telemetry.track_request(
+            "openrouter",
+            api_model,
+            prompt_chars=len(text or "") + len(system_prompt or ""),
+            max_tokens=max_tokens,
+            abort_errors=(OpenRouterRequestAborted,),
+        ) as call:
+            lease = await gov.acquire_slot_async(api_model, cancel_check=cancel_check)
+            if lease is None:
+                raise OpenRouterRequestAborted()
+            call.mark_dispatched()
+            try:
+                result = await self._complete(
+                    model_name=api_model,
+                    user_text=text,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    api_key=api_key,
+                    timeout_s=timeout_s,
+                    cancel_check=cancel_check,
+                    reasoning_effort_none=reasoning_effort_none,
+                    openrouter_payload_extra=effective_payload_extra,
+                    content_only=content_only,
+                )
+            finally:
+                await gov.release_slot_async(api_model, lease)
+            call.set_result(result)
+            return result
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, OpenRouterAPIError):
+        return exc.status_code not in _FINAL_STATUSES
+    return not isinstance(exc, (OpenRouterRequestAborted, TypeError, ValueError))
+
+
+async def fan_out(
+    calls: Sequence[Callable[[Callable[[], bool]], Awaitable[Optional[str]]]],
+    *,
+    concurrency: int,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    item_cancel_checks: Optional[Sequence[Optional[Callable[[], bool]]]] = None,
+    item_retries: int = 1,
+    poll_interval_s: float = 0.25,
+) -> List[Any]:
+    """
+    Run ``calls`` with at most ``concurrency`` in flight; results in input order.
+
+    Each call receives the cancel check to honour (the batch's or its own). An item that
+    returns nothing or fails with a retryable error is retried up to ``item_retries`` times;
+    a final failure leaves the exception in its slot (None for an empty response). Items
+    stopped by their own cancel check end as OpenRouterRequestAborted; if the batch's
+    ``cancel_check`` fires, OpenRouterRequestAborted is raised once every item has stopped.
+
+    The given checks may block (the job cancel flag reads the database): they are evaluated
+    together on the default executor every ``poll_interval_s``, and the calls only see the
+    cached results.
+    """
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    checks = list(item_cancel_checks or [None] * len(calls))
+    watched = [c for c in dict.fromkeys([cancel_check, *checks]) if c is not None]
+    fired: Dict[Callable[[], bool], bool] = {}
+
+    def _poll_checks() -> None:
+        for check in watched:
+            if fired.get(check):
+                continue
+            try:
+                fired[check] = bool(check())
+            except Exception as e:
+                logger.warning("%s batch cancel check failed: %s", OPENROUTER_LOG_PREFIX, e)
+
+    async def _poller() -> None:
+        while True:
+            await asyncio.sleep(poll_interval_s)
+            await loop.run_in_executor(None, _poll_checks)
+
+    def _stop_check(own: Optional[Callable[[], bool]]) -> Optional[Callable[[], bool]]:
+        if own is None and cancel_check is None:
+            return None
+        return lambda: fired.get(cancel_check, False) or fired.get(own, False)
+
+    async def _one(index: int) -> Any:
+        stop = _stop_check(checks[index])
+        async with sem:
+            for attempt in range(item_retries + 1):
+                if stop is not None and stop():
+                    return OpenRouterRequestAborted()
+                try:
+                    result = await calls[index](stop)
+                except OpenRouterRequestAborted as e:
+                    return e
+                except Exception as e:
+                    if attempt == item_retries or not _retryable(e):
+                        logger.warning("%s batch item %s failed: %s", OPENROUTER_LOG_PREFIX, index, e)
+                        return e
+                    logger.warning("%s batch item %s failed, retrying: %s", OPENROUTER_LOG_PREFIX, index, e)
+                    continue
+                if result or attempt == item_retries:
+                    return result
+                logger.warning("%s batch item %s returned no text, retrying", OPENROUTER_LOG_PREFIX, index)
+        return None
+
+    poller = None
+    if watched:
+        await loop.run_in_executor(None, _poll_checks)
+        poller = asyncio.ensure_future(_poller())
+    try:
+        results = await asyncio.gather(*(_one(i) for i in range(len(calls))))
+    finally:
+        if poller is not None:
+            poller.cancel()
+    if cancel_check is not None:
+        await loop.run_in_executor(None, _poll_checks)
+        if fired.get(cancel_check):
+            raise OpenRouterRequestAborted()
+    return list(results)
@@ -0,0 +1,405 @@
+"""
+Provider-wide rate limiter and concurrency governor for OpenRouter chat/completions.
+
+Every stage runs its own thread pool and several Celery jobs can run at once, so without a
+shared limit bursts of requests end in 429 storms. ``RateGovernor`` sits in front of every
+OpenRouter request and enforces, per model:
+
+- a token bucket (``rps`` requests per second, ``burst`` tokens), and
+- a cap on requests in flight (``max_in_flight``; 0 = unlimited).
+
+The bucket adapts to the provider: a 429 halves the model's rate and starts a cool-down
+(``Retry-After`` when given, else an exponential delay); successful calls raise the rate back
+towards its configured value.
+
+State is process-wide by default. When ``OPENROUTER_GOVERNOR_REDIS_URL`` is set, buckets,
+cool-downs and in-flight counts live in Redis so all web/Celery workers share one budget;
+if Redis is unreachable the governor falls back to process-local state.
+
+Configuration (environment):
+
+    OPENROUTER_RATE_LIMITS          JSON, e.g.
+        {"default": {"rps": 2, "burst": 10, "max_in_flight": 16}, "z-ai/glm-5": {"rps": 1}}
+    OPENROUTER_GOVERNOR_REDIS_URL   redis://... (optional, cross-worker state)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITS_ENV = "OPENROUTER_RATE_LIMITS"
+REDIS_URL_ENV = "OPENROUTER_GOVERNOR_REDIS_URL"
+
+# Lowest adaptive rate, as a fraction of the configured rps
+_MIN_RATE_FRACTION = 0.05
+# Rate regained per successful call, as a fraction of the configured rps
+_RECOVERY_FRACTION = 0.05
+# Cool-down after a 429 without Retry-After: base * 2^(consecutive 429s - 1), capped
+_DEFAULT_COOLDOWN_S = 2.0
+_MAX_COOLDOWN_S = 60.0
+# In-flight leases older than this are treated as leaked (crashed worker)
+_IN_FLIGHT_LEASE_S = 900.0
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    rps: float = 2.0
+    burst: int = 10
+    max_in_flight: int = 16
+
+
+def load_model_limits_from_env() -> Dict[str, ModelLimits]:
+    """Parse OPENROUTER_RATE_LIMITS; the "default" entry applies to models not listed."""
+    limits: Dict[str, ModelLimits] = {"default": ModelLimits()}
+    raw = (os.environ.get(RATE_LIMITS_ENV) or "").strip()
+    if not raw:
+        return limits
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError as e:
+        logger.warning("Ignoring invalid %s: %s", RATE_LIMITS_ENV, e)
+        return limits
+    if not isinstance(parsed, dict):
+        return limits
+    default_spec = parsed.get("default") if isinstance(parsed.get("default"), dict) else {}
+    limits["default"] = _limits_from_spec(ModelLimits(), default_spec)
+    for model, spec in parsed.items():
+        if model != "default" and isinstance(spec, dict):
+            limits[model] = _limits_from_spec(limits["default"], spec)
+    return limits
+
+
+def _limits_from_spec(base: ModelLimits, spec: dict) -> ModelLimits:
+    fields = {}
+    try:
+        if "rps" in spec:
+            fields["rps"] = max(0.01, float(spec["rps"]))
+        if "burst" in spec:
+            fields["burst"] = max(1, int(spec["burst"]))
+        if "max_in_flight" in spec:
+            fields["max_in_flight"] = max(0, int(spec["max_in_flight"]))
+    except (TypeError, ValueError) as e:
+        logger.warning("Ignoring invalid rate limit spec %r: %s", spec, e)
+        return base
+    return replace(base, **fields)
+
+
+class _LocalBackend:
+    """Process-local buckets and in-flight counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, float]] = {}
+        self._in_flight: Dict[str, set] = {}
+
+    def _bucket(self, model: str, limits: ModelLimits, now: float) -> Dict[str, float]:
+        b = self._buckets.get(model)
+        if b is None:
+            b = {"tokens": float(limits.burst), "ts": now, "rate": limits.rps, "cooldown_until": 0.0, "strikes": 0}
+            self._buckets[model] = b
+        return b
+
+    def take_token(self, model: str, limits: ModelLimits, now: float) -> float:
+        """Take one token; returns 0 on success, else seconds to wait before trying again."""
+        with self._lock:
+            b = self._bucket(model, limits, now)
+            if now < b["cooldown_until"]:
+                return b["cooldown_until"] - now
+            b["tokens"] = min(float(limits.burst), b["tokens"] + (now - b["ts"]) * b["rate"])
+            b["ts"] = now
+            if b["tokens"] >= 1.0:
+                b["tokens"] -= 1.0
+                return 0.0
+            return (1.0 - b["tokens"]) / b["rate"]
+
+    def try_enter(self, model: str, limits: ModelLimits, lease: str, now: float) -> bool:
+        with self._lock:
+            holders = self._in_flight.setdefault(model, set())
+            if limits.max_in_flight and len(holders) >= limits.max_in_flight:
+                return False
+            holders.add(lease)
+            return True
+
+    def leave(self, model: str, lease: str) -> None:
+        with self._lock:
+            self._in_flight.get(model, set()).discard(lease)
+
+    def on_rate_limited(self, model: str, limits: ModelLimits, retry_after_s: Optional[float], now: float) -> float:
+        with self._lock:
+            b = self._bucket(model, limits, now)
+            b["strikes"] += 1
+            b["rate"] = max(limits.rps * _MIN_RATE_FRACTION, b["rate"] * 0.5)
+            b["tokens"] = 0.0
+            delay = _cooldown_seconds(retry_after_s, int(b["strikes"]))
+            b["cooldown_until"] = max(b["cooldown_until"], now + delay)
+            return b["rate"]
+
+    def on_success(self, model: str, limits: ModelLimits, now: float) -> None:
+        with self._lock:
+            b = self._bucket(model, limits, now)
+            b["strikes"] = 0
+            b["rate"] = min(limits.rps, b["rate"] + limits.rps * _RECOVERY_FRACTION)
+
+
+def _cooldown_seconds(retry_after_s: Optional[float], strikes: int) -> float:
+    if retry_after_s is not None and retry_after_s >= 0:
+        return min(float(retry_after_s), _MAX_COOLDOWN_S)
+    return min(_DEFAULT_COOLDOWN_S * (2 ** max(0, strikes - 1)), _MAX_COOLDOWN_S)
+
+
+# Token bucket: returns "0" when a token was taken, else seconds to wait (as a string so Lua
+# does not truncate fractions).
+_REDIS_TAKE_TOKEN = """
+local now = tonumber(ARGV[1])
+local base_rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'cooldown_until')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+local rate = tonumber(b[3]) or base_rate
+local cooldown_until = tonumber(b[4]) or 0
+if now < cooldown_until then
+  return tostring(cooldown_until - now)
+end
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+# In-flight semaphore as a sorted set of leases scored by start time; stale leases expire.
+_REDIS_TRY_ENTER = """
+local now = tonumber(ARGV[1])
+local max_in_flight = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[4]))
+if max_in_flight > 0 and redis.call('ZCARD', KEYS[1]) >= max_in_flight then
+  return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[4])))
+return 1
+"""
+
+_REDIS_RATE_LIMITED = """
+local now = tonumber(ARGV[1])
+local base_rate = tonumber(ARGV[2])
+local min_rate = tonumber(ARGV[3])
+local delay = tonumber(ARGV[4])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or base_rate
+local cooldown_until = tonumber(redis.call('HGET', KEYS[1], 'cooldown_until')) or 0
+rate = math.max(min_rate, rate * 0.5)
+cooldown_until = math.max(cooldown_until, now + delay)
+redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'tokens', '0', 'ts', tostring(now),
+           'cooldown_until', tostring(cooldown_until))
+redis.call('HINCRBY', KEYS[1], 'strikes', 1)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(rate)
+"""
+
+_REDIS_SUCCESS = """
+local base_rate = tonumber(ARGV[1])
+local step = tonumber(ARGV[2])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or base_rate
+redis.call('HSET', KEYS[1], 'rate', tostring(math.min(base_rate, rate + step)), 'strikes', '0')
+return 1
+"""
+
+
+class _RedisBackend:
+    """Buckets and in-flight leases shared through Redis (same semantics as _LocalBackend)."""
+
+    def __init__(self, client, prefix: str = "openrouter:governor"):
+        self._client = client
+        self._prefix = prefix
+        self._take_token = client.register_script(_REDIS_TAKE_TOKEN)
+        self._try_enter = client.register_script(_REDIS_TRY_ENTER)
+        self._rate_limited = client.register_script(_REDIS_RATE_LIMITED)
+        self._success = client.register_script(_REDIS_SUCCESS)
+
+    def _key(self, kind: str, model: str) -> str:
+        return f"{self._prefix}:{kind}:{model}"
+
+    def take_token(self, model: str, limits: ModelLimits, now: float) -> float:
+        return float(self._take_token(keys=[self._key("bucket", model)], args=[now, limits.rps, limits.burst]))
+
+    def try_enter(self, model: str, limits: ModelLimits, lease: str, now: float) -> bool:
+        args = [now, limits.max_in_flight, lease, _IN_FLIGHT_LEASE_S]
+        return bool(int(self._try_enter(keys=[self._key("inflight", model)], args=args)))
+
+    def leave(self, model: str, lease: str) -> None:
+        self._client.zrem(self._key("inflight", model), lease)
+
+    def on_rate_limited(self, model: str, limits: ModelLimits, retry_after_s: Optional[float], now: float) -> float:
+        strikes = int(self._client.hget(self._key("bucket", model), "strikes") or 0) + 1
+        delay = _cooldown_seconds(retry_after_s, strikes)
+        args = [now, limits.rps, limits.rps * _MIN_RATE_FRACTION, delay]
+        return float(self._rate_limited(keys=[self._key("bucket", model)], args=args))
+
+    def on_success(self, model: str, limits: ModelLimits, now: float) -> None:
+        self._success(keys=[self._key("bucket", model)], args=[limits.rps, limits.rps * _RECOVERY_FRACTION])
+
+
+class RateGovernor:
+    """Per-model token bucket + max-in-flight limiter shared by all OpenRouter clients."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, ModelLimits]] = None,
+        redis_client=None,
+        poll_interval_s: float = 0.25,
+    ):
+        self.limits = dict(limits or {"default": ModelLimits()})
+        self.limits.setdefault("default", ModelLimits())
+        self.poll_interval_s = poll_interval_s
+        self._local = _LocalBackend()
+        self._backend = _RedisBackend(redis_client) if redis_client is not None else self._local
+
+    def limits_for(self, model: str) -> ModelLimits:
+        return self.limits.get(model) or self.limits["default"]
+
+    def _call_backend(self, method: str, *args):
+        try:
+            return getattr(self._backend, method)(*args)
+        except Exception as e:
+            if self._backend is self._local:
+                raise
+            logger.warning("Rate governor Redis backend failed (%s); using process-local limits", e)
+            self._backend = self._local
+            return getattr(self._local, method)(*args)
+
+    def _sleep(self, seconds: float, cancel_check: Optional[Callable[[], bool]]) -> bool:
+        """Sleep in small steps; returns False if cancel_check fired."""
+        deadline = time.monotonic() + max(0.0, seconds)
+        while True:
+            if cancel_check and cancel_check():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, self.poll_interval_s))
+
+    def acquire_slot(self, model: str, cancel_check: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """Block until an in-flight slot is free; returns a lease id, or None if cancelled."""
+        limits = self.limits_for(model)
+        lease = uuid.uuid4().hex
+        waited = False
+        while not self._call_backend("try_enter", model, limits, lease, time.time()):
+            if not waited:
+                logger.info("Rate governor: %s has %s requests in flight; waiting", model, limits.max_in_flight)
+                waited = True
+            if not self._sleep(self.poll_interval_s, cancel_check):
+                return None
+        return lease
+
+    def release_slot(self, model: str, lease: str) -> None:
+        self._call_backend("leave", model, lease)
+
+    def wait_for_token(self, model: str, cancel_check: Optional[Callable[[], bool]] = None) -> bool:
+        """Block until the model's bucket (and any 429 cool-down) allows a request; False if cancelled."""
+        limits = self.limits_for(model)
+        while True:
+            wait_s = self._call_backend("take_token", model, limits, time.time())
+            if wait_s <= 0:
+                return True
+            if not self._sleep(wait_s, cancel_check):
+                return False
+
+    # Coroutine versions for the asyncio transport (openrouter_async.py): same limits and
+    # state, but waiting yields to the event loop instead of blocking a thread. Redis round
+    # trips run on the default executor so they never stall the other requests on the loop;
+    # ``cancel_check`` must be non-blocking here (fan_out passes cached flags).
+
+    async def _call_backend_async(self, method: str, *args):
+        if self._backend is self._local:
+            return self._call_backend(method, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, self._call_backend, method, *args)
+
+    async def sleep_async(self, seconds: float, cancel_check: Optional[Callable[[], bool]]) -> bool:
+        """Coroutine ``_sleep``: wait in small steps; returns False if cancel_check fired."""
+        deadline = time.monotonic() + max(0.0, seconds)
+        while True:
+            if cancel_check and cancel_check():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            await asyncio.sleep(min(remaining, self.poll_interval_s))
+
+    async def acquire_slot_async(self, model: str, cancel_check: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        limits = self.limits_for(model)
+        lease = uuid.uuid4().hex
+        while not await self._call_backend_async("try_enter", model, limits, lease, time.time()):
+            if not await self.sleep_async(self.poll_interval_s, cancel_check):
+                return None
+        return lease
+
+    async def release_slot_async(self, model: str, lease: str) -> None:
+        await self._call_backend_async("leave", model, lease)
+
+    async def wait_for_token_async(self, model: str, cancel_check: Optional[Callable[[], bool]] = None) -> bool:
+        limits = self.limits_for(model)
+        while True:
+            wait_s = await self._call_backend_async("take_token", model, limits, time.time())
+            if wait_s <= 0:
+                return True
+            if not await self.sleep_async(wait_s, cancel_check):
+                return False
+
+    async def report_rate_limited_async(self, model: str, retry_after_s: Optional[float] = None) -> None:
+        if self._backend is self._local:
+            self.report_rate_limited(model, retry_after_s)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self.report_rate_limited, model, retry_after_s)
+
+    async def report_success_async(self, model: str) -> None:
+        await self._call_backend_async("on_success", model, self.limits_for(model), time.time())
+
+    def report_rate_limited(self, model: str, retry_after_s: Optional[float] = None) -> None:
+        rate = self._call_backend("on_rate_limited", model, self.limits_for(model), retry_after_s, time.time())
+        logger.warning(
+            "Rate governor: 429 for %s (Retry-After=%s); rate lowered to %.3f req/s",
+            model,
+            retry_after_s,
+            rate,
+        )
+
+    def report_success(self, model: str) -> None:
+        self._call_backend("on_success", model, self.limits_for(model), time.time())
+
+
+_default_governor: Optional[RateGovernor] = None
+_default_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateGovernor:
+    """Process-wide governor built from the environment on first use."""
+    global _default_governor
+    with _default_governor_lock:
+        if _default_governor is None:
+            redis_client = None
+            redis_url = (os.environ.get(REDIS_URL_ENV) or "").strip()
+            if redis_url:
+                try:
+                    import redis
+
+                    redis_client = redis.Redis.from_url(redis_url)
+                    redis_client.ping()
+                except Exception as e:
+                    logger.warning("Rate governor: Redis unavailable at %s (%s); using process-local limits", redis_url, e)
+                    redis_client = None
+            _default_governor = RateGovernor(load_model_limits_from_env(), redis_client=redis_client)
+        return _default_governor
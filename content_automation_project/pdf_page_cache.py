@@ -0,0 +1,89 @@
+"""
+Persistent per-page PDF text cache.
+
+``PDFProcessor`` re-parses the same PDFs over and over (OpenRouter batch path, OCR
+Extraction, Stage X/Y, unit regenerations). This cache stores the extracted text of every
+page once, keyed by the SHA-256 of the file, the page number and the extractor mode, so
+full and range extractions can be assembled without opening the PDF again.
+
+Layout under the cache root::
+
+    <root>/<sha[:2]>/<sha>/meta.json                 {"page_count": N}
+    <root>/<sha[:2]>/<sha>/<mode>/<page>.txt         text of one page (1-indexed)
+
+Writes are atomic (tmp file + ``os.replace``) so concurrent workers can share a root.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Environment variable read by PDFProcessor when no explicit cache_dir is given.
+PDF_TEXT_CACHE_DIR_ENV = "PDF_TEXT_CACHE_DIR"
+
+# Bump when extraction output for an existing mode changes, so old entries are ignored.
+CACHE_VERSION = 1
+
+def _write_atomic(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class PdfPageCache:
+    """Per-page text cache rooted at ``cache_dir``."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.abspath(os.path.expanduser(str(cache_dir)))
+
+    @classmethod
+    def from_env(cls) -> Optional["PdfPageCache"]:
+        """Cache rooted at $PDF_TEXT_CACHE_DIR, or None when unset/empty."""
+        root = (os.environ.get(PDF_TEXT_CACHE_DIR_ENV) or "").strip()
+        return cls(root) if root else None
+
+    def _doc_dir(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def _page_path(self, digest: str, mode: str, page_number: int) -> str:
+        return os.path.join(self._doc_dir(digest), f"v{CACHE_VERSION}-{mode}", f"{page_number}.txt")
+
+    def get_page_count(self, digest: str) -> Optional[int]:
+        try:
+            with open(os.path.join(self._doc_dir(digest), "meta.json"), "r", encoding="utf-8") as f:
+                count = json.load(f).get("page_count")
+        except (OSError, ValueError):
+            return None
+        return int(count) if isinstance(count, int) and count >= 0 else None
+
+    def set_page_count(self, digest: str, page_count: int) -> None:
+        try:
+            _write_atomic(
+                os.path.join(self._doc_dir(digest), "meta.json"),
+                json.dumps({"page_count": int(page_count)}),
+            )
+        except OSError as e:
+            logger.warning("Could not write PDF page cache metadata: %s", e)
+
+    def get_pages(self, digest: str, mode: str, page_numbers: Iterable[int]) -> Dict[int, str]:
+        """Cached texts for the requested pages; missing pages are simply absent."""
+        found: Dict[int, str] = {}
+        for n in page_numbers:
+            try:
+                with open(self._page_path(digest, mode, n), "r", encoding="utf-8") as f:
+                    found[n] = f.read()
+            except OSError:
+                continue
+        return found
+
+    def put_page(self, digest: str, mode: str, page_number: int, text: str) -> None:
+        try:
+            _write_atomic(self._page_path(digest, mode, page_number), text)
+        except OSError as e:
+            logger.warning("Could not write PDF page cache entry: %s", e)
@@ -5,7 +5,9 @@ Handles PDF validation, page counting, and text extraction using PyMuPDF
 
 import os
 import logging
-from typing import Optional, Tuple, List, Dict, Any
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, List, Dict, Any, Set
 from pathlib import Path
 
 try:
@@ -22,15 +24,204 @@ try:
 except ImportError:
     PDF_LIBRARY_AVAILABLE = False
 
+from file_hashing import file_sha256
+from pdf_page_cache import PdfPageCache
+
+# Environment override for the page-extraction process pool size (1 disables it).
+PDF_EXTRACT_WORKERS_ENV = "PDF_EXTRACT_WORKERS"
+
+
+def _extract_fitz_pages(file_path: str, mode: str, page_numbers: List[int]) -> List[Tuple[int, str]]:
+    """Process-pool worker: open the PDF in this process and extract the given 1-indexed pages."""
+    doc = fitz.open(file_path)
+    try:
+        if mode == PDFProcessor.MODE_MUPDF_FORMATTED:
+            return [(n, PDFProcessor._format_page_markdown(doc[n - 1])) for n in page_numbers]
+        return [(n, doc[n - 1].get_text()) for n in page_numbers]
+    finally:
+        doc.close()
+
 
 class PDFProcessor:
     """Handles PDF file operations using PyMuPDF (primary) with PyPDF2 as fallback"""
     
-    def __init__(self):
+    # Extractor modes (part of the page cache key)
+    MODE_MUPDF_TEXT = "fitz_text"
+    MODE_MUPDF_FORMATTED = "fitz_markdown"
+    MODE_PYPDF2_TEXT = "pypdf2_text"
+    
+    # Fewer uncached pages than this are extracted serially (pool start-up is not worth it)
+    PARALLEL_MIN_PAGES = 48
+    
+    def __init__(self, cache_dir: Optional[str] = None, extract_workers: Optional[int] = None):
+        """
+        Args:
+            cache_dir: Root of the per-page text cache. Defaults to $PDF_TEXT_CACHE_DIR;
+                no caching when neither is set.
+            extract_workers: Processes used to extract large PyMuPDF page ranges. Defaults to
+                $PDF_EXTRACT_WORKERS, else the CPU count (max 8); 1 keeps extraction serial.
+        """
         self.logger = logging.getLogger(__name__)
+        self.page_cache: Optional[PdfPageCache] = (
+            PdfPageCache(cache_dir) if cache_dir else PdfPageCache.from_env()
+        )
+        if extract_workers is None:
+            try:
+                extract_workers = int(os.environ.get(PDF_EXTRACT_WORKERS_ENV) or 0)
+            except ValueError:
+                extract_workers = 0
+            if extract_workers <= 0:
+                extract_workers = min(os.cpu_count() or 1, 8)
+        self.extract_workers = max(1, int(extract_workers))
         if not MUPDF_AVAILABLE:
             self.logger.warning("PyMuPDF not available. Some features may be limited.")
     
+    def _cache_digest(self, file_path: str) -> Optional[str]:
+        if self.page_cache is None:
+            return None
+        try:
+            return file_sha256(file_path)
+        except OSError as e:
+            self.logger.warning(f"Could not hash PDF for page cache: {e}")
+            return None
+    
+    @staticmethod
+    def _format_page_markdown(page) -> str:
+        """Page text with Markdown markers for italic, bold and bold-italic spans."""
+        lines_out = []
+        blocks = page.get_text("dict")
+        for block in blocks.get("blocks", []):
+            if "lines" in block:  # Text block
+                for line in block["lines"]:
+                    line_parts = []
+                    for span in line.get("spans", []):
+                        text = span.get("text", "")
+                        if not text:
+                            continue
+                        
+                        flags = span.get("flags", 0)
+                        
+                        # Detect formatting (PyMuPDF flag values)
+                        is_bold = flags & 16  # Bit 4 = bold
+                        is_italic = flags & 2  # Bit 1 = italic
+                        
+                        # Apply Markdown formatting
+                        if is_bold and is_italic:
+                            formatted_text = f"***{text}***"
+                        elif is_bold:
+                            formatted_text = f"**{text}**"
+                        elif is_italic:
+                            formatted_text = f"*{text}*"
+                        else:
+                            formatted_text = text
+                        
+                        line_parts.append(formatted_text)
+                    
+                    if line_parts:
+                        lines_out.append(" ".join(line_parts) + "\n")
+        return "".join(lines_out)
+    
+    def _read_pages(
+        self,
+        file_path: str,
+        mode: str,
+        first_page: int = 1,
+        last_page: Optional[int] = None,
+    ) -> Tuple[int, int, int, List[Tuple[int, str]]]:
+        """
+        Text of pages ``first_page``..``last_page`` (1-indexed, inclusive, clamped to the
+        document; ``last_page=None`` means the last page) for one extractor mode.
+        
+        Pages already in the page cache are served from it; the PDF is opened only when some
+        page is missing. Raises whatever the underlying library raises.
+        
+        Returns:
+            (total_pages, first_page, last_page, [(page_number, text), ...]) with the clamped range
+        """
+        digest = self._cache_digest(file_path)
+        cached: Dict[int, str] = {}
+        if digest is not None:
+            total_pages = self.page_cache.get_page_count(digest)
+            if total_pages is not None:
+                lo = max(1, first_page)
+                hi = min(last_page if last_page is not None else total_pages, total_pages)
+                wanted = range(lo, hi + 1)
+                cached = self.page_cache.get_pages(digest, mode, wanted)
+                if len(cached) == len(wanted):
+                    return total_pages, lo, hi, [(n, cached[n]) for n in wanted]
+        
+        if mode == self.MODE_PYPDF2_TEXT:
+            with open(file_path, 'rb') as file:
+                pages = PyPDF2.PdfReader(file).pages
+                get_text = lambda idx: pages[idx].extract_text() or ""
+                result = self._collect_pages(digest, mode, len(pages), first_page, last_page, get_text, cached)
+        else:
+            doc = fitz.open(file_path)
+            try:
+                if mode == self.MODE_MUPDF_FORMATTED:
+                    get_text = lambda idx: self._format_page_markdown(doc[idx])
+                else:
+                    get_text = lambda idx: doc[idx].get_text()
+                total_pages = len(doc)
+                lo = max(1, first_page)
+                hi = min(last_page if last_page is not None else total_pages, total_pages)
+                missing = [n for n in range(lo, hi + 1) if n not in cached]
+                if self.extract_workers > 1 and len(missing) >= self.PARALLEL_MIN_PAGES:
+                    extracted = self._extract_pages_parallel(file_path, mode, missing)
+                    if digest is not None:
+                        for page_number, text in extracted.items():
+                            self.page_cache.put_page(digest, mode, page_number, text)
+                    cached = {**cached, **extracted}
+                result = self._collect_pages(digest, mode, total_pages, first_page, last_page, get_text, cached)
+            finally:
+                doc.close()
+        return result
+    
+    def _extract_pages_parallel(self, file_path: str, mode: str, page_numbers: List[int]) -> Dict[int, str]:
+        """
+        Extract PyMuPDF pages in a process pool, one contiguous shard per worker.
+        
+        Returns {page_number: text}; empty when the pool cannot be used (e.g. inside a daemonic
+        Celery worker), in which case the caller extracts the pages serially.
+        """
+        workers = min(self.extract_workers, len(page_numbers))
+        shard_size = -(-len(page_numbers) // workers)
+        shards = [page_numbers[i:i + shard_size] for i in range(0, len(page_numbers), shard_size)]
+        try:
+            # spawn: forking a threaded web/worker process can deadlock in the child
+            with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = pool.map(_extract_fitz_pages, [file_path] * len(shards), [mode] * len(shards), shards)
+                extracted = {n: text for shard in results for n, text in shard}
+        except Exception as e:
+            self.logger.warning(f"Parallel page extraction unavailable ({e}), extracting serially")
+            return {}
+        self.logger.info(f"Extracted {len(extracted)} pages with {len(shards)} worker processes")
+        return extracted
+    
+    def _collect_pages(self, digest, mode, total_pages, first_page, last_page, get_text, cached):
+        """Fill the clamped range from ``cached`` or ``get_text(page_index)``, caching new pages."""
+        lo = max(1, first_page)
+        hi = min(last_page if last_page is not None else total_pages, total_pages)
+        if digest is not None:
+            self.page_cache.set_page_count(digest, total_pages)
+        pages = []
+        for page_number in range(lo, hi + 1):
+            text = cached.get(page_number)
+            if text is None:
+                text = get_text(page_number - 1)
+                if digest is not None:
+                    self.page_cache.put_page(digest, mode, page_number, text)
+            pages.append((page_number, text))
+        return total_pages, lo, hi, pages
+    
+    @staticmethod
+    def _join_plain_pages(pages: List[Tuple[int, str]]) -> str:
+        return "\n".join(
+            f"--- Page {page_number} ---\n{text}\n"
+            for page_number, text in pages
+            if text and text.strip()
+        )
+    
     def validate_pdf(self, file_path: str) -> Tuple[bool, Optional[str], int]:
         """
         Validate PDF file and count pages
@@ -71,12 +262,20 @@ class PDFProcessor:
         Returns:
             Number of pages
         """
+        digest = self._cache_digest(file_path)
+        if digest is not None:
+            cached_count = self.page_cache.get_page_count(digest)
+            if cached_count is not None:
+                return cached_count
+        
         # Priority 1: Use PyMuPDF
         if MUPDF_AVAILABLE:
             try:
                 doc = fitz.open(file_path)
                 page_count = len(doc)
                 doc.close()
+                if digest is not None:
+                    self.page_cache.set_page_count(digest, page_count)
                 return page_count
             except Exception as e:
                 self.logger.warning(f"PyMuPDF failed to count pages: {e}, trying PyPDF2...")
@@ -109,22 +308,11 @@ class PDFProcessor:
         # Priority 1: Use PyMuPDF (better quality)
         if MUPDF_AVAILABLE:
             try:
-                doc = fitz.open(file_path)
-                total_pages = len(doc)
-                pages_to_extract = min(total_pages, max_pages) if max_pages else total_pages
-                
-                text_content = []
-                for page_num in range(pages_to_extract):
-                    page = doc[page_num]
-                    # get_text() is the most reliable method for plain text extraction
-                    text = page.get_text()
-                    if text and text.strip():
-                        text_content.append(f"--- Page {page_num + 1} ---\n{text}\n")
-                
-                doc.close()
-                
-                if text_content:
-                    extracted_text = "\n".join(text_content)
+                _, _, pages_to_extract, pages = self._read_pages(
+                    file_path, self.MODE_MUPDF_TEXT, 1, max_pages or None
+                )
+                extracted_text = self._join_plain_pages(pages)
+                if extracted_text:
                     char_count = len(extracted_text)
                     self.logger.info(
                         f"Successfully extracted {char_count} characters from {pages_to_extract} pages using PyMuPDF"
@@ -138,25 +326,16 @@ class PDFProcessor:
         # Priority 2: Fallback to PyPDF2
         if PDF_LIBRARY_AVAILABLE:
             try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    total_pages = len(pdf_reader.pages)
-                    pages_to_extract = min(total_pages, max_pages) if max_pages else total_pages
-                    
-                    text_content = []
-                    for page_num in range(pages_to_extract):
-                        page = pdf_reader.pages[page_num]
-                        text = page.extract_text()
-                        if text and text.strip():
-                            text_content.append(f"--- Page {page_num + 1} ---\n{text}\n")
-                    
-                    if text_content:
-                        extracted_text = "\n".join(text_content)
-                        char_count = len(extracted_text)
-                        self.logger.info(
-                            f"Successfully extracted {char_count} characters from {pages_to_extract} pages using PyPDF2 (fallback)"
-                        )
-                        return extracted_text
+                _, _, pages_to_extract, pages = self._read_pages(
+                    file_path, self.MODE_PYPDF2_TEXT, 1, max_pages or None
+                )
+                extracted_text = self._join_plain_pages(pages)
+                if extracted_text:
+                    char_count = len(extracted_text)
+                    self.logger.info(
+                        f"Successfully extracted {char_count} characters from {pages_to_extract} pages using PyPDF2 (fallback)"
+                    )
+                    return extracted_text
             except Exception as e:
                 self.logger.error(f"PyPDF2 extraction also failed: {e}")
         
@@ -180,51 +359,14 @@ class PDFProcessor:
             return self.extract_text(file_path, max_pages)
         
         try:
-            doc = fitz.open(file_path)
-            total_pages = len(doc)
-            pages_to_extract = min(total_pages, max_pages) if max_pages else total_pages
-            
-            text_content = []
-            for page_num in range(pages_to_extract):
-                page = doc[page_num]
-                blocks = page.get_text("dict")
-                
-                page_text = [f"--- Page {page_num + 1} ---\n"]
-                
-                for block in blocks.get("blocks", []):
-                    if "lines" in block:  # Text block
-                        for line in block["lines"]:
-                            line_parts = []
-                            for span in line.get("spans", []):
-                                text = span.get("text", "")
-                                if not text:
-                                    continue
-                                
-                                flags = span.get("flags", 0)
-                                
-                                # Detect formatting (PyMuPDF flag values)
-                                is_bold = flags & 16  # Bit 4 = bold
-                                is_italic = flags & 2  # Bit 1 = italic
-                                
-                                # Apply Markdown formatting
-                                if is_bold and is_italic:
-                                    formatted_text = f"***{text}***"
-                                elif is_bold:
-                                    formatted_text = f"**{text}**"
-                                elif is_italic:
-                                    formatted_text = f"*{text}*"
-                                else:
-                                    formatted_text = text
-                                
-                                line_parts.append(formatted_text)
-                            
-                            if line_parts:
-                                page_text.append(" ".join(line_parts) + "\n")
-                
-                if len(page_text) > 1:  # More than just the page header
-                    text_content.append("".join(page_text))
-            
-            doc.close()
+            _, _, pages_to_extract, pages = self._read_pages(
+                file_path, self.MODE_MUPDF_FORMATTED, 1, max_pages or None
+            )
+            text_content = [
+                f"--- Page {page_number} ---\n{text}"
+                for page_number, text in pages
+                if text  # More than just the page header
+            ]
             
             if text_content:
                 extracted_text = "\n".join(text_content)
@@ -253,36 +395,21 @@ class PDFProcessor:
         Returns:
             Extracted text from the specified page range or None if failed
         """
+        requested_start, requested_end = start_page, end_page
+        
         # Priority 1: Use PyMuPDF
         if MUPDF_AVAILABLE:
             try:
-                doc = fitz.open(file_path)
-                total_pages = len(doc)
-                
-                # Validate page range
-                start_page = max(1, start_page)
-                end_page = min(end_page, total_pages)
+                _, start_page, end_page, pages = self._read_pages(
+                    file_path, self.MODE_MUPDF_TEXT, requested_start, requested_end
+                )
                 
                 if start_page > end_page:
                     self.logger.error(f"Invalid page range: {start_page} > {end_page}")
-                    doc.close()
                     return None
                 
-                # Convert to 0-indexed for PyMuPDF
-                start_idx = start_page - 1
-                end_idx = end_page
-                
-                text_content = []
-                for page_num in range(start_idx, end_idx):
-                    page = doc[page_num]
-                    text = page.get_text()
-                    if text and text.strip():
-                        text_content.append(f"--- Page {page_num + 1} ---\n{text}\n")
-                
-                doc.close()
-                
-                if text_content:
-                    extracted_text = "\n".join(text_content)
+                extracted_text = self._join_plain_pages(pages)
+                if extracted_text:
                     char_count = len(extracted_text)
                     self.logger.info(
                         f"Successfully extracted {char_count} characters from pages {start_page}-{end_page} using PyMuPDF"
@@ -296,79 +423,37 @@ class PDFProcessor:
         # Priority 2: Fallback to PyPDF2
         if PDF_LIBRARY_AVAILABLE:
             try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    total_pages = len(pdf_reader.pages)
-                    
-                    # Validate page range
-                    start_page = max(1, start_page)
-                    end_page = min(end_page, total_pages)
-                    
-                    if start_page > end_page:
-                        self.logger.error(f"Invalid page range: {start_page} > {end_page}")
-                        return None
-                    
-                    # Convert to 0-indexed for PyPDF2
-                    start_idx = start_page - 1
-                    end_idx = end_page
-                    
-                    text_content = []
-                    for page_num in range(start_idx, end_idx):
-                        page = pdf_reader.pages[page_num]
-                        text = page.extract_text()
-                        if text and text.strip():
-                            text_content.append(f"--- Page {page_num + 1} ---\n{text}\n")
-                    
-                    if text_content:
-                        extracted_text = "\n".join(text_content)
-                        char_count = len(extracted_text)
-                        self.logger.info(
-                            f"Successfully extracted {char_count} characters from pages {start_page}-{end_page} using PyPDF2 (fallback)"
-                        )
-                        return extracted_text
+                _, start_page, end_page, pages = self._read_pages(
+                    file_path, self.MODE_PYPDF2_TEXT, requested_start, requested_end
+                )
+                
+                if start_page > end_page:
+                    self.logger.error(f"Invalid page range: {start_page} > {end_page}")
+                    return None
+                
+                extracted_text = self._join_plain_pages(pages)
+                if extracted_text:
+                    char_count = len(extracted_text)
+                    self.logger.info(
+                        f"Successfully extracted {char_count} characters from pages {start_page}-{end_page} using PyPDF2 (fallback)"
+                    )
+                    return extracted_text
             except Exception as e:
                 self.logger.error(f"PyPDF2 extraction also failed for page range: {e}")
         
         self.logger.error(f"All text extraction methods failed for pages {start_page}-{end_page}")
         return None
     
-    def extract_chapter_structure(self, file_path: str) -> Optional[List[Dict[str, Any]]]:
+    def _collect_text_lines(self, file_path: str) -> List[Dict[str, Any]]:
         """
-        Extract chapter structure (subchapter and topics) from PDF without using LLM.
-        Uses font size and formatting analysis to identify subchapters and topics.
-        
-        Rules:
-        1. Items in "Chapter contents" on first page are NOT topics (even if bold/large)
-        2. Only Bold with larger font size are topics (not italic with smaller font)
-        3. Must not miss any subchapter or topic
-        
-        Args:
-            file_path: Path to PDF file
-            
+        Collect every text line with font information (PyMuPDF only).
+
         Returns:
-            List of dictionaries with structure:
-            [
-                {
-                    "Subchapter": "Bullous Pemphigoid",
-                    "Topics": ["Epidemiology", "Pathogenesis", ...]
-                },
-                ...
-            ]
+            List of {"text", "font_size", "is_bold", "is_italic", "y_position", "page"} (page is 1-indexed)
         """
-        if not MUPDF_AVAILABLE:
-            self.logger.error("PyMuPDF required for structure extraction")
-            return None
-        
+        lines_data = []
+        doc = fitz.open(file_path)
         try:
-            import re
-            from collections import defaultdict
-            
-            doc = fitz.open(file_path)
-            
-            # Collect all lines with font information (including italic detection)
-            lines_data = []
-            first_page_lines = []  # For detecting "Chapter contents"
-            
             for page_num in range(len(doc)):
                 page = doc[page_num]
                 blocks = page.get_text("dict")
@@ -401,25 +486,172 @@ class PDFProcessor:
                             continue
                         
                         avg_font_size = sum(font_sizes) / len(font_sizes) if font_sizes else 0
-                        is_bold = any(is_bold_list)
-                        is_italic = any(is_italic_list)
                         
-                        line_info = {
+                        lines_data.append({
                             "text": line_text,
                             "font_size": avg_font_size,
-                            "is_bold": is_bold,
-                            "is_italic": is_italic,
+                            "is_bold": any(is_bold_list),
+                            "is_italic": any(is_italic_list),
                             "y_position": y_position,
                             "page": page_num + 1
-                        }
-                        
-                        lines_data.append(line_info)
-                        
-                        # Collect first page lines separately
-                        if page_num == 0:
-                            first_page_lines.append(line_info)
-            
+                        })
+        finally:
             doc.close()
+        return lines_data
+
+    @staticmethod
+    def _normalize_heading(text: str) -> str:
+        import re
+        text = re.sub(r'^[\d\.\-\•\*\:\;]+\s*', '', (text or "").strip())
+        text = re.sub(r'\s+\d+\s*$', '', text)
+        return re.sub(r'\s+', ' ', text).strip().lower()
+
+    @staticmethod
+    def _chapter_contents_lines(lines_data: List[Dict[str, Any]]) -> Set[int]:
+        """ids of the first-page lines from the "Chapter contents" heading onwards (lines sorted by page, y)."""
+        contents: Set[int] = set()
+        in_contents = False
+        for line in lines_data:
+            if line["page"] != 1:
+                continue
+            text_lower = line["text"].lower()
+            if "chapter" in text_lower and "content" in text_lower:
+                in_contents = True
+            if in_contents:
+                contents.add(id(line))
+        return contents
+
+    def locate_subchapter_pages(
+        self,
+        file_path: str,
+        subchapters: List[Dict[str, Any]],
+        margin: int = 1,
+    ) -> List[Optional[Tuple[int, int]]]:
+        """
+        Map each Pre-OCR subchapter row to the page window that holds its text.
+
+        Each subchapter starts on the first page (not before the previous subchapter) where a
+        line matches its name, preferring the body-heading font sizes used by
+        extract_chapter_structure and ignoring the first-page "Chapter contents" list; if the
+        name is not found, the first matching topic heading
+        is used. A subchapter ends where the next located one starts (same page included,
+        since headings often begin mid-page). ``margin`` extra pages are added on both sides.
+
+        Args:
+            file_path: Path to PDF file
+            subchapters: Rows with "Subchapter" and optional "Topics" (Pre-OCR topic file order)
+            margin: Extra pages before/after each window
+
+        Returns:
+            One (start_page, end_page) per row (1-indexed, inclusive), or None where the
+            subchapter could not be located (callers should send the whole text then).
+        """
+        result: List[Optional[Tuple[int, int]]] = [None] * len(subchapters)
+        if not MUPDF_AVAILABLE or not subchapters:
+            return result
+        try:
+            lines_data = self._collect_text_lines(file_path)
+            total_pages = self.count_pages(file_path)
+        except Exception as e:
+            self.logger.warning(f"Could not read PDF lines for page location: {e}")
+            return result
+        if not lines_data or total_pages <= 0:
+            return result
+
+        body_sizes = sorted(round(line["font_size"] * 2) / 2 for line in lines_data)
+        body_font = body_sizes[len(body_sizes) // 2]
+        lines_data.sort(key=lambda x: (x["page"], x["y_position"]))
+        # The "Chapter contents" list on page 1 names every subchapter in heading style
+        # (Rule 1 of extract_chapter_structure); matching it would pin them all to page 1.
+        contents = self._chapter_contents_lines(lines_data)
+        normalized = [
+            (line, self._normalize_heading(line["text"]))
+            for line in lines_data
+            if id(line) not in contents
+        ]
+
+        def _matches(needle: str, hay: str) -> bool:
+            if not needle or not hay:
+                return False
+            if needle == hay:
+                return True
+            return (needle in hay or hay in needle) and abs(len(needle) - len(hay)) <= 5
+
+        def _find_page(names: List[str], min_page: int) -> Optional[int]:
+            wanted = [self._normalize_heading(n) for n in names if n and str(n).strip()]
+            if not wanted:
+                return None
+            fallback = None
+            for line, norm in normalized:
+                if line["page"] < min_page:
+                    continue
+                if not any(_matches(w, norm) for w in wanted):
+                    continue
+                # Headings are bold or larger than body text; plain mentions are a last resort.
+                if line["is_bold"] or line["font_size"] > body_font + 0.5:
+                    return line["page"]
+                if fallback is None:
+                    fallback = line["page"]
+            return fallback
+
+        starts: List[Optional[int]] = []
+        min_page = 1
+        for row in subchapters:
+            name = (row.get("Subchapter") or row.get("subchapter") or "").strip()
+            topics = row.get("Topics") or row.get("topics") or []
+            page = _find_page([name], min_page)
+            if page is None and isinstance(topics, list):
+                page = _find_page([str(t) for t in topics], min_page)
+            starts.append(page)
+            if page is not None:
+                min_page = page
+
+        margin = max(0, int(margin or 0))
+        for i, start in enumerate(starts):
+            if start is None:
+                continue
+            next_start = next((p for p in starts[i + 1:] if p is not None), None)
+            end = next_start if next_start is not None else total_pages
+            result[i] = (max(1, start - margin), min(total_pages, max(start, end) + margin))
+
+        located = sum(1 for w in result if w is not None)
+        self.logger.info(f"Located page windows for {located}/{len(subchapters)} subchapters (margin={margin})")
+        return result
+
+    def extract_chapter_structure(self, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Extract chapter structure (subchapter and topics) from PDF without using LLM.
+        Uses font size and formatting analysis to identify subchapters and topics.
+        
+        Rules:
+        1. Items in "Chapter contents" on first page are NOT topics (even if bold/large)
+        2. Only Bold with larger font size are topics (not italic with smaller font)
+        3. Must not miss any subchapter or topic
+        
+        Args:
+            file_path: Path to PDF file
+            
+        Returns:
+            List of dictionaries with structure:
+            [
+                {
+                    "Subchapter": "Bullous Pemphigoid",
+                    "Topics": ["Epidemiology", "Pathogenesis", ...]
+                },
+                ...
+            ]
+        """
+        if not MUPDF_AVAILABLE:
+            self.logger.error("PyMuPDF required for structure extraction")
+            return None
+        
+        try:
+            import re
+            from collections import defaultdict
+            
+            # Collect all lines with font information (including italic detection)
+            lines_data = self._collect_text_lines(file_path)
+            first_page_lines = [line for line in lines_data if line["page"] == 1]  # For detecting "Chapter contents"
             
             if not lines_data:
                 self.logger.warning("No text lines found in PDF")
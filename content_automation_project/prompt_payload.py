@@ -0,0 +1,99 @@
+"""
+Compact JSON encoding of the data blocks embedded in LLM prompts.
+
+Processors used to serialize prompt data with ``json.dumps(..., indent=2)``; for row lists the
+indentation and newlines alone are 20-40% of the characters sent. ``encode_payload`` writes
+minified JSON (UTF-8 kept) and can send uniform row lists in columnar form::
+
+    [{"PointId": "1", "Points": "a"}, {"PointId": "2", "Points": "b"}, ...]
+    -> {"columns":["PointId","Points"],"rows":[["1","a"],["2","b"],...]}
+
+which states every key once instead of once per row. Columnar form changes the shape the
+model sees, so it is opt-in per stage.
+
+At DEBUG level every call logs the indented vs. encoded size (characters and estimated tokens,
+see ``llm_chunk_planner.estimate_tokens``) under this module's logger, tagged with the stage;
+the indented form is only serialized for that log line.
+
+Configuration (environment):
+
+    PROMPT_PAYLOAD_TABULAR   comma-separated stage names whose uniform row lists are sent in
+                             columnar form, or "all" (default: none)
+"""
+
+import json
+import logging
+import os
+from typing import Any, Optional
+
+from llm_chunk_planner import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TABULAR_ENV = "PROMPT_PAYLOAD_TABULAR"
+
+# Row lists shorter than this gain too little from columnar form to be worth the shape change
+_MIN_TABLE_ROWS = 4
+
+
+def tabular_enabled(stage: str) -> bool:
+    raw = (os.environ.get(TABULAR_ENV) or "").strip()
+    if not raw:
+        return False
+    names = {s.strip().lower() for s in raw.split(",") if s.strip()}
+    return "all" in names or (stage or "").strip().lower() in names
+
+
+def tabulate(value: Any) -> Any:
+    """Columnar form for every list of dicts sharing one key set (recursively); other values unchanged."""
+    if isinstance(value, dict):
+        return {k: tabulate(v) for k, v in value.items()}
+    if not isinstance(value, list):
+        return value
+    if len(value) >= _MIN_TABLE_ROWS and all(isinstance(r, dict) for r in value):
+        columns = list(value[0].keys())
+        keyset = set(columns)
+        if columns and all(len(r) == len(columns) and keyset.issuperset(r) for r in value):
+            return {"columns": columns, "rows": [[tabulate(r[c]) for c in columns] for r in value]}
+    return [tabulate(v) for v in value]
+
+
+def encode_payload(
+    value: Any,
+    *,
+    stage: str,
+    label: str = "",
+    tabular: Optional[bool] = None,
+) -> str:
+    """
+    Serialize ``value`` for a prompt.
+
+    Args:
+        value: JSON-serializable prompt data
+        stage: Stage name for logging and the ``PROMPT_PAYLOAD_TABULAR`` switch (e.g. "stage_x")
+        label: Which block of the prompt this is (logged), e.g. "part 3"
+        tabular: Force columnar form on/off; None follows ``PROMPT_PAYLOAD_TABULAR``
+    """
+    use_table = tabular if tabular is not None else tabular_enabled(stage)
+    encoded_value = tabulate(value) if use_table else value
+    text = json.dumps(encoded_value, ensure_ascii=False, separators=(",", ":"))
+    if logger.isEnabledFor(logging.DEBUG):
+        _log_sizes(stage, label, json.dumps(value, ensure_ascii=False, indent=2), text)
+    return text
+
+
+def _log_sizes(stage: str, label: str, before: str, after: str) -> None:
+    tokens_before = estimate_tokens(before)
+    tokens_after = estimate_tokens(after)
+    saved = 100 - (100 * len(after) // len(before)) if before else 0
+    logger.debug(
+        "prompt payload stage=%s%s: %d -> %d chars (-%d%%), ~%d -> ~%d tokens",
+        stage,
+        f" [{label}]" if label else "",
+        len(before),
+        len(after),
+        saved,
+        tokens_before,
+        tokens_after,
+    )
+
@@ -16,6 +16,7 @@ from datetime import datetime
 from typing import Optional, Dict, List, Any, Callable, Tuple
 from base_stage_processor import BaseStageProcessor
 from api_layer import APIConfig
+from llm_response_cache import mode_for_attempt
 
 
 class StageEProcessor(BaseStageProcessor):
@@ -376,6 +377,7 @@ class StageEProcessor(BaseStageProcessor):
                         temperature=APIConfig.DEFAULT_TEMPERATURE,
                         max_tokens=max_tokens,
                         timeout_s=self.SUBCHAPTER_MODEL_TIMEOUT_S,
+                        response_cache=mode_for_attempt(attempt),
                     )
             except Exception as e:
                 if self._is_openrouter_context_limit_error(e):
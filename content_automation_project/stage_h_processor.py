@@ -14,10 +14,25 @@ from typing import Optional, Dict, List, Any, Callable, Tuple
 
 from base_stage_processor import BaseStageProcessor
 from api_layer import APIConfig
+from chunk_checkpoint import ChunkCheckpointStore
+from llm_response_cache import mode_for_attempt
+from llm_chunk_planner import (
+    ContextLimitExceeded,
+    chunk_budget_for_model,
+    chunk_token_limit,
+    estimate_json_tokens,
+    estimate_tokens,
+    plan_chunks,
+    run_with_bisect,
+)
+from prompt_payload import encode_payload
 from stage_j_processor import sj_web_is_context_limit_error
 
 STAGE_H_WEB_LOG_PREFIX = "[stage_h_web]"
 
+# Completion budget per flashcard row (~250 tokens, +50% headroom)
+_SH_WEB_COMPLETION_TOKENS_PER_ROW = 375
+
 _SH_WEB_JSON_RETRY_SUFFIX = (
     "\n\nCRITICAL (retry): Reply with ONLY one JSON object {\"data\":[...]}. "
     "Each element: PointId, Qtext, Choice1, Choice2, Choice3, Choice4, Correct. "
@@ -62,16 +77,45 @@ Lesson rows (PointId + hierarchy + Points only — no Imp/Type in this block):
 Generate one flashcard per PointId in the lesson rows above. Reply with ONE JSON object per the Output rules (root key "data"). No markdown outside JSON."""
 
 
+def sh_web_max_output_tokens_cap() -> int:
+    return min(APIConfig.DEFAULT_MAX_TOKENS * 2, getattr(APIConfig, "DEFAULT_OPENROUTER_MAX_TOKENS", 65536))
+
+
 def sh_web_max_tokens_for_chunk(chunk_len: int) -> int:
-    estimated = int(chunk_len * 250 * 1.5)
-    cap = min(APIConfig.DEFAULT_MAX_TOKENS * 2, getattr(APIConfig, "DEFAULT_OPENROUTER_MAX_TOKENS", 65536))
-    return max(4096, min(estimated, cap))
+    estimated = chunk_len * _SH_WEB_COMPLETION_TOKENS_PER_ROW
+    return max(4096, min(estimated, sh_web_max_output_tokens_cap()))
+
+
+def sh_web_plan_chunks(
+    lesson_rows: List[Dict[str, Any]],
+    stage_f_json_str: str,
+    prompt_body: str,
+    model_name: str,
+    max_rows: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Pack lesson rows into chunks by estimated tokens for ``model_name``.
+
+    The Stage F catalog is repeated in every chunk prompt, so it counts against each chunk's
+    window; rows are capped so their completion budget fits ``sh_web_max_output_tokens_cap``.
+    """
+    budget = chunk_budget_for_model(model_name)
+    fixed = estimate_tokens(sh_web_build_user_prompt(prompt_body, 1, 1, stage_f_json_str, []))
+    row_cap = min(
+        max_rows or budget.max_rows,
+        max(1, sh_web_max_output_tokens_cap() // _SH_WEB_COMPLETION_TOKENS_PER_ROW),
+    )
+    return plan_chunks(
+        [r for r in lesson_rows if isinstance(r, dict)],
+        row_tokens=lambda r: estimate_json_tokens(sh_web_slim_lesson_row(r)) + _SH_WEB_COMPLETION_TOKENS_PER_ROW,
+        limit_tokens=chunk_token_limit(budget, fixed),
+        max_rows=row_cap,
+    )
 
 
 class StageHProcessor(BaseStageProcessor):
     """Process Stage H: Generate flashcards from Stage J and Stage F data"""
 
-    STAGE_H_WEB_CHUNK_SIZE = 100
     STAGE_H_WEB_PARALLEL_CHUNKS = 6
     STAGE_H_WEB_LLM_PARSE_RETRIES = 3
 
@@ -157,6 +201,7 @@ class StageHProcessor(BaseStageProcessor):
                     max_tokens=max_out,
                     reasoning_effort_none=use_reasoning_none,
                     content_only=use_content_only,
+                    response_cache=mode_for_attempt(attempt),
                 )
             except Exception as e:
                 if sj_web_is_context_limit_error(e):
@@ -165,7 +210,7 @@ class StageHProcessor(BaseStageProcessor):
                         f"chunk_fail reason=context_limit part={part_num}/{total_parts} prompt_chars={prompt_chars}",
                     )
                     logger.error("%s context_limit_error: %s", STAGE_H_WEB_LOG_PREFIX, e)
-                    return None
+                    raise ContextLimitExceeded(str(e)) from e
                 sh_web_log(logger, f"chunk_fail reason=api_error part={part_num}/{total_parts} attempt={attempt}")
                 logger.exception("%s api_error", STAGE_H_WEB_LOG_PREFIX)
                 return None
@@ -202,6 +247,54 @@ class StageHProcessor(BaseStageProcessor):
         )
         return None
 
+    def _run_web_chunk_with_bisect(
+        self,
+        chunk_rows: List[Dict[str, Any]],
+        stage_f_json_str: str,
+        part_num: int,
+        total_parts: int,
+        prompt_body: str,
+        model_name: str,
+        cancel_check: Optional[Callable[[], bool]],
+        checkpoints: Optional[ChunkCheckpointStore] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Run one planned chunk; if it overflows the context window, split it in half and retry.
+        With ``checkpoints``, each successful (sub-)chunk is persisted and reused on reruns.
+        """
+
+        def _key(rows: List[Dict[str, Any]]) -> str:
+            chunk_input = {
+                "stage": "stage_h_web",
+                "rows": [sh_web_slim_lesson_row(r) for r in rows],
+                "stage_f": stage_f_json_str,
+            }
+            return ChunkCheckpointStore.chunk_key(chunk_input, prompt_body, model_name)
+
+        def _call(rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            return self._run_web_chunk_flashcards(
+                rows, stage_f_json_str, part_num, total_parts, prompt_body, model_name, cancel_check
+            )
+
+        def _run(rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            if checkpoints is None:
+                return _call(rows)
+            return checkpoints.get_or_run(_key(rows), lambda: _call(rows))
+
+        splits: List[int] = []
+
+        def _on_split(n_rows: int, mid: int) -> None:
+            splits.append(n_rows)
+            sh_web_log(
+                self.logger,
+                f"chunk_bisect part={part_num}/{total_parts} lesson_rows={n_rows} -> {mid}+{n_rows - mid}",
+            )
+
+        out = run_with_bisect(chunk_rows, _run, on_split=_on_split)
+        if checkpoints is not None and out is not None and splits:
+            checkpoints.save(_key(chunk_rows), out)
+        return out
+
     @staticmethod
     def _topic_unit_row_groups(
         records: List[Dict[str, Any]],
@@ -252,19 +345,19 @@ class StageHProcessor(BaseStageProcessor):
         model_name: str,
         cancel_check: Optional[Callable[[], bool]] = None,
         chunk_size: Optional[int] = None,
+        checkpoints: Optional[ChunkCheckpointStore] = None,
     ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
-        """Run Stage H LLM for one unit's lesson rows (sub-chunked if large)."""
-        chunk_sz = chunk_size if chunk_size is not None else self.STAGE_H_WEB_CHUNK_SIZE
+        """Run Stage H LLM for one unit's lesson rows (token-budget sub-chunks if large)."""
         rows = [r for r in lesson_rows if isinstance(r, dict)]
         if not rows:
             return [], None, 0
-        sub_chunks = [rows[i : i + chunk_sz] for i in range(0, len(rows), chunk_sz)]
+        sub_chunks = sh_web_plan_chunks(rows, stage_f_json_str, prompt_body, model_name, chunk_size)
         combined: List[Dict[str, Any]] = []
         prompt_calls = 0
         for idx, chunk in enumerate(sub_chunks):
             if cancel_check and cancel_check():
                 return [], "cancelled", prompt_calls
-            part_rows = self._run_web_chunk_flashcards(
+            part_rows = self._run_web_chunk_with_bisect(
                 chunk,
                 stage_f_json_str,
                 idx + 1,
@@ -272,6 +365,7 @@ class StageHProcessor(BaseStageProcessor):
                 prompt_body,
                 model_name,
                 cancel_check,
+                checkpoints,
             )
             prompt_calls += 1
             if part_rows is None:
@@ -291,9 +385,14 @@ class StageHProcessor(BaseStageProcessor):
         chunk_size: Optional[int] = None,
         max_parallel_chunks: Optional[int] = None,
         unit_hooks: Any = None,
+        checkpoint_dir: Optional[str] = None,
     ) -> Optional[str]:
-        """Web Stage H: tagged a*.json + image catalog f*.json → ac*.json."""
-        chunk_sz = chunk_size if chunk_size is not None else self.STAGE_H_WEB_CHUNK_SIZE
+        """Web Stage H: tagged a*.json + image catalog f*.json → ac*.json.
+
+        Rows are packed into chunks by the model's token budget; ``chunk_size`` caps rows per chunk.
+        With ``checkpoint_dir``, parsed chunk rows are checkpointed there so a rerun only calls the
+        LLM for chunks that did not finish; the checkpoints are removed once ac*.json is saved.
+        """
         max_par = max_parallel_chunks if max_parallel_chunks is not None else self.STAGE_H_WEB_PARALLEL_CHUNKS
 
         def _progress(msg: str) -> None:
@@ -310,7 +409,7 @@ class StageHProcessor(BaseStageProcessor):
         _progress("Starting Web Flashcard Generation (parallel chunks)...")
         sh_web_log(
             self.logger,
-            f"job_begin model={model_name!r} chunk_size={chunk_sz} max_parallel={max_par}",
+            f"job_begin model={model_name!r} max_chunk_rows={chunk_size} max_parallel={max_par}",
         )
 
         stage_j_data = self.load_json_file(tagged_json_path)
@@ -363,6 +462,8 @@ class StageHProcessor(BaseStageProcessor):
 
         call_mode = "parallel_chunks"
         nw = 1
+        chunk_rows: List[int] = []
+        checkpoints = ChunkCheckpointStore(checkpoint_dir) if checkpoint_dir else None
         combined_model_data: List[Dict[str, Any]] = []
 
         if unit_hooks is not None:
@@ -370,7 +471,7 @@ class StageHProcessor(BaseStageProcessor):
             unit_groups = self._topic_unit_row_groups(stage_j_records)
             _progress(
                 f"Topic-parallel flashcards: {len(unit_groups)} unit(s), "
-                f"chunk_size={chunk_sz} within each unit"
+                "token-budget chunks within each unit"
             )
             prompt_seq = 0
             for unit_meta, unit_rows in unit_groups:
@@ -395,7 +496,8 @@ class StageHProcessor(BaseStageProcessor):
                     prompt,
                     model_name,
                     cancel_check,
-                    chunk_sz,
+                    chunk_size,
+                    checkpoints,
                 )
                 prompt_seq += max(n_calls, 1)
                 if err or not fc_rows:
@@ -424,14 +526,13 @@ class StageHProcessor(BaseStageProcessor):
                     f"  ✓ Unit {ui}: {len(fc_rows)} flashcard row(s) for «{utop}»"
                 )
         else:
-            n_chunks = max(1, math.ceil(len(stage_j_records) / chunk_sz))
-            _progress(f"Chunk size={chunk_sz}, chunks={n_chunks}, parallel workers={min(max_par, n_chunks)}")
-
-            chunks: List[List[Dict[str, Any]]] = []
-            for i in range(0, len(stage_j_records), chunk_sz):
-                chunks.append(stage_j_records[i : i + chunk_sz])
-
+            chunks = sh_web_plan_chunks(stage_j_records, stage_f_json_str, prompt, model_name, chunk_size)
+            chunk_rows = [len(c) for c in chunks]
             nw = min(max_par, len(chunks)) if chunks else 1
+            _progress(
+                f"Token-budget chunks={len(chunks)} (rows per chunk {min(chunk_rows, default=0)}–"
+                f"{max(chunk_rows, default=0)}), parallel workers={nw}"
+            )
             chunk_responses: Dict[int, Optional[List[Dict[str, Any]]]] = {}
 
             with ThreadPoolExecutor(max_workers=nw) as executor:
@@ -440,16 +541,16 @@ class StageHProcessor(BaseStageProcessor):
                     if cancel_check and cancel_check():
                         _progress("Cancelled before scheduling chunks.")
                         break
-                    chunk_rows = [r for r in chunk if isinstance(r, dict)]
                     fut = executor.submit(
-                        self._run_web_chunk_flashcards,
-                        chunk_rows,
+                        self._run_web_chunk_with_bisect,
+                        chunk,
                         stage_f_json_str,
                         idx + 1,
                         len(chunks),
                         prompt,
                         model_name,
                         cancel_check,
+                        checkpoints,
                     )
                     future_to_idx[fut] = idx
 
@@ -484,6 +585,9 @@ class StageHProcessor(BaseStageProcessor):
                     combined_model_data.extend(part_rows)
                     _progress(f"Chunk {idx + 1}/{len(chunks)}: collected {len(part_rows)} flashcard row(s)")
 
+        if checkpoints is not None and checkpoints.restored:
+            _progress(f"Reused {checkpoints.restored} checkpointed chunk(s) from an earlier run")
+
         if not combined_model_data:
             sh_web_log(self.logger, "job_fail reason=no_rows_after_merge")
             return None
@@ -524,8 +628,8 @@ class StageHProcessor(BaseStageProcessor):
             "source_stage_f": os.path.basename(catalog_json_path),
             "model_used": model_name,
             "stage_h_call_mode": call_mode,
-            "stage_h_web_strategy": "single_llm_call_per_chunk_parse_retries",
-            "chunk_size": chunk_sz,
+            "stage_h_web_strategy": "token_budget_chunks_parse_retries_bisect_on_context_limit",
+            "chunk_rows": chunk_rows,
             "parallel_workers_used": nw,
             "total_records": len(flashcard_records),
             "records_with_flashcards": matched_count,
@@ -534,6 +638,8 @@ class StageHProcessor(BaseStageProcessor):
         _progress(f"Saving flashcard output to: {output_path}")
         success = self.save_json_file(flashcard_records, output_path, output_metadata, "H")
         if success:
+            if checkpoints is not None:
+                checkpoints.clear()
             if unit_hooks and hasattr(unit_hooks, "set_output_relpath") and hasattr(unit_hooks, "job_id"):
                 from webapp.job_files import job_root
 
@@ -695,7 +801,7 @@ class StageHProcessor(BaseStageProcessor):
             _progress(f"Part {i+1}: {len(part_data)} records (indices {start_idx} to {end_idx-1})")
         
         # Prepare Stage F JSON string
-        stage_f_json_str = json.dumps(stage_f_records, ensure_ascii=False, indent=2)
+        stage_f_json_str = encode_payload(stage_f_records, stage="stage_h", label="stage F")
         
         # Prepare base prompt template
         base_prompt_template = f"""{prompt}
@@ -774,7 +880,7 @@ Return ONLY valid JSON, no additional text."""
             _progress(f"Processing Part {part_num}/{num_parts} ({len(part_data)} records)...")
             _progress("=" * 60)
             
-            part_json_str = json.dumps(part_data, ensure_ascii=False, indent=2)
+            part_json_str = encode_payload(part_data, stage="stage_h", label=f"part {part_num}")
             part_prompt = f"""{base_prompt_template}
 
 Stage J Data - Part {part_num}/{num_parts} (without Imp and Type columns):
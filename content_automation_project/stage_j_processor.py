@@ -16,6 +16,18 @@ from typing import Optional, Dict, List, Any, Callable, Tuple
 from base_stage_processor import BaseStageProcessor
 from word_file_processor import WordFileProcessor
 from api_layer import APIConfig
+from chunk_checkpoint import ChunkCheckpointStore
+from llm_response_cache import mode_for_attempt
+from llm_chunk_planner import (
+    ContextLimitExceeded,
+    chunk_budget_for_model,
+    chunk_token_limit,
+    estimate_json_tokens,
+    estimate_tokens,
+    plan_chunks,
+    run_with_bisect,
+)
+from prompt_payload import encode_payload
 
 
 def _sj_normalize_key_part(value: Any) -> str:
@@ -244,13 +256,64 @@ Lesson rows (PointId + hierarchy + Points text only):
 For this chunk only: score every PointId in lesson rows above. Reply with ONE JSON object per the Output rules in the prompt (root key "data"; keys PointId, Imp, Type; Imp as "1"|"2"|"3"; one row per PointId). No markdown, no text outside JSON."""
 
 
+def sj_web_plan_chunks(
+    ta_rows: List[Dict[str, Any]],
+    table_by_topic: Dict[Tuple[str, str, str], List[Dict[str, str]]],
+    image_by_topic: Dict[Tuple[str, str, str], List[Dict[str, str]]],
+    step1_records: List[Dict[str, Any]],
+    prompt_body: str,
+    model_name: str,
+    *,
+    max_output_tokens: int,
+    completion_tokens_per_row: int,
+    max_rows: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Pack lesson rows into chunks by estimated tokens for ``model_name``.
+
+    Each topic's captions and Step 1 reference questions are counted once per chunk, the way
+    ``sj_web_build_user_prompt`` sends them.
+    """
+    budget = chunk_budget_for_model(model_name)
+    step1_tokens: Dict[Tuple[str, str, str], int] = defaultdict(int)
+    for x in step1_records:
+        if isinstance(x, dict):
+            step1_tokens[_sj_step1_topic_key(x)] += estimate_json_tokens(x)
+
+    def _topic_key(r: Dict[str, Any]) -> Tuple[str, str, str]:
+        return _sj_build_topic_key(r.get("chapter", ""), r.get("subchapter", ""), r.get("topic", ""))
+
+    def _topic_tokens(key: Tuple[str, str, str]) -> int:
+        sidebar = {
+            "topic": " ".join(key),
+            "topic_table_captions": table_by_topic.get(key) or [],
+            "topic_image_captions": image_by_topic.get(key) or [],
+        }
+        return estimate_json_tokens(sidebar) + step1_tokens.get(key, 0)
+
+    def _row_tokens(r: Dict[str, Any]) -> int:
+        return estimate_json_tokens(sj_web_slim_lesson_row(r)) + completion_tokens_per_row
+
+    fixed = estimate_tokens(sj_web_build_user_prompt(prompt_body, 1, 1, [], [], []))
+    row_cap = min(max_rows or budget.max_rows, max(1, max_output_tokens // completion_tokens_per_row))
+    return plan_chunks(
+        [r for r in ta_rows if isinstance(r, dict)],
+        row_tokens=_row_tokens,
+        limit_tokens=chunk_token_limit(budget, fixed, max_output_tokens),
+        max_rows=row_cap,
+        group_key=_topic_key,
+        group_tokens=_topic_tokens,
+    )
+
+
 class StageJProcessor(BaseStageProcessor):
     """Process Stage J: Add Imp and Type columns to Stage E data"""
 
-    STAGE_J_WEB_CHUNK_SIZE = 100
     STAGE_J_WEB_PARALLEL_CHUNKS = 6
     STAGE_J_WEB_MAX_OUTPUT_TOKENS = 8192
     STAGE_J_WEB_LLM_PARSE_RETRIES = 3
+    # Planner estimate for one {"PointId","Imp","Type"} output row
+    STAGE_J_WEB_COMPLETION_TOKENS_PER_ROW = 30
 
     def __init__(self, api_client):
         super().__init__(api_client)
@@ -385,7 +448,7 @@ class StageJProcessor(BaseStageProcessor):
         # Prepare Stage F JSON string if available
         stage_f_json_str = ""
         if stage_f_records:
-            stage_f_json_str = json.dumps(stage_f_records, ensure_ascii=False, indent=2)
+            stage_f_json_str = encode_payload(stage_f_records, stage="stage_j", label="stage F")
         
         # Prepare base prompt template
         base_prompt_template = f"""{prompt}
@@ -435,7 +498,7 @@ Return ONLY valid JSON, no additional text."""
             _progress(f"Processing Part {part_num}/{num_parts} ({len(part_data)} records)...")
             _progress("=" * 60)
             
-            part_json_str = json.dumps(part_data, ensure_ascii=False, indent=2)
+            part_json_str = encode_payload(part_data, stage="stage_j", label=f"part {part_num}")
             part_prompt = f"""{base_prompt_template}
 
 Stage E Data - Part {part_num}/{num_parts} (JSON):
@@ -734,7 +797,7 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
         """
         One bounded slice of lesson rows → one prompt → LLM (fixed max_tokens).
         Retries only on empty/unparseable model text (same prompt, same max_tokens).
-        On OpenRouter context-limit errors: log and return None (no bisect, no taper).
+        On OpenRouter context-limit errors: log and raise ContextLimitExceeded (caller bisects).
         """
         logger = self.logger
         if cancel_check and cancel_check():
@@ -780,6 +843,7 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
                     max_tokens=max_out,
                     reasoning_effort_none=use_reasoning_none,
                     content_only=use_content_only,
+                    response_cache=mode_for_attempt(attempt),
                 )
             except Exception as e:
                 if sj_web_is_context_limit_error(e):
@@ -790,7 +854,7 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
                         f"prompt_chars={prompt_chars}",
                     )
                     logger.error("%s context_limit_error: %s", STAGE_J_WEB_LOG_PREFIX, e)
-                    return None
+                    raise ContextLimitExceeded(str(e)) from e
                 sj_web_log(
                     logger,
                     f"chunk_fail reason=api_error part={part_num}/{total_parts} attempt={attempt}",
@@ -835,6 +899,65 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
         )
         return None
 
+    def _run_web_chunk_with_bisect(
+        self,
+        chunk_ta_rows: List[Dict[str, Any]],
+        table_by_topic: Dict[Tuple[str, str, str], List[Dict[str, str]]],
+        image_by_topic: Dict[Tuple[str, str, str], List[Dict[str, str]]],
+        step1_records: List[Dict[str, Any]],
+        part_num: int,
+        total_parts: int,
+        prompt_body: str,
+        model_name: str,
+        cancel_check: Optional[Callable[[], bool]],
+        checkpoints: Optional[ChunkCheckpointStore] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Run one planned chunk; if it overflows the context window, split it in half and retry.
+        With ``checkpoints``, each successful (sub-)chunk is persisted and reused on reruns.
+        """
+
+        def _key(rows: List[Dict[str, Any]]) -> str:
+            chunk_input = {
+                "stage": "stage_j_web",
+                "rows": [sj_web_slim_lesson_row(r) for r in rows],
+                "topics_context": sj_web_topic_sidebar_rows(rows, table_by_topic, image_by_topic),
+                "ref_questions": sj_web_step1_rows_for_chunk_topics(step1_records, rows),
+            }
+            return ChunkCheckpointStore.chunk_key(chunk_input, prompt_body, model_name)
+
+        def _call(rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            return self._run_web_chunk_importance_type(
+                rows,
+                table_by_topic,
+                image_by_topic,
+                step1_records,
+                part_num,
+                total_parts,
+                prompt_body,
+                model_name,
+                cancel_check,
+            )
+
+        def _run(rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            if checkpoints is None:
+                return _call(rows)
+            return checkpoints.get_or_run(_key(rows), lambda: _call(rows))
+
+        splits: List[int] = []
+
+        def _on_split(n_rows: int, mid: int) -> None:
+            splits.append(n_rows)
+            sj_web_log(
+                self.logger,
+                f"chunk_bisect part={part_num}/{total_parts} lesson_rows={n_rows} -> {mid}+{n_rows - mid}",
+            )
+
+        out = run_with_bisect(chunk_ta_rows, _run, on_split=_on_split)
+        if checkpoints is not None and out is not None and splits:
+            checkpoints.save(_key(chunk_ta_rows), out)
+        return out
+
     def process_stage_j_web_four_json(
         self,
         ta_json_path: str,
@@ -848,12 +971,15 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
         cancel_check: Optional[Callable[[], bool]] = None,
         chunk_size: Optional[int] = None,
         max_parallel_chunks: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None,
     ) -> Optional[str]:
         """
         Web Stage J: TA merged JSON + tablepic + filepic + Step 1 combined.
-        Enriches rows with per-topic captions in memory, chunks (~100 rows), parallel LLM calls, writes a*.json.
+        Enriches rows with per-topic captions in memory, packs chunks to the model's token budget
+        (``chunk_size`` caps rows per chunk), parallel LLM calls, writes a*.json.
+        With ``checkpoint_dir``, parsed chunk rows are checkpointed there so a rerun only calls
+        the LLM for chunks that did not finish; the checkpoints are removed once a*.json is saved.
         """
-        chunk_sz = chunk_size if chunk_size is not None else self.STAGE_J_WEB_CHUNK_SIZE
         max_par = max_parallel_chunks if max_parallel_chunks is not None else self.STAGE_J_WEB_PARALLEL_CHUNKS
 
         def _progress(msg: str) -> None:
@@ -870,7 +996,7 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
         _progress("Starting Web Stage J (four JSON inputs, parallel chunks)...")
         sj_web_log(
             self.logger,
-            f"job_begin model={model_name!r} chunk_size={chunk_sz} max_parallel={max_par} "
+            f"job_begin model={model_name!r} max_chunk_rows={chunk_size} max_parallel={max_par} "
             f"parse_retries_per_chunk={self.STAGE_J_WEB_LLM_PARSE_RETRIES}",
         )
 
@@ -908,14 +1034,24 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
             f"filepic={len(filepic_records)}, step1={len(step1_records)}"
         )
 
-        n_chunks = max(1, math.ceil(len(ta_records) / chunk_sz))
-        _progress(f"Chunk size={chunk_sz}, chunks={n_chunks}, parallel workers={min(max_par, n_chunks)}")
-
-        chunks: List[List[Dict[str, Any]]] = []
-        for i in range(0, len(ta_records), chunk_sz):
-            chunks.append(ta_records[i : i + chunk_sz])
-
+        chunks = sj_web_plan_chunks(
+            ta_records,
+            table_by_topic,
+            image_by_topic,
+            step1_records,
+            prompt,
+            model_name,
+            max_output_tokens=self.STAGE_J_WEB_MAX_OUTPUT_TOKENS,
+            completion_tokens_per_row=self.STAGE_J_WEB_COMPLETION_TOKENS_PER_ROW,
+            max_rows=chunk_size,
+        )
+        chunk_rows = [len(c) for c in chunks]
         nw = min(max_par, len(chunks)) if chunks else 1
+        _progress(
+            f"Token-budget chunks={len(chunks)} (rows per chunk {min(chunk_rows, default=0)}–"
+            f"{max(chunk_rows, default=0)}), parallel workers={nw}"
+        )
+        checkpoints = ChunkCheckpointStore(checkpoint_dir) if checkpoint_dir else None
 
         chunk_responses: Dict[int, Optional[List[Dict[str, Any]]]] = {}
         with ThreadPoolExecutor(max_workers=nw) as executor:
@@ -924,11 +1060,9 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
                 if cancel_check and cancel_check():
                     _progress("Cancelled before scheduling chunks.")
                     break
-                chunk_ta = [r for r in chunk if isinstance(r, dict)]
-
                 fut = executor.submit(
-                    self._run_web_chunk_importance_type,
-                    chunk_ta,
+                    self._run_web_chunk_with_bisect,
+                    chunk,
                     table_by_topic,
                     image_by_topic,
                     step1_records,
@@ -937,6 +1071,7 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
                     prompt,
                     model_name,
                     cancel_check,
+                    checkpoints,
                 )
                 future_to_idx[fut] = idx
 
@@ -952,6 +1087,9 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
                     self.logger.exception("%s chunk_worker_crash idx=%s", STAGE_J_WEB_LOG_PREFIX, idx)
                     chunk_responses[idx] = None
 
+        if checkpoints is not None and checkpoints.restored:
+            _progress(f"Reused {checkpoints.restored} checkpointed chunk(s) from an earlier run")
+
         if cancel_check and cancel_check():
             return None
 
@@ -1056,11 +1194,11 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
             "model_used": model_name,
             "stage_j_txt_file": os.path.basename(txt_path),
             "stage_j_call_mode": "parallel_chunks",
-            "stage_j_web_strategy": "single_llm_call_per_chunk_parse_retries_only",
+            "stage_j_web_strategy": "token_budget_chunks_parse_retries_bisect_on_context_limit",
             "stage_j_web_parse_retries_per_chunk": self.STAGE_J_WEB_LLM_PARSE_RETRIES,
             "stage_j_web_output_max_tokens": self.STAGE_J_WEB_MAX_OUTPUT_TOKENS,
             "topic_captions_once_per_chunk_topic": True,
-            "chunk_size": chunk_sz,
+            "chunk_rows": chunk_rows,
             "parallel_workers_used": nw,
             "total_records": len(merged_records),
             "records_with_imp_type": len([r for r in merged_records if r.get("Imp") or r.get("Type")]),
@@ -1069,6 +1207,8 @@ Stage E Data - Part {part_num}/{num_parts} (JSON):
         _progress(f"Saving Web Stage J output to: {output_path}")
         success = self.save_json_file(merged_records, output_path, output_metadata, "J")
         if success:
+            if checkpoints is not None:
+                checkpoints.clear()
             sj_web_log(
                 self.logger,
                 f"job_ok path={os.path.basename(output_path)} chunks={len(chunks)} "
@@ -10,6 +10,7 @@ from typing import Optional, Dict, List, Any, Callable
 
 from base_stage_processor import BaseStageProcessor
 from api_layer import APIConfig
+from prompt_payload import encode_payload
 
 
 class StageLProcessor(BaseStageProcessor):
@@ -99,7 +100,7 @@ class StageLProcessor(BaseStageProcessor):
         # Build compact overview context (stats per topic)
         _progress("Building overview context from Stage J and Stage V...")
         overview_context = self._build_overview_context(stage_j_records, stage_v_records)
-        overview_json_str = json.dumps(overview_context, ensure_ascii=False, indent=2)
+        overview_json_str = encode_payload(overview_context, stage="stage_l", label="overview")
 
         # Build full prompt
         full_prompt = f"""{prompt}
@@ -478,7 +479,7 @@ IMPORTANT:
 
         _progress("Building overview context from tagged lesson + Test Bank 1...")
         overview_context = self._build_overview_context(imp_records, step1_records)
-        overview_json_str = json.dumps(overview_context, ensure_ascii=False, indent=2)
+        overview_json_str = encode_payload(overview_context, stage="stage_l", label="overview")
 
         json_schema = """
 The JSON response MUST be a single object with EXACTLY these two fields (no other top-level keys):
@@ -15,6 +15,8 @@ from datetime import datetime
 from typing import Optional, Dict, List, Any, Callable, Tuple
 from base_stage_processor import BaseStageProcessor
 from api_layer import APIConfig
+from llm_response_cache import mode_for_attempt
+from prompt_payload import encode_payload
 
 
 class StageTAProcessor(BaseStageProcessor):
@@ -124,7 +126,7 @@ class StageTAProcessor(BaseStageProcessor):
         scope_note: str = "",
     ) -> str:
         stage_e_json_str = json.dumps(stage_e_points, ensure_ascii=False, separators=(",", ":"))
-        tables_json_str = json.dumps(subchapter_tables, ensure_ascii=False, indent=2)
+        tables_json_str = encode_payload(subchapter_tables, stage="stage_ta", label="tables")
         note = scope_note.strip()
         if note and not note.startswith("\n"):
             note = "\n\n" + note
@@ -197,6 +199,7 @@ class StageTAProcessor(BaseStageProcessor):
                         temperature=APIConfig.DEFAULT_TEMPERATURE,
                         max_tokens=self.SUBCHAPTER_MODEL_MAX_COMPLETION_TOKENS,
                         timeout_s=self.SUBCHAPTER_MODEL_TIMEOUT_S,
+                        response_cache=mode_for_attempt(attempt),
                     )
             except Exception as e:
                 if self._is_openrouter_context_limit_error(e):
@@ -9,14 +9,17 @@ import json
 import logging
 import os
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict, List, Any, Callable, Tuple
 from base_stage_processor import BaseStageProcessor
 from word_file_processor import WordFileProcessor
 from api_layer import APIConfig
+from llm_response_cache import mode_for_attempt
 from openrouter_api_client import OpenRouterAPIError, OpenRouterRequestAborted
+from prompt_payload import encode_payload
 
 
 @dataclass
@@ -36,7 +39,9 @@ class StageVProcessingContext:
 
 class StageVProcessor(BaseStageProcessor):
     """Process Stage V: Generate test files from Stage J and Word document"""
-    STEP2_BATCH_SIZE = 10
+    # Default number of Step 2 topics in flight (per-job override: step2_concurrency)
+    STEP2_CONCURRENCY = 10
+    # Attempts per Step 2 topic (a failed topic is re-queued until this many attempts were made)
     STEP2_TOPIC_RETRY_PASSES = 2
     # Step 1/2 return large JSON arrays; 16k output tokens truncates multi-question banks on OpenRouter.
     _STAGE_V_OUTPUT_MAX_TOKENS = APIConfig.DEFAULT_OPENROUTER_MAX_TOKENS
@@ -242,7 +247,7 @@ class StageVProcessor(BaseStageProcessor):
             }
             stage_j_records_for_prompt.append(clean_record)
 
-        full_stage_j_json = json.dumps(stage_j_records_for_prompt, ensure_ascii=False, indent=2)
+        full_stage_j_json = encode_payload(stage_j_records_for_prompt, stage="stage_v", label="stage J (full)")
 
         return StageVProcessingContext(
             stage_j_path=stage_j_path,
@@ -270,8 +275,9 @@ class StageVProcessor(BaseStageProcessor):
         cancel_check: Optional[Callable[[], bool]] = None,
         unit_hooks: Optional[Any] = None,
         keep_unit_artifacts: bool = False,
+        step2_concurrency: Optional[int] = None,
     ) -> Optional[str]:
-        """Run Step 2 batches, merge QIds, save final b*.json; optionally remove step1 combined file."""
+        """Run Step 2 topics (sliding window), merge QIds, save final b*.json; optionally remove step1 combined file."""
         stage_j_path = ctx.stage_j_path
         word_file_path = ctx.word_file_path
         output_dir = ctx.output_dir_final
@@ -334,9 +340,9 @@ class StageVProcessor(BaseStageProcessor):
                     "chapter_name": chapter_name,
                     "subchapter_name": subchapter_name,
                     "topic_name": topic_name,
-                    "topic_stage_j_json": json.dumps(filtered_stage_j_records, ensure_ascii=False, indent=2),
+                    "topic_stage_j_json": encode_payload(filtered_stage_j_records, stage="stage_v", label=f"topic {topic_idx} stage J"),
                     "filtered_rows_count": len(filtered_stage_j_records),
-                    "topic_step1_json": json.dumps(filtered_step1_records, ensure_ascii=False, indent=2),
+                    "topic_step1_json": encode_payload(filtered_step1_records, stage="stage_v", label=f"topic {topic_idx} step 1"),
                     "filtered_step1_count": len(filtered_step1_records),
                 }
             )
@@ -351,118 +357,127 @@ class StageVProcessor(BaseStageProcessor):
             except Exception as e:
                 self.logger.warning("Failed to seed unit manifest: %s", e)
 
-        pending_tasks = list(step2_tasks)
-        for pass_idx in range(1, self.STEP2_TOPIC_RETRY_PASSES + 1):
-            if not pending_tasks:
-                break
-
-            total_batches = (len(pending_tasks) + self.STEP2_BATCH_SIZE - 1) // self.STEP2_BATCH_SIZE
-            _progress(
-                f"STEP 2 pass {pass_idx}/{self.STEP2_TOPIC_RETRY_PASSES}: "
-                f"{len(pending_tasks)} topic(s) to process"
-            )
-            failed_in_pass: List[Dict[str, Any]] = []
-
-            for batch_idx, start in enumerate(range(0, len(pending_tasks), self.STEP2_BATCH_SIZE), 1):
-                batch_tasks = pending_tasks[start : start + self.STEP2_BATCH_SIZE]
-                _progress(
-                    f"STEP 2 pass {pass_idx}/{self.STEP2_TOPIC_RETRY_PASSES}, batch {batch_idx}/{total_batches}: "
-                    f"processing {len(batch_tasks)} topic(s) with concurrency={self.STEP2_BATCH_SIZE}"
-                )
+        concurrency = max(1, int(step2_concurrency or self.STEP2_CONCURRENCY))
+        max_attempts = self.STEP2_TOPIC_RETRY_PASSES
+        _progress(
+            f"STEP 2: {len(step2_tasks)} topic(s) to process with up to {concurrency} in flight "
+            f"({max_attempts} attempt(s) per topic)"
+        )
 
-                executor = ThreadPoolExecutor(max_workers=self.STEP2_BATCH_SIZE)
-                future_to_task = {}
-                try:
-                    for task in batch_tasks:
-                        topic_idx = task["topic_idx"]
-                        chapter_name = task["chapter_name"]
-                        subchapter_name = task["subchapter_name"]
-                        topic_name = task["topic_name"]
-                        self.logger.info("")
-                        self.logger.info("=" * 80)
-                        self.logger.info(f"QUEUE TOPIC {topic_idx}/{len(topics_list)}: '{topic_name}'")
-                        self.logger.info("=" * 80)
-                        self.logger.info(f"  Chapter: '{chapter_name}'")
-                        self.logger.info(f"  Subchapter: '{subchapter_name}'")
-                        self.logger.info(f"  Topic: '{topic_name}'")
-                        self.logger.info("  Input: filtered Stage J + filtered Step 1 + Step 2 prompt")
-                        self.logger.info(f"  Pass/Batch: {pass_idx}/{self.STEP2_TOPIC_RETRY_PASSES} - {batch_idx}/{total_batches}")
-                        self.logger.info(f"  Stage J rows: {task['filtered_rows_count']}")
-                        self.logger.info(f"  Step 1 rows: {task['filtered_step1_count']}")
-
-                        future = executor.submit(
-                            self._step2_refine_questions_and_add_qid,
-                            stage_j_path=stage_j_path,
-                            word_file_path=word_file_path,
-                            full_stage_j_json=task["topic_stage_j_json"],
-                            current_topic_name=topic_name,
-                            current_topic_subchapter=subchapter_name,
-                            topic_step1_json=task["topic_step1_json"],
-                            step1_output_path=step1_combined_path,
-                            prompt=prompt_2,
-                            model_name=model_name_2,
-                            book_id=book_id,
-                            chapter_id=chapter_id,
-                            topic_idx=topic_idx,
-                            total_topics=len(topics_list),
-                            qid_start_counter=1,
-                            output_dir=output_dir,
-                            progress_callback=progress_callback,
-                            assign_qid=False,
-                            cancel_check=cancel_check,
+        # Sliding window: a slot is refilled as soon as any topic finishes, and a failed topic goes
+        # back to the front of the queue right away instead of waiting for a later pass.
+        # Results are committed (unit hooks, progress) in topic order.
+        pending_queue = deque(step2_tasks)
+        attempts: Dict[int, int] = {}
+        outcomes: Dict[int, Optional[Tuple[str, str, str, str]]] = {}
+        commit_order = [t["topic_idx"] for t in step2_tasks]
+        next_commit = 0
+        failed_topics_after_retries: List[Dict[str, Any]] = []
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        in_flight: Dict[Any, Dict[str, Any]] = {}
+        try:
+            while pending_queue or in_flight:
+                while pending_queue and len(in_flight) < concurrency:
+                    task = pending_queue.popleft()
+                    topic_idx = task["topic_idx"]
+                    attempts[topic_idx] = attempts.get(topic_idx, 0) + 1
+                    self.logger.info("")
+                    self.logger.info("=" * 80)
+                    self.logger.info(f"QUEUE TOPIC {topic_idx}/{len(topics_list)}: '{task['topic_name']}'")
+                    self.logger.info("=" * 80)
+                    self.logger.info(f"  Chapter: '{task['chapter_name']}'")
+                    self.logger.info(f"  Subchapter: '{task['subchapter_name']}'")
+                    self.logger.info(f"  Topic: '{task['topic_name']}'")
+                    self.logger.info("  Input: filtered Stage J + filtered Step 1 + Step 2 prompt")
+                    self.logger.info(f"  Attempt: {attempts[topic_idx]}/{max_attempts}")
+                    self.logger.info(f"  Stage J rows: {task['filtered_rows_count']}")
+                    self.logger.info(f"  Step 1 rows: {task['filtered_step1_count']}")
+
+                    future = executor.submit(
+                        self._step2_refine_questions_and_add_qid,
+                        stage_j_path=stage_j_path,
+                        word_file_path=word_file_path,
+                        full_stage_j_json=task["topic_stage_j_json"],
+                        current_topic_name=task["topic_name"],
+                        current_topic_subchapter=task["subchapter_name"],
+                        topic_step1_json=task["topic_step1_json"],
+                        step1_output_path=step1_combined_path,
+                        prompt=prompt_2,
+                        model_name=model_name_2,
+                        book_id=book_id,
+                        chapter_id=chapter_id,
+                        topic_idx=topic_idx,
+                        total_topics=len(topics_list),
+                        qid_start_counter=1,
+                        output_dir=output_dir,
+                        progress_callback=progress_callback,
+                        assign_qid=False,
+                        cancel_check=cancel_check,
+                        retry_pass=attempts[topic_idx],
+                    )
+                    in_flight[future] = task
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    topic_idx = task["topic_idx"]
+                    topic_name = task["topic_name"]
+                    attempt = attempts[topic_idx]
+                    topic_step2_output = None
+                    num_questions = 0
+                    try:
+                        topic_step2_output, num_questions = future.result()
+                    except OpenRouterRequestAborted:
+                        raise
+                    except Exception as e:
+                        self.logger.warning(
+                            f"  ✗ Step 2 raised exception for Topic '{topic_name}' (attempt {attempt}/{max_attempts}): {e}"
                         )
-                        future_to_task[future] = task
-
-                    for future in as_completed(future_to_task):
-                        task = future_to_task[future]
-                        topic_idx = task["topic_idx"]
-                        chapter_name = task["chapter_name"]
-                        subchapter_name = task["subchapter_name"]
-                        topic_name = task["topic_name"]
-                        try:
-                            topic_step2_output, num_questions = future.result()
-                            if topic_step2_output:
-                                step2_topic_outputs[topic_idx] = (chapter_name, subchapter_name, topic_name, topic_step2_output)
-                                if unit_hooks and hasattr(unit_hooks, "on_topic_done"):
-                                    unit_hooks.on_topic_done(
-                                        topic_idx,
-                                        chapter_name,
-                                        subchapter_name,
-                                        topic_name,
-                                        topic_step2_output,
-                                        topic_idx,
-                                    )
-                                _progress(f"Step 2 completed for Topic '{topic_name}': {topic_step2_output}")
-                                self.logger.info(
-                                    f"  ✓ Step 2 completed for Topic '{topic_name}' in pass {pass_idx}, batch {batch_idx} "
-                                    f"({num_questions} questions)"
-                                )
-                            else:
-                                failed_in_pass.append(task)
-                                self.logger.warning(
-                                    f"  ✗ Step 2 failed for Topic '{topic_name}' in pass {pass_idx}, batch {batch_idx}"
-                                )
-                        except OpenRouterRequestAborted:
-                            raise
-                        except Exception as e:
-                            failed_in_pass.append(task)
-                            self.logger.warning(
-                                f"  ✗ Step 2 raised exception for Topic '{topic_name}' in pass {pass_idx}, batch {batch_idx}: {e}"
-                            )
-                finally:
-                    executor.shutdown(wait=False, cancel_futures=True)
-
-            if failed_in_pass and pass_idx < self.STEP2_TOPIC_RETRY_PASSES:
-                _progress(
-                    f"STEP 2 pass {pass_idx} finished: {len(failed_in_pass)} topic(s) failed and will be retried"
-                )
-            elif failed_in_pass:
-                _progress(
-                    f"STEP 2 pass {pass_idx} finished: {len(failed_in_pass)} topic(s) still failed after final retry pass"
-                )
-            pending_tasks = failed_in_pass
+                    if topic_step2_output:
+                        outcomes[topic_idx] = (
+                            task["chapter_name"],
+                            task["subchapter_name"],
+                            topic_name,
+                            topic_step2_output,
+                        )
+                        self.logger.info(
+                            f"  ✓ Step 2 completed for Topic '{topic_name}' on attempt {attempt} "
+                            f"({num_questions} questions)"
+                        )
+                    elif attempt < max_attempts:
+                        pending_queue.appendleft(task)
+                        _progress(
+                            f"Step 2 failed for Topic '{topic_name}' (attempt {attempt}/{max_attempts}); re-queued"
+                        )
+                    else:
+                        outcomes[topic_idx] = None
+                        failed_topics_after_retries.append(task)
+                        _progress(f"Step 2 failed for Topic '{topic_name}' after {max_attempts} attempt(s)")
+
+                while next_commit < len(commit_order) and commit_order[next_commit] in outcomes:
+                    topic_idx = commit_order[next_commit]
+                    next_commit += 1
+                    outcome = outcomes[topic_idx]
+                    if outcome is None:
+                        continue
+                    step2_topic_outputs[topic_idx] = outcome
+                    chapter_name, subchapter_name, topic_name, topic_step2_output = outcome
+                    if unit_hooks and hasattr(unit_hooks, "on_topic_done"):
+                        unit_hooks.on_topic_done(
+                            topic_idx,
+                            chapter_name,
+                            subchapter_name,
+                            topic_name,
+                            topic_step2_output,
+                            topic_idx,
+                        )
+                    _progress(f"Step 2 completed for Topic '{topic_name}': {topic_step2_output}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        failed_topics_after_retries.sort(key=lambda t: t["topic_idx"])
 
-        failed_topics_after_retries = list(pending_tasks)
         if failed_topics_after_retries:
             failed_topics_payload = {
                 "failed_topics_count": len(failed_topics_after_retries),
@@ -674,10 +689,12 @@ class StageVProcessor(BaseStageProcessor):
         cancel_check: Optional[Callable[[], bool]] = None,
         unit_hooks: Optional[Any] = None,
         keep_unit_artifacts: bool = False,
+        step2_concurrency: Optional[int] = None,
     ) -> Optional[str]:
         """
         Run Step 2 + final merge using an existing Step 1 combined JSON.
         If step1_combined_path is None, uses step1_combined_{book}{chapter}.json under output_dir.
+        step2_concurrency: topics in flight at once (default STEP2_CONCURRENCY).
         """
         if hasattr(self.api_client, "set_stage"):
             self.api_client.set_stage("stage_v")
@@ -706,6 +723,7 @@ class StageVProcessor(BaseStageProcessor):
             cancel_check=cancel_check,
             unit_hooks=unit_hooks,
             keep_unit_artifacts=keep_unit_artifacts,
+            step2_concurrency=step2_concurrency,
         )
 
     def process_stage_v(
@@ -853,6 +871,7 @@ Stage J Data (FULL file - all records, without Type column):
                     temperature=APIConfig.DEFAULT_TEMPERATURE,
                     max_tokens=self._STAGE_V_OUTPUT_MAX_TOKENS,
                     cancel_check=cancel_check,
+                    response_cache=mode_for_attempt(attempt + 1),
                 )
                 if part_response:
                     _progress(f"Step 1 response received ({len(part_response)} characters)")
@@ -1004,6 +1023,7 @@ IMPORTANT: Focus on generating test questions for the topic: "{current_topic_nam
                     model_name=model_name,
                     temperature=APIConfig.DEFAULT_TEMPERATURE,
                     max_tokens=self._STAGE_V_OUTPUT_MAX_TOKENS,
+                    response_cache=mode_for_attempt(attempt + 1),
                 )
                 if part_response:
                     _progress(f"Step 1 response received for Topic {topic_idx} ({len(part_response)} characters)")
@@ -1119,6 +1139,7 @@ IMPORTANT: Focus on generating test questions for the topic: "{current_topic_nam
         progress_callback: Optional[Callable[[str], None]] = None,
         assign_qid: bool = True,
         cancel_check: Optional[Callable[[], bool]] = None,
+        retry_pass: int = 1,
     ) -> tuple[Optional[str], int]:
         """
         Step 2: Refine questions and add QId mapping.
@@ -1142,6 +1163,7 @@ IMPORTANT: Focus on generating test questions for the topic: "{current_topic_nam
             output_dir: Output directory
             progress_callback: Optional callback for progress updates
             assign_qid: Whether to add QId in this function (for concurrent mode this is False and QId is assigned later)
+            retry_pass: 1-based attempt of this topic in the Step 2 queue (re-queued topics refresh the response cache)
             
         Returns:
             Tuple of (Path to Step 2 output file or None on error, number of questions processed)
@@ -1222,6 +1244,8 @@ IMPORTANT: Focus on refining test questions for the topic: "{current_topic_name}
                     cancel_check=cancel_check,
                     reasoning_effort_none=use_reasoning_none,
                     content_only=use_content_only,
+                    # A re-queued topic (retry_pass > 1) never starts from the cached answer either
+                    response_cache=mode_for_attempt(retry_pass + attempt),
                 )
             except OpenRouterRequestAborted:
                 raise
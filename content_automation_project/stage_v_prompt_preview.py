@@ -14,6 +14,7 @@ import re
 from typing import Any, Dict, List, Optional, Tuple
 
 from base_stage_processor import BaseStageProcessor
+from prompt_payload import encode_payload
 from word_file_processor import WordFileProcessor
 
 # Step 1 default matches `prompts.json` → "Test Bank Generation - Step 1 Prompt"
@@ -145,7 +146,7 @@ class StageVPromptPreview(BaseStageProcessor):
             "topics": [],
         }
 
-        full_stage_j_json = json.dumps(cleaned_records, ensure_ascii=False, indent=2)
+        full_stage_j_json = encode_payload(cleaned_records, stage="stage_v", label="stage J (full)")
         full_prompt_1 = f"""{prompt_1}
 
 Word Document (Test Questions):
@@ -169,7 +170,7 @@ Stage J Data (FULL file - all records, without Type column):
             if not filtered_stage_j:
                 continue
 
-            stage_j_json = json.dumps(filtered_stage_j, ensure_ascii=False, indent=2)
+            stage_j_json = encode_payload(filtered_stage_j, stage="stage_v", label=f"topic {topic_idx} stage J")
 
             topic_prompt_2 = prompt_2.replace("{Topic_NAME}", topic_name)
             topic_prompt_2 = topic_prompt_2.replace("{Subchapter_Name}", subchapter_name)
@@ -7,11 +7,15 @@ from __future__ import annotations
 import json
 import logging
 import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from api_layer import APIConfig, GeminiAPIClient
 from base_stage_processor import BaseStageProcessor
+from llm_response_cache import mode_for_attempt
 from voice_class_captions import (
     TopicCaptionIndexes,
     build_topic_caption_context,
@@ -19,6 +23,7 @@ from voice_class_captions import (
 )
 from voice_class_prompts import SCRIPT_JSON_RETRY_SUFFIX, build_topic_script_prompt
 from webapp.audio_merge import merge_voice_tracks, wav_duration_seconds
+from webapp.voice_segment_index import store_audio_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -231,6 +236,7 @@ class StageVoiceProcessor(BaseStageProcessor):
                     cancel_check=cancel_check,
                     reasoning_effort_none=use_reasoning_none,
                     content_only=use_content_only,
+                    response_cache=mode_for_attempt(attempt),
                 )
             except Exception as e:
                 last_error = str(e)
@@ -630,77 +636,209 @@ class StageVoiceProcessor(BaseStageProcessor):
         report_progress(f"Saved voice script: {os.path.basename(output_path)}")
         return output_path
 
-    def _generate_tts_with_rotation(
-        self,
+    @staticmethod
+    def _tts_request(
         text: str,
         output_wav: str,
         *,
+        api_key: str,
+        voice: str,
+        model: str,
+        instruction: Optional[str],
+    ) -> Optional[str]:
+        """One Gemini TTS call (worker thread safe). Returns None on success, else the error text."""
+        from api_layer import APIKeyManager
+
+        client = GeminiAPIClient(api_key_manager=APIKeyManager(load_env=False))
+        try:
+            ok = client.generate_tts(
+                text=text,
+                output_file=output_wav,
+                voice=voice,
+                model=model,
+                api_key=api_key,
+                instruction=instruction,
+            )
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+        if ok:
+            return None
+        return (client.last_tts_error or "TTS returned false").strip()
+
+    def _tts_segment_request(self, text: str, output_wav: str, **kwargs: Any) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """``_tts_request`` plus duration/peaks/silence analysis of the new WAV, off the scheduling thread."""
+        err = self._tts_request(text, output_wav, **kwargs)
+        if err is not None or not os.path.isfile(output_wav):
+            return err, None
+        from webapp.audio_merge import analyze_audio_for_preview
+
+        try:
+            return None, analyze_audio_for_preview(output_wav)
+        except Exception as e:
+            self.logger.warning("Audio analysis of %s failed: %s", output_wav, e)
+            return None, None
+
+    def _synthesize_segments(
+        self,
+        jobs: List[Tuple[int, Dict[str, Any], str]],
+        *,
+        total_segments: int,
         voice: str,
         model: str,
         instruction: Optional[str],
+        concurrency: int,
         progress_callback: Optional[Callable[[str], None]] = None,
         cancel_check: Optional[Callable[[], bool]] = None,
     ) -> bool:
+        """Synthesize ``(segment_id, segment, wav_path)`` jobs across the Gemini key pool.
+
+        Keys are leased so each has at most one request in flight, and only while it has RPM/RPD
+        budget. Key bookkeeping and progress run on the calling thread; workers only call the
+        API and write ``.tmp.wav`` files that are renamed into place on success. A failed
+        attempt is retried on another key up to ``max_attempts()`` times; after the first
+        segment that runs out of attempts (or on cancel) no new work starts, in-flight
+        requests finish, and False is returned with ``_last_tts_failure`` set.
+        """
         self._last_tts_failure = None
         if not self._gemini_keys:
             self._last_tts_failure = "No Gemini TTS key manager configured"
             self.logger.error(self._last_tts_failure)
             return False
 
-        from api_layer import GENAI_AVAILABLE, APIKeyManager, GeminiAPIClient
+        from api_layer import GENAI_AVAILABLE
+        from webapp.config import GEMINI_TTS_DEFAULT_RPD, GEMINI_TTS_DEFAULT_RPM
         from webapp.gemini_tts_key_manager import GeminiTtsKeyManager
 
+        def _progress(msg: str) -> None:
+            if progress_callback:
+                progress_callback(msg)
+
         if not GENAI_AVAILABLE:
             self._last_tts_failure = "google.genai not installed in worker — rebuild Docker image"
-            if progress_callback:
-                progress_callback(self._last_tts_failure)
+            _progress(self._last_tts_failure)
             return False
+        if not jobs:
+            return True
 
         mgr: GeminiTtsKeyManager = self._gemini_keys
-        attempts = mgr.max_attempts()
-        client = GeminiAPIClient(api_key_manager=APIKeyManager(load_env=False))
+        max_attempts = mgr.max_attempts()
+        pending = deque(jobs)
+        attempts: Dict[int, int] = {}
+        in_flight: Dict[Any, Tuple[int, Dict[str, Any], str, Any, str]] = {}
+        failure: Optional[str] = None
         last_err = ""
+        # Audio metadata for the voice-segments page (webapp.voice_segment_index), written once at the end
+        index_entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
 
-        for attempt in range(attempts):
-            key_row = mgr.wait_for_available_key(
-                progress_callback=progress_callback,
-                cancel_check=cancel_check,
-            )
-            if key_row is None:
-                if cancel_check and cancel_check():
-                    self._last_tts_failure = "TTS cancelled"
-                else:
-                    self._last_tts_failure = last_err or "No Gemini TTS API keys available (add or renew keys in Admin)"
-                if progress_callback:
-                    progress_callback(self._last_tts_failure)
-                return False
+        pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="tts")
+        try:
+            while pending or in_flight:
+                if failure is None and cancel_check and cancel_check():
+                    failure = "TTS cancelled"
+                while failure is None and pending and len(in_flight) < concurrency:
+                    key_row = mgr.lease_available_key()
+                    if key_row is None:
+                        break
+                    sid, seg, wav_path = pending.popleft()
+                    if sid not in attempts:
+                        _progress(
+                            f"TTS segment {sid}/{total_segments} ({seg.get('paragraph_count', '?')} paragraphs)..."
+                        )
+                    attempts[sid] = attempts.get(sid, 0) + 1
+                    stem = os.path.splitext(os.path.basename(wav_path))[0]
+                    tmp_wav = os.path.join(
+                        os.path.dirname(wav_path),
+                        f".{stem}.{os.getpid()}.{threading.get_ident()}.{sid}.tmp.wav",
+                    )
+                    fut = pool.submit(
+                        self._tts_segment_request,
+                        (seg.get("combined_text") or "").strip(),
+                        tmp_wav,
+                        api_key=key_row.api_key,
+                        voice=voice,
+                        model=model,
+                        instruction=instruction,
+                    )
+                    in_flight[fut] = (sid, seg, wav_path, key_row, tmp_wav)
+
+                if failure is not None and not in_flight:
+                    break
+
+                if not in_flight:
+                    # Nothing running and no key with budget: wait for the pool like wait_for_available_key.
+                    delay = mgr.seconds_until_any_key_available(exclude_leased=True)
+                    if delay is None:
+                        failure = last_err or "No Gemini TTS API keys available (add or renew keys in Admin)"
+                        break
+                    delay = max(1.0, min(delay, 300.0))
+                    msg = (
+                        f"Gemini TTS rate limit — waiting {delay:.0f}s "
+                        f"(pool RPM={GEMINI_TTS_DEFAULT_RPM}, RPD={GEMINI_TTS_DEFAULT_RPD})"
+                    )
+                    self.logger.info(msg)
+                    _progress(msg)
+                    remaining = delay
+                    while remaining > 0 and not (cancel_check and cancel_check()):
+                        chunk = min(remaining, 5.0)
+                        time.sleep(chunk)
+                        remaining -= chunk
+                    mgr.db.expire_all()
+                    continue
 
-            try:
-                ok = client.generate_tts(
-                    text=text,
-                    output_file=output_wav,
-                    voice=voice,
-                    model=model,
-                    api_key=key_row.api_key,
-                    instruction=instruction,
+                # Wake up periodically while segments wait for a key, so freed budget is used.
+                done, _ = wait(
+                    list(in_flight),
+                    timeout=5.0 if pending and failure is None else None,
+                    return_when=FIRST_COMPLETED,
                 )
-                if ok:
-                    mgr.mark_success(key_row)
-                    return True
-                err = (client.last_tts_error or "TTS returned false").strip()
-                last_err = err
-                if progress_callback:
-                    progress_callback(f"TTS key {key_row.account_name} failed: {err[:200]}")
-                mgr.mark_failure(key_row, err)
-            except Exception as e:
-                err = str(e)
-                last_err = err
-                if progress_callback:
-                    progress_callback(f"TTS key {key_row.account_name} failed: {err[:200]}")
-                mgr.mark_failure(key_row, err)
-
-        self._last_tts_failure = last_err or "All Gemini TTS keys failed"
-        return False
+                for fut in done:
+                    sid, seg, wav_path, key_row, tmp_wav = in_flight.pop(fut)
+                    mgr.release_key(key_row)
+                    err, meta = fut.result()
+                    if err is None and not os.path.isfile(tmp_wav):
+                        err = "TTS reported success but wrote no audio"
+                    if err is None:
+                        mgr.mark_success(key_row)
+                        os.replace(tmp_wav, wav_path)
+                        if meta:
+                            seg_dir = os.path.dirname(wav_path)
+                            index_entries.setdefault(os.path.dirname(seg_dir), {})[
+                                f"{os.path.basename(seg_dir)}/{os.path.basename(wav_path)}"
+                            ] = meta
+                        dur = meta.get("duration_seconds") if meta else wav_duration_seconds(wav_path)
+                        if dur is not None:
+                            est = float(seg.get("estimated_seconds") or 0)
+                            _progress(f"Segment {sid} audio: {dur:.1f}s (estimated {est:.1f}s)")
+                        continue
+
+                    last_err = err
+                    try:
+                        os.remove(tmp_wav)
+                    except OSError:
+                        pass
+                    _progress(f"TTS key {key_row.account_name} failed: {err[:200]}")
+                    mgr.mark_failure(key_row, err)
+                    if attempts[sid] < max_attempts:
+                        pending.appendleft((sid, seg, wav_path))
+                    elif failure is None:
+                        self.logger.error("TTS failed for segment %s: %s", sid, err)
+                        _progress(f"TTS failed for segment {sid}: {err[:300]}")
+                        failure = err
+        finally:
+            pool.shutdown(wait=True)
+            for _sid, _seg, _wav, key_row, tmp_wav in in_flight.values():
+                mgr.release_key(key_row)
+                try:
+                    os.remove(tmp_wav)
+                except OSError:
+                    pass
+            for index_dir, entries in index_entries.items():
+                store_audio_metadata(index_dir, entries)
+
+        if failure is not None:
+            self._last_tts_failure = failure
+            return False
+        return True
 
     def process_voice_class_step2(
         self,
@@ -714,9 +852,17 @@ class StageVoiceProcessor(BaseStageProcessor):
         tts_instruction: Optional[str] = None,
         segment_indices: Optional[List[int]] = None,
         skip_merge: bool = False,
+        tts_concurrency: Optional[int] = None,
         progress_callback: Optional[Callable[[str], None]] = None,
         cancel_check: Optional[Callable[[], bool]] = None,
     ) -> Optional[str]:
+        """TTS every segment of the script into ``tts_segments/`` and merge with intro/outro.
+
+        Segments run concurrently across the Gemini key pool (``tts_concurrency``, default
+        ``GEMINI_TTS_MAX_PARALLEL``, capped by the number of active keys). Existing WAVs are
+        skipped unless ``segment_indices`` is given; the merge always follows segment_id order.
+        """
+
         def _progress(msg: str) -> None:
             if progress_callback:
                 progress_callback(msg)
@@ -762,12 +908,11 @@ class StageVoiceProcessor(BaseStageProcessor):
         )
         # #endregion
 
+        jobs: List[Tuple[int, Dict[str, Any], str]] = []
         for seg in segments:
             sid = int(seg.get("segment_id") or 0)
             if wanted is not None and sid not in wanted:
                 continue
-            if cancel_check and cancel_check():
-                return None
 
             combined = (seg.get("combined_text") or "").strip()
             if not combined:
@@ -783,28 +928,32 @@ class StageVoiceProcessor(BaseStageProcessor):
                         f"Segment {sid} skipped (existing audio: {dur_existing:.1f}s, estimated {est:.1f}s)"
                     )
                     continue
+            jobs.append((sid, seg, wav_path))
 
-            _progress(f"TTS segment {sid}/{len(segments)} ({seg.get('paragraph_count', '?')} paragraphs)...")
+        if cancel_check and cancel_check():
+            return None
 
-            ok = self._generate_tts_with_rotation(
-                combined,
-                wav_path,
-                voice=tts_voice,
-                model=tts_model,
-                instruction=tts_instruction,
-                progress_callback=progress_callback,
-                cancel_check=cancel_check,
-            )
-            if not ok:
-                detail = self._last_tts_failure or "unknown error"
-                self.logger.error("TTS failed for segment %s: %s", sid, detail)
-                _progress(f"TTS failed for segment {sid}: {detail[:300]}")
-                return None
+        if jobs and self._gemini_keys:
+            from webapp.config import GEMINI_TTS_MAX_PARALLEL
 
-            dur = wav_duration_seconds(wav_path)
-            if dur is not None:
-                est = float(seg.get("estimated_seconds") or 0)
-                _progress(f"Segment {sid} audio: {dur:.1f}s (estimated {est:.1f}s)")
+            limit = tts_concurrency if tts_concurrency is not None else GEMINI_TTS_MAX_PARALLEL
+            concurrency = max(1, min(int(limit), len(jobs), self._gemini_keys.active_key_count() or 1))
+            if concurrency > 1:
+                _progress(f"TTS: {len(jobs)} segment(s), up to {concurrency} at a time across the key pool")
+        else:
+            concurrency = 1
+
+        if not self._synthesize_segments(
+            jobs,
+            total_segments=len(segments),
+            voice=tts_voice,
+            model=tts_model,
+            instruction=tts_instruction,
+            concurrency=concurrency,
+            progress_callback=progress_callback,
+            cancel_check=cancel_check,
+        ):
+            return None
 
         if skip_merge:
             return script_json_path
@@ -10,16 +10,23 @@ import json
 import logging
 import math
 import os
-from typing import Optional, Dict, List, Any, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, List, Any, Callable, Tuple
 
 from base_stage_processor import BaseStageProcessor
 from multi_part_processor import MultiPartProcessor
 from api_layer import APIConfig
+from llm_chunk_planner import estimate_tokens
+from old_book_retrieval import OLD_BOOK_NEIGHBOR_MARGIN, OLD_BOOK_TOP_K, OldBookIndex, needs_retrieval
+from prompt_payload import encode_payload
 
 
 class StageXProcessor(BaseStageProcessor):
     """Process Stage X: Detect changes between old book PDF and current Stage A data"""
     
+    # Part 2 change-detection requests in flight at once
+    STAGE_X_PARALLEL_PARTS = 4
+    
     def __init__(self, api_client):
         super().__init__(api_client)
         self.logger = logging.getLogger(__name__)
@@ -38,7 +45,8 @@ class StageXProcessor(BaseStageProcessor):
         
         output_dir: Optional[str] = None,
         progress_callback: Optional[Callable[[str], None]] = None,
-        pdf_extracted_path: Optional[str] = None  # Optional: use pre-extracted PDF JSON
+        pdf_extracted_path: Optional[str] = None,  # Optional: use pre-extracted PDF JSON
+        max_parallel_parts: Optional[int] = None
     ) -> Optional[str]:
         """
         Process Stage X: Detect changes between old book and current data.
@@ -55,6 +63,7 @@ class StageXProcessor(BaseStageProcessor):
             changes_model: Model for change detection
             output_dir: Output directory (defaults to stage_a_path directory)
             progress_callback: Optional callback for progress updates
+            max_parallel_parts: Part 2 parts run concurrently (default STAGE_X_PARALLEL_PARTS)
             
         Returns:
             Path to output file (x{book}{chapter}+{chapter_name}.json) or None on error
@@ -150,68 +159,73 @@ class StageXProcessor(BaseStageProcessor):
             stage_a_parts.append(part_data)
             _progress(f"Part {i+1}: {len(part_data)} records (indices {start_idx} to {end_idx-1})")
         
+        # Large old books: send each part only the old rows that align with its records
+        old_book_index = None
+        if needs_retrieval(pdf_extracted_rows):
+            old_book_index = OldBookIndex(pdf_extracted_rows)
+            _progress(
+                f"Old book is large ({len(pdf_extracted_rows)} rows): each part gets only its matching old rows "
+                f"(top {OLD_BOOK_TOP_K} per record, +/-{OLD_BOOK_NEIGHBOR_MARGIN} neighbours)"
+            )
+        
         all_changes = []
         all_txt_responses = []
         base_name = os.path.splitext(os.path.basename(stage_a_path))[0]
         
-        # Process each part separately
-        for part_num, part_records in enumerate(stage_a_parts, 1):
-            _progress("=" * 60)
-            _progress(f"Processing Part {part_num}/{num_parts} of Stage A for change detection ({len(part_records)} records)...")
-            _progress("=" * 60)
-            
-            part_data = {
-                "current_data": part_records,
-                "old_book_data": pdf_extracted_rows
-            }
-            part_text = json.dumps(part_data, ensure_ascii=False, indent=2)
-            
-            part_response = self.api_client.process_text(
-                text=part_text,
-                system_prompt=changes_prompt,
-                model_name=changes_model
-            )
+        # Parts run concurrently; each part's TXT and JSON are saved as soon as it finishes,
+        # and results are merged in part order.
+        workers = max_parallel_parts if max_parallel_parts is not None else self.STAGE_X_PARALLEL_PARTS
+        workers = max(1, min(workers, num_parts)) if num_parts else 1
+        _progress(f"Running {num_parts} part(s) with up to {workers} in parallel")
+        part_results: Dict[int, Tuple[Optional[str], List[Any]]] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_part = {}
+            for part_num, part_records in enumerate(stage_a_parts, 1):
+                if old_book_index is not None:
+                    old_rows = old_book_index.rows_for(part_records)
+                    if not old_rows:
+                        # Nothing matched (e.g. a different script or numbering only): fall back to the whole book
+                        old_rows = pdf_extracted_rows
+                else:
+                    old_rows = pdf_extracted_rows
+                part_data = {
+                    "current_data": part_records,
+                    "old_book_data": old_rows
+                }
+                part_text = encode_payload(part_data, stage="stage_x", label=f"part {part_num}")
+                _progress(
+                    f"Part {part_num}: {len(part_records)} records, {len(old_rows)}/{len(pdf_extracted_rows)} "
+                    f"old-book rows in context, {len(part_text)} chars (~{estimate_tokens(part_text)} tokens)"
+                )
+                fut = executor.submit(
+                    self._detect_part_changes,
+                    part_num,
+                    part_text,
+                    changes_prompt,
+                    changes_model,
+                    output_dir,
+                    base_name,
+                )
+                future_to_part[fut] = part_num
             
-            if part_response:
-                # Save Part TXT
-                txt_path = os.path.join(output_dir, f"{base_name}_stage_x_part2_part{part_num}.txt")
+            for fut in as_completed(future_to_part):
+                part_num = future_to_part[fut]
                 try:
-                    with open(txt_path, 'w', encoding='utf-8') as f:
-                        f.write(f"=== STAGE X PART 2 - PART {part_num} (Change Detection) RESPONSE ===\n\n")
-                        f.write(part_response)
-                    _progress(f"Saved Part {part_num} raw response to: {os.path.basename(txt_path)}")
-                    self.logger.info(f"Saved Stage X Part 2 Part {part_num} raw response to: {txt_path}")
+                    part_results[part_num] = fut.result()
                 except Exception as e:
-                    self.logger.warning(f"Failed to save Part {part_num} TXT: {e}")
-                
-                all_txt_responses.append(part_response)
-                
-                # Extract JSON from Part
-                _progress(f"Extracting JSON from Part {part_num} response...")
-                part_json = self.extract_json_from_response(part_response)
-                if not part_json:
-                    _progress(f"Trying to extract Part {part_num} JSON from text using fallback...")
-                    part_json = self.load_txt_as_json_from_text(part_response)
-                if not part_json:
-                    _progress(f"Trying to load Part {part_num} JSON from TXT file...")
-                    part_json = self.load_txt_as_json(txt_path)
-                
-                if part_json:
-                    # Handle both list and dict JSON structures
-                    if isinstance(part_json, list):
-                        all_changes.extend(part_json)
-                        _progress(f"Part {part_num}: Extracted {len(part_json)} changes")
-                    elif isinstance(part_json, dict):
-                        changes = part_json.get("changes", part_json.get("data", []))
-                        if isinstance(changes, list):
-                            all_changes.extend(changes)
-                            _progress(f"Part {part_num}: Extracted {len(changes)} changes")
-                        else:
-                            all_changes.append(part_json)
-                            _progress(f"Part {part_num}: Extracted 1 change")
-            else:
-                self.logger.warning(f"Part {part_num} returned no response")
-                _progress(f"Warning: Part {part_num} returned no response. Continuing...")
+                    self.logger.exception(f"Part {part_num} failed: {e}")
+                    part_results[part_num] = (None, [])
+                response, changes = part_results[part_num]
+                if response is None:
+                    _progress(f"Warning: Part {part_num} returned no response. Continuing...")
+                else:
+                    _progress(f"Part {part_num}/{num_parts} done: {len(changes)} change(s)")
+        
+        for part_num in sorted(part_results):
+            response, changes = part_results[part_num]
+            if response is not None:
+                all_txt_responses.append(response)
+            all_changes.extend(changes)
         
         # Save combined TXT file
         combined_txt_path = os.path.join(output_dir, f"{base_name}_stage_x_part2_all_parts.txt")
@@ -278,6 +292,8 @@ class StageXProcessor(BaseStageProcessor):
                 }
                 validated_changes.append(validated_change)
         
+        # Neighbouring parts may both report a change near their boundary: keep the first
+        validated_changes = self._dedupe_changes(validated_changes)
         _progress(f"Total validated changes: {len(validated_changes)}")
         
         # Extract chapter name from Stage A metadata or filename
@@ -362,10 +378,89 @@ class StageXProcessor(BaseStageProcessor):
             self.logger.error("Failed to save Stage X output")
             return None
         
-        _progress(f"Stage X completed: {output_filename}")
+        _progress(f"Stage X completed: {os.path.basename(output_path)}")
         
         return output_path
     
+    def _detect_part_changes(
+        self,
+        part_num: int,
+        part_text: str,
+        changes_prompt: str,
+        changes_model: str,
+        output_dir: str,
+        base_name: str,
+    ) -> Tuple[Optional[str], List[Any]]:
+        """
+        Run change detection for one part of Stage A (``part_text`` is its serialized prompt input).
+        
+        Saves the raw response ({base}_stage_x_part2_part{N}.txt) and the parsed changes
+        ({base}_stage_x_part2_part{N}.json) as soon as the part finishes.
+        
+        Returns:
+            (raw response or None, list of changes extracted from it)
+        """
+        part_response = self.api_client.process_text(
+            text=part_text,
+            system_prompt=changes_prompt,
+            model_name=changes_model
+        )
+        if not part_response:
+            self.logger.warning(f"Part {part_num} returned no response")
+            return None, []
+        
+        txt_path = os.path.join(output_dir, f"{base_name}_stage_x_part2_part{part_num}.txt")
+        try:
+            with open(txt_path, 'w', encoding='utf-8') as f:
+                f.write(f"=== STAGE X PART 2 - PART {part_num} (Change Detection) RESPONSE ===\n\n")
+                f.write(part_response)
+            self.logger.info(f"Saved Stage X Part 2 Part {part_num} raw response to: {txt_path}")
+        except Exception as e:
+            self.logger.warning(f"Failed to save Part {part_num} TXT: {e}")
+        
+        part_json = self.extract_json_from_response(part_response)
+        if not part_json:
+            part_json = self.load_txt_as_json_from_text(part_response)
+        if not part_json:
+            part_json = self.load_txt_as_json(txt_path)
+        
+        # Handle both list and dict JSON structures
+        changes: List[Any] = []
+        if isinstance(part_json, list):
+            changes = part_json
+        elif isinstance(part_json, dict):
+            found = part_json.get("changes", part_json.get("data", []))
+            changes = found if isinstance(found, list) else [part_json]
+        if not part_json:
+            self.logger.warning(f"Part {part_num}: no JSON found in response")
+            return part_response, changes
+        
+        json_path = os.path.join(output_dir, f"{base_name}_stage_x_part2_part{part_num}.json")
+        try:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(changes, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Failed to save Part {part_num} JSON: {e}")
+        return part_response, changes
+    
+    @staticmethod
+    def _dedupe_changes(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop repeated changes (same POINTID, description and type), keeping the first."""
+        seen = set()
+        unique = []
+        for change in changes:
+            # The validation loop leaves a falsy POINTID (e.g. 0) unconverted
+            key = (
+                str(change.get("POINTID", "")).strip(),
+                " ".join(str(change.get("Change Description", "")).split()),
+                str(change.get("Change Type", "")).strip().lower(),
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(change)
+        return unique
+    
     def _extract_pdf_with_txt_saving(
         self,
         pdf_path: str,
@@ -9,15 +9,21 @@ Step 2: Compare OCR Extraction JSON with extracted PDF and detect deletions
 import json
 import logging
 import os
-from typing import Optional, Dict, List, Any, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, List, Any, Callable, Tuple
 
 from base_stage_processor import BaseStageProcessor
 from api_layer import APIConfig
+from old_book_retrieval import OldBookIndex, partition_rows
+from prompt_payload import encode_payload
 
 
 class StageYProcessor(BaseStageProcessor):
     """Process Stage Y: Detect deleted content"""
     
+    # Step 2 deletion-detection shards (one per subchapter) in flight at once
+    STAGE_Y_PARALLEL_SHARDS = 4
+    
     def __init__(self, api_client):
         super().__init__(api_client)
         self.logger = logging.getLogger(__name__)
@@ -32,7 +38,8 @@ class StageYProcessor(BaseStageProcessor):
         deletion_detection_model: str,  # Model for deletion detection
         output_dir: Optional[str] = None,
         progress_callback: Optional[Callable[[str], None]] = None,
-        step1_output_path: Optional[str] = None  # Optional: use pre-extracted Step 1 output
+        step1_output_path: Optional[str] = None,  # Optional: use pre-extracted Step 1 output
+        max_parallel_shards: Optional[int] = None  # Step 2 shards in flight (default STAGE_Y_PARALLEL_SHARDS)
     ) -> Optional[str]:
         """
         Process Stage Y: Detect deleted content.
@@ -118,7 +125,8 @@ class StageYProcessor(BaseStageProcessor):
             output_dir=output_dir,
             book_id=book_id,
             chapter_id=chapter_id,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            max_parallel_shards=max_parallel_shards
         )
         
         if not step2_output:
@@ -310,11 +318,15 @@ class StageYProcessor(BaseStageProcessor):
         output_dir: str,
         book_id: int,
         chapter_id: int,
-        progress_callback: Optional[Callable[[str], None]] = None
+        progress_callback: Optional[Callable[[str], None]] = None,
+        max_parallel_shards: Optional[int] = None
     ) -> Optional[str]:
         """
         Step 2: Detect deletions by comparing OCR Extraction JSON with Step 1 output.
         
+        The comparison is sharded per subchapter; each shard gets the stretch of the old book
+        that aligns with it (old_book_retrieval.partition_rows) and shards run concurrently.
+        
         Args:
             step1_output_path: Path to Step 1 output JSON
             ocr_extraction_json_path: Path to OCR Extraction JSON
@@ -324,6 +336,7 @@ class StageYProcessor(BaseStageProcessor):
             book_id: Book ID
             chapter_id: Chapter ID
             progress_callback: Optional progress callback
+            max_parallel_shards: Shards in flight at once (default STAGE_Y_PARALLEL_SHARDS)
             
         Returns:
             Path to output JSON file or None on error
@@ -355,59 +368,85 @@ class StageYProcessor(BaseStageProcessor):
         
         _progress(f"Loaded {len(ocr_extraction_records)} records from OCR Extraction JSON")
         
-        # Prepare data for model
-        comparison_data = {
-            "current_data": ocr_extraction_records,
-            "old_book_data": pdf_extracted_rows
-        }
-        comparison_text = json.dumps(comparison_data, ensure_ascii=False, indent=2)
-        
-        # Call model
-        _progress("Calling model for deletion detection...")
-        response = self.api_client.process_text(
-            text=comparison_text,
-            system_prompt=prompt,
-            model_name=model_name
-        )
-        
-        if not response:
-            self.logger.error("Model returned no response")
-            return None
+        # Shard by subchapter: each shard gets its own stretch of the old book and runs concurrently
+        shards = self._subchapter_shards(ocr_extraction_records)
+        old_parts = None
+        if len(shards) > 1:
+            old_parts = partition_rows(OldBookIndex(pdf_extracted_rows), [recs for _, recs in shards])
+        if old_parts is None:
+            shard_inputs = [("", ocr_extraction_records, pdf_extracted_rows)]
+        else:
+            shard_inputs = [
+                (label, recs, [pdf_extracted_rows[i] for i in part])
+                for (label, recs), part in zip(shards, old_parts)
+            ]
         
-        # Save raw response
         base_name = os.path.splitext(os.path.basename(ocr_extraction_json_path))[0]
-        txt_path = os.path.join(output_dir, f"{base_name}_stage_y_step2.txt")
-        try:
-            with open(txt_path, 'w', encoding='utf-8') as f:
-                f.write("=== STAGE Y - STEP 2 (Deletion Detection) RESPONSE ===\n\n")
-                f.write(response)
-            _progress(f"Saved Step 2 raw response to: {os.path.basename(txt_path)}")
-        except Exception as e:
-            self.logger.warning(f"Failed to save Step 2 TXT: {e}")
-        
-        # Extract JSON from response
-        _progress("Extracting JSON from Step 2 response...")
-        deletions_json = self.extract_json_from_response(response)
-        if not deletions_json:
-            _progress("Trying to extract JSON from text using fallback...")
-            deletions_json = self.load_txt_as_json_from_text(response)
-        if not deletions_json:
-            _progress("Trying to load JSON from TXT file...")
-            deletions_json = self.load_txt_as_json(txt_path)
-        
-        if not deletions_json:
-            self.logger.error("Failed to extract JSON from model response")
+        sharded = len(shard_inputs) > 1
+        workers = max_parallel_shards if max_parallel_shards is not None else self.STAGE_Y_PARALLEL_SHARDS
+        workers = max(1, min(workers, len(shard_inputs)))
+        if sharded:
+            _progress(f"Deletion detection split into {len(shard_inputs)} subchapter shard(s), up to {workers} in parallel")
+        
+        shard_results: Dict[int, Tuple[Optional[str], Optional[List[Any]]]] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_shard = {}
+            for shard_num, (label, recs, old_rows) in enumerate(shard_inputs, 1):
+                if sharded and not old_rows:
+                    # No old-book rows were assigned to this subchapter: nothing to compare
+                    shard_results[shard_num] = ("", [])
+                    continue
+                comparison_data = {
+                    "current_data": recs,
+                    "old_book_data": old_rows
+                }
+                comparison_text = encode_payload(comparison_data, stage="stage_y", label=f"shard {shard_num}")
+                _progress(
+                    f"Shard {shard_num}{f' ({label})' if label else ''}: {len(old_rows)}/{len(pdf_extracted_rows)} "
+                    f"old-book rows, {len(comparison_text)} chars"
+                )
+                suffix = f"_shard{shard_num}" if sharded else ""
+                fut = executor.submit(
+                    self._detect_shard_deletions,
+                    comparison_text,
+                    prompt,
+                    model_name,
+                    os.path.join(output_dir, f"{base_name}_stage_y_step2{suffix}.txt"),
+                    os.path.join(output_dir, f"{base_name}_stage_y_step2{suffix}.json") if sharded else None,
+                )
+                future_to_shard[fut] = shard_num
+            
+            for fut in as_completed(future_to_shard):
+                shard_num = future_to_shard[fut]
+                try:
+                    shard_results[shard_num] = fut.result()
+                except Exception as e:
+                    self.logger.exception(f"Deletion detection shard {shard_num} failed: {e}")
+                    shard_results[shard_num] = (None, None)
+                deletions = shard_results[shard_num][1]
+                if deletions is not None:
+                    _progress(f"Shard {shard_num}/{len(shard_inputs)} done: {len(deletions)} deletion(s)")
+        
+        failed = [n for n, (response, deletions) in sorted(shard_results.items()) if deletions is None]
+        if failed:
+            self.logger.error(f"Deletion detection returned no usable JSON for shard(s) {failed}")
             return None
         
-        # Extract deletions list
-        if isinstance(deletions_json, list):
-            all_deletions = deletions_json
-        elif isinstance(deletions_json, dict):
-            all_deletions = deletions_json.get("deletions", deletions_json.get("data", []))
-            if not isinstance(all_deletions, list):
-                all_deletions = [deletions_json]
-        else:
-            all_deletions = [deletions_json]
+        if sharded:
+            # Combined raw responses, in shard order, under the unsharded file name
+            txt_path = os.path.join(output_dir, f"{base_name}_stage_y_step2.txt")
+            try:
+                with open(txt_path, 'w', encoding='utf-8') as f:
+                    for shard_num in sorted(shard_results):
+                        f.write(f"=== STAGE Y - STEP 2 (Deletion Detection) SHARD {shard_num} RESPONSE ===\n\n")
+                        f.write(shard_results[shard_num][0] or "")
+                        f.write("\n\n")
+            except Exception as e:
+                self.logger.warning(f"Failed to save combined Step 2 TXT: {e}")
+        
+        all_deletions = []
+        for shard_num in sorted(shard_results):
+            all_deletions.extend(shard_results[shard_num][1])
         
         if not all_deletions:
             self.logger.error("No deletions found in model response")
@@ -415,7 +454,8 @@ class StageYProcessor(BaseStageProcessor):
         
         # Validate structure: should have Number and Sentence
         validated_deletions = []
-        for idx, deletion in enumerate(all_deletions, start=1):
+        seen_sentences = set()
+        for deletion in all_deletions:
             if isinstance(deletion, dict):
                 # Extract Sentence from model response
                 sentence = None
@@ -428,9 +468,15 @@ class StageYProcessor(BaseStageProcessor):
                 else:
                     sentence = str(sentence)
                 
+                # A sentence reported more than once (e.g. by two shards) is kept once
+                sentence_key = " ".join(sentence.split())
+                if sentence_key and sentence_key in seen_sentences:
+                    continue
+                seen_sentences.add(sentence_key)
+                
                 # Auto-assign Number sequentially
                 validated_deletion = {
-                    "Number": str(idx),
+                    "Number": str(len(validated_deletions) + 1),
                     "Sentence": sentence
                 }
                 validated_deletions.append(validated_deletion)
@@ -519,9 +565,95 @@ class StageYProcessor(BaseStageProcessor):
             self.logger.error("Failed to save Stage Y output")
             return None
         
-        _progress(f"Stage Y completed: {output_filename}")
+        _progress(f"Stage Y completed: {os.path.basename(output_path)}")
         return output_path
     
+    def _detect_shard_deletions(
+        self,
+        comparison_text: str,
+        prompt: str,
+        model_name: str,
+        txt_path: str,
+        json_path: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[List[Any]]]:
+        """
+        Run deletion detection for one shard, saving its raw response to ``txt_path`` (and the
+        parsed deletions to ``json_path``) as soon as it finishes.
+        
+        Returns:
+            (raw response, deletions); deletions is None when no JSON could be extracted
+        """
+        response = self.api_client.process_text(
+            text=comparison_text,
+            system_prompt=prompt,
+            model_name=model_name
+        )
+        if not response:
+            self.logger.error(f"Model returned no response ({os.path.basename(txt_path)})")
+            return None, None
+        
+        try:
+            with open(txt_path, 'w', encoding='utf-8') as f:
+                f.write("=== STAGE Y - STEP 2 (Deletion Detection) RESPONSE ===\n\n")
+                f.write(response)
+            self.logger.info(f"Saved Step 2 raw response to: {txt_path}")
+        except Exception as e:
+            self.logger.warning(f"Failed to save Step 2 TXT: {e}")
+        
+        deletions_json = self.extract_json_from_response(response)
+        if not deletions_json:
+            deletions_json = self.load_txt_as_json_from_text(response)
+        if not deletions_json:
+            deletions_json = self.load_txt_as_json(txt_path)
+        if not deletions_json and deletions_json != []:
+            self.logger.error(f"Failed to extract JSON from model response ({os.path.basename(txt_path)})")
+            return response, None
+        
+        # Extract deletions list
+        if isinstance(deletions_json, list):
+            deletions = deletions_json
+        elif isinstance(deletions_json, dict):
+            deletions = deletions_json.get("deletions", deletions_json.get("data", []))
+            if not isinstance(deletions, list):
+                deletions = [deletions_json]
+        else:
+            deletions = [deletions_json]
+        
+        if json_path:
+            try:
+                with open(json_path, 'w', encoding='utf-8') as f:
+                    json.dump(deletions, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                self.logger.warning(f"Failed to save Step 2 JSON: {e}")
+        return response, deletions
+    
+    @staticmethod
+    def _subchapter_shards(records: List[Any]) -> List[Tuple[str, List[Any]]]:
+        """
+        Split OCR Extraction records by subchapter, in document order.
+        
+        Chapter records ({"chapter", "subchapters": [...]}) give one shard per subchapter,
+        each a copy of the chapter holding just that subchapter; flat rows are grouped by
+        their "subchapter" field.
+        """
+        shards: List[Tuple[str, List[Any]]] = []
+        flat: Dict[str, List[Any]] = {}
+        for record in records:
+            subs = record.get("subchapters") if isinstance(record, dict) else None
+            if isinstance(subs, list) and subs:
+                for sub in subs:
+                    label = str((sub.get("subchapter") if isinstance(sub, dict) else "") or "").strip()
+                    shard_record = {k: v for k, v in record.items() if k != "subchapters"}
+                    shard_record["subchapters"] = [sub]
+                    shards.append((label, [shard_record]))
+                continue
+            label = str((record.get("subchapter") if isinstance(record, dict) else "") or "").strip()
+            if label not in flat:
+                flat[label] = []
+                shards.append((label, flat[label]))
+            flat[label].append(record)
+        return shards
+    
     def _process_part(
         self,
         pdf_file,
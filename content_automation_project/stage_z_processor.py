@@ -10,6 +10,7 @@ from typing import Optional, Dict, List, Any, Callable
 
 from base_stage_processor import BaseStageProcessor
 from api_layer import APIConfig
+from prompt_payload import encode_payload
 
 
 class StageZProcessor(BaseStageProcessor):
@@ -110,7 +111,7 @@ class StageZProcessor(BaseStageProcessor):
             "deletions": stage_y_deletions
         }
         
-        richtext_text = json.dumps(richtext_data, ensure_ascii=False, indent=2)
+        richtext_text = encode_payload(richtext_data, stage="stage_z")
         
         # Call model for RichText generation
         _progress("Calling model for RichText generation...")
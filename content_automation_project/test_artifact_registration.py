@@ -0,0 +1,80 @@
+"""Tests for incremental artifact registration (webapp.job_files) and deferred hashing."""
+
+import hashlib
+import os
+import unittest
+
+from webapp.artifact_hashing import wait_for_artifact_hashes
+from webapp.job_files import register_artifacts_under
+from webapp.models import Artifact
+from webapp_test_db import make_job_database
+
+
+class TestRegisterArtifactsUnder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp, self.engine, self.Session = make_job_database(self, "artifact_reg_", job_type="voice_class")
+        self.base = os.path.join(self.tmp, "job-1")
+        self.out = os.path.join(self.base, "pair_0", "output")
+        os.makedirs(os.path.join(self.out, "tts_segments"))
+
+    def tearDown(self) -> None:
+        wait_for_artifact_hashes()
+
+    def _write(self, rel: str, data: bytes) -> None:
+        with open(os.path.join(self.out, rel), "wb") as f:
+            f.write(data)
+
+    def _register(self) -> None:
+        db = self.Session()
+        try:
+            register_artifacts_under(db, "job-1", 0, self.base, "pair_0/output")
+        finally:
+            db.close()
+        wait_for_artifact_hashes()
+
+    def _rows(self):
+        db = self.Session()
+        try:
+            return {a.rel_path: (a.id, a.role, a.byte_size, a.sha256) for a in db.query(Artifact)}
+        finally:
+            db.close()
+
+    def test_registers_new_files_and_hashes_in_background(self) -> None:
+        self._write("tts_segments/segment_0001.wav", b"RIFF0001")
+        self._write("notes.txt", b"hello")
+        self._register()
+        rows = self._rows()
+        self.assertEqual(
+            rows["pair_0/output/tts_segments/segment_0001.wav"][1:],
+            ("tts_segment", 8, hashlib.sha256(b"RIFF0001").hexdigest()),
+        )
+        self.assertEqual(rows["pair_0/output/notes.txt"][1], "txt_dump")
+
+    def test_only_changed_files_are_updated(self) -> None:
+        self._write("notes.txt", b"hello")
+        self._write("keep.json", b"{}")
+        self._register()
+        before = self._rows()
+
+        self._write("notes.txt", b"hello, world")
+        self._register()
+        after = self._rows()
+
+        self.assertEqual(after["pair_0/output/keep.json"], before["pair_0/output/keep.json"])
+        notes = after["pair_0/output/notes.txt"]
+        self.assertEqual(notes[0], before["pair_0/output/notes.txt"][0])
+        self.assertEqual(notes[2:], (12, hashlib.sha256(b"hello, world").hexdigest()))
+        self.assertEqual(len(after), 2)
+
+    def test_rows_outside_the_scanned_dir_are_left_alone(self) -> None:
+        db = self.Session()
+        db.add(Artifact(job_id="job-1", pair_index=0, rel_path="pair_0/inputs/a.docx", role="upload_word", byte_size=1))
+        db.commit()
+        db.close()
+        self._write("notes.txt", b"x")
+        self._register()
+        self.assertEqual(sorted(self._rows()), ["pair_0/inputs/a.docx", "pair_0/output/notes.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
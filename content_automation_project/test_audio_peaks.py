@@ -0,0 +1,80 @@
+"""Tests for vectorized waveform peaks and the per-hash peaks cache (webapp.audio_peaks)."""
+
+import math
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import wave
+from unittest import mock
+
+from webapp import audio_peaks
+from webapp.audio_merge import analyze_audio_for_preview
+from webapp.audio_peaks import peak_summary
+
+
+def _write_wav(path: str, samples, rate: int = 24000, channels: int = 1) -> None:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+class TestAudioPeaks(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp(prefix="audio_peaks_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.cache = os.path.join(self.tmp, "cache")
+        p = mock.patch("webapp.config.AUDIO_PEAKS_CACHE_DIR", self.cache)
+        p.start()
+        self.addCleanup(p.stop)
+        with audio_peaks._memo_lock:
+            audio_peaks._memo.clear()
+
+    def test_peaks_and_stats_match_a_per_sample_reference(self) -> None:
+        # 2 s at 8 kHz: a sine whose amplitude ramps up, so every bar has a different peak.
+        n = 16000
+        samples = [int(30000 * (i / n) * math.sin(i / 7.0)) for i in range(n)]
+        path = os.path.join(self.tmp, "ramp.wav")
+        _write_wav(path, samples, rate=8000)
+
+        bar_count = 50
+        per_bar = n // bar_count
+        ref = [max(abs(s) for s in samples[b * per_bar : (b + 1) * per_bar]) for b in range(bar_count)]
+        ref = [round(v / max(ref), 4) for v in ref]
+
+        preview = analyze_audio_for_preview(path, bar_count=bar_count)
+        self.assertEqual(preview["duration_seconds"], 2.0)
+        self.assertFalse(preview["is_silent"])
+        self.assertAlmostEqual(preview["max_amplitude"], max(abs(s) for s in samples) / 32768.0, places=4)
+        for got, want in zip(preview["waveform_peaks"], ref):
+            self.assertAlmostEqual(got, want, delta=0.03)
+
+    def test_silence_and_stereo_downmix(self) -> None:
+        path = os.path.join(self.tmp, "silent.wav")
+        _write_wav(path, [5, -5] * 24000, channels=2)
+        preview = analyze_audio_for_preview(path)
+        self.assertTrue(preview["is_silent"])
+        self.assertAlmostEqual(preview["duration_seconds"], 1.0)
+        self.assertEqual(len(preview["waveform_peaks"]), 80)
+
+    def test_summary_is_cached_per_file_hash(self) -> None:
+        a = os.path.join(self.tmp, "a.wav")
+        _write_wav(a, [1000, -2000, 3000] * 4000)
+        first = peak_summary(a)
+        self.assertTrue(any(f.endswith(".npz") for _, _, fs in os.walk(self.cache) for f in fs))
+
+        with audio_peaks._memo_lock:
+            audio_peaks._memo.clear()
+        b = os.path.join(self.tmp, "renamed_copy.wav")
+        shutil.copyfile(a, b)
+        with mock.patch.object(audio_peaks, "_compute_summary", side_effect=AssertionError("decoded again")):
+            again = peak_summary(b)
+        self.assertEqual(again.sample_count, first.sample_count)
+        self.assertEqual(again.peaks(80), first.peaks(80))
+
+
+if __name__ == "__main__":
+    unittest.main()
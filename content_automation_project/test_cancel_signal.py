@@ -0,0 +1,74 @@
+"""Tests for cached job stop checks (webapp.cancel_signal)."""
+
+import unittest
+from unittest import mock
+
+from sqlalchemy import event
+
+from webapp import cancel_signal
+from webapp.cancel_signal import clear_cancel, forgets_cancel_flag, is_cancel_requested, request_cancel
+from webapp.models import Job
+from webapp_test_db import make_job_database
+
+
+class TestCancelSignal(unittest.TestCase):
+    def setUp(self) -> None:
+        _tmp, self.engine, self.Session = make_job_database(self, "cancel_signal_", job_id="job-c")
+        self.reads = 0
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, params, context, executemany) -> None:
+            if statement.lstrip().upper().startswith("SELECT") and "cancel_requested" in statement:
+                self.reads += 1
+
+        patches = [
+            mock.patch("webapp.config.RUN_TASKS_INLINE", True),
+            mock.patch.object(cancel_signal, "CANCEL_REFRESH_SECONDS", 60.0),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        clear_cancel("job-c")
+
+    def tearDown(self) -> None:
+        clear_cancel("job-c")
+
+    def _set_db_flag(self, value: bool) -> None:
+        db = self.Session()
+        db.query(Job).filter(Job.id == "job-c").update({"cancel_requested": value})
+        db.commit()
+        db.close()
+
+    def test_checks_are_cached_between_refreshes(self) -> None:
+        for _ in range(500):
+            self.assertFalse(is_cancel_requested("job-c", self.engine))
+        self.assertEqual(self.reads, 1)
+        self._set_db_flag(True)
+        self.assertFalse(is_cancel_requested("job-c", self.engine))
+        with mock.patch.object(cancel_signal, "CANCEL_REFRESH_SECONDS", 0.0):
+            self.assertTrue(is_cancel_requested("job-c", self.engine))
+
+    def test_request_and_clear_take_effect_without_db_read(self) -> None:
+        self.assertFalse(is_cancel_requested("job-c", self.engine))
+        self._set_db_flag(True)
+        request_cancel("job-c")
+        self.assertTrue(is_cancel_requested("job-c", self.engine))
+        self._set_db_flag(False)
+        clear_cancel("job-c")
+        self.assertFalse(is_cancel_requested("job-c", self.engine))
+        self.assertEqual(self.reads, 2)
+
+    def test_runner_wrapper_forgets_the_job_even_on_error(self) -> None:
+        @forgets_cancel_flag
+        def runner(job_id: str) -> None:
+            self.assertFalse(is_cancel_requested(job_id, self.engine))
+            self.assertIn(job_id, cancel_signal._flags)
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            runner("job-c")
+        self.assertNotIn("job-c", cancel_signal._flags)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Tests for per-chunk checkpoints and resume in chunked LLM stages."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from chunk_checkpoint import ChunkCheckpointStore
+from stage_h_processor import StageHProcessor
+
+
+class _FlashcardClient:
+    """Answers every chunk except PointIds listed in ``fail_pids``."""
+
+    def __init__(self, fail_pids=()):
+        self.fail_pids = set(fail_pids)
+        self.calls = []
+
+    def process_text(self, text, **kwargs):
+        pids = [seg.split('"')[0] for seg in text.split('"PointId":"')[1:]]
+        self.calls.append(pids)
+        if self.fail_pids & set(pids):
+            return ""
+        rows = ",".join(f'{{"PointId":"{p}","Qtext":"q{p}","Correct":"1"}}' for p in pids)
+        return f'{{"data":[{rows}]}}'
+
+
+class TestChunkCheckpointStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp(prefix="chunk_ckpt_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def test_key_covers_input_prompt_and_model(self) -> None:
+        base = ChunkCheckpointStore.chunk_key({"rows": [1]}, "p", "m")
+        self.assertEqual(base, ChunkCheckpointStore.chunk_key({"rows": [1]}, "p", "m"))
+        self.assertNotEqual(base, ChunkCheckpointStore.chunk_key({"rows": [2]}, "p", "m"))
+        self.assertNotEqual(base, ChunkCheckpointStore.chunk_key({"rows": [1]}, "p2", "m"))
+        self.assertNotEqual(base, ChunkCheckpointStore.chunk_key({"rows": [1]}, "p", "m2"))
+
+    def test_get_or_run_persists_success_only(self) -> None:
+        store = ChunkCheckpointStore(os.path.join(self.tmp, "ckpt"))
+        self.assertIsNone(store.get_or_run("a", lambda: None))
+        self.assertEqual(store.get_or_run("b", lambda: [{"x": 1}]), [{"x": 1}])
+        again = ChunkCheckpointStore(store.root_dir)
+        self.assertEqual(again.get_or_run("b", lambda: self.fail("should not run")), [{"x": 1}])
+        self.assertEqual(again.restored, 1)
+        with open(os.path.join(store.root_dir, "c.json"), "w", encoding="utf-8") as f:
+            f.write('{"rows": [')
+        self.assertIsNone(again.load("c"))
+        again.clear()
+        self.assertFalse(os.path.exists(store.root_dir))
+
+
+class TestFlashcardResume(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp(prefix="stage_h_resume_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        rows = [
+            {"PointId": f"001002{i:04d}", "chapter": "C", "subchapter": "S", "topic": "T", "Points": f"point {i}"}
+            for i in range(1, 7)
+        ]
+        self.tagged = os.path.join(self.tmp, "a001002.json")
+        with open(self.tagged, "w", encoding="utf-8") as f:
+            json.dump({"metadata": {"chapter": "C"}, "data": rows}, f)
+        self.catalog = os.path.join(self.tmp, "f001002.json")
+        with open(self.catalog, "w", encoding="utf-8") as f:
+            json.dump({"data": [{"image": "x.png"}]}, f)
+        self.ckpt = os.path.join(self.tmp, ".chunk_checkpoints")
+        self.out_dir = os.path.join(self.tmp, "out")
+        os.makedirs(self.out_dir)
+
+    def _run(self, client):
+        return StageHProcessor(client).process_stage_h_web_two_json(
+            self.tagged,
+            self.catalog,
+            "prompt",
+            "m",
+            output_dir=self.out_dir,
+            chunk_size=2,
+            max_parallel_chunks=1,
+            checkpoint_dir=self.ckpt,
+        )
+
+    def test_rerun_only_calls_failed_chunk(self) -> None:
+        first = _FlashcardClient(fail_pids={"0010020003"})
+        self.assertIsNone(self._run(first))
+        self.assertEqual(len(os.listdir(self.ckpt)), 2)
+
+        second = _FlashcardClient()
+        out = self._run(second)
+        self.assertTrue(out and os.path.isfile(out))
+        self.assertEqual(second.calls, [["0010020003", "0010020004"]])
+        self.assertFalse(os.path.exists(self.ckpt))
+        with open(out, encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertEqual(sum(1 for r in saved["data"] if r.get("Qtext")), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
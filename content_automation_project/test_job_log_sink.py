@@ -0,0 +1,75 @@
+"""Tests for buffered job log writes (webapp.job_log_sink)."""
+
+import threading
+import unittest
+from unittest import mock
+
+from webapp import job_log_sink as sink_mod
+from webapp.job_files import append_log
+from webapp.job_log_sink import flush_job_logs, job_log_sink
+from webapp.models import JobLogLine
+from webapp_test_db import make_job_database
+
+
+class TestJobLogSink(unittest.TestCase):
+    def setUp(self) -> None:
+        _tmp, self.engine, self.Session = make_job_database(self, "job_log_sink_")
+
+    def tearDown(self) -> None:
+        flush_job_logs()
+        with sink_mod._lock:
+            for key in [k for k in sink_mod._sinks if k[0] is self.engine]:
+                del sink_mod._sinks[key]
+
+    def _rows(self):
+        db = self.Session()
+        try:
+            return [(r.seq, r.line, r.pair_index) for r in db.query(JobLogLine).order_by(JobLogLine.seq)]
+        finally:
+            db.close()
+
+    def test_threaded_writes_batch_into_few_inserts(self) -> None:
+        sink = job_log_sink("job-1", self.engine)
+
+        def worker(pair_index: int) -> None:
+            for i in range(50):
+                sink.write(f"p{pair_index} line {i}", pair_index)
+
+        with mock.patch.object(sink_mod, "LOG_FLUSH_LINES", 10_000):
+            threads = [threading.Thread(target=worker, args=(p,)) for p in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            flush_job_logs("job-1")
+
+        rows = self._rows()
+        self.assertEqual([r[0] for r in rows], list(range(1, 201)))
+        for p in range(4):
+            self.assertEqual([r[1] for r in rows if r[2] == p], [f"p{p} line {i}" for i in range(50)])
+        self.assertLessEqual(sink.batches_written, 20)
+
+    def test_seq_block_follows_lines_from_other_writers(self) -> None:
+        db = self.Session()
+        append_log(db, "job-1", "first", None)
+        flush_job_logs("job-1")
+        db.add(JobLogLine(job_id="job-1", seq=2, line="other process", pair_index=None))
+        db.commit()
+        append_log(db, "job-1", "second", 0)
+        append_log(db, "job-1", "third", 0)
+        db.close()
+        flush_job_logs("job-1")
+        self.assertEqual([r[:2] for r in self._rows()], [(1, "first"), (2, "other process"), (3, "second"), (4, "third")])
+
+    def test_failed_batch_is_retried(self) -> None:
+        sink = job_log_sink("job-1", self.engine)
+        sink.write("kept", None)
+        with mock.patch.object(sink_mod, "Session", side_effect=RuntimeError("db down")):
+            flush_job_logs("job-1")
+        self.assertEqual(sink.pending(), 1)
+        flush_job_logs("job-1")
+        self.assertEqual([r[1] for r in self._rows()], ["kept"])
+
+
+if __name__ == "__main__":
+    unittest.main()
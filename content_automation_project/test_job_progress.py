@@ -0,0 +1,129 @@
+"""Tests for delta job polling and the progress event stream (webapp.job_progress)."""
+
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+
+from webapp import job_progress
+from webapp.artifact_hashing import wait_for_artifact_hashes
+from webapp.job_files import register_artifacts_under
+from webapp.job_progress import job_event_stream, job_progress_delta
+from webapp.models import Artifact, Job, JobLogLine, JobPair
+from webapp_test_db import make_job_database
+
+
+class TestJobProgress(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp, self.engine, self.Session = make_job_database(self, "job_progress_")
+        db = self.Session()
+        db.add(JobPair(job_id="job-1", pair_index=0, stage_j_filename="a.json", stage_j_relpath="in/a.json", step1_status="running"))
+        db.add_all([JobLogLine(job_id="job-1", seq=i, line=f"line {i}", pair_index=0) for i in range(1, 4)])
+        db.add_all(
+            [Artifact(job_id="job-1", pair_index=0, rel_path=f"out/{i}.json", role="step1_output", byte_size=i) for i in range(2)]
+        )
+        db.commit()
+        db.close()
+
+    def _delta(self, **kw):
+        db = self.Session()
+        try:
+            return job_progress_delta(db, db.get(Job, "job-1"), **kw)
+        finally:
+            db.close()
+
+    def test_cursors_return_only_changes(self) -> None:
+        full = self._delta()
+        self.assertEqual(full["max_seq"], 3)
+        self.assertEqual(len(full["pairs"]), 1)
+        self.assertEqual(len(full["artifacts"]), 2)
+        self.assertFalse(full["artifacts_delta"])
+
+        idle = self._delta(
+            after_seq=full["max_seq"],
+            after_artifact_id=full["max_artifact_id"],
+            pairs_version=full["pairs_version"],
+        )
+        self.assertEqual(idle["log_lines"], [])
+        self.assertEqual(idle["max_seq"], 3)
+        self.assertIsNone(idle["pairs"])
+        self.assertEqual(idle["artifacts"], [])
+        self.assertEqual(idle["artifact_count"], 2)
+
+        db = self.Session()
+        db.get(JobPair, db.query(JobPair.id).scalar()).step1_status = "succeeded"
+        db.add(Artifact(job_id="job-1", pair_index=0, rel_path="out/new.json", role="step1_output", byte_size=9))
+        db.commit()
+        db.close()
+        changed = self._delta(
+            after_seq=3, after_artifact_id=full["max_artifact_id"], pairs_version=full["pairs_version"]
+        )
+        self.assertEqual(changed["pairs"][0]["step1_status"], "succeeded")
+        self.assertEqual([a["rel_path"] for a in changed["artifacts"]], ["out/new.json"])
+        self.assertEqual(changed["artifact_count"], 3)
+
+    def test_rows_updated_in_place_are_resent(self) -> None:
+        out = os.path.join(self.tmp, "job-1", "pair_0", "output")
+        os.makedirs(out)
+
+        def write_and_register(data: bytes) -> None:
+            with open(os.path.join(out, "seg.wav"), "wb") as f:
+                f.write(data)
+            db = self.Session()
+            try:
+                register_artifacts_under(db, "job-1", 0, os.path.join(self.tmp, "job-1"), "pair_0/output")
+            finally:
+                db.close()
+            wait_for_artifact_hashes()
+
+        write_and_register(b"RIFF")
+        full = self._delta()
+        cursors = {"after_artifact_id": full["max_artifact_id"], "after_artifact_rev": full["artifacts_rev"]}
+        self.assertEqual(self._delta(**cursors)["artifacts"], [])
+
+        write_and_register(b"RIFF-longer")
+        changed = self._delta(**cursors)
+        self.assertEqual([(a["rel_path"], a["byte_size"]) for a in changed["artifacts"]], [("pair_0/output/seg.wav", 11)])
+        self.assertEqual(changed["max_artifact_id"], full["max_artifact_id"])
+        self.assertGreater(changed["artifacts_rev"], full["artifacts_rev"])
+        self.assertEqual(
+            self._delta(after_artifact_id=changed["max_artifact_id"], after_artifact_rev=changed["artifacts_rev"])["artifacts"],
+            [],
+        )
+
+    def test_limit_reports_true_max_seq(self) -> None:
+        page = self._delta(limit=2)
+        self.assertEqual([ln["seq"] for ln in page["log_lines"]], [1, 2])
+        self.assertEqual(page["max_seq"], 3)
+
+    def test_event_stream_sends_progress_then_only_changes(self) -> None:
+        async def never_disconnected() -> bool:
+            return False
+
+        async def collect():
+            out = []
+            stream = job_event_stream("job-1", never_disconnected)
+            out.append(await stream.__anext__())
+            db = self.Session()
+            db.add(JobLogLine(job_id="job-1", seq=4, line="line 4", pair_index=0))
+            db.commit()
+            db.close()
+            out.append(await stream.__anext__())
+            await stream.aclose()
+            return out
+
+        with mock.patch.object(job_progress, "SessionLocal", self.Session), mock.patch.object(
+            job_progress, "EVENTS_ACTIVE_INTERVAL", 0.01
+        ):
+            first, second = asyncio.run(collect())
+        self.assertTrue(first.startswith("event: progress\n"))
+        self.assertEqual(len(json.loads(first.split("data: ", 1)[1])["artifacts"]), 2)
+        payload = json.loads(second.split("data: ", 1)[1])
+        self.assertEqual([ln["line"] for ln in payload["log_lines"]], ["line 4"])
+        self.assertIsNone(payload["pairs"])
+        self.assertEqual(payload["artifacts"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Tests for the append-only journaled JSON writer."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from journaled_json_writer import (
+    JournaledJsonWriter,
+    journal_path_for,
+    load_journaled_json,
+    recover_journals_under,
+)
+
+
+class TestJournaledJsonWriter(unittest.TestCase):
+    def _base(self):
+        return {"metadata": {"total_points": 0}, "points": [], "raw_responses": []}
+
+    def test_finalize_materializes_once_and_removes_journal(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "Lesson_file_x.json")
+            w = JournaledJsonWriter(out)
+            w.begin(self._base())
+            for i in range(3):
+                w.append(("points",), {"PointId": str(i)})
+                w.append(("raw_responses",), {"response_text": "r" * 100}, journal_only=True)
+                w.set(("metadata", "total_points"), i + 1)
+            with open(out, "r", encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["points"], [])
+            w.finalize(drop_keys=("raw_responses",))
+
+            self.assertFalse(os.path.exists(journal_path_for(out)))
+            with open(out, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual([p["PointId"] for p in data["points"]], ["0", "1", "2"])
+        self.assertEqual(data["metadata"]["total_points"], 3)
+        self.assertNotIn("raw_responses", data)
+
+    def test_recover_from_journal_ignores_torn_tail(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "OCR Extraction_x.json")
+            w = JournaledJsonWriter(out)
+            w.begin({"metadata": {}, "chapters": [{"chapter": "", "subchapters": []}]})
+            w.append(("chapters", 0, "subchapters"), {"subchapter": "A"})
+            w.set(("chapters", 0, "chapter"), "C1")
+            w.append(("chapters", 0, "subchapters"), {"subchapter": "B"})
+            w.close()
+            with open(journal_path_for(out), "a", encoding="utf-8") as f:
+                f.write('{"op": "append", "path": ["chapters", 0, "subch')
+
+            live = load_journaled_json(out)
+            self.assertEqual([s["subchapter"] for s in live["chapters"][0]["subchapters"]], ["A", "B"])
+
+            self.assertEqual(recover_journals_under(tmp), 1)
+            self.assertFalse(os.path.exists(journal_path_for(out)))
+            with open(out, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(data["chapters"][0]["chapter"], "C1")
+        self.assertEqual(len(data["chapters"][0]["subchapters"]), 2)
+
+    def test_output_is_rewritten_once_the_interval_has_passed(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "Lesson_file_x.json")
+            w = JournaledJsonWriter(out, materialize_interval_s=0)
+            w.begin(self._base())
+            w.append(("points",), {"PointId": "1"})
+            w.append(("raw_responses",), {"response_text": "r"}, journal_only=True)
+            with open(out, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            w.close()
+        self.assertEqual(data["points"], [{"PointId": "1"}])
+        self.assertEqual(data["raw_responses"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
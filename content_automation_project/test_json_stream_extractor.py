@@ -0,0 +1,71 @@
+"""Tests for single-pass JSON extraction/repair and its streaming mode."""
+
+import json
+import logging
+import unittest
+
+from base_stage_processor import BaseStageProcessor
+from json_stream_extractor import (
+    StreamingJsonExtractor,
+    extract_json_values,
+    extract_primary_json,
+    remember_scan,
+    scan_json_blocks,
+)
+from multi_part_post_processor import MultiPartPostProcessor
+
+_ROWS = [{"PointId": f"00100200{i:02d}", "Points": f"نکته {i} با \"نقل‌قول\" و {{براکت}}"} for i in range(1, 6)]
+
+
+class TestExtraction(unittest.TestCase):
+    def test_fenced_and_prose_wrapped(self) -> None:
+        body = json.dumps({"data": _ROWS}, ensure_ascii=False)
+        text = f"طبق منبع [1] و {{x}}:\n```json\n{body}\n```\nپایان."
+        self.assertEqual(extract_primary_json(text), {"data": _ROWS})
+        self.assertEqual(extract_json_values(text), [[1], {"data": _ROWS}])
+
+    def test_truncated_response_keeps_complete_rows(self) -> None:
+        body = json.dumps({"data": _ROWS}, ensure_ascii=False)
+        cut = body.index('"Points"', body.index("0010020004"))
+        self.assertEqual(extract_primary_json("```json\n" + body[:cut]), {"data": _ROWS[:3] + [{"PointId": "0010020004"}]})
+        fenced = "```json\n" + body[: cut + 12] + "\n```\n"
+        self.assertEqual(extract_primary_json(fenced)["data"][:3], _ROWS[:3])
+
+    def test_trailing_commas_and_escaped_string(self) -> None:
+        self.assertEqual(extract_primary_json('{"a": [1, 2,], "b": {"c": 3,},}'), {"a": [1, 2], "b": {"c": 3}})
+        escaped = json.dumps("```json\n" + json.dumps({"data": _ROWS}) + "\n```")
+        self.assertEqual(extract_primary_json(escaped), {"data": _ROWS})
+
+    def test_streaming_matches_one_shot(self) -> None:
+        body = json.dumps({"data": _ROWS}, ensure_ascii=False, indent=2)
+        text = f"x [1] ```json\n{body}\n``` و {{y}} [{{\"k\": \"\\\\\"}}, 2,] " + body[:200]
+        expected = [(b.start, b.value) for b in scan_json_blocks(text)]
+        for size in (1, 2, 3, 7, 64):
+            extractor = StreamingJsonExtractor()
+            for i in range(0, len(text), size):
+                extractor.feed(text[i : i + size])
+            extractor.finish()
+            self.assertEqual([(b.start, b.value) for b in extractor.blocks], expected, size)
+
+    def test_remembered_scan_returns_fresh_values(self) -> None:
+        text = "```json\n" + json.dumps({"data": _ROWS}) + "\n```"
+        extractor = StreamingJsonExtractor()
+        extractor.feed(text)
+        extractor.finish()
+        remember_scan(text, extractor.blocks)
+        first = extract_primary_json(text)
+        first["data"].clear()
+        self.assertEqual(extract_primary_json(text), {"data": _ROWS})
+
+    def test_processor_entry_points(self) -> None:
+        text = "```json\n" + json.dumps([{"a": 1}, {"b": 2}, 3]) + "\n```"
+        post = MultiPartPostProcessor(api_client=None)
+        self.assertEqual(post._extract_json_blocks_from_text("\ufeff" + text), [{"a": 1}, {"b": 2}])
+        base = BaseStageProcessor.__new__(BaseStageProcessor)
+        base.logger = logging.getLogger(__name__)
+        self.assertEqual(base.extract_json_from_response(text), [{"a": 1}, {"b": 2}, 3])
+        self.assertIsNone(base.extract_json_from_response("no json here"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Tests for token-budget chunk planning and context-limit bisection."""
+
+import os
+import unittest
+from unittest import mock
+
+from llm_chunk_planner import (
+    CHUNK_BUDGETS_ENV,
+    ContextLimitExceeded,
+    chunk_budget_for_model,
+    estimate_tokens,
+    plan_chunks,
+    run_with_bisect,
+)
+from stage_h_processor import StageHProcessor
+from stage_j_processor import sj_web_plan_chunks
+
+
+class TestPlanChunks(unittest.TestCase):
+    def test_estimate_counts_non_ascii_heavier(self) -> None:
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcd" * 10), 10)
+        self.assertEqual(estimate_tokens("سلام" * 10), 20)
+
+    def test_packs_by_tokens_and_counts_group_once_per_chunk(self) -> None:
+        rows = [("A", 10)] * 4 + [("B", 10)] * 4
+        chunks = plan_chunks(
+            rows,
+            row_tokens=lambda r: r[1],
+            limit_tokens=60,
+            max_rows=100,
+            group_key=lambda r: r[0],
+            group_tokens=lambda k: 20,
+        )
+        self.assertEqual([len(c) for c in chunks], [4, 4])
+        self.assertEqual({r[0] for r in chunks[0]}, {"A"})
+
+    def test_balances_tail_chunk_and_respects_row_cap(self) -> None:
+        chunks = plan_chunks(list(range(21)), row_tokens=lambda r: 1, limit_tokens=10, max_rows=100)
+        self.assertEqual([len(c) for c in chunks], [8, 8, 5])
+        self.assertEqual([r for c in chunks for r in c], list(range(21)))
+        capped = plan_chunks(list(range(7)), row_tokens=lambda r: 1, limit_tokens=1000, max_rows=3)
+        self.assertEqual(len(capped), 3)
+        self.assertTrue(all(len(c) <= 3 for c in capped))
+
+    def test_oversized_row_gets_own_chunk(self) -> None:
+        chunks = plan_chunks([1, 500, 1], row_tokens=lambda r: r, limit_tokens=100, max_rows=10)
+        self.assertEqual(chunks, [[1], [500], [1]])
+
+    def test_budget_env_override_and_choice_resolution(self) -> None:
+        env = '{"default": {"chunk_tokens": 5000}, "deepseek/deepseek-v4-pro": {"max_rows": 40}}'
+        with mock.patch.dict(os.environ, {CHUNK_BUDGETS_ENV: env}):
+            self.assertEqual(chunk_budget_for_model("unknown/model").chunk_tokens, 5000)
+            budget = chunk_budget_for_model("deepseek/deepseek-v4-pro (reasoning high)")
+            self.assertEqual((budget.max_rows, budget.chunk_tokens), (40, 5000))
+
+    def test_stage_j_plan_counts_topic_captions(self) -> None:
+        rows = [
+            {"PointId": str(i), "chapter": "C", "subchapter": "S", "topic": "T1" if i < 10 else "T2", "Points": "x" * 40}
+            for i in range(20)
+        ]
+        heavy = {("c", "s", "t1"): [{"point_text": "p", "caption": "y" * 6000}]}
+        env = '{"default": {"chunk_tokens": 2000}}'
+        with mock.patch.dict(os.environ, {CHUNK_BUDGETS_ENV: env}):
+            light = sj_web_plan_chunks(rows, {}, {}, [], "prompt", "m", max_output_tokens=8192, completion_tokens_per_row=30)
+            loaded = sj_web_plan_chunks(rows, heavy, {}, [], "prompt", "m", max_output_tokens=8192, completion_tokens_per_row=30)
+        self.assertEqual(len(light), 1)
+        self.assertGreater(len(loaded), 1)
+
+
+class TestBisect(unittest.TestCase):
+    def test_splits_until_chunks_fit_and_keeps_order(self) -> None:
+        calls = []
+
+        def run(rows):
+            calls.append(len(rows))
+            if len(rows) > 2:
+                raise ContextLimitExceeded("too long")
+            return [r * 10 for r in rows]
+
+        splits = []
+        out = run_with_bisect([1, 2, 3, 4, 5], run, on_split=lambda n, mid: splits.append((n, mid)))
+        self.assertEqual(out, [10, 20, 30, 40, 50])
+        self.assertEqual(splits, [(5, 2), (3, 1)])
+        self.assertEqual(calls, [5, 2, 3, 1, 2])
+
+    def test_single_row_over_limit_fails(self) -> None:
+        def run(rows):
+            raise ContextLimitExceeded("too long")
+
+        self.assertIsNone(run_with_bisect([1, 2], run))
+
+    def test_stage_h_chunk_bisects_on_context_error(self) -> None:
+        class _Client:
+            def __init__(self):
+                self.sizes = []
+
+            def process_text(self, text, **kwargs):
+                n = text.count('"PointId"')
+                self.sizes.append(n)
+                if n > 2:
+                    raise RuntimeError("This endpoint's maximum context length is 8192 tokens")
+                pids = [seg.split('"')[0] for seg in text.split('"PointId":"')[1:]]
+                rows = ",".join(f'{{"PointId":"{p}","Qtext":"q{p}","Correct":"1"}}' for p in pids)
+                return f'{{"data":[{rows}]}}'
+
+        client = _Client()
+        proc = StageHProcessor(client)
+        rows = [{"PointId": str(100 + i), "topic": "T", "Points": "p"} for i in range(4)]
+        out = proc._run_web_chunk_with_bisect(rows, "[]", 1, 1, "prompt", "m", None)
+        self.assertEqual([r["PointId"] for r in out], ["100", "101", "102", "103"])
+        self.assertEqual(client.sizes, [4, 2, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Tests for the disk-backed LLM response cache in UnifiedAPIClient.process_text."""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from llm_response_cache import CACHE_USE, LLMResponseCache, mode_for_attempt
+from stage_ta_processor import StageTAProcessor
+from unified_api_client import UnifiedAPIClient
+from webapp.prompt_capture import PromptCapturingUnifiedClient
+
+
+class _FakeOpenRouter:
+    def __init__(self):
+        self.calls = 0
+
+    def process_text(self, text, system_prompt, model_name, temperature, max_tokens, api_key, **kwargs):
+        self.calls += 1
+        return f"answer {self.calls} to {text}"
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def _client(self, cache):
+        client = UnifiedAPIClient(response_cache=cache)
+        fake = _FakeOpenRouter()
+        client.openrouter_client = fake
+        return client, fake
+
+    def test_identical_requests_hit_cache_and_modes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = LLMResponseCache(tmp)
+            client, fake = self._client(cache)
+
+            first = client.process_text("hello", system_prompt="sys", model_name="m/a", temperature=0.2)
+            self.assertEqual(client.last_response_cache_status(), "miss")
+            again = client.process_text("hello", system_prompt="sys", model_name="m/a", temperature=0.2)
+            self.assertEqual(client.last_response_cache_status(), "hit")
+            self.assertEqual(again, first)
+            self.assertEqual(fake.calls, 1)
+
+            # Any request field change is a different key
+            client.process_text("hello", system_prompt="sys", model_name="m/a", temperature=0.3)
+            self.assertEqual(fake.calls, 2)
+
+            refreshed = client.process_text("hello", system_prompt="sys", model_name="m/a", temperature=0.2, response_cache="refresh")
+            self.assertNotEqual(refreshed, first)
+            self.assertEqual(client.process_text("hello", system_prompt="sys", model_name="m/a", temperature=0.2), refreshed)
+
+            client.process_text("hello", system_prompt="sys", model_name="m/a", temperature=0.2, response_cache="bypass")
+            self.assertEqual(client.last_response_cache_status(), "bypass")
+            self.assertEqual(fake.calls, 4)
+            self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_parse_retry_skips_the_rejected_cached_response(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            client, fake = self._client(LLMResponseCache(tmp))
+            answers = iter(["not json", '{"tables": []}', '{"tables": [1]}'])
+            fake.process_text = lambda *a, **kw: next(answers)
+            proc = StageTAProcessor(client)
+
+            def call():
+                return proc._call_table_notes_llm_with_retries(
+                    full_prompt="tables prompt", model_name="m/a", attempt_label="t", _progress=lambda _m: None
+                )
+
+            with mock.patch("stage_ta_processor.time.sleep"):
+                first = call()
+                # The retry's accepted answer replaced the rejected one in the cache
+                second = call()
+
+        self.assertEqual(first[1], {"tables": []})
+        self.assertEqual(second, first)
+        self.assertEqual(next(answers), '{"tables": [1]}')
+
+    def test_job_cache_mode_overrides_the_callers_use(self) -> None:
+        class _Inner:
+            def __init__(self):
+                self.modes = []
+
+            def process_text(self, *args, **kwargs):
+                self.modes.append(kwargs.get("response_cache"))
+                return "ok"
+
+            def process_text_many(self, requests, **kwargs):
+                self.modes.append(kwargs.get("response_cache"))
+                return ["ok"] * len(requests)
+
+        for job_mode, expected in (("bypass", ["bypass"] * 4), ("refresh", ["refresh"] * 4), ("use", ["use", "refresh", "use", "use"])):
+            inner = _Inner()
+            client = PromptCapturingUnifiedClient(inner, None, "job-1", 0, "flashcard", "step1", response_cache_mode=job_mode)
+            with mock.patch.object(client, "_write_capture"):
+                client.process_text(text="a", response_cache=CACHE_USE)
+                client.process_text(text="a", response_cache=mode_for_attempt(2))
+                client.process_text(text="a")
+                client.process_text_many([{"text": "a"}])
+            self.assertEqual(inner.modes, expected, job_mode)
+
+    def test_ttl_expiry_and_lru_eviction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = LLMResponseCache(tmp, ttl_seconds=0.05)
+            cache.put("a" * 64, "x")
+            time.sleep(0.1)
+            self.assertIsNone(cache.get("a" * 64))
+
+            cache.put("f" * 64, "y" * 200)
+            entry_size = os.path.getsize(cache._path("f" * 64))
+            os.remove(cache._path("f" * 64))
+            cache = LLMResponseCache(tmp, max_bytes=int(entry_size * 3.5))
+            now = time.time()
+            for i, key in enumerate(("b" * 64, "c" * 64, "d" * 64)):
+                cache.put(key, "y" * 200)
+                os.utime(cache._path(key), (now - 100 + i, now - 100 + i))
+            cache.get("b" * 64)  # touch: b becomes most recently used
+            cache.put("e" * 64, "y" * 200)
+            self.assertIsNotNone(cache.get("b" * 64))
+            self.assertIsNone(cache.get("c" * 64))
+            self.assertIsNotNone(cache.get("e" * 64))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+"""Tests for per-request LLM telemetry (llm_telemetry, webapp.llm_telemetry_store)."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import llm_telemetry
+from openrouter_api_client import OpenRouterAPIClient, OpenRouterRequestAborted
+from openrouter_rate_governor import ModelLimits, RateGovernor
+from webapp.database import Base
+from webapp import llm_telemetry_store as store
+from webapp.llm_telemetry_store import _row_from_record, job_llm_summary, prometheus_text
+from webapp.models import LLMRequestLog
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body or {}
+        self.text = "error" if status_code >= 400 else ""
+        self.reason = ""
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        return None
+
+    def close(self):
+        return None
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def post(self, url, **kwargs):
+        return self.responses.pop(0)
+
+
+class _FakeKeyManager:
+    def get_next_key(self):
+        return "test-key"
+
+
+class TestLLMTelemetry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.records = []
+        llm_telemetry.add_sink(self.records.append)
+        self.addCleanup(llm_telemetry.remove_sink, self.records.append)
+
+    def _client(self, responses) -> OpenRouterAPIClient:
+        gov = RateGovernor({"default": ModelLimits(rps=100, burst=10, max_in_flight=4)}, poll_interval_s=0.01)
+        client = OpenRouterAPIClient(api_key_manager=_FakeKeyManager(), rate_governor=gov)
+        client.session = _FakeSession(responses)
+        return client
+
+    def test_openrouter_request_record(self) -> None:
+        credit_cap = {"error": {"message": "This request requires more credits; you can only afford 3000"}}
+        ok_body = {
+            "choices": [{"message": {"content": "hello"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15, "cost": 0.0021},
+        }
+        client = self._client(
+            [
+                _FakeResponse(429, {"Retry-After": "0.01"}),
+                _FakeResponse(402, body=credit_cap),
+                _FakeResponse(200, body=ok_body),
+            ]
+        )
+        with llm_telemetry.request_context(job_id="job-1", pair_index=2, unit_index=5, step="step1"):
+            with llm_telemetry.request_context(stage="stage_j"):
+                text = client.process_text("hi", system_prompt="sys", model_name="test/model", max_tokens=8000)
+        self.assertEqual(text, "hello")
+        self.assertEqual(len(self.records), 1)
+        rec = self.records[0]
+        self.assertEqual(
+            (rec.provider, rec.model, rec.stage, rec.job_id, rec.pair_index, rec.unit_index, rec.step),
+            ("openrouter", "test/model", "stage_j", "job-1", 2, 5, "step1"),
+        )
+        self.assertEqual((rec.outcome, rec.retries, rec.credit_cap_reductions), ("ok", 1, 1))
+        self.assertEqual((rec.prompt_chars, rec.response_chars, rec.max_tokens), (5, 5, 8000))
+        self.assertEqual((rec.prompt_tokens, rec.completion_tokens, rec.cost), (12, 3, 0.0021))
+        self.assertIsNotNone(rec.queue_ms)
+        self.assertIsNone(rec.ttft_ms)  # non-streamed
+        self.assertEqual(llm_telemetry.current_context(), {})
+
+    def test_aborted_and_failed_outcomes(self) -> None:
+        with self.assertRaises(OpenRouterRequestAborted):
+            with llm_telemetry.track_request("openrouter", "m", abort_errors=(OpenRouterRequestAborted,)):
+                llm_telemetry.note_first_token()
+                raise OpenRouterRequestAborted()
+        with llm_telemetry.track_request("deepseek", "m") as call:
+            llm_telemetry.note_error("API error 500")
+            call.set_result(None)
+        with self.assertRaises(TypeError):
+            with llm_telemetry.request_context(stage_name="x"):
+                pass
+        self.assertEqual([r.outcome for r in self.records], ["aborted", "error"])
+        self.assertIsNotNone(self.records[0].ttft_ms)
+        self.assertEqual((self.records[1].stage, self.records[1].error), ("unknown", "API error 500"))
+
+    def test_summary_and_prometheus_from_table(self) -> None:
+        self.assertEqual(llm_telemetry.percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(llm_telemetry.percentile(list(range(1, 101)), 95), 95)
+        self.assertIsNone(llm_telemetry.percentile([], 50))
+
+        tmp = tempfile.mkdtemp(prefix="llm_telemetry_")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'test.db')}")
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        self.addCleanup(db.close)
+
+        def rec(stage, latency_ms, outcome="ok", job_id="job-1", tokens=100, cost=0.01):
+            return llm_telemetry.LLMRequestRecord(
+                ts="2026-01-01T00:00:00.000+00:00", provider="openrouter", model="m", stage=stage,
+                outcome=outcome, job_id=job_id, latency_ms=latency_ms, prompt_tokens=tokens,
+                completion_tokens=tokens // 2, cost=cost,
+            )
+
+        for r in [rec("stage_j", 1000), rec("stage_j", 3000), rec("stage_j", 40000, outcome="error"),
+                  rec("stage_e", 500), rec("stage_e", 700, job_id="job-2")]:
+            db.add(_row_from_record(r))
+        db.commit()
+
+        summary = job_llm_summary(db, "job-1")
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual([s["stage"] for s in summary["stages"]], ["stage_j", "stage_e"])
+        stage_j = summary["stages"][0]
+        self.assertEqual((stage_j["latency_p50_ms"], stage_j["latency_p95_ms"], stage_j["errors"]), (3000, 40000, 1))
+        self.assertEqual((stage_j["prompt_tokens"], stage_j["completion_tokens"]), (300, 150))
+        self.assertAlmostEqual(summary["cost"], 0.04)
+
+        text = prometheus_text(db)
+        self.assertIn('llm_requests_total{provider="openrouter",stage="stage_j",model="m",outcome="error"} 1', text)
+        self.assertIn('llm_prompt_tokens_total{provider="openrouter",stage="stage_e",model="m"} 200', text)
+        self.assertIn('llm_request_latency_seconds_bucket{provider="openrouter",stage="stage_j",model="m",le="5"} 2', text)
+        self.assertIn('llm_request_latency_seconds_bucket{provider="openrouter",stage="stage_j",model="m",le="+Inf"} 3', text)
+        self.assertIn('llm_request_latency_seconds_sum{provider="openrouter",stage="stage_j",model="m"} 44', text)
+
+    def test_db_sink_batches_inserts_and_prunes_old_rows(self) -> None:
+        tmp = tempfile.mkdtemp(prefix="llm_telemetry_")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'test.db')}")
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        def rec(ts):
+            return llm_telemetry.LLMRequestRecord(ts=ts, provider="openrouter", model="m", stage="s", outcome="ok")
+
+        with mock.patch.object(store, "_ensure_flusher"):
+            for ts in ("2026-01-01T00:00:00+00:00", "2026-03-01T00:00:00+00:00", "2026-03-02T00:00:00+00:00"):
+                store.store_record(rec(ts))
+        db = Session()
+        self.addCleanup(db.close)
+        self.assertEqual(db.query(LLMRequestLog).count(), 0)  # queued, not written per request
+        self.assertEqual(store.flush_llm_records(engine), 3)
+        self.assertEqual(store.flush_llm_records(engine), 0)
+        self.assertEqual(db.query(LLMRequestLog).count(), 3)
+
+        with mock.patch.object(store, "LLM_REQUESTS_RETENTION_DAYS", 30):
+            self.assertEqual(store.prune_llm_requests(engine, now=datetime(2026, 3, 15)), 1)
+        self.assertEqual(db.query(LLMRequestLog).count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Tests for bounded-concurrency OCR Extraction subchapter fan-out."""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import fitz
+
+from multi_part_processor import MultiPartProcessor
+
+
+class _FakeTextClient:
+    """Non-Gemini client: answers each subchapter prompt after a delay that reverses completion order."""
+
+    def __init__(self, n_subchapters: int):
+        self.n_subchapters = n_subchapters
+        self._lock = threading.Lock()
+        self.current = 0
+        self.max_concurrency = 0
+
+    def initialize_text_client(self, _model_name: str) -> bool:
+        return True
+
+    def process_text(self, text, system_prompt, model_name, temperature, max_tokens):
+        name = system_prompt.split("|", 1)[0]
+        idx = int(name.rsplit("_", 1)[1])
+        with self._lock:
+            self.current += 1
+            self.max_concurrency = max(self.max_concurrency, self.current)
+        try:
+            time.sleep(0.02 * (self.n_subchapters - idx + 1))
+        finally:
+            with self._lock:
+                self.current -= 1
+        return json.dumps({"subchapter": name, "topics": [{"topic": f"T{idx}", "extractions": []}]})
+
+
+class _RecordingHooks:
+    def __init__(self):
+        self.events = []
+
+    def before_unit(self, unit_index, chapter, subchapter, topic, prompt_seq):
+        self.events.append(("before", unit_index))
+
+    def after_unit(self, unit_index, chapter, subchapter, topic, points, prompt_seq, status="succeeded"):
+        self.events.append(("after", unit_index, status))
+
+
+class TestOcrExtractionConcurrency(unittest.TestCase):
+    def _write_inputs(self, tmp: str, n: int):
+        pdf_path = os.path.join(tmp, "chapter.pdf")
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 72), "Sample chapter text")
+        doc.save(pdf_path)
+        doc.close()
+        topic_path = os.path.join(tmp, "t105003.json")
+        with open(topic_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "metadata": {"book_id": 105, "chapter_id": 3, "chapter": "C"},
+                    "data": [{"Subchapter": f"Sub_{i}", "Topics": [f"T{i}"]} for i in range(1, n + 1)],
+                },
+                f,
+            )
+        return pdf_path, topic_path
+
+    def test_parallel_subchapters_keep_topic_order(self) -> None:
+        n = 6
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path, topic_path = self._write_inputs(tmp, n)
+            client = _FakeTextClient(n)
+            hooks = _RecordingHooks()
+            out = MultiPartProcessor(client).process_ocr_extraction_with_topics(
+                pdf_path=pdf_path,
+                topic_file_path=topic_path,
+                base_prompt="{SUBCHAPTER_NAME}|{TOPIC_NAME}",
+                model_name="test/model",
+                output_dir=tmp,
+                unit_hooks=hooks,
+                concurrency=3,
+            )
+            self.assertIsNotNone(out)
+            with open(out, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+        subs = data["chapters"][0]["subchapters"]
+        self.assertEqual([s["subchapter"] for s in subs], [f"Sub_{i}" for i in range(1, n + 1)])
+        self.assertEqual(data["metadata"]["total_subchapters"], n)
+        self.assertGreater(client.max_concurrency, 1)
+        self.assertLessEqual(client.max_concurrency, 3)
+        afters = [e for e in hooks.events if e[0] == "after"]
+        self.assertEqual([e[1] for e in afters], list(range(1, n + 1)))
+        self.assertTrue(all(e[2] == "succeeded" for e in afters))
+        self.assertEqual(sum(1 for e in hooks.events if e[0] == "before"), n)
+
+    def test_cancel_from_progress_callback_stops_submitting(self) -> None:
+        n = 8
+
+        class _Cancelled(Exception):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path, topic_path = self._write_inputs(tmp, n)
+            client = _FakeTextClient(n)
+            hooks = _RecordingHooks()
+
+            def progress(msg: str) -> None:
+                if msg.startswith("Received model response"):
+                    raise _Cancelled()
+
+            with self.assertRaises(_Cancelled):
+                MultiPartProcessor(client).process_ocr_extraction_with_topics(
+                    pdf_path=pdf_path,
+                    topic_file_path=topic_path,
+                    base_prompt="{SUBCHAPTER_NAME}|{TOPIC_NAME}",
+                    model_name="test/model",
+                    progress_callback=progress,
+                    output_dir=tmp,
+                    unit_hooks=hooks,
+                    concurrency=2,
+                )
+        self.assertLess(sum(1 for e in hooks.events if e[0] == "before"), n)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Tests for retrieval-scoped old-book context in Stage X change detection."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from old_book_retrieval import OldBookIndex, needs_retrieval
+from stage_x_processor import StageXProcessor
+
+
+def _old_row(i: int) -> dict:
+    return {"page": i // 10 + 1, "text": f"topic{i} describes concept{i} and example{i} of the chapter"}
+
+
+def _record(i: int) -> dict:
+    return {"PointId": f"1050030{i:03d}", "topic": f"Topic{i}", "Points": f"concept{i} with a new example{i}"}
+
+
+class _CapturingClient:
+    def __init__(self) -> None:
+        self.prompts = []
+
+    def process_text(self, text, system_prompt=None, model_name=None, **kwargs):
+        self.prompts.append(json.loads(text))
+        return json.dumps([{"POINTID": p["PointId"], "Change Description": "x", "Change Type": "edit"}
+                           for p in self.prompts[-1]["current_data"][:1]])
+
+
+class TestOldBookRetrieval(unittest.TestCase):
+    def test_selects_matching_rows_and_neighbours_in_book_order(self) -> None:
+        index = OldBookIndex([_old_row(i) for i in range(1000)])
+        selected = index.select([_record(500), _record(20)], top_k=1, margin=2)
+        self.assertEqual(selected, [18, 19, 20, 21, 22, 498, 499, 500, 501, 502])
+        self.assertEqual(index.select([{"Points": "nothing in common"}]), [])
+
+    def test_persian_arabic_letter_variants_match(self) -> None:
+        index = OldBookIndex([{"text": "فیزیک"}, {"text": "شیمی"}, {"text": "زیست"}])
+        self.assertEqual(index.select([{"Points": "فيزيك"}], top_k=1, margin=0), [0])
+
+    def test_stage_x_parts_carry_bounded_old_book_context(self) -> None:
+        tmp = tempfile.mkdtemp(prefix="stage_x_")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        old_rows = [_old_row(i) for i in range(2000)]
+        self.assertTrue(needs_retrieval(old_rows))
+        pdf_json = os.path.join(tmp, "old_extracted.json")
+        with open(pdf_json, "w", encoding="utf-8") as f:
+            json.dump({"rows": old_rows}, f)
+        stage_a = os.path.join(tmp, "a105003+Motion.json")
+        with open(stage_a, "w", encoding="utf-8") as f:
+            json.dump({"metadata": {"book_id": 105, "chapter_id": 3, "chapter": "Motion"},
+                       "data": [_record(i) for i in range(400)]}, f)
+
+        client = _CapturingClient()
+        out = StageXProcessor(client).process_stage_x(
+            old_book_pdf_path="", pdf_extraction_prompt="", pdf_extraction_model="",
+            stage_a_path=stage_a, changes_prompt="detect", changes_model="m",
+            output_dir=tmp, pdf_extracted_path=pdf_json,
+        )
+        self.assertTrue(out and os.path.isfile(out))
+        self.assertEqual(len(client.prompts), 2)
+        for part in client.prompts:
+            self.assertLess(len(part["old_book_data"]), 200 * 5 + 1)
+            self.assertLess(len(part["old_book_data"]), len(old_rows))
+        # The second part's records align with old rows 200-399, not with the first part's.
+        second = {r["text"].split()[0] for r in client.prompts[1]["old_book_data"]}
+        self.assertIn("topic300", second)
+        self.assertNotIn("topic100", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""Tests for the asyncio OpenRouter transport and UnifiedAPIClient.process_text_many."""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+import llm_telemetry
+import openrouter_async
+from openrouter_api_client import OpenRouterAPIClient, OpenRouterAPIError, OpenRouterRequestAborted
+from openrouter_rate_governor import ModelLimits, RateGovernor
+from unified_api_client import UnifiedAPIClient
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body or {}
+        self.text = "error" if status_code >= 400 else ""
+        self.reason_phrase = ""
+
+    def json(self):
+        return self._body
+
+
+class _FakeAsyncHttp:
+    """Answers by prompt text: "b" is rate-limited once, "bad" is a 400; tracks requests in flight."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def post(self, url, json=None, **kwargs):
+        text = json["messages"][-1]["content"]
+        self.calls.append(text)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+        if text == "b" and self.calls.count("b") == 1:
+            return _FakeResponse(429, headers={"Retry-After": "0.01"})
+        if text == "bad":
+            return _FakeResponse(400, body={"error": {"message": "context length exceeded"}})
+        return _FakeResponse(200, body={"choices": [{"message": {"content": text.upper()}}]})
+
+
+class _FakeKeyManager:
+    def get_next_key(self):
+        return "test-key"
+
+
+class _BlockingOpenRouter:
+    """Thread-fallback stand-in: "empty" answers nothing the first time, "slow" waits for its cancel."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def process_text(self, text, system_prompt=None, model_name=None, temperature=None, max_tokens=None,
+                     api_key=None, cancel_check=None, **kwargs):
+        with self.lock:
+            self.calls.append(text)
+            n = self.calls.count(text)
+        if text == "empty" and n == 1:
+            return None
+        if text == "slow":
+            while not cancel_check():
+                time.sleep(0.01)
+            raise OpenRouterRequestAborted()
+        return f"<{text}>"
+
+
+class TestProcessTextMany(unittest.TestCase):
+    def test_async_transport_orders_results_and_retries(self) -> None:
+        client = UnifiedAPIClient()
+        client.openrouter_client = OpenRouterAPIClient(
+            api_key_manager=_FakeKeyManager(),
+            rate_governor=RateGovernor({"default": ModelLimits(rps=1000, burst=1000, max_in_flight=0)}, poll_interval_s=0.01),
+        )
+        http = _FakeAsyncHttp()
+        sink_threads = []
+
+        def sink(record):
+            sink_threads.append(threading.current_thread().name)
+
+        llm_telemetry.add_sink(sink)
+        self.addCleanup(llm_telemetry.remove_sink, sink)
+        with mock.patch.object(openrouter_async, "HTTPX_AVAILABLE", True), \
+                mock.patch.object(openrouter_async, "_shared_http", return_value=http):
+            requests = [{"text": t, "model_name": "test/model"} for t in ("a", "b", "bad", "d", "e")]
+            results = client.process_text_many(
+                requests, concurrency=2, return_exceptions=True, response_cache="bypass"
+            )
+
+        self.assertEqual(results[:2] + results[3:], ["A", "B", "D", "E"])
+        self.assertIsInstance(results[2], OpenRouterAPIError)
+        self.assertEqual(results[2].status_code, 400)
+        self.assertEqual(http.calls.count("b"), 2)  # 429 retried inside the request
+        self.assertEqual(http.calls.count("bad"), 1)  # 400 is final: no item retry
+        self.assertLessEqual(http.max_in_flight, 2)
+        # Telemetry sinks (a DB insert in the webapp) run off the event loop
+        deadline = time.monotonic() + 2
+        while len(sink_threads) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(sink_threads), 5)
+        self.assertNotIn("openrouter-async", sink_threads)
+
+    def test_thread_fallback_item_retry_and_item_cancel(self) -> None:
+        client = UnifiedAPIClient()
+        fake = _BlockingOpenRouter()
+        client.openrouter_client = fake
+        stop_slow = threading.Event()
+        requests = [
+            {"text": "x"},
+            {"text": "empty"},
+            {"text": "slow", "cancel_check": stop_slow.is_set},
+        ]
+        threading.Timer(0.1, stop_slow.set).start()
+        with mock.patch.object(openrouter_async, "HTTPX_AVAILABLE", False):
+            results = client.process_text_many(requests, concurrency=3, item_retries=1, response_cache="bypass")
+        self.assertEqual(results, ["<x>", "<empty>", None])
+        self.assertEqual(fake.calls.count("empty"), 2)
+
+    def test_batch_cancel_raises(self) -> None:
+        started = []
+
+        async def call(stop):
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        stop = threading.Event()
+        check_threads = set()
+
+        def cancel_check():
+            # Stands in for the job cancel flag (a DB read): must not run on the event loop
+            check_threads.add(threading.current_thread().name)
+            return stop.is_set()
+
+        async def main():
+            task = asyncio.ensure_future(
+                openrouter_async.fan_out([call] * 10, concurrency=2, cancel_check=cancel_check, poll_interval_s=0.005)
+            )
+            await asyncio.sleep(0.015)
+            stop.set()
+            return await task
+
+        with self.assertRaises(OpenRouterRequestAborted):
+            openrouter_async.run(main())
+        self.assertLess(len(started), 10)
+        self.assertTrue(check_threads)
+        self.assertNotIn("openrouter-async", check_threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Tests for the OpenRouter rate governor and its use in OpenRouterAPIClient."""
+
+import threading
+import time
+import unittest
+
+from openrouter_api_client import OpenRouterAPIClient, _parse_retry_after_seconds
+from openrouter_rate_governor import ModelLimits, RateGovernor
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body or {}
+        self.text = ""
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        return None
+
+    def close(self):
+        return None
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class _FakeKeyManager:
+    def get_next_key(self):
+        return "test-key"
+
+
+class TestRateGovernor(unittest.TestCase):
+    def test_max_in_flight_is_enforced_across_threads(self) -> None:
+        gov = RateGovernor({"default": ModelLimits(rps=1000, burst=1000, max_in_flight=2)}, poll_interval_s=0.01)
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def worker():
+            lease = gov.acquire_slot("m")
+            try:
+                with lock:
+                    state["current"] += 1
+                    state["peak"] = max(state["peak"], state["current"])
+                time.sleep(0.05)
+                with lock:
+                    state["current"] -= 1
+            finally:
+                gov.release_slot("m", lease)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(state["peak"], 2)
+
+    def test_token_bucket_paces_requests_after_burst(self) -> None:
+        gov = RateGovernor({"default": ModelLimits(rps=20, burst=2, max_in_flight=0)}, poll_interval_s=0.01)
+        started = time.monotonic()
+        for _ in range(4):
+            self.assertTrue(gov.wait_for_token("m"))
+        # 2 burst tokens free, then 2 more at 20/s => ~0.1s
+        self.assertGreaterEqual(time.monotonic() - started, 0.08)
+
+    def test_rate_limited_halves_rate_and_honours_retry_after(self) -> None:
+        gov = RateGovernor({"default": ModelLimits(rps=10, burst=5, max_in_flight=0)}, poll_interval_s=0.01)
+        gov.report_rate_limited("m", retry_after_s=0.2)
+        started = time.monotonic()
+        self.assertTrue(gov.wait_for_token("m"))
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+        self.assertAlmostEqual(gov._local._buckets["m"]["rate"], 5.0)
+        gov.report_success("m")
+        self.assertAlmostEqual(gov._local._buckets["m"]["rate"], 5.5)
+        # Other models are unaffected
+        self.assertTrue(gov.wait_for_token("other"))
+
+    def test_cancel_while_waiting_returns_none(self) -> None:
+        gov = RateGovernor({"default": ModelLimits(max_in_flight=1)}, poll_interval_s=0.01)
+        lease = gov.acquire_slot("m")
+        self.assertIsNone(gov.acquire_slot("m", cancel_check=lambda: True))
+        gov.release_slot("m", lease)
+
+
+class TestOpenRouterClientGovernor(unittest.TestCase):
+    def test_429_is_retried_after_retry_after(self) -> None:
+        gov = RateGovernor({"default": ModelLimits(rps=100, burst=10, max_in_flight=4)}, poll_interval_s=0.01)
+        client = OpenRouterAPIClient(api_key_manager=_FakeKeyManager(), rate_governor=gov)
+        ok_body = {"choices": [{"message": {"content": "hello"}, "finish_reason": "stop"}]}
+        client.session = _FakeSession([_FakeResponse(429, {"Retry-After": "0.05"}), _FakeResponse(200, body=ok_body)])
+        text = client.process_text("hi", model_name="test/model")
+        self.assertEqual(text, "hello")
+        self.assertEqual(client.session.calls, 2)
+        self.assertEqual(gov._local._in_flight["test/model"], set())
+
+    def test_parse_retry_after(self) -> None:
+        self.assertEqual(_parse_retry_after_seconds("3"), 3.0)
+        self.assertIsNone(_parse_retry_after_seconds("soon"))
+        self.assertEqual(_parse_retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
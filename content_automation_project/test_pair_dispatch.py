@@ -0,0 +1,138 @@
+"""Tests for parallel single-stage pair execution (webapp.pair_dispatch)."""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from webapp import pair_dispatch
+from webapp.cancel_signal import request_cancel
+from webapp.models import InboxNotification, Job, JobLogLine, JobPair
+from webapp.pair_dispatch import SingleStageSpec, finalize_pair_batch, run_single_stage_job
+from webapp_test_db import make_job_database
+
+
+class TestPairDispatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.job_id = "job-1"
+        _tmp, self.engine, self.Session = make_job_database(
+            self, "pair_dispatch_", job_id=self.job_id, job_type="pre_ocr_topic", status="draft"
+        )
+        patches = [
+            mock.patch.object(pair_dispatch, "SessionLocal", self.Session),
+            mock.patch("webapp.config.RUN_TASKS_INLINE", True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        db = self.Session()
+        for i in range(4):
+            db.add(JobPair(job_id=self.job_id, pair_index=i, stage_j_filename=f"{i}.pdf", stage_j_relpath=f"in/{i}.pdf"))
+        db.commit()
+        db.close()
+
+    def _set_cfg(self, cfg: str) -> None:
+        db = self.Session()
+        db.query(Job).filter(Job.id == self.job_id).update({"config_json": cfg})
+        db.commit()
+        db.close()
+
+    def _state(self):
+        db = self.Session()
+        try:
+            job = db.query(Job).filter(Job.id == self.job_id).one()
+            pairs = {p.pair_index: p.step1_status for p in db.query(JobPair).all()}
+            notes = [n.kind for n in db.query(InboxNotification).all()]
+            logs = [r.line for r in db.query(JobLogLine).order_by(JobLogLine.id).all()]
+            return job.status, pairs, notes, logs
+        finally:
+            db.close()
+
+    def test_parallel_pairs_bounded_and_finalized_once(self) -> None:
+        self._set_cfg('{"pair_concurrency": 2, "delay_seconds": 0}')
+        lock = threading.Lock()
+        in_flight = [0]
+        peak = [0]
+        threads = set()
+
+        def run_pair(run) -> None:
+            run.start()
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+                threads.add(threading.get_ident())
+            time.sleep(0.1)
+            with lock:
+                in_flight[0] -= 1
+            run.pair.step1_status = "failed" if run.pair.pair_index == 2 else "succeeded"
+
+        spec = SingleStageSpec("Fake", "Fake runner started.", run_pair, uses_llm=False)
+        run_single_stage_job(self.job_id, None, spec)
+
+        status, pairs, notes, logs = self._state()
+        self.assertEqual(peak[0], 2)
+        self.assertGreaterEqual(len(threads), 2)
+        self.assertEqual(status, "failed")
+        self.assertEqual(pairs, {0: "succeeded", 1: "succeeded", 2: "failed", 3: "succeeded"})
+        self.assertEqual(notes, ["step1_fail"])
+        self.assertEqual(logs.count("--- Fake job finished ---"), 1)
+
+    def test_serial_run_keeps_pair_order(self) -> None:
+        self._set_cfg('{"delay_seconds": 0}')
+        seen = []
+
+        def run_pair(run) -> None:
+            seen.append((run.position, run.pair.pair_index))
+            run.start()
+            run.pair.step1_status = "succeeded"
+
+        run_single_stage_job(self.job_id, [1, 3], SingleStageSpec("Fake", "start", run_pair, uses_llm=False))
+
+        status, pairs, notes, _ = self._state()
+        self.assertEqual(seen, [(0, 1), (1, 3)])
+        self.assertEqual(status, "succeeded")
+        self.assertEqual(pairs[1], "succeeded")
+        self.assertEqual(pairs[0], "pending")
+        self.assertEqual(notes, ["step1_ok"])
+
+    def test_cancel_in_parallel_run(self) -> None:
+        self._set_cfg('{"pair_concurrency": 4, "delay_seconds": 0}')
+
+        def run_pair(run) -> None:
+            run.start()
+            if run.pair.pair_index == 0:
+                run.db.query(Job).filter(Job.id == run.job_id).update({"cancel_requested": True})
+                run.db.commit()
+                request_cancel(run.job_id)
+            time.sleep(0.05)
+            run.progress("working")
+            run.pair.step1_status = "succeeded"
+
+        run_single_stage_job(self.job_id, None, SingleStageSpec("Fake", "start", run_pair, uses_llm=False))
+
+        status, pairs, notes, logs = self._state()
+        self.assertEqual(status, "cancelled")
+        self.assertTrue(all(s == "failed" for s in pairs.values()))
+        self.assertEqual(notes, [])
+        self.assertEqual(logs.count("--- Step 1 stopped by user ---"), 1)
+
+    def test_finalize_waits_for_active_pairs_and_wins_once(self) -> None:
+        db = self.Session()
+        db.query(Job).update({"status": "running"})
+        db.query(JobPair).update({"step1_status": "succeeded"})
+        db.query(JobPair).filter(JobPair.pair_index == 3).update({"step1_status": "running"})
+        db.commit()
+
+        self.assertFalse(finalize_pair_batch(self.job_id, [0, 1, 2, 3], "Fake"))
+        self.assertTrue(finalize_pair_batch(self.job_id, [0, 1, 2], "Fake"))
+        self.assertFalse(finalize_pair_batch(self.job_id, [0, 1, 2], "Fake"))
+        db.close()
+
+        status, _, notes, _ = self._state()
+        self.assertEqual(status, "succeeded")
+        self.assertEqual(notes, ["step1_ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
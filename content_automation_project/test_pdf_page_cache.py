@@ -0,0 +1,75 @@
+"""Tests for the persistent per-page PDF text cache."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import fitz
+
+import pdf_processor
+from pdf_processor import PDFProcessor
+
+
+def _write_pdf(path: str, n: int) -> None:
+    doc = fitz.open()
+    for i in range(1, n + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page body {i}")
+    doc.save(path)
+    doc.close()
+
+
+class TestPdfPageCache(unittest.TestCase):
+    def test_repeat_extractions_are_served_from_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "book.pdf")
+            _write_pdf(pdf_path, 4)
+            cache_dir = os.path.join(tmp, "cache")
+
+            full = PDFProcessor(cache_dir=cache_dir).extract_text(pdf_path)
+            uncached_range = PDFProcessor().extract_text_range(pdf_path, 2, 3)
+
+            proc = PDFProcessor(cache_dir=cache_dir)
+            with mock.patch.object(pdf_processor.fitz, "open", side_effect=AssertionError("PDF reopened")):
+                self.assertEqual(proc.extract_text(pdf_path), full)
+                self.assertEqual(proc.extract_text_range(pdf_path, 2, 3), uncached_range)
+                self.assertEqual(proc.count_pages(pdf_path), 4)
+
+        self.assertIn("--- Page 4 ---\nPage body 4", full)
+        self.assertTrue(uncached_range.startswith("--- Page 2 ---\nPage body 2"))
+        self.assertNotIn("Page body 4", uncached_range)
+
+    def test_changed_file_misses_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "book.pdf")
+            proc = PDFProcessor(cache_dir=os.path.join(tmp, "cache"))
+            _write_pdf(pdf_path, 2)
+            self.assertEqual(proc.count_pages(pdf_path), 2)
+            _write_pdf(pdf_path, 5)
+            self.assertEqual(proc.count_pages(pdf_path), 5)
+            self.assertIn("Page body 5", proc.extract_text(pdf_path))
+
+
+class TestParallelPageExtraction(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"PDF_TEXT_CACHE_DIR": ""})
+    def test_process_pool_matches_serial_output(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "book.pdf")
+            _write_pdf(pdf_path, 12)
+            serial = PDFProcessor(extract_workers=1)
+            parallel = PDFProcessor(extract_workers=3)
+            parallel.PARALLEL_MIN_PAGES = 4
+
+            self.assertEqual(len(parallel._extract_pages_parallel(pdf_path, parallel.MODE_MUPDF_TEXT, list(range(1, 13)))), 12)
+            with mock.patch.object(parallel, "_extract_pages_parallel", wraps=parallel._extract_pages_parallel) as spy:
+                self.assertEqual(parallel.extract_text(pdf_path), serial.extract_text(pdf_path))
+                self.assertEqual(
+                    parallel.extract_text_with_formatting(pdf_path),
+                    serial.extract_text_with_formatting(pdf_path),
+                )
+            self.assertEqual(spy.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
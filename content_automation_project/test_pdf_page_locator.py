@@ -0,0 +1,80 @@
+"""Tests for locating Pre-OCR subchapters in the PDF page range."""
+
+import os
+import tempfile
+import unittest
+
+import fitz
+
+from pdf_processor import PDFProcessor
+
+
+def _write_pdf(path: str, pages) -> None:
+    doc = fitz.open()
+    for heading, body in pages:
+        page = doc.new_page()
+        y = 72
+        if heading:
+            page.insert_text((72, y), heading, fontname="hebo", fontsize=16)
+            y += 30
+        page.insert_text((72, y), body, fontname="helv", fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+class TestPdfPageLocator(unittest.TestCase):
+    def test_windows_follow_headings_with_margin(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "chapter.pdf")
+            _write_pdf(
+                pdf_path,
+                [
+                    ("", "Chapter contents: Alpha Disease, Beta Syndrome"),
+                    ("Alpha Disease", "alpha body text"),
+                    ("", "more alpha text"),
+                    ("Beta Syndrome", "beta body text"),
+                    ("", "more beta text"),
+                    ("", "closing text"),
+                ],
+            )
+            rows = [
+                {"Subchapter": "Alpha Disease", "Topics": []},
+                {"Subchapter": "Missing Subchapter", "Topics": ["Nowhere"]},
+                {"Subchapter": "Beta Syndrome", "Topics": []},
+            ]
+            proc = PDFProcessor()
+            no_margin = proc.locate_subchapter_pages(pdf_path, rows, margin=0)
+            with_margin = proc.locate_subchapter_pages(pdf_path, rows, margin=1)
+
+        self.assertEqual(no_margin, [(2, 4), None, (4, 6)])
+        self.assertEqual(with_margin, [(1, 5), None, (3, 6)])
+
+    def test_bold_contents_page_is_not_a_heading_match(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "chapter.pdf")
+            _write_pdf(
+                pdf_path,
+                [
+                    ("Chapter contents", ""),
+                    ("Alpha Disease", "alpha body text"),
+                    ("", "more alpha text"),
+                    ("Beta Syndrome", "beta body text"),
+                    ("", "closing text"),
+                ],
+            )
+            doc = fitz.open(pdf_path)
+            doc[0].insert_text((72, 130), "Alpha Disease 2", fontname="hebo", fontsize=12)
+            doc[0].insert_text((72, 150), "Beta Syndrome 4", fontname="hebo", fontsize=12)
+            doc.saveIncr()
+            doc.close()
+            rows = [
+                {"Subchapter": "Alpha Disease", "Topics": []},
+                {"Subchapter": "Beta Syndrome", "Topics": []},
+            ]
+            windows = PDFProcessor().locate_subchapter_pages(pdf_path, rows, margin=1)
+
+        self.assertEqual(windows, [(1, 5), (3, 5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
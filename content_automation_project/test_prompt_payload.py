@@ -0,0 +1,41 @@
+"""Tests for the compact prompt payload encoder."""
+
+import json
+import os
+import unittest
+from unittest import mock
+
+from prompt_payload import TABULAR_ENV, encode_payload, tabulate
+
+_ROWS = [{"PointId": str(i), "topic": "حرکت", "Points": f"متن {i}", "Imp": "2"} for i in range(6)]
+
+
+class TestPromptPayload(unittest.TestCase):
+    def test_minified_round_trips_and_logs_savings(self) -> None:
+        with self.assertLogs("prompt_payload", level="DEBUG") as logs:
+            text = encode_payload({"current_data": _ROWS}, stage="stage_x", label="part 1")
+        self.assertNotIn("\n", text)
+        self.assertEqual(json.loads(text), {"current_data": _ROWS})
+        self.assertIn("حرکت", text)
+        self.assertLess(len(text), len(json.dumps({"current_data": _ROWS}, ensure_ascii=False, indent=2)) * 0.8)
+        self.assertIn("stage=stage_x [part 1]", logs.output[0])
+        self.assertIn("tokens", logs.output[0])
+
+    def test_columnar_form(self) -> None:
+        table = tabulate({"rows": _ROWS, "short": _ROWS[:2], "mixed": _ROWS[:3] + [{"PointId": "9"}]})
+        self.assertEqual(table["rows"]["columns"], ["PointId", "topic", "Points", "Imp"])
+        self.assertEqual(table["rows"]["rows"][5], ["5", "حرکت", "متن 5", "2"])
+        self.assertEqual(table["short"], _ROWS[:2])
+        self.assertIsInstance(table["mixed"], list)
+
+    def test_columnar_form_is_opt_in_per_stage(self) -> None:
+        with mock.patch.dict(os.environ, {TABULAR_ENV: "stage_y, stage_v"}):
+            self.assertIn('"columns"', encode_payload(_ROWS, stage="stage_v"))
+            self.assertNotIn('"columns"', encode_payload(_ROWS, stage="stage_x"))
+            self.assertNotIn('"columns"', encode_payload(_ROWS, stage="stage_v", tabular=False))
+        with mock.patch.dict(os.environ, {TABULAR_ENV: ""}):
+            self.assertNotIn('"columns"', encode_payload(_ROWS, stage="stage_v"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,6 +20,16 @@ class _ThreadingTestStageVProcessor(StageVProcessor):
         self.current_concurrency = 0
         self.max_concurrency = 0
         self.step2_calls = 0
+        self.attempts = {}
+        self.topic_delays = {}
+        self.fail_first_attempts = {}
+        self.retry_passes = {}
+        # blocking_topic holds its slot until every topic in blocking_until has succeeded
+        self.blocking_topic = None
+        self.blocking_until = set()
+        self.succeeded = set()
+        self.others_done = threading.Event()
+        self.overlapped = None
 
     def _step1_run_once(
         self,
@@ -32,6 +42,7 @@ class _ThreadingTestStageVProcessor(StageVProcessor):
         chapter_id: int,
         output_dir=None,
         progress_callback=None,
+        cancel_check=None,
     ):
         # Fake Step 1 output file so Step 2 can continue.
         out_dir = output_dir or os.path.dirname(stage_j_path)
@@ -63,15 +74,26 @@ class _ThreadingTestStageVProcessor(StageVProcessor):
         output_dir=None,
         progress_callback=None,
         assign_qid: bool = True,
+        topic_step1_json: str = "",
+        cancel_check=None,
+        retry_pass: int = 1,
     ):
         with self._lock:
             self.current_concurrency += 1
             self.max_concurrency = max(self.max_concurrency, self.current_concurrency)
             self.step2_calls += 1
+            self.attempts[topic_idx] = self.attempts.get(topic_idx, 0) + 1
+            attempt = self.attempts[topic_idx]
+            self.retry_passes.setdefault(topic_idx, []).append(retry_pass)
 
         try:
-            # Keep threads alive briefly to expose real overlap.
-            time.sleep(0.08)
+            if topic_idx == self.blocking_topic:
+                self.overlapped = self.others_done.wait(5.0)
+            else:
+                # Keep threads alive briefly to expose real overlap.
+                time.sleep(self.topic_delays.get(topic_idx, 0.08))
+            if attempt <= self.fail_first_attempts.get(topic_idx, 0):
+                return None, 0
             out_dir = output_dir or os.path.dirname(stage_j_path)
             os.makedirs(out_dir, exist_ok=True)
             path = os.path.join(out_dir, f"step2_topic_{topic_idx}.json")
@@ -81,39 +103,55 @@ class _ThreadingTestStageVProcessor(StageVProcessor):
                 metadata={"topic_idx": topic_idx},
                 stage_name="V-Step2-Test",
             )
+            with self._lock:
+                self.succeeded.add(topic_idx)
+                if self.blocking_until and self.blocking_until <= self.succeeded:
+                    self.others_done.set()
             return path, 1
         finally:
             with self._lock:
                 self.current_concurrency -= 1
 
 
+class _RecordingTopicHooks:
+    def __init__(self):
+        self.done = []
+
+    def on_topic_done(self, topic_idx, chapter, subchapter, topic, path, prompt_seq):
+        self.done.append(topic_idx)
+
+
+def _write_stage_v_inputs(tmp: str, n_topics: int):
+    stage_j_path = os.path.join(tmp, "a105030.json")
+    word_file_path = os.path.join(tmp, "doc.docx")
+
+    # Create minimal word placeholder file (not used by fake Step 1).
+    with open(word_file_path, "w", encoding="utf-8") as f:
+        f.write("word-placeholder")
+
+    rows = []
+    for i in range(1, n_topics + 1):
+        rows.append(
+            {
+                "PointId": f"105030{i:04d}",
+                "chapter": "Chapter 30",
+                "subchapter": f"Sub {i%3}",
+                "topic": f"Topic {i}",
+                "subtopic": "",
+                "subsubtopic": "",
+                "Points": f"Point {i}",
+                "Imp": "M",
+            }
+        )
+    with open(stage_j_path, "w", encoding="utf-8") as f:
+        json.dump({"metadata": {"stage": "J"}, "data": rows}, f, ensure_ascii=False, indent=2)
+    return stage_j_path, word_file_path
+
+
 class StageVThreadingTest(unittest.TestCase):
     def test_step2_uses_threaded_batches_without_real_api(self):
         with tempfile.TemporaryDirectory() as tmp:
-            stage_j_path = os.path.join(tmp, "a105030.json")
-            word_file_path = os.path.join(tmp, "doc.docx")
-
-            # Create minimal word placeholder file (not used by fake Step 1).
-            with open(word_file_path, "w", encoding="utf-8") as f:
-                f.write("word-placeholder")
-
-            # 20 topics => two batches with batch size 10.
-            rows = []
-            for i in range(1, 21):
-                rows.append(
-                    {
-                        "PointId": f"105030{i:04d}",
-                        "chapter": "Chapter 30",
-                        "subchapter": f"Sub {i%3}",
-                        "topic": f"Topic {i}",
-                        "subtopic": "",
-                        "subsubtopic": "",
-                        "Points": f"Point {i}",
-                        "Imp": "M",
-                    }
-                )
-            with open(stage_j_path, "w", encoding="utf-8") as f:
-                json.dump({"metadata": {"stage": "J"}, "data": rows}, f, ensure_ascii=False, indent=2)
+            stage_j_path, word_file_path = _write_stage_v_inputs(tmp, 20)
 
             processor = _ThreadingTestStageVProcessor()
             output_path = processor.process_stage_v(
@@ -142,6 +180,42 @@ class StageVThreadingTest(unittest.TestCase):
             actual_qids = [row.get("QId") for row in data]
             self.assertEqual(actual_qids, expected_qids)
 
+    def test_step2_sliding_window_retries_and_commits_in_topic_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stage_j_path, word_file_path = _write_stage_v_inputs(tmp, 8)
+            processor = _ThreadingTestStageVProcessor()
+            # Topic 1 runs until all others are done; with batch barriers topics 4..8 would wait for it.
+            processor.blocking_topic = 1
+            processor.blocking_until = set(range(2, 9))
+            processor.fail_first_attempts = {3: 1}
+            step1_path = processor._step1_run_once(
+                stage_j_path, word_file_path, "", "p1", "m1", 105, 30, output_dir=tmp
+            )
+            hooks = _RecordingTopicHooks()
+
+            output_path = processor.process_stage_v_step2(
+                stage_j_path=stage_j_path,
+                word_file_path=word_file_path,
+                prompt_2="p2 {Topic_NAME} {Subchapter_Name}",
+                model_name_2="m2",
+                step1_combined_path=step1_path,
+                output_dir=tmp,
+                unit_hooks=hooks,
+                step2_concurrency=3,
+            )
+
+            self.assertIsNotNone(output_path)
+            self.assertEqual(processor.attempts[3], 2)
+            self.assertEqual(processor.retry_passes[3], [1, 2])  # the re-queue refreshes the cache
+            self.assertEqual(processor.step2_calls, 9)
+            self.assertEqual(processor.max_concurrency, 3)
+            # Topics 2..8 (and topic 3's retry) shared the two free slots while topic 1 was in flight.
+            self.assertTrue(processor.overlapped)
+            self.assertEqual(hooks.done, list(range(1, 9)))
+            with open(output_path, "r", encoding="utf-8") as f:
+                data = json.load(f)["data"]
+            self.assertEqual([row["Qtext"] for row in data], [f"q_{i}" for i in range(1, 9)])
+
 
 if __name__ == "__main__":
     unittest.main()
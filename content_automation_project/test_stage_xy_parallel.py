@@ -0,0 +1,120 @@
+"""Tests for concurrent Stage X parts and subchapter-sharded Stage Y deletion detection."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from stage_x_processor import StageXProcessor
+from stage_y_processor import StageYProcessor
+
+
+class _ConcurrencyClient:
+    """Records request payloads and the peak number of requests in flight."""
+
+    def __init__(self, respond) -> None:
+        self.respond = respond
+        self.payloads = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def process_text(self, text, system_prompt=None, model_name=None, **kwargs):
+        payload = json.loads(text)
+        with self._lock:
+            self.payloads.append(payload)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        return json.dumps(self.respond(payload), ensure_ascii=False)
+
+
+class TestStageXYParallel(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp(prefix="stage_xy_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def _write(self, name: str, data) -> str:
+        path = os.path.join(self.tmp, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        return path
+
+    def test_stage_x_parts_run_concurrently_and_merge_in_order(self) -> None:
+        records = [{"PointId": f"1050030{i:03d}", "Points": f"point {i}"} for i in range(600)]
+        stage_a = self._write("a105003+Motion.json", {"metadata": {"chapter": "Motion"}, "data": records})
+        pdf_json = self._write("old.json", {"rows": [{"text": "old"}]})
+
+        def respond(payload):
+            first = payload["current_data"][0]["PointId"]
+            # Every part also reports the same shared change, which must be kept once.
+            return [{"POINTID": first, "Change Description": "edited", "Change Type": "edit"},
+                    {"POINTID": "1050030000", "Change Description": "edited", "Change Type": "edit"}]
+
+        client = _ConcurrencyClient(respond)
+        out = StageXProcessor(client).process_stage_x(
+            old_book_pdf_path="", pdf_extraction_prompt="", pdf_extraction_model="",
+            stage_a_path=stage_a, changes_prompt="detect", changes_model="m",
+            output_dir=self.tmp, pdf_extracted_path=pdf_json, max_parallel_parts=3,
+        )
+        self.assertEqual(client.peak, 3)
+        with open(out, encoding="utf-8") as f:
+            changes = json.load(f)["data"]
+        self.assertEqual([c["POINTID"] for c in changes], ["1050030000", "1050030200", "1050030400"])
+        for n in (1, 2, 3):
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp, f"a105003+Motion_stage_x_part2_part{n}.json")))
+
+    def test_dedupe_accepts_non_string_fields(self) -> None:
+        changes = [
+            {"POINTID": 0, "Change Description": "x", "Change Type": "edit"},
+            {"POINTID": "0", "Change Description": " x ", "Change Type": "Edit"},
+            {"POINTID": "", "Change Description": 5, "Change Type": None},
+        ]
+        self.assertEqual(StageXProcessor._dedupe_changes(changes), [changes[0], changes[2]])
+
+    def test_stage_y_shards_by_subchapter_and_splits_the_old_book(self) -> None:
+        names = ["Speed", "Force", "Energy"]
+        ocr = {"metadata": {"book_id": 105, "chapter_id": 3, "chapter": "Motion"},
+               "chapters": [{"chapter": "Motion", "subchapters": [
+                   {"subchapter": n, "topics": [{"topic": f"{n.lower()} basics", "extractions": [f"{n.lower()} text"]}]}
+                   for n in names]}]}
+        ocr_path = self._write("o105003+Motion.json", ocr)
+        old_rows = []
+        for n in names:
+            old_rows += [{"text": f"{n.lower()} text"}, {"text": f"{n.lower()} removed paragraph"}]
+        step1 = self._write("step1.json", {"rows": old_rows})
+
+        def respond(payload):
+            return {"deletions": [{"Sentence": r["text"]} for r in payload["old_book_data"] if "removed" in r["text"]]
+                    + [{"Sentence": "  repeated   sentence "}]}
+
+        client = _ConcurrencyClient(respond)
+        out = StageYProcessor(client)._step2_detect_deletions(
+            step1_output_path=step1, ocr_extraction_json_path=ocr_path, prompt="p", model_name="m",
+            output_dir=self.tmp, book_id=105, chapter_id=3,
+        )
+        self.assertEqual(len(client.payloads), 3)
+        self.assertGreater(client.peak, 1)
+        sent = sorted(r["text"] for p in client.payloads for r in p["old_book_data"])
+        self.assertEqual(sent, sorted(r["text"] for r in old_rows))
+        for p in client.payloads:
+            self.assertEqual(len(p["current_data"][0]["subchapters"]), 1)
+
+        with open(out, encoding="utf-8") as f:
+            deletions = json.load(f)["data"]
+        self.assertEqual(
+            [d["Sentence"] for d in deletions],
+            ["speed removed paragraph", "  repeated   sentence ", "force removed paragraph", "energy removed paragraph"],
+        )
+        self.assertEqual([d["Number"] for d in deletions], ["1", "2", "3", "4"])
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp, "o105003+Motion_stage_y_step2_shard2.json")))
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp, "o105003+Motion_stage_y_step2.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Tests for per-unit shards of a pair's combined output (webapp.unit_repair.shards)."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from webapp.unit_repair.manifest import save_manifest
+from webapp.unit_repair.preview import get_unit_preview_payload
+from webapp.unit_repair.shards import load_unit_shard, shards_dir, unit_payloads
+
+JOB = "job-shards"
+
+
+def _point(topic: str, pid: str) -> dict:
+    return {"chapter": "C1", "subchapter": "S1", "topic": topic, "PointId": pid}
+
+
+class TestUnitShards(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp(prefix="unit_shards_")
+        self.addCleanup(shutil.rmtree, self.root, True)
+        p = mock.patch("webapp.job_files.JOBS_ROOT", self.root)
+        p.start()
+        self.addCleanup(p.stop)
+        self.manifest = {
+            "job_type": "document_processing",
+            "output_relpath": "pair_1/output/points.json",
+            "units": [
+                {"unit_index": 1, "chapter": "C1", "subchapter": "S1", "topic": "T1"},
+                {"unit_index": 2, "chapter": "C1", "subchapter": "S1", "topic": "T2"},
+            ],
+        }
+        save_manifest(JOB, 1, self.manifest)
+        self.output = os.path.join(self.root, JOB, "pair_1", "output", "points.json")
+        os.makedirs(os.path.dirname(self.output))
+
+    def _write_output(self, points) -> None:
+        with open(self.output, "w", encoding="utf-8") as f:
+            json.dump({"points": points}, f)
+
+    def test_shards_follow_the_combined_file(self) -> None:
+        self._write_output([_point("T1", "1"), _point("T2", "2"), _point("T1", "3")])
+        first = load_unit_shard(JOB, 1, "document_processing", 1)
+        self.assertEqual([p["PointId"] for p in first["points"]], ["1", "3"])
+        self.assertEqual(sorted(os.listdir(shards_dir(JOB, 1))), ["index.json", "u001.json", "u002.json"])
+
+        # A rewrite (e.g. renumber) changes the file's size/mtime, so the shards are rebuilt.
+        self._write_output([_point("T1", "10")])
+        os.utime(self.output, ns=(1, 1))
+        self.assertEqual(load_unit_shard(JOB, 1, "document_processing", 1), {"points": [_point("T1", "10")]})
+        self.assertIsNone(load_unit_shard(JOB, 1, "document_processing", 2))
+        self.assertNotIn("u002.json", os.listdir(shards_dir(JOB, 1)))
+
+        payload = get_unit_preview_payload(JOB, 1, 1, "document_processing")
+        self.assertEqual(payload["sections"][0]["title"], "Unit output (from combined file)")
+        self.assertIn('"PointId": "10"', payload["sections"][0]["content"])
+
+    def test_unit_payloads_by_job_type(self) -> None:
+        units = [{"unit_index": 1, "subchapter": "B"}, {"unit_index": 2, "subchapter": "missing"}]
+        data = {"chapters": [{"subchapters": [{"subchapter": "A"}, {"subchapter": "B"}]}]}
+        self.assertEqual(unit_payloads("ocr_extraction", data, units), {1: {"subchapter": "B"}, 2: {"subchapter": "B"}})
+
+        units = [{"unit_index": 1, "topic_name": "T", "subchapter_name": "S"}]
+        rows = [{"Topic": "T", "Subchapter": "S", "q": 1}, {"Topic": "T", "Subchapter": "X", "q": 2}]
+        self.assertEqual(unit_payloads("test_bank", {"data": rows}, units), {1: [rows[0]]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Tests for the Voice Class audio metadata sidecar (webapp.voice_segment_index)."""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+import wave
+
+from webapp.audio_merge import wav_header_duration_seconds
+from webapp.voice_segment_index import (
+    cached_audio_metadata,
+    index_path,
+    load_audio_index,
+    record_audio_metadata,
+    rel_to_output,
+    segment_rel_path,
+    store_audio_metadata,
+)
+
+
+def _write_wav(path: str, seconds: float) -> None:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(24000)
+        w.writeframes(b"\x00\x00" * int(24000 * seconds))
+
+
+def _store_entries(out_dir: str, first: int, count: int) -> None:
+    for sid in range(first, first + count):
+        store_audio_metadata(out_dir, {segment_rel_path(sid): {"duration_seconds": float(sid)}})
+
+
+class TestVoiceSegmentIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.out = tempfile.mkdtemp(prefix="voice_index_")
+        self.addCleanup(shutil.rmtree, self.out, True)
+        os.makedirs(os.path.join(self.out, "tts_segments"))
+        self.rel = segment_rel_path(7)
+        self.wav = os.path.join(self.out, "tts_segments", "segment_007.wav")
+
+    def test_entry_is_served_until_the_file_changes(self) -> None:
+        _write_wav(self.wav, 1.5)
+        meta = {"duration_seconds": 1.5, "is_silent": True, "waveform_peaks": [0.0] * 4}
+        record_audio_metadata(self.out, self.rel, meta)
+        self.assertTrue(os.path.isfile(index_path(self.out)))
+
+        cached = cached_audio_metadata(load_audio_index(self.out), self.out, self.rel)
+        self.assertEqual(cached["duration_seconds"], 1.5)
+        self.assertTrue(cached["is_silent"])
+
+        _write_wav(self.wav, 2.0)
+        self.assertIsNone(cached_audio_metadata(load_audio_index(self.out), self.out, self.rel))
+        self.assertAlmostEqual(wav_header_duration_seconds(self.wav), 2.0)
+
+    def test_missing_or_corrupt_index_is_empty(self) -> None:
+        self.assertEqual(load_audio_index(self.out), {})
+        with open(index_path(self.out), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertEqual(load_audio_index(self.out), {})
+        self.assertEqual(rel_to_output(self.out, self.wav), "tts_segments/segment_007.wav")
+        self.assertIsNone(rel_to_output(self.out, os.path.dirname(self.out)))
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs fork")
+    def test_writers_in_separate_processes_keep_each_others_entries(self) -> None:
+        for sid in range(1, 41):
+            _write_wav(os.path.join(self.out, "tts_segments", f"segment_{sid:03d}.wav"), 0.01)
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_store_entries, args=(self.out, 1 + 10 * i, 10)) for i in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(30)
+        self.assertEqual([p.exitcode for p in procs], [0] * 4)
+        self.assertEqual(len(load_audio_index(self.out)), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
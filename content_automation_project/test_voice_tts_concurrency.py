@@ -0,0 +1,186 @@
+"""Tests for concurrent Voice Class TTS segment synthesis across the key pool."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from types import SimpleNamespace
+from unittest import mock
+
+import stage_voice_processor
+from stage_voice_processor import StageVoiceProcessor
+from webapp.voice_segment_index import load_audio_index
+
+
+def _write_wav(path: str, seconds: float = 0.5) -> None:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00\x00" * int(8000 * seconds))
+
+
+def _wav_seconds(path: str):
+    try:
+        with wave.open(path, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+    except (OSError, wave.Error):
+        return None
+
+
+class _FakeKeyManager:
+    """In-memory stand-in for GeminiTtsKeyManager (lease / release / mark_*)."""
+
+    def __init__(self, n_keys: int, max_attempts: int = 3):
+        self.rows = [SimpleNamespace(id=i + 1, account_name=f"acct{i + 1}", api_key=f"key-{i + 1}") for i in range(n_keys)]
+        self._leased = set()
+        self._max_attempts = max_attempts
+        self.successes = []
+        self.failures = []
+        self.db = SimpleNamespace(expire_all=lambda: None)
+
+    def max_attempts(self) -> int:
+        return self._max_attempts
+
+    def active_key_count(self) -> int:
+        return len(self.rows)
+
+    def lease_available_key(self):
+        for row in self.rows:
+            if row.id not in self._leased:
+                self._leased.add(row.id)
+                return row
+        return None
+
+    def release_key(self, row) -> None:
+        self._leased.discard(row.id)
+
+    def seconds_until_any_key_available(self, exclude_leased: bool = False):
+        return 0.0 if self.rows else None
+
+    def mark_success(self, row) -> None:
+        self.successes.append(row.api_key)
+
+    def mark_failure(self, row, error: str) -> None:
+        self.failures.append((row.api_key, error))
+
+
+class TestConcurrentTts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp(prefix="voice_tts_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        segments = [
+            {"segment_id": i, "combined_text": f"text {i}", "paragraph_count": 1, "estimated_seconds": 1.0}
+            for i in range(1, 9)
+        ]
+        self.script = os.path.join(self.tmp, "v.json")
+        with open(self.script, "w", encoding="utf-8") as f:
+            json.dump({"metadata": {"book_id": 1, "chapter_id": 2}, "segments": segments}, f)
+        self.tts_dir = os.path.join(self.tmp, "tts_segments")
+        for p in (
+            mock.patch.object(stage_voice_processor, "wav_duration_seconds", _wav_seconds),
+            mock.patch("api_layer.GENAI_AVAILABLE", True),
+            # Step 2 writes debug-session lines under .cursor/ in the project tree
+            mock.patch("webapp.debug_session_log.debug_log"),
+        ):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _run(self, mgr, fake_request, **kwargs):
+        proc = StageVoiceProcessor(None, gemini_tts_key_manager=mgr)
+        messages = []
+        with mock.patch.object(StageVoiceProcessor, "_tts_request", staticmethod(fake_request)):
+            result = proc.process_voice_class_step2(
+                self.script,
+                self.tmp,
+                intro_mp3="",
+                outro_mp3="",
+                tts_model="m",
+                tts_voice="v",
+                skip_merge=True,
+                progress_callback=messages.append,
+                **kwargs,
+            )
+        return proc, result, messages
+
+    def test_one_request_per_key_and_bounded_parallelism(self) -> None:
+        os.makedirs(self.tts_dir, exist_ok=True)
+        _write_wav(os.path.join(self.tts_dir, "segment_002.wav"))
+        lock = threading.Lock()
+        in_flight_keys = set()
+        peak = [0]
+        calls = []
+
+        def fake_request(text, output_wav, *, api_key, voice, model, instruction):
+            with lock:
+                self.assertNotIn(api_key, in_flight_keys)
+                in_flight_keys.add(api_key)
+                peak[0] = max(peak[0], len(in_flight_keys))
+                calls.append(text)
+            time.sleep(0.05)
+            self.assertTrue(output_wav.endswith(".tmp.wav"))
+            _write_wav(output_wav)
+            with lock:
+                in_flight_keys.discard(api_key)
+            return None
+
+        mgr = _FakeKeyManager(3)
+        with mock.patch.object(
+            stage_voice_processor, "store_audio_metadata", wraps=stage_voice_processor.store_audio_metadata
+        ) as store:
+            _proc, result, messages = self._run(mgr, fake_request, tts_concurrency=8)
+
+        self.assertEqual(result, self.script)
+        self.assertEqual(peak[0], 3)
+        self.assertNotIn("text 2", calls)
+        self.assertEqual(len(calls), 7)
+        self.assertIn("Segment 2 skipped", " ".join(messages))
+        self.assertEqual(
+            sorted(os.listdir(self.tts_dir)),
+            [f"segment_{i:03d}.wav" for i in range(1, 9)],
+        )
+        # One index write for the whole batch, with an entry per synthesized segment
+        store.assert_called_once()
+        self.assertEqual(len(load_audio_index(self.tmp)), 7)
+        starts = [m for m in messages if m.startswith("TTS segment ")]
+        self.assertEqual([m.split()[2] for m in starts], ["1/8", "3/8", "4/8", "5/8", "6/8", "7/8", "8/8"])
+
+    def test_failed_attempt_retries_on_another_key(self) -> None:
+        failed_once = set()
+
+        def fake_request(text, output_wav, *, api_key, voice, model, instruction):
+            if text == "text 4" and text not in failed_once:
+                failed_once.add(text)
+                return "429 rate limit"
+            _write_wav(output_wav)
+            return None
+
+        mgr = _FakeKeyManager(2)
+        _proc, result, _messages = self._run(mgr, fake_request)
+        self.assertEqual(result, self.script)
+        self.assertEqual(len(mgr.failures), 1)
+        self.assertEqual(len(mgr.successes), 8)
+        self.assertTrue(os.path.isfile(os.path.join(self.tts_dir, "segment_004.wav")))
+
+    def test_exhausted_segment_fails_without_partial_file(self) -> None:
+        def fake_request(text, output_wav, *, api_key, voice, model, instruction):
+            _write_wav(output_wav, 0.1)
+            if text == "text 3":
+                return "server error"
+            return None
+
+        mgr = _FakeKeyManager(2, max_attempts=2)
+        proc, result, _messages = self._run(mgr, fake_request, tts_concurrency=2)
+        self.assertIsNone(result)
+        self.assertEqual(proc._last_tts_failure, "server error")
+        self.assertFalse(os.path.exists(os.path.join(self.tts_dir, "segment_003.wav")))
+        self.assertFalse([n for n in os.listdir(self.tts_dir) if n.endswith(".tmp.wav")])
+        self.assertEqual(mgr._leased, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -39,6 +39,8 @@ import json
 import logging
 from typing import Any, Dict, List, Optional, Callable
 
+from prompt_payload import encode_payload
+
 
 logger = logging.getLogger(__name__)
 
@@ -83,8 +85,8 @@ def run_third_stage_chunked(
         logger.info(msg)
 
     # Pre-render source and incomplete JSON once (they may be large)
-    source_json_str = json.dumps(json1_data, ensure_ascii=False, indent=2)
-    incomplete_json_str = json.dumps(json2_data, ensure_ascii=False, indent=2)
+    source_json_str = encode_payload(json1_data, stage=f"{stage_name}_stage", label="source")
+    incomplete_json_str = encode_payload(json2_data, stage=f"{stage_name}_stage", label="incomplete")
 
     all_content: List[Any] = []
     chunk_index: int = 1
@@ -102,7 +104,7 @@ def run_third_stage_chunked(
             cursor_part = (
                 "\n\nPrevious cursor (for continuation – read-only, "
                 "do NOT copy it verbatim into payload):\n"
-                + json.dumps(cursor, ensure_ascii=False, indent=2)
+                + json.dumps(cursor, ensure_ascii=False, separators=(",", ":"))
             )
 
         # Build full prompt for this chunk.
@@ -6,10 +6,11 @@ Converts the model response (with hierarchical JSON structure) to flat JSON with
 import json
 import logging
 import os
-import re
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from json_stream_extractor import extract_primary_json
+
 
 class ThirdStageConverter:
     """Convert third stage output to flat JSON with PointId."""
@@ -125,7 +126,8 @@ class ThirdStageConverter:
 
     def _extract_json_from_response(self, response_text: str) -> Optional[Dict[str, Any]]:
         """
-        Extract JSON from response text (may contain markdown code blocks).
+        Extract JSON from response text (may contain markdown code blocks, prose, escaped JSON
+        strings, trailing commas or a truncated tail); the largest block wins.
 
         Returns:
             Parsed JSON object or None on error.
@@ -133,489 +135,10 @@ class ThirdStageConverter:
         if not response_text:
             return None
 
-        # If response_text is already a JSON string (escaped), try to unescape it first
-        try:
-            # Check if it's a JSON-encoded string
-            if response_text.startswith('"') and response_text.endswith('"'):
-                unescaped = json.loads(response_text)
-                if isinstance(unescaped, str):
-                    response_text = unescaped
-        except:
-            pass
-
-        # Try to find JSON in markdown code blocks
-        # First, check if there's an opening ```json marker
-        start_marker = '```json'
-        start_idx = response_text.find(start_marker)
-        
-        if start_idx != -1:
-            # Found opening marker, extract from after it
-            json_start = start_idx + len(start_marker)
-            # Look for closing marker
-            end_marker = '```'
-            end_idx = response_text.find(end_marker, json_start)
-            
-            if end_idx != -1:
-                # Found closing marker
-                json_str = response_text[json_start:end_idx].strip()
-            else:
-                # No closing marker - JSON is incomplete, extract everything after opening
-                json_str = response_text[json_start:].strip()
-                self.logger.warning("No closing markdown marker found, JSON may be incomplete")
-        else:
-            # Try without json identifier
-            start_marker = '```'
-            start_idx = response_text.find(start_marker)
-            if start_idx != -1:
-                json_start = start_idx + len(start_marker)
-                end_idx = response_text.find('```', json_start)
-                if end_idx != -1:
-                    json_str = response_text[json_start:end_idx].strip()
-                else:
-                    json_str = response_text[json_start:].strip()
-                    self.logger.warning("No closing markdown marker found, JSON may be incomplete")
-            else:
-                # No markdown markers, try direct JSON parse
-                json_str = response_text.strip()
-
-        # Try to parse JSON
-        try:
-            parsed = json.loads(json_str)
-            self.logger.debug("Successfully parsed JSON directly")
-            return parsed
-        except json.JSONDecodeError as e:
-            self.logger.warning(f"Direct JSON parse failed: {e}. Trying fallback extraction...")
-            self.logger.debug(f"JSON string length: {len(json_str)}, first 200 chars: {json_str[:200]}")
-            
-            # Repair unterminated string (truncated model output) then retry
-            if "Unterminated string" in str(e) or "Unterminated" in str(e):
-                repaired = self._repair_unterminated_string(json_str, e)
-                if repaired:
-                    try:
-                        parsed = json.loads(repaired)
-                        self.logger.info("Successfully parsed JSON after repairing unterminated string")
-                        return parsed
-                    except json.JSONDecodeError:
-                        pass
-            
-            # Try to extract JSON object/array
-            start_obj = json_str.find("{")
-            start_arr = json_str.find("[")
-            
-            if start_obj != -1 and (start_arr == -1 or start_obj < start_arr):
-                end_obj = json_str.rfind("}")
-                if end_obj > start_obj:
-                    candidate = json_str[start_obj:end_obj + 1]
-                    self.logger.debug(f"Trying to parse extracted object (length: {len(candidate)})")
-                    try:
-                        parsed = json.loads(candidate)
-                        self.logger.info("Successfully parsed JSON using object extraction")
-                        return parsed
-                    except json.JSONDecodeError as e2:
-                        self.logger.warning(f"Object extraction parse failed: {e2}")
-                        # Try progressive extraction - find the largest valid JSON prefix
-                        try:
-                            balanced = self._extract_largest_valid_json(candidate)
-                            if balanced:
-                                parsed = json.loads(balanced)
-                                self.logger.info(f"Successfully parsed JSON using progressive extraction (extracted {len(balanced)} chars from {len(candidate)})")
-                                return parsed
-                        except Exception as e3:
-                            self.logger.debug(f"Progressive extraction also failed: {e3}")
-                        
-                        # Last resort: try to extract valid JSON by finding last complete structure
-                        try:
-                            self.logger.info("Attempting to repair incomplete JSON...")
-                            repaired = self._repair_incomplete_json(candidate)
-                            if repaired:
-                                parsed = json.loads(repaired)
-                                self.logger.info("Successfully parsed JSON using repair method")
-                                return parsed
-                            else:
-                                self.logger.warning("Repair method returned None")
-                        except Exception as e4:
-                            self.logger.warning(f"JSON repair also failed: {e4}", exc_info=True)
-            elif start_arr != -1:
-                end_arr = json_str.rfind("]")
-                if end_arr > start_arr:
-                    candidate = json_str[start_arr:end_arr + 1]
-                    self.logger.debug(f"Trying to parse extracted array (length: {len(candidate)})")
-                    try:
-                        parsed = json.loads(candidate)
-                        self.logger.info("Successfully parsed JSON using array extraction")
-                        return parsed
-                    except json.JSONDecodeError as e2:
-                        self.logger.warning(f"Array extraction parse failed: {e2}")
-
-        self.logger.error("All JSON extraction methods failed")
-        return None
-
-    def _repair_unterminated_string(self, text: str, error: json.JSONDecodeError) -> Optional[str]:
-        """
-        Repair JSON that failed with Unterminated string (e.g. truncated model output).
-        Truncates at the error position, then closes any open brackets/braces in reverse order.
-        """
-        pos = getattr(error, "pos", None)
-        if pos is None or pos <= 0:
-            match = re.search(r"\(char\s+(\d+)\)", str(error))
-            if match:
-                pos = int(match.group(1))
-            else:
-                return None
-        if pos >= len(text):
-            pos = len(text)
-        prefix = text[:pos]
-        if not prefix.strip():
-            return None
-        # Track open delimiters in order (respecting strings) so we close in reverse order
-        stack = []
-        i = 0
-        in_string = False
-        escape_next = False
-        n = len(prefix)
-        while i < n:
-            c = prefix[i]
-            if escape_next:
-                escape_next = False
-                i += 1
-                continue
-            if c == "\\" and in_string:
-                escape_next = True
-                i += 1
-                continue
-            if c == '"':
-                in_string = not in_string
-                i += 1
-                continue
-            if in_string:
-                i += 1
-                continue
-            if c == "[":
-                stack.append("]")
-            elif c == "{":
-                stack.append("}")
-            elif c == "]":
-                if stack and stack[-1] == "]":
-                    stack.pop()
-            elif c == "}":
-                if stack and stack[-1] == "}":
-                    stack.pop()
-            i += 1
-        closing = "".join(reversed(stack))
-        repaired = prefix + closing
-        try:
-            json.loads(repaired)
-            return repaired
-        except json.JSONDecodeError:
-            return None
-
-    def _extract_balanced_json(self, text: str, max_pos: int) -> Optional[str]:
-        """Try to extract balanced JSON up to a certain position."""
-        if not text or max_pos <= 0:
-            return None
-        
-        # Find the opening brace
-        start = text.find("{")
-        if start == -1:
-            return None
-        
-        # Try to find balanced braces up to max_pos
-        depth = 0
-        in_string = False
-        escape_next = False
-        last_balanced = start
-        
-        for i in range(start, min(max_pos, len(text))):
-            char = text[i]
-            
-            if escape_next:
-                escape_next = False
-                continue
-            
-            if char == '\\':
-                escape_next = True
-                continue
-            
-            if char == '"' and not escape_next:
-                in_string = not in_string
-                continue
-            
-            if in_string:
-                continue
-            
-            if char == '{':
-                depth += 1
-            elif char == '}':
-                depth -= 1
-                if depth == 0:
-                    last_balanced = i
-        
-        if last_balanced > start:
-            return text[start:last_balanced + 1]
-        
-        return None
-
-    def _repair_incomplete_json(self, text: str) -> Optional[str]:
-        """
-        Try to repair incomplete JSON by finding the last complete string
-        and closing any unclosed brackets/braces.
-        """
-        if not text:
-            return None
-        
-        start = text.find("{")
-        if start == -1:
-            return None
-        
-        # Find the last complete value by scanning forward
-        # We need to find the last complete array element or object property
-        in_string = False
-        escape_next = False
-        last_string_end = start
-        depth = 0
-        array_depth = 0
-        
-        for i, char in enumerate(text[start:], start):
-            if escape_next:
-                escape_next = False
-                continue
-            
-            if char == '\\':
-                escape_next = True
-                continue
-            
-            if char == '"' and not escape_next:
-                if in_string:
-                    # String closed - this could be end of a value
-                    # Check if we're in a valid context (not in a key)
-                    # A value ends with: ", " or ", \n" or "]" or "}"
-                    # Look ahead to see what comes after this quote
-                    if i + 1 < len(text):
-                        next_chars = text[i+1:i+4].strip()
-                        if next_chars.startswith(',') or next_chars.startswith(']') or next_chars.startswith('}'):
-                            last_string_end = i
-                in_string = not in_string
-                continue
-            
-            if in_string:
-                continue
-            
-            # We're outside a string
-            if char == '{':
-                depth += 1
-            elif char == '}':
-                depth -= 1
-                if depth == 0:
-                    last_string_end = i
-            elif char == '[':
-                array_depth += 1
-            elif char == ']':
-                array_depth -= 1
-                if array_depth == 0 and depth == 0:
-                    last_string_end = i
-        
-        if last_string_end > start:
-            # Extract up to the last complete value
-            # But we need to make sure we're at a valid boundary
-            # Look for the last complete array element or object property
-            extracted = text[start:last_string_end + 1]
-            
-            # Find the last ']' that's not inside a string
-            last_array_end = -1
-            in_str = False
-            escape = False
-            for i in range(len(extracted) - 1, -1, -1):
-                if escape:
-                    escape = False
-                    continue
-                if extracted[i] == '\\':
-                    escape = True
-                    continue
-                if extracted[i] == '"':
-                    in_str = not in_str
-                    continue
-                if not in_str and extracted[i] == ']':
-                    last_array_end = i
-                    break
-            
-            if last_array_end > 0:
-                # Extract up to the last complete array
-                extracted = extracted[:last_array_end + 1]
-            
-            # Count unclosed brackets/braces
-            open_braces = extracted.count('{') - extracted.count('}')
-            open_brackets = extracted.count('[') - extracted.count(']')
-            
-            self.logger.debug(f"Found last value at position {last_string_end}, open_braces={open_braces}, open_brackets={open_brackets}")
-            
-            # Close in reverse order (arrays first, then objects)
-            if open_brackets > 0:
-                extracted += ']' * open_brackets
-            if open_braces > 0:
-                extracted += '}' * open_braces
-            
-            try:
-                parsed = json.loads(extracted)
-                self.logger.info(f"Successfully repaired JSON (closed {open_brackets} brackets, {open_braces} braces)")
-                return extracted
-            except json.JSONDecodeError as e:
-                self.logger.debug(f"Repair attempt failed: {e}")
-                # Try to find a better cut point by looking for the last complete array/object
-                pass
-        
-        # Fallback: find last complete structure by tracking depth
-        depth = 0
-        in_string = False
-        escape_next = False
-        last_valid_pos = start
-        
-        for i, char in enumerate(text[start:], start):
-            if escape_next:
-                escape_next = False
-                continue
-            
-            if char == '\\':
-                escape_next = True
-                continue
-            
-            if char == '"' and not escape_next:
-                in_string = not in_string
-                continue
-            
-            if in_string:
-                continue
-            
-            if char == '{':
-                depth += 1
-            elif char == '}':
-                depth -= 1
-                if depth == 0:
-                    last_valid_pos = i
-                elif depth < 0:
-                    break
-        
-        # If we found a complete structure, use it
-        if last_valid_pos > start:
-            extracted = text[start:last_valid_pos + 1]
-            open_braces = extracted.count('{') - extracted.count('}')
-            open_brackets = extracted.count('[') - extracted.count(']')
-            
-            if open_brackets > 0:
-                extracted += ']' * open_brackets
-            if open_braces > 0:
-                extracted += '}' * open_braces
-            
-            try:
-                parsed = json.loads(extracted)
-                return extracted
-            except:
-                pass
-        
-        return None
-
-    def _extract_largest_valid_json(self, text: str) -> Optional[str]:
-        """
-        Extract the largest valid JSON from potentially incomplete text.
-        Works backwards from the end, trying progressively shorter prefixes.
-        """
-        if not text:
-            return None
-        
-        start = text.find("{")
-        if start == -1:
-            return None
-        
-        # Try progressively shorter prefixes
-        # Start from end and work backwards
-        max_length = len(text) - start
-        min_length = 100  # Minimum reasonable JSON length
-        
-        # Binary search for the largest valid JSON
-        left = min_length
-        right = max_length
-        
-        best_result = None
-        
-        while left <= right:
-            mid = (left + right) // 2
-            candidate = text[start:start + mid]
-            
-            # Try to balance and parse
-            try:
-                # First, try to balance brackets
-                balanced = self._balance_json_brackets(candidate)
-                if balanced:
-                    parsed = json.loads(balanced)
-                    # Valid JSON found, try longer
-                    best_result = balanced
-                    left = mid + 1
-                else:
-                    # Invalid, try shorter
-                    right = mid - 1
-            except json.JSONDecodeError:
-                # Invalid, try shorter
-                right = mid - 1
-        
-        return best_result
-
-    def _balance_json_brackets(self, text: str) -> Optional[str]:
-        """
-        Try to balance JSON brackets by finding the last complete structure.
-        """
-        if not text:
-            return None
-        
-        depth = 0
-        in_string = False
-        escape_next = False
-        last_balanced_pos = -1
-        
-        for i, char in enumerate(text):
-            if escape_next:
-                escape_next = False
-                continue
-            
-            if char == '\\':
-                escape_next = True
-                continue
-            
-            if char == '"' and not escape_next:
-                in_string = not in_string
-                continue
-            
-            if in_string:
-                continue
-            
-            if char == '{':
-                depth += 1
-            elif char == '}':
-                depth -= 1
-                if depth == 0:
-                    last_balanced_pos = i
-                elif depth < 0:
-                    # Unbalanced closing brace
-                    break
-        
-        if last_balanced_pos > 0:
-            result = text[:last_balanced_pos + 1]
-            # Try to close any unclosed arrays
-            open_arrays = result.count('[') - result.count(']')
-            if open_arrays > 0:
-                result += ']' * open_arrays
-            return result
-        
-        # If no balanced structure found, try to close manually
-        open_braces = text.count('{') - text.count('}')
-        if open_braces > 0:
-            # Try adding closing braces
-            candidate = text + '}' * open_braces
-            try:
-                json.loads(candidate)
-                return candidate
-            except:
-                pass
-        
-        return None
+        parsed = extract_primary_json(response_text)
+        if parsed is None:
+            self.logger.error("All JSON extraction methods failed")
+        return parsed
 
     def _flatten_to_points(self, json_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON extraction from model responses: json_stream_extractor vs the previous extractors.
+
+The previous implementations (BaseStageProcessor.extract_json_from_response,
+MultiPartPostProcessor._extract_json_blocks_from_text, ThirdStageConverter._extract_json_from_response,
+MultiPartProcessor._extract_json_from_persian_text) are loaded from a git revision (default: the
+revision before json_stream_extractor.py was added), so the comparison stays reproducible after
+they were removed from the tree.
+
+Corpus: response files given on the command line (.txt = one response; .json = a Lesson/stage file
+whose raw_responses[*].response_text are used). Without files, a synthetic Persian corpus is built
+(fenced, prose-wrapped, truncated, trailing-comma and multi-block responses of ~50-500 KB).
+
+Reports per implementation: total time, responses parsed, and agreement with the new extractor.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# module file -> (class, method, returns list of blocks)
+_LEGACY = {
+    "base_stage_processor": ("BaseStageProcessor", "extract_json_from_response", False),
+    "multi_part_post_processor": ("MultiPartPostProcessor", "_extract_json_blocks_from_text", True),
+    "third_stage_converter": ("ThirdStageConverter", "_extract_json_from_response", False),
+    "multi_part_processor": ("MultiPartProcessor", "_extract_json_from_persian_text", False),
+}
+
+
+def _git(*args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=REPO_DIR, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def _default_rev() -> str:
+    try:
+        added = _git("log", "--diff-filter=A", "--format=%H", "-1", "--", "json_stream_extractor.py").strip()
+    except (OSError, subprocess.CalledProcessError):
+        added = ""
+    return f"{added}^" if added else "HEAD"
+
+
+def _load_legacy(rev: str, module_name: str) -> types.ModuleType:
+    source = _git("show", f"{rev}:./{module_name}.py")
+    module = types.ModuleType(f"legacy_{module_name}")
+    module.__file__ = os.path.join(REPO_DIR, f"{module_name}.py")
+    exec(compile(source, f"{rev}:{module_name}.py", "exec"), module.__dict__)
+    return module
+
+
+def _legacy_extractors(rev: str) -> Dict[str, Callable[[str], Any]]:
+    out: Dict[str, Callable[[str], Any]] = {}
+    quiet = logging.getLogger("bench_json_extraction.legacy")
+    quiet.setLevel(logging.CRITICAL)
+    for module_name, (cls_name, method, _) in _LEGACY.items():
+        try:
+            cls = getattr(_load_legacy(rev, module_name), cls_name)
+        except Exception as e:  # noqa: BLE001 - report and benchmark the rest
+            print(f"skip {module_name} at {rev}: {e}", file=sys.stderr)
+            continue
+        obj = cls.__new__(cls)
+        obj.logger = quiet
+        out[f"{cls_name}.{method}"] = getattr(obj, method)
+    return out
+
+
+def _persian_row(i: int) -> Dict[str, Any]:
+    return {
+        "PointId": f"001002{i:04d}",
+        "chapter": "فصل اول: سلول",
+        "subchapter": "بخش ۲ - غشای سلولی",
+        "topic": f"موضوع {i}",
+        "Points": "غشای سلولی از دو لایه فسفولیپید تشکیل شده و پروتئین‌ها در آن شناورند. " * 3,
+        "Importance": str(i % 5),
+    }
+
+
+def _synthetic_corpus() -> List[Tuple[str, str]]:
+    corpus: List[Tuple[str, str]] = []
+    for rows in (150, 600, 1500):
+        body = json.dumps({"data": [_persian_row(i) for i in range(rows)]}, ensure_ascii=False, indent=2)
+        corpus.append((f"fenced_{rows}", f"```json\n{body}\n```"))
+        corpus.append((f"prose_{rows}", f"در ادامه خروجی [1] آمده است:\n{body}\nپایان پاسخ {{مدل}}."))
+        corpus.append((f"truncated_{rows}", "```json\n" + body[: int(len(body) * 0.8)]))
+        corpus.append((f"trailing_comma_{rows}", body.replace('"\n    }', '",\n    }')))
+        half = rows // 2
+        first = json.dumps({"data": [_persian_row(i) for i in range(half)]}, ensure_ascii=False)
+        second = json.dumps({"data": [_persian_row(i) for i in range(half, rows)]}, ensure_ascii=False)
+        corpus.append((f"multi_block_{rows}", f"```json\n{first}\n```\nبخش دوم:\n```json\n{second}\n```"))
+    return corpus
+
+
+def _file_corpus(paths: List[str]) -> List[Tuple[str, str]]:
+    corpus: List[Tuple[str, str]] = []
+    for path in paths:
+        name = os.path.basename(path)
+        if path.lower().endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                doc = json.load(f)
+            raw = doc.get("raw_responses") if isinstance(doc, dict) else None
+            for i, entry in enumerate(raw or []):
+                text = entry.get("response_text") if isinstance(entry, dict) else None
+                if isinstance(text, str) and text:
+                    corpus.append((f"{name}#{i}", text))
+        else:
+            with open(path, encoding="utf-8") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def _streamed(text: str, piece: int) -> Any:
+    from json_stream_extractor import StreamingJsonExtractor
+
+    extractor = StreamingJsonExtractor()
+    for i in range(0, len(text), piece):
+        extractor.feed(text[i : i + piece])
+    extractor.finish()
+    return extractor.blocks
+
+
+def _time(fn: Callable[[str], Any], corpus: List[Tuple[str, str]], repeat: int) -> Tuple[float, List[Any]]:
+    results: List[Any] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        results = [fn(text) for _, text in corpus]
+    return (time.perf_counter() - started) / repeat, results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Response .txt files or stage .json files with raw_responses")
+    parser.add_argument("--rev", default=None, help="Git revision holding the previous extractors")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stream-chunk", type=int, default=256, help="Characters per simulated SSE delta")
+    args = parser.parse_args(argv)
+
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    from json_stream_extractor import extract_json_values, extract_primary_json
+
+    corpus = _file_corpus(args.files) if args.files else _synthetic_corpus()
+    if not corpus:
+        print("empty corpus", file=sys.stderr)
+        return 1
+    total_chars = sum(len(t) for _, t in corpus)
+    rev = args.rev or _default_rev()
+    print(f"corpus: {len(corpus)} responses, {total_chars / 1e6:.1f} M chars; legacy rev {rev}")
+
+    new_time, primary = _time(extract_primary_json, corpus, args.repeat)
+    blocks_time, blocks = _time(extract_json_values, corpus, args.repeat)
+    stream_time, _ = _time(lambda t: _streamed(t, max(1, args.stream_chunk)), corpus, args.repeat)
+    print(f"{'implementation':<58} {'seconds':>8} {'parsed':>7} {'agree':>6}")
+    print(f"{'json_stream_extractor.extract_primary_json':<58} {new_time:8.3f} {sum(p is not None for p in primary):7d} {'-':>6}")
+    print(f"{'json_stream_extractor.extract_json_values':<58} {blocks_time:8.3f} {sum(bool(b) for b in blocks):7d} {'-':>6}")
+    print(f"{f'StreamingJsonExtractor ({args.stream_chunk}-char feeds)':<58} {stream_time:8.3f} {'':>7} {'':>6}")
+
+    for label, fn in _legacy_extractors(rev).items():
+        elapsed, results = _time(fn, corpus, args.repeat)
+        as_blocks = any(label.endswith(m) for _, m, many in _LEGACY.values() if many)
+        if as_blocks:
+            expected = [
+                [x for v in b for x in ([v] if isinstance(v, dict) else [i for i in v if isinstance(i, dict)] if isinstance(v, list) else [])]
+                for b in blocks
+            ]
+            parsed = sum(bool(r) for r in results)
+        else:
+            expected = primary
+            parsed = sum(r is not None for r in results)
+        agree = sum(r == e for r, e in zip(results, expected))
+        print(f"{label:<58} {elapsed:8.3f} {parsed:7d} {agree:6d}")
+        for (name, _), r, e in zip(corpus, results, expected):
+            if r != e:
+                print(f"  differs: {name}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,10 +2,16 @@
 Unified API client for OpenRouter-only operation.
 """
 
+import asyncio
 import logging
 import os
-from typing import Optional, Dict, Any, Callable
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Sequence
+import openrouter_async
 from api_layer import APIKeyManager, APIConfig
+from llm_telemetry import current_context, request_context
+from llm_response_cache import CACHE_BYPASS, CACHE_REFRESH, LLMResponseCache, request_cache_key
 from openrouter_api_client import OpenRouterAPIClient
 from stage_settings_manager import StageSettingsManager
 
@@ -16,6 +22,23 @@ class UnifiedAPIClient:
     """
     
     STAGE_API_MAPPING = {}
+
+    # Keys accepted in each process_text_many request (process_text's arguments)
+    BATCH_REQUEST_KEYS = frozenset(
+        {
+            "text",
+            "system_prompt",
+            "model_name",
+            "temperature",
+            "max_tokens",
+            "api_key",
+            "cancel_check",
+            "timeout_s",
+            "reasoning_effort_none",
+            "openrouter_payload_extra",
+            "content_only",
+        }
+    )
     
     def __init__(
         self,
@@ -23,12 +46,14 @@ class UnifiedAPIClient:
         deepseek_api_key_manager: Optional[APIKeyManager] = None,
         openrouter_api_key_manager: Optional[APIKeyManager] = None,
         stage_settings_manager: Optional[StageSettingsManager] = None,
+        response_cache: Optional[LLMResponseCache] = None,
     ):
         """
         Initialize Unified API Client
         
         Args:
             stage_settings_manager: Optional StageSettingsManager for stage-specific settings.
+            response_cache: Optional LLM response cache; defaults to $LLM_RESPONSE_CACHE_DIR (disabled when unset).
         """
         self.logger = logging.getLogger(__name__)
 
@@ -42,6 +67,15 @@ class UnifiedAPIClient:
         self.stage_settings = stage_settings_manager or StageSettingsManager()
 
         self._current_stage: Optional[str] = None
+
+        self.response_cache = response_cache if response_cache is not None else LLMResponseCache.from_env()
+        # Outcome of the last process_text call on this thread: "hit" | "miss" | "bypass" | None
+        self._cache_status = threading.local()
+        self._async_transport: Optional[openrouter_async.AsyncOpenRouterTransport] = None
+    
+    def last_response_cache_status(self) -> Optional[str]:
+        """Cache outcome of the most recent process_text call made on the calling thread."""
+        return getattr(self._cache_status, "value", None)
     
     def set_stage(self, stage_name: str):
         """
@@ -101,7 +135,8 @@ class UnifiedAPIClient:
                     timeout_s: float = 600.0,
                     reasoning_effort_none: bool = False,
                     openrouter_payload_extra: Optional[Dict[str, Any]] = None,
-                    content_only: bool = False) -> Optional[str]:
+                    content_only: bool = False,
+                    response_cache: str = "use") -> Optional[str]:
         """
         Process text using appropriate API for current stage
         
@@ -109,25 +144,193 @@ class UnifiedAPIClient:
         cancel_check: optional callable returning True to abort (uses streaming on OpenRouter).
         reasoning_effort_none: OpenRouter reasoning.effort=none for JSON-only structured output.
         content_only: use assistant message.content only (ignore reasoning trace).
+        response_cache: "use" | "refresh" (skip lookup, store new response) | "bypass";
+            only applies when a response cache is configured. Retries after a rejected answer
+            pass ``llm_response_cache.mode_for_attempt(attempt)``.
         """
         client = self.get_client_for_stage()
         stage = self._current_stage or "unknown"
         model_name = self._resolve_model(model_name, stage)
         stage_api_key = self.stage_settings.get_stage_api_key(stage)
+
+        cache = self.response_cache if response_cache != CACHE_BYPASS else None
+        self._cache_status.value = "bypass" if self.response_cache is not None and cache is None else None
+        cache_key = None
+        if cache is not None:
+            cache_key = self._response_cache_key(
+                text=text,
+                system_prompt=system_prompt,
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                reasoning_effort_none=reasoning_effort_none,
+                openrouter_payload_extra=openrouter_payload_extra,
+                content_only=content_only,
+            )
+            cached = cache.get(cache_key) if response_cache != CACHE_REFRESH else None
+            if cached is not None:
+                self._cache_status.value = "hit"
+                self.logger.info(f"[UnifiedAPIClient] Response cache hit for model {model_name} (stage: {stage})")
+                return cached
+            self._cache_status.value = "miss"
+
         self.logger.info(f"[UnifiedAPIClient] Processing text with OpenRouter model: {model_name} (stage: {stage})")
-        return client.process_text(
-            text,
-            system_prompt,
-            model_name,
-            temperature,
-            max_tokens,
-            api_key or stage_api_key,
-            cancel_check=cancel_check,
-            timeout_s=timeout_s,
-            reasoning_effort_none=reasoning_effort_none,
-            openrouter_payload_extra=openrouter_payload_extra,
-            content_only=content_only,
+        with request_context(stage=self._current_stage):
+            result = client.process_text(
+                text,
+                system_prompt,
+                model_name,
+                temperature,
+                max_tokens,
+                api_key or stage_api_key,
+                cancel_check=cancel_check,
+                timeout_s=timeout_s,
+                reasoning_effort_none=reasoning_effort_none,
+                openrouter_payload_extra=openrouter_payload_extra,
+                content_only=content_only,
+            )
+        if cache is not None and result:
+            cache.put(cache_key, result, meta={"model": model_name, "stage": stage})
+        return result
+
+    @staticmethod
+    def _response_cache_key(
+        *,
+        text: str,
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: Optional[str] = None,
+        reasoning_effort_none: bool = False,
+        openrouter_payload_extra: Optional[Dict[str, Any]] = None,
+        content_only: bool = False,
+        **_ignored: Any,
+    ) -> str:
+        return request_cache_key(
+            {
+                "provider": "openrouter",
+                "model": model_name,
+                "system_prompt": system_prompt,
+                "text": text,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "reasoning_effort_none": reasoning_effort_none,
+                "openrouter_payload_extra": openrouter_payload_extra,
+                "content_only": content_only,
+            }
+        )
+
+    def process_text_many(self,
+                          requests: Sequence[Dict[str, Any]],
+                          concurrency: int = 8,
+                          cancel_check: Optional[Callable[[], bool]] = None,
+                          item_retries: int = 1,
+                          return_exceptions: bool = False,
+                          response_cache: str = "use") -> List[Any]:
+        """
+        Run many process_text requests concurrently; results come back in request order.
+
+        requests: dicts of process_text arguments (see BATCH_REQUEST_KEYS; "text" is required).
+        concurrency: requests in flight at once (the rate governor's per-model caps still apply).
+        cancel_check: stops the whole batch (raises OpenRouterRequestAborted); a request's own
+            "cancel_check" stops only that request.
+        item_retries: extra attempts for a request that returns no text or fails with a
+            retryable error (not 400/401/402/403/404/413).
+        return_exceptions: leave a failed request's exception in its slot instead of None.
+        response_cache: as in process_text, applied per request.
+
+        With httpx installed the requests are coroutines sharing one keep-alive pool
+        (openrouter_async.py); otherwise they run on a pool of `concurrency` threads.
+        """
+        stage = self._current_stage or "unknown"
+        stage_api_key = self.stage_settings.get_stage_api_key(stage)
+        cache = self.response_cache if response_cache != CACHE_BYPASS else None
+
+        results: List[Any] = [None] * len(requests)
+        pending: List[int] = []
+        items: List[Dict[str, Any]] = []
+        cache_keys: Dict[int, str] = {}
+        for i, request in enumerate(requests):
+            unknown = set(request) - self.BATCH_REQUEST_KEYS
+            if unknown or "text" not in request:
+                raise TypeError(f"process_text_many request {i}: missing 'text' or unknown keys {sorted(unknown)}")
+            kw = dict(request)
+            kw["model_name"] = self._resolve_model(kw.get("model_name"), stage)
+            kw["api_key"] = kw.get("api_key") or stage_api_key
+            kw.setdefault("temperature", 0.7)
+            kw.setdefault("max_tokens", APIConfig.DEFAULT_OPENROUTER_MAX_TOKENS)
+            if cache is not None:
+                cache_keys[i] = self._response_cache_key(**kw)
+                cached = cache.get(cache_keys[i]) if response_cache != CACHE_REFRESH else None
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+            items.append(kw)
+
+        self.logger.info(
+            f"[UnifiedAPIClient] Batch of {len(requests)} requests (stage: {stage}): "
+            f"{len(requests) - len(pending)} from cache, {len(pending)} to OpenRouter, concurrency={concurrency}"
         )
+        if not items:
+            return results
+        outcomes = self._run_batch(items, concurrency, cancel_check, item_retries)
+        for i, kw, out in zip(pending, items, outcomes):
+            if isinstance(out, BaseException):
+                results[i] = out if return_exceptions else None
+                continue
+            results[i] = out
+            if cache is not None and out:
+                cache.put(cache_keys[i], out, meta={"model": kw["model_name"], "stage": stage})
+        return results
+
+    def _run_batch(self,
+                   items: List[Dict[str, Any]],
+                   concurrency: int,
+                   cancel_check: Optional[Callable[[], bool]],
+                   item_retries: int) -> List[Any]:
+        """fan_out over the asyncio transport, or over blocking calls on a thread pool without httpx."""
+        telemetry = current_context()
+        if self._current_stage:
+            telemetry["stage"] = self._current_stage
+        item_cancel_checks = [kw.pop("cancel_check", None) for kw in items]
+        pool: Optional[ThreadPoolExecutor] = None
+
+        if openrouter_async.HTTPX_AVAILABLE:
+            if self._async_transport is None:
+                self._async_transport = openrouter_async.AsyncOpenRouterTransport(self.openrouter_client)
+            transport = self._async_transport
+
+            def _call(kw: Dict[str, Any]):
+                async def call(stop):
+                    with request_context(**telemetry):
+                        return await transport.process_text(**kw, cancel_check=stop)
+                return call
+        else:
+            pool = ThreadPoolExecutor(max_workers=max(1, int(concurrency)), thread_name_prefix="openrouter-batch")
+
+            def _blocking(kw: Dict[str, Any], stop):
+                with request_context(**telemetry):
+                    return self.openrouter_client.process_text(**kw, cancel_check=stop)
+
+            def _call(kw: Dict[str, Any]):
+                async def call(stop):
+                    return await asyncio.get_running_loop().run_in_executor(pool, _blocking, kw, stop)
+                return call
+
+        try:
+            return openrouter_async.run(
+                openrouter_async.fan_out(
+                    [_call(kw) for kw in items],
+                    concurrency=concurrency,
+                    cancel_check=cancel_check,
+                    item_cancel_checks=item_cancel_checks,
+                    item_retries=item_retries,
+                )
+            )
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False)
     
     def process_pdf_with_prompt(self,
                                 pdf_path: str,
@@ -6,10 +6,10 @@ Pure business logic — no API calls, no filesystem access.
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from prompt_payload import encode_payload
 from stage_j_processor import _sj_build_topic_key, sj_index_pic_captions_by_topic
 
 TopicKey = Tuple[str, str, str]
@@ -109,7 +109,7 @@ def build_topic_caption_context(
 
 def format_caption_block_for_prompt(topics_context: Dict[str, Any]) -> str:
     """Format caption context as a readable block for the script LLM prompt."""
-    serialized = json.dumps(topics_context, ensure_ascii=False, indent=2)
+    serialized = encode_payload(topics_context, stage="voice_class", label="captions")
     return (
         "\n\nImage and table captions for THIS TOPIC "
         "(use these to explain figures and tables naturally in the spoken script):\n"
@@ -6,9 +6,9 @@ Pure string building — no API calls, no filesystem access.
 
 from __future__ import annotations
 
-import json
 from typing import Any, Dict, List, Optional
 
+from prompt_payload import encode_payload
 from voice_class_captions import format_caption_block_for_prompt
 
 _SCRIPT_JSON_SCHEMA = """
@@ -74,7 +74,7 @@ def build_topic_script_prompt(
     if topics_context:
         caption_block = format_caption_block_for_prompt(topics_context)
 
-    lesson_json = json.dumps(topic_rows, ensure_ascii=False, indent=2)
+    lesson_json = encode_payload(topic_rows, stage="voice_class", label="lesson rows")
 
     return (
         f"{prompt_body}{scope}{caption_block}\n\n"
@@ -0,0 +1,107 @@
+"""
+Background sha256 digests for ``Artifact`` rows.
+
+``register_artifacts_under`` used to hash every new file before committing, so registering a
+Voice Class pair's WAV/MP3 outputs held the worker for tens of seconds. Rows are now inserted
+with ``sha256 = NULL`` and their ids handed to :func:`schedule_artifact_hashes`; a small thread
+pool (``ARTIFACT_HASH_WORKERS``) hashes them and fills the column. The row is only updated if
+the file still has the size and mtime it was registered with, so a file rewritten meanwhile is
+left for the next registration. Rows still unhashed (worker restarted) are scheduled again on
+their first download.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from file_hashing import sha256_of_file
+from webapp.config import ARTIFACT_HASH_WORKERS
+from webapp.models import Artifact
+
+logger = logging.getLogger(__name__)
+
+# (artifact id, absolute path, byte size, st_mtime_ns) as registered.
+HashJob = Tuple[int, str, int, Optional[int]]
+
+_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+_pending: Set[Future] = set()
+# Ids queued or being hashed, so repeated downloads do not queue the same file twice.
+_queued_ids: Set[Tuple[Any, int]] = set()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, ARTIFACT_HASH_WORKERS), thread_name_prefix="artifact-hash")
+        return _pool
+
+
+def _hash_one(bind: Any, job: HashJob) -> None:
+    artifact_id, path, size, mtime_ns = job
+    try:
+        digest = sha256_of_file(path)
+        st = os.stat(path)
+        if st.st_size != size or (mtime_ns is not None and st.st_mtime_ns != mtime_ns):
+            return
+        s = Session(bind=bind)
+        try:
+            q = s.query(Artifact).filter(Artifact.id == artifact_id, Artifact.byte_size == size)
+            if mtime_ns is not None:
+                q = q.filter(Artifact.mtime_ns == mtime_ns)
+            q.update({Artifact.sha256: digest}, synchronize_session=False)
+            s.commit()
+        finally:
+            s.close()
+    except OSError as e:
+        logger.debug("Skipping sha256 of artifact %s: %s", artifact_id, e)
+    except Exception:
+        logger.exception("Storing sha256 of artifact %s failed", artifact_id)
+    finally:
+        with _lock:
+            _queued_ids.discard((bind, artifact_id))
+
+
+def _done(fut: Future) -> None:
+    with _lock:
+        _pending.discard(fut)
+
+
+def schedule_artifact_hashes(bind: Any, jobs: Iterable[HashJob]) -> int:
+    """Hash ``jobs`` in the background and store the digests on ``bind``; returns how many were queued."""
+    pool = _executor()
+    queued = 0
+    for job in jobs:
+        key = (bind, job[0])
+        with _lock:
+            if key in _queued_ids:
+                continue
+            _queued_ids.add(key)
+        fut = pool.submit(_hash_one, bind, job)
+        with _lock:
+            _pending.add(fut)
+        fut.add_done_callback(_done)
+        queued += 1
+    return queued
+
+
+def ensure_artifact_hash(db: Session, art: Artifact, path: str) -> None:
+    """Queue a digest for ``art`` if it has none yet (e.g. its worker exited before hashing)."""
+    if art.sha256:
+        return
+    schedule_artifact_hashes(db.get_bind(), [(art.id, path, int(art.byte_size or 0), art.mtime_ns)])
+
+
+def wait_for_artifact_hashes(timeout: Optional[float] = None) -> None:
+    """Block until every queued digest is stored (tests, task shutdown)."""
+    with _lock:
+        pending: List[Future] = list(_pending)
+    if pending:
+        wait(pending, timeout=timeout)
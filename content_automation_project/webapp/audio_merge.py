@@ -7,6 +7,7 @@ import os
 import shutil
 import subprocess
 import tempfile
+import wave
 from typing import Callable, List, Optional
 
 logger = logging.getLogger(__name__)
@@ -566,93 +567,20 @@ def probe_audio_duration_seconds(audio_path: str) -> Optional[float]:
         return None
 
 
-def _compute_waveform_peaks_streaming(
-    audio_path: str,
-    *,
-    bar_count: int = 80,
-    sample_rate: int = 8000,
-    duration_seconds: Optional[float] = None,
-    timeout: int = 900,
-) -> Optional[tuple[List[float], float, float]]:
-    """
-    Decode audio through an ffmpeg pipe in small chunks (constant RAM).
-    Returns (normalized_peaks, normalized_max, normalized_rms).
-    """
-    if not _ffmpeg_available() or not os.path.isfile(audio_path):
-        return None
-
-    duration = duration_seconds if duration_seconds and duration_seconds > 0 else probe_audio_duration_seconds(audio_path)
-    if duration is None or duration <= 0:
-        return None
-
-    expected_samples = max(1, int(duration * sample_rate))
-    samples_per_bar = max(1, expected_samples // bar_count)
-    bar_max = [0] * bar_count
-    sample_count = 0
-    sum_sq = 0.0
-    max_possible = 32768.0
-
-    cmd = [
-        "ffmpeg",
-        "-v",
-        "error",
-        "-i",
-        audio_path,
-        "-ac",
-        "1",
-        "-ar",
-        str(sample_rate),
-        "-f",
-        "s16le",
-        "-acodec",
-        "pcm_s16le",
-        "pipe:1",
-    ]
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+def wav_header_duration_seconds(wav_path: str) -> Optional[float]:
+    """Duration from a PCM WAV header (no subprocess); None for other formats."""
     try:
-        assert proc.stdout is not None
-        while True:
-            chunk = proc.stdout.read(65536)
-            if not chunk:
-                break
-            n_samples = len(chunk) // 2
-            for i in range(n_samples):
-                lo = chunk[i * 2]
-                hi = chunk[i * 2 + 1]
-                val = lo | (hi << 8)
-                if val >= 0x8000:
-                    val -= 0x10000
-                abs_val = abs(val)
-                bar_idx = min(bar_count - 1, sample_count // samples_per_bar)
-                if abs_val > bar_max[bar_idx]:
-                    bar_max[bar_idx] = abs_val
-                sum_sq += float(val * val)
-                sample_count += 1
-        proc.wait(timeout=timeout)
-        if proc.returncode != 0:
-            logger.warning("ffmpeg waveform stream failed for %s (exit %s)", audio_path, proc.returncode)
-            return None
-    except subprocess.TimeoutExpired:
-        proc.kill()
-        logger.warning("ffmpeg waveform stream timed out for %s", audio_path)
+        with wave.open(wav_path, "rb") as wf:
+            rate = wf.getframerate()
+            return wf.getnframes() / float(rate) if rate > 0 else None
+    except (wave.Error, EOFError, OSError):
         return None
-    finally:
-        if proc.stdout:
-            proc.stdout.close()
-
-    if sample_count <= 0:
-        peaks = [0.0] * bar_count
-        return peaks, 0.0, 0.0
-
-    raw_peaks = [(bar_max[i] / max_possible) for i in range(bar_count)]
-    normalized_max = max(raw_peaks)
-    normalized_rms = (sum_sq / sample_count) ** 0.5 / max_possible
-    visual_max = max(raw_peaks) or 1.0
-    peaks = [round(p / visual_max, 4) for p in raw_peaks]
-    return peaks, normalized_max, normalized_rms
 
 
 def wav_duration_seconds(wav_path: str) -> Optional[float]:
+    duration = wav_header_duration_seconds(wav_path)
+    if duration is not None:
+        return duration
     duration = probe_audio_duration_seconds(wav_path)
     if duration is not None:
         return duration
@@ -670,94 +598,23 @@ def wav_duration_seconds(wav_path: str) -> Optional[float]:
 def analyze_audio_for_preview(audio_path: str, *, bar_count: int = 80) -> Optional[dict]:
     """
     Lightweight audio analysis for admin preview: duration, silence hint, downsampled peaks.
-    Uses ffprobe + streaming ffmpeg decode so large MP3s do not OOM the API process.
+    Decoding is vectorized and cached per file hash (see webapp.audio_peaks), so repeat
+    previews of the same audio do not decode it again.
     """
-    if not os.path.isfile(audio_path):
-        return None
-
-    duration = probe_audio_duration_seconds(audio_path)
-    streamed = _compute_waveform_peaks_streaming(
-        audio_path,
-        bar_count=bar_count,
-        duration_seconds=duration,
-    )
-    if streamed is not None:
-        peaks, normalized_max, normalized_rms = streamed
-        duration_val = duration or 0.0
-        is_silent = (
-            duration_val < 0.05
-            or normalized_max < 0.005
-            or normalized_rms < 0.002
-        )
-        return {
-            "duration_seconds": round(duration_val, 2),
-            "max_amplitude": round(normalized_max, 4),
-            "is_silent": is_silent,
-            "waveform_peaks": peaks,
-        }
+    from webapp.audio_peaks import peak_summary
 
-    try:
-        from pydub import AudioSegment
-    except ImportError:
-        return None
-
-    try:
-        audio = AudioSegment.from_file(audio_path)
-        raw = audio.get_array_of_samples()
-        if not raw:
-            return {
-                "duration_seconds": 0.0,
-                "max_amplitude": 0.0,
-                "is_silent": True,
-                "waveform_peaks": [0.0] * bar_count,
-            }
-
-        channels = max(1, int(audio.channels))
-        max_possible = float(1 << (8 * audio.sample_width - 1))
-        mono: List[int] = []
-        if channels == 1:
-            mono = [abs(int(s)) for s in raw]
-        else:
-            for i in range(0, len(raw) - channels + 1, channels):
-                frame = [abs(int(raw[i + c])) for c in range(channels)]
-                mono.append(max(frame))
-
-        if not mono:
-            return {
-                "duration_seconds": round(len(audio) / 1000.0, 2),
-                "max_amplitude": 0.0,
-                "is_silent": True,
-                "waveform_peaks": [0.0] * bar_count,
-            }
-
-        max_amp = max(mono)
-        normalized_max = max_amp / max_possible if max_possible else 0.0
-        rms = (sum(v * v for v in mono) / len(mono)) ** 0.5
-        normalized_rms = rms / max_possible if max_possible else 0.0
-        duration_val = len(audio) / 1000.0
-        is_silent = duration_val < 0.05 or normalized_max < 0.005 or normalized_rms < 0.002
-
-        chunk = max(1, len(mono) // bar_count)
-        peaks: List[float] = []
-        for i in range(0, len(mono), chunk):
-            block = mono[i : i + chunk]
-            peaks.append((max(block) / max_possible) if block else 0.0)
-        peaks = peaks[:bar_count]
-        while len(peaks) < bar_count:
-            peaks.append(0.0)
-
-        visual_max = max(peaks) or 1.0
-        peaks = [round(p / visual_max, 4) for p in peaks]
-
-        return {
-            "duration_seconds": round(duration_val, 2),
-            "max_amplitude": round(normalized_max, 4),
-            "is_silent": is_silent,
-            "waveform_peaks": peaks,
-        }
-    except Exception as e:
-        logger.warning("Audio analysis failed for %s: %s", audio_path, e)
+    summary = peak_summary(audio_path)
+    if summary is None:
         return None
+    duration_val = summary.duration_seconds
+    normalized_max = summary.normalized_max
+    is_silent = duration_val < 0.05 or normalized_max < 0.005 or summary.normalized_rms < 0.002
+    return {
+        "duration_seconds": round(duration_val, 2),
+        "max_amplitude": round(normalized_max, 4),
+        "is_silent": is_silent,
+        "waveform_peaks": summary.peaks(bar_count),
+    }
 
 
 def analyze_wav_for_preview(wav_path: str, *, bar_count: int = 80) -> Optional[dict]:
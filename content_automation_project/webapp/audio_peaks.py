@@ -0,0 +1,312 @@
+"""
+Waveform peaks and loudness stats for audio previews, vectorized with NumPy and cached on disk.
+
+The previous analyzer decoded through an ffmpeg pipe and then visited every sample in Python
+(~29M iterations for a 60-minute MP3 at 8 kHz) on every preview request. Samples are now
+reduced a chunk at a time with NumPy into a peak pyramid: level 0 holds the max ``|sample|``
+of every ``BLOCK_SAMPLES`` block, and each further level halves the previous one by taking
+pairwise maxima. Bars for any ``bar_count`` are read from the coarsest level that still has a
+few blocks per bar.
+
+Summaries are cached under ``AUDIO_PEAKS_CACHE_DIR`` keyed by the file's SHA-256, so a file is
+decoded once no matter how often (or under which name) it is previewed::
+
+    <root>/<sha[:2]>/<sha>-v<CACHE_VERSION>.npz
+
+PCM WAVs (Gemini TTS segments) are read with :mod:`wave` directly; other formats are decoded
+to 8 kHz mono by ffmpeg, with pydub as the last resort.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import threading
+import wave
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the summary format or the decoding changes, so old cache entries are ignored.
+CACHE_VERSION = 1
+BLOCK_SAMPLES = 256
+DECODE_SAMPLE_RATE = 8000
+_MAX_POSSIBLE = 32768.0
+# Bars are taken from the coarsest level with at least this many blocks per bar.
+_MIN_BLOCKS_PER_BAR = 4
+_CHUNK_BYTES = 1 << 20
+
+_memo_lock = threading.Lock()
+_memo: "OrderedDict[str, PeakSummary]" = OrderedDict()
+_MEMO_SIZE = 64
+
+
+@dataclass
+class PeakSummary:
+    sample_rate: int
+    sample_count: int
+    max_abs: int
+    sum_sq: float
+    levels: List[np.ndarray]
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.sample_count / float(self.sample_rate) if self.sample_rate else 0.0
+
+    @property
+    def normalized_max(self) -> float:
+        return self.max_abs / _MAX_POSSIBLE
+
+    @property
+    def normalized_rms(self) -> float:
+        if self.sample_count <= 0:
+            return 0.0
+        return float(np.sqrt(self.sum_sq / self.sample_count)) / _MAX_POSSIBLE
+
+    def peaks(self, bar_count: int) -> List[float]:
+        """``bar_count`` bar heights scaled so the loudest bar is 1.0 (all zeros for silence)."""
+        if bar_count <= 0:
+            return []
+        level = self.levels[0]
+        for candidate in self.levels:
+            if len(candidate) < bar_count * _MIN_BLOCKS_PER_BAR:
+                break
+            level = candidate
+        n = len(level)
+        if n == 0:
+            return [0.0] * bar_count
+        if n < bar_count:
+            raw = np.zeros(bar_count, dtype=np.float64)
+            raw[:n] = level
+        else:
+            starts = (np.arange(bar_count, dtype=np.int64) * n) // bar_count
+            raw = np.maximum.reduceat(level, starts).astype(np.float64)
+        raw /= _MAX_POSSIBLE
+        visual_max = float(raw.max()) or 1.0
+        return [round(float(p), 4) for p in raw / visual_max]
+
+
+class _PeakAccumulator:
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.sample_count = 0
+        self.max_abs = 0
+        self.sum_sq = 0.0
+        self._blocks: List[np.ndarray] = []
+        self._carry = np.zeros(0, dtype=np.int32)
+
+    def feed(self, samples: np.ndarray) -> None:
+        if samples.size == 0:
+            return
+        mags = np.abs(samples.astype(np.int32))
+        self.sample_count += int(samples.size)
+        self.max_abs = max(self.max_abs, int(mags.max()))
+        self.sum_sq += float(np.dot(mags.astype(np.float64), mags))
+        if self._carry.size:
+            mags = np.concatenate([self._carry, mags])
+        whole = (mags.size // BLOCK_SAMPLES) * BLOCK_SAMPLES
+        if whole:
+            self._blocks.append(mags[:whole].reshape(-1, BLOCK_SAMPLES).max(axis=1))
+        self._carry = mags[whole:]
+
+    def finish(self) -> PeakSummary:
+        blocks = self._blocks
+        if self._carry.size:
+            blocks = blocks + [np.array([self._carry.max()], dtype=np.int32)]
+        level = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int32)
+        levels = [level]
+        while len(level) > 1:
+            if len(level) % 2:
+                level = np.append(level, 0)
+            level = level.reshape(-1, 2).max(axis=1)
+            levels.append(level)
+        return PeakSummary(
+            sample_rate=self.sample_rate,
+            sample_count=self.sample_count,
+            max_abs=self.max_abs,
+            sum_sq=self.sum_sq,
+            levels=levels,
+        )
+
+
+def _wav_chunks(path: str) -> Optional[tuple]:
+    """(sample_rate, mono int16 chunk iterator) for 16-bit PCM WAVs, else None."""
+    try:
+        wf = wave.open(path, "rb")
+    except (wave.Error, EOFError, OSError):
+        return None
+    if wf.getsampwidth() != 2 or wf.getframerate() <= 0:
+        wf.close()
+        return None
+    channels = max(1, wf.getnchannels())
+    frames_per_chunk = max(1, _CHUNK_BYTES // (2 * channels))
+
+    def chunks() -> Iterator[np.ndarray]:
+        with wf:
+            while True:
+                raw = wf.readframes(frames_per_chunk)
+                if not raw:
+                    return
+                samples = np.frombuffer(raw, dtype="<i2")
+                if channels > 1:
+                    samples = samples[: (samples.size // channels) * channels].reshape(-1, channels)
+                    samples = samples.astype(np.int32).sum(axis=1) // channels
+                yield samples
+
+    return wf.getframerate(), chunks()
+
+
+def _ffmpeg_chunks(path: str, timeout: int) -> Iterator[np.ndarray]:
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        path,
+        "-ac",
+        "1",
+        "-ar",
+        str(DECODE_SAMPLE_RATE),
+        "-f",
+        "s16le",
+        "-acodec",
+        "pcm_s16le",
+        "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        assert proc.stdout is not None
+        pending = b""
+        while True:
+            chunk = proc.stdout.read(_CHUNK_BYTES)
+            if not chunk:
+                break
+            chunk = pending + chunk
+            whole = len(chunk) - (len(chunk) % 2)
+            pending = chunk[whole:]
+            yield np.frombuffer(chunk[:whole], dtype="<i2")
+        proc.wait(timeout=timeout)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exit {proc.returncode}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        if proc.stdout:
+            proc.stdout.close()
+
+
+def _compute_summary(path: str, timeout: int) -> Optional[PeakSummary]:
+    wav = _wav_chunks(path)
+    if wav is not None:
+        rate, chunks = wav
+        acc = _PeakAccumulator(rate)
+        for samples in chunks:
+            acc.feed(samples)
+        return acc.finish()
+
+    from webapp.audio_merge import _ffmpeg_available
+
+    if _ffmpeg_available():
+        acc = _PeakAccumulator(DECODE_SAMPLE_RATE)
+        try:
+            for samples in _ffmpeg_chunks(path, timeout):
+                acc.feed(samples)
+            return acc.finish()
+        except (RuntimeError, subprocess.TimeoutExpired, OSError) as e:
+            logger.warning("ffmpeg waveform decode failed for %s: %s", path, e)
+
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        return None
+    try:
+        audio = AudioSegment.from_file(path).set_channels(1).set_sample_width(2)
+    except Exception as e:
+        logger.warning("Audio analysis failed for %s: %s", path, e)
+        return None
+    acc = _PeakAccumulator(audio.frame_rate)
+    acc.feed(np.frombuffer(audio.raw_data, dtype="<i2"))
+    return acc.finish()
+
+
+def _cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, digest[:2], f"{digest}-v{CACHE_VERSION}.npz")
+
+
+def _load_cached(path: str) -> Optional[PeakSummary]:
+    try:
+        with np.load(path) as data:
+            stats = data["stats"]
+            n_levels = int(stats[4])
+            return PeakSummary(
+                sample_rate=int(stats[0]),
+                sample_count=int(stats[1]),
+                max_abs=int(stats[2]),
+                sum_sq=float(stats[3]),
+                levels=[data[f"level_{i}"] for i in range(n_levels)],
+            )
+    except (OSError, KeyError, ValueError, IndexError):
+        return None
+
+
+def _store_cached(path: str, summary: PeakSummary) -> None:
+    stats = np.array(
+        [summary.sample_rate, summary.sample_count, summary.max_abs, summary.sum_sq, len(summary.levels)],
+        dtype=np.float64,
+    )
+    arrays = {f"level_{i}": lvl.astype(np.int32) for i, lvl in enumerate(summary.levels)}
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            np.savez(f, stats=stats, **arrays)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not write peaks cache %s: %s", path, e)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _remember(digest: str, summary: PeakSummary) -> None:
+    with _memo_lock:
+        _memo[digest] = summary
+        _memo.move_to_end(digest)
+        while len(_memo) > _MEMO_SIZE:
+            _memo.popitem(last=False)
+
+
+def peak_summary(path: str, *, cache_dir: Optional[str] = None, timeout: int = 900) -> Optional[PeakSummary]:
+    """Peak pyramid and loudness stats for ``path`` (cached per file hash); None if it cannot be decoded."""
+    if not os.path.isfile(path):
+        return None
+    if cache_dir is None:
+        from webapp.config import AUDIO_PEAKS_CACHE_DIR
+
+        cache_dir = AUDIO_PEAKS_CACHE_DIR
+    from file_hashing import file_sha256
+
+    try:
+        digest = file_sha256(path)
+    except OSError:
+        return None
+    with _memo_lock:
+        summary = _memo.get(digest)
+    if summary is not None:
+        return summary
+    cached_file = _cache_path(cache_dir, digest) if cache_dir else None
+    summary = _load_cached(cached_file) if cached_file and os.path.isfile(cached_file) else None
+    if summary is None:
+        summary = _compute_summary(path, timeout)
+        if summary is None:
+            return None
+        if cached_file:
+            _store_cached(cached_file, summary)
+    _remember(digest, summary)
+    return summary
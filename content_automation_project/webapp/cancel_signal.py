@@ -0,0 +1,167 @@
+"""
+Job stop requests as an in-memory flag instead of a DB query per check.
+
+``Job.cancel_requested`` stays the source of truth, but workers used to read it with a fresh
+session on every check: once per SSE line in streamed OpenRouter calls and once per progress
+message. :func:`is_cancel_requested` now answers from a per-job cached flag and re-reads the
+DB at most every ``CANCEL_REFRESH_SECONDS``.
+
+``/jobs/{job_id}/cancel`` calls :func:`request_cancel` after committing the flag. It sets the
+cached flag in this process (inline runners see it on their next check) and, with Celery,
+publishes on a Redis channel that every worker process listens to. When the flag is reset (job
+re-queued, or a stop finalized) :func:`clear_cancel` drops the cached value everywhere.
+Without Redis, workers still pick up the stop from the periodic DB read. Celery task wrappers
+call :func:`forget_job` when a run ends so a long-lived worker does not keep every job it ran.
+"""
+
+from __future__ import annotations
+
+import logging
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from webapp.config import CANCEL_REFRESH_SECONDS, REDIS_URL
+from webapp.models import Job
+
+logger = logging.getLogger(__name__)
+
+CANCEL_CHANNEL = "webapp:job_cancel"
+
+_lock = threading.Lock()
+# job_id -> (cancel requested, monotonic time it was last known to be current)
+_flags: Dict[str, Tuple[bool, float]] = {}
+_listener: Optional[threading.Thread] = None
+_redis_client: Any = None
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _use_redis() -> bool:
+    from webapp.config import RUN_TASKS_INLINE
+
+    if RUN_TASKS_INLINE:
+        return False
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _redis() -> Any:
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _redis_client
+
+
+def _publish(job_id: str, requested: bool) -> None:
+    if not _use_redis():
+        return
+    try:
+        _redis().publish(CANCEL_CHANNEL, f"{job_id}:{int(requested)}")
+    except Exception as e:
+        # Workers fall back to the periodic DB read.
+        logger.warning("Could not publish stop signal for job %s: %s", job_id, e)
+
+
+def _listen() -> None:
+    warned = False
+    while True:
+        try:
+            pubsub = _redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CANCEL_CHANNEL)
+            for msg in pubsub.listen():
+                data = msg.get("data")
+                if isinstance(data, bytes):
+                    data = data.decode("utf-8", "replace")
+                job_id, _, state = str(data or "").rpartition(":")
+                if not job_id:
+                    continue
+                with _lock:
+                    if state == "1":
+                        _flags[job_id] = (True, time.monotonic())
+                    else:
+                        _flags.pop(job_id, None)
+        except Exception as e:
+            # Stops still arrive through the periodic DB read meanwhile.
+            (logger.debug if warned else logger.warning)("Stop signal listener disconnected (%s); retrying", e)
+            warned = True
+            time.sleep(5)
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if not _use_redis() or (_listener is not None and _listener.is_alive()):
+        return
+    with _lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        _listener = threading.Thread(target=_listen, name="job-cancel-listener", daemon=True)
+        _listener.start()
+
+
+def _read_db(job_id: str, bind: Any) -> bool:
+    if bind is None:
+        from webapp.database import SessionLocal
+
+        s = SessionLocal()
+    else:
+        s = Session(bind=bind)
+    try:
+        return bool(s.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+    finally:
+        s.close()
+
+
+def is_cancel_requested(job_id: str, bind: Any = None) -> bool:
+    """Cached ``Job.cancel_requested``; re-read from the DB (on ``bind``) when older than the refresh interval."""
+    now = time.monotonic()
+    with _lock:
+        flag = _flags.get(job_id)
+    if flag is not None and now - flag[1] < CANCEL_REFRESH_SECONDS:
+        return flag[0]
+    _ensure_listener()
+    requested = _read_db(job_id, bind)
+    with _lock:
+        _flags[job_id] = (requested, time.monotonic())
+    return requested
+
+
+def request_cancel(job_id: str) -> None:
+    """Push a stop to running workers (call after committing ``cancel_requested = True``)."""
+    with _lock:
+        _flags[job_id] = (True, time.monotonic())
+    _publish(job_id, True)
+
+
+def clear_cancel(job_id: str) -> None:
+    """Forget a cached stop (call after committing ``cancel_requested = False``)."""
+    with _lock:
+        _flags.pop(job_id, None)
+    _publish(job_id, False)
+
+
+def forget_job(job_id: str) -> None:
+    """Drop this process's cached flag for a job whose run ended (the DB flag is untouched)."""
+    with _lock:
+        _flags.pop(job_id, None)
+
+
+def forgets_cancel_flag(fn: _F) -> _F:
+    """Decorate a runner taking ``job_id`` first: :func:`forget_job` once it returns or raises."""
+
+    @functools.wraps(fn)
+    def wrapper(job_id: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return fn(job_id, *args, **kwargs)
+        finally:
+            forget_job(job_id)
+
+    return wrapper  # type: ignore[return-value]
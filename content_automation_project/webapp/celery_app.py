@@ -37,10 +37,13 @@ from webapp.schema_migrate import apply_schema_migrations  # noqa: E402
 from webapp.database import SessionLocal  # noqa: E402
 from webapp.bootstrap import bootstrap_admins, ensure_missing_env_admins  # noqa: E402
 from webapp.job_files import append_log  # noqa: E402
+from webapp.job_log_sink import flush_job_logs  # noqa: E402
+from webapp.llm_telemetry_store import install_db_sink  # noqa: E402
 from webapp.system_prompt_defaults import seed_system_prompt_defaults  # noqa: E402
 
 Base.metadata.create_all(bind=engine)
 apply_schema_migrations(engine)
+install_db_sink()
 _worker_db = SessionLocal()
 try:
     bootstrap_admins(_worker_db)
@@ -54,7 +57,12 @@ celery_app.autodiscover_tasks(packages=["webapp"], related_name="celery_tasks",
 
 @celery_app.on_after_configure.connect
 def _connect_task_failure_logger(**kwargs: object) -> None:
-    from celery.signals import task_failure
+    from celery.signals import task_failure, task_postrun
+
+    @task_postrun.connect
+    def _flush_task_logs(**kw: object) -> None:
+        # Job log lines are batched in memory; write the rest before the worker idles.
+        flush_job_logs()
 
     @task_failure.connect
     def _log_regenerate_task_failure(
@@ -4,38 +4,53 @@ from __future__ import annotations
 
 from typing import List, Optional
 
+from webapp.cancel_signal import forgets_cancel_flag
 from webapp.celery_app import celery_app
 from webapp.tasks_stage_v import run_full_pipeline_job, run_step1_job, run_step2_job
 from webapp.unit_repair.tasks import run_regenerate_unit_task, run_renumber_pair_task
 
 
 @celery_app.task(name="webapp.run_step1_job")
+@forgets_cancel_flag
 def run_step1_task(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
     run_step1_job(job_id, pair_indices)
 
 
 @celery_app.task(name="webapp.run_step2_job")
+@forgets_cancel_flag
 def run_step2_task(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
     run_step2_job(job_id, pair_indices)
 
 
 @celery_app.task(name="webapp.run_full_pipeline_job")
+@forgets_cancel_flag
 def run_full_pipeline_task(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
     run_full_pipeline_job(job_id, pair_indices)
 
 
 @celery_app.task(name="webapp.run_regenerate_unit")
+@forgets_cancel_flag
 def regenerate_unit_task(job_id: str, pair_index: int, unit_index: int) -> None:
     run_regenerate_unit_task(job_id, pair_index, unit_index)
 
 
 @celery_app.task(name="webapp.run_renumber_pair")
+@forgets_cancel_flag
 def renumber_pair_task(job_id: str, pair_index: int) -> None:
     run_renumber_pair_task(job_id, pair_index)
 
 
 @celery_app.task(name="webapp.run_voice_class_merge_only")
+@forgets_cancel_flag
 def run_voice_class_merge_only_task(job_id: str, pair_index: int) -> None:
     from webapp.tasks_voice_class import run_voice_class_merge_only
 
     run_voice_class_merge_only(job_id, pair_index, source="celery_worker")
+
+
+@celery_app.task(name="webapp.run_single_stage_pair")
+@forgets_cancel_flag
+def run_single_stage_pair_task(job_id: str, pair_index: int, position: int, batch: List[int]) -> None:
+    from webapp.tasks_single_stage import run_single_stage_pair
+
+    run_single_stage_pair(job_id, pair_index, position, batch)
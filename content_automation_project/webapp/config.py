@@ -8,6 +8,12 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
 JOBS_ROOT = os.environ.get("JOBS_ROOT", str(PROJECT_ROOT / "data" / "jobs"))
 DATABASE_URL = os.environ.get("DATABASE_URL", f"sqlite:///{PROJECT_ROOT / 'data' / 'webapp.db'}")
+# Shared per-page PDF text cache (see pdf_page_cache.py). Set PDF_TEXT_CACHE_DIR="" to disable.
+# Exported to the environment so every PDFProcessor in web/Celery processes picks it up.
+PDF_TEXT_CACHE_DIR = os.environ.setdefault("PDF_TEXT_CACHE_DIR", str(PROJECT_ROOT / "data" / "pdf_text_cache"))
+# Waveform peak pyramids for audio previews, keyed by file SHA-256 (see webapp/audio_peaks.py).
+# Set AUDIO_PEAKS_CACHE_DIR="" to disable.
+AUDIO_PEAKS_CACHE_DIR = os.environ.get("AUDIO_PEAKS_CACHE_DIR", str(PROJECT_ROOT / "data" / "audio_peaks_cache"))
 REDIS_URL = os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/0")
 SECRET_KEY = os.environ.get("SECRET_KEY", "change-me-in-production-use-openssl-rand-hex-32")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "10080"))  # 7 days
@@ -18,6 +24,10 @@ ALGORITHM = "HS256"
 _run_inline = os.environ.get("WEBAPP_RUN_TASKS_INLINE", "").strip().lower()
 RUN_TASKS_INLINE = _run_inline in ("1", "true", "yes", "on")
 
+# Workers re-read Job.cancel_requested at most this often; /cancel also pushes the stop
+# (Redis pub/sub to Celery workers, an in-process flag inline), so this only bounds staleness.
+CANCEL_REFRESH_SECONDS = float(os.environ.get("WEBAPP_CANCEL_REFRESH_SECONDS", "2.0"))
+
 # Test Bank / Stage V API defaults (aligned with api_layer.APIConfig OpenRouter + GLM-5)
 DEFAULT_TEST_BANK_PROVIDER = "openrouter"
 DEFAULT_TEST_BANK_MODEL = "z-ai/glm-5"
@@ -53,6 +63,25 @@ GEMINI_TTS_DEFAULT_RPM = int(os.environ.get("GEMINI_TTS_DEFAULT_RPM", "3"))
 GEMINI_TTS_DEFAULT_RPD = int(os.environ.get("GEMINI_TTS_DEFAULT_RPD", "10"))
 GEMINI_TTS_DAILY_RESET_TZ = os.environ.get("GEMINI_TTS_DAILY_RESET_TZ", "America/Los_Angeles")
 GEMINI_TTS_MAX_ROTATION_ATTEMPTS = int(os.environ.get("GEMINI_TTS_MAX_ROTATION_ATTEMPTS", "5"))
+# Voice Class Step 2: segments synthesized at once (never more than the number of active keys).
+GEMINI_TTS_MAX_PARALLEL = int(os.environ.get("GEMINI_TTS_MAX_PARALLEL", "8"))
+
+# Job log lines are buffered per job and written in batches of this many lines, or this often.
+LOG_FLUSH_LINES = int(os.environ.get("WEBAPP_LOG_FLUSH_LINES", "100"))
+LOG_FLUSH_SECONDS = float(os.environ.get("WEBAPP_LOG_FLUSH_SECONDS", "1.0"))
+
+# LLM request telemetry rows are inserted in batches of this many records, or this often,
+# and rows older than the retention window are deleted (0 keeps them forever).
+LLM_TELEMETRY_FLUSH_ROWS = int(os.environ.get("WEBAPP_LLM_TELEMETRY_FLUSH_ROWS", "200"))
+LLM_TELEMETRY_FLUSH_SECONDS = float(os.environ.get("WEBAPP_LLM_TELEMETRY_FLUSH_SECONDS", "2.0"))
+LLM_REQUESTS_RETENTION_DAYS = int(os.environ.get("WEBAPP_LLM_REQUESTS_RETENTION_DAYS", "30"))
+
+# Artifact sha256 digests are computed after registration by this many background threads.
+ARTIFACT_HASH_WORKERS = int(os.environ.get("WEBAPP_ARTIFACT_HASH_WORKERS", "2"))
+
+# GET /metrics (Prometheus text format) accepts "Authorization: Bearer <token>" when set;
+# without the token it is only served to a logged-in admin.
+METRICS_TOKEN = os.environ.get("WEBAPP_METRICS_TOKEN", "").strip()
 
 DEFAULT_VOICE_CLASS_TTS_MODEL = "gemini-2.5-flash-preview-tts"
 DEFAULT_VOICE_CLASS_TTS_VOICE = "Enceladus"
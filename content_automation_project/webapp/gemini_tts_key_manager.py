@@ -6,7 +6,7 @@ import logging
 import re
 import time
 from datetime import datetime, timedelta, timezone
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Set
 from zoneinfo import ZoneInfo
 
 from sqlalchemy.orm import Session
@@ -65,11 +65,16 @@ def _next_midnight_pt_utc(now: Optional[datetime] = None) -> datetime:
 
 
 class GeminiTtsKeyManager:
-    """Round-robin Gemini TTS keys with proactive RPM/RPD budgets."""
+    """Round-robin Gemini TTS keys with proactive RPM/RPD budgets.
+
+    Keys can also be leased (``lease_available_key`` / ``release_key``) so a parallel caller
+    keeps at most one request in flight per key. Leases are in-memory, per manager.
+    """
 
     def __init__(self, db: Session):
         self.db = db
         self._index = 0
+        self._leased: Set[int] = set()
 
     @staticmethod
     def _limits(row: GeminiTtsApiKey) -> tuple[int, int]:
@@ -123,9 +128,14 @@ class GeminiTtsKeyManager:
         n = len(self._all_active_rows())
         return min(GEMINI_TTS_MAX_ROTATION_ATTEMPTS, max(n, 1))
 
-    def seconds_until_any_key_available(self) -> Optional[float]:
+    def active_key_count(self) -> int:
+        return len(self._all_active_rows())
+
+    def seconds_until_any_key_available(self, exclude_leased: bool = False) -> Optional[float]:
         now = datetime.utcnow()
         rows = self._all_active_rows()
+        if exclude_leased:
+            rows = [r for r in rows if r.id not in self._leased]
         if not rows:
             return None
         earliest: Optional[float] = None
@@ -204,6 +214,22 @@ class GeminiTtsKeyManager:
         self.db.commit()
         return row
 
+    def lease_available_key(self) -> Optional[GeminiTtsApiKey]:
+        """Non-blocking: next key with RPM/RPD budget that is not already leased."""
+        now = datetime.utcnow()
+        rows = self._all_active_rows()
+        eligible = [r for r in rows if r.id not in self._leased and self._has_budget(r, now)]
+        self.db.commit()
+        if not eligible:
+            return None
+        row = eligible[self._index % len(eligible)]
+        self._index += 1
+        self._leased.add(row.id)
+        return row
+
+    def release_key(self, row: GeminiTtsApiKey) -> None:
+        self._leased.discard(row.id)
+
     def _apply_success_budget(self, row: GeminiTtsApiKey, now: datetime) -> None:
         self._refresh_row_counters(row, now)
         row.requests_today = int(row.requests_today or 0) + 1
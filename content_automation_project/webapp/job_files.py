@@ -2,16 +2,18 @@
 
 from __future__ import annotations
 
-import hashlib
 import os
 import shutil
-from typing import Iterable, List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from journaled_json_writer import recover_journals_under
+from webapp.artifact_hashing import HashJob, schedule_artifact_hashes
 from webapp.config import JOBS_ROOT
-from webapp.models import Artifact, InboxNotification, Job, JobLogLine
+from webapp.job_log_sink import flush_job_logs, job_log_sink
+from webapp.models import Artifact, InboxNotification, Job
 
 
 def job_root(job_id: str) -> str:
@@ -35,30 +37,77 @@ def ensure_dirs(job_id: str, pair_index: int) -> None:
     os.makedirs(pair_output(job_id, pair_index), exist_ok=True)
 
 
-def next_log_seq(db: Session, job_id: str) -> int:
-    m = db.query(func.max(JobLogLine.seq)).filter(JobLogLine.job_id == job_id).scalar()
-    return (m or 0) + 1
-
-
 def append_log(db: Session, job_id: str, line: str, pair_index: Optional[int] = None) -> None:
-    seq = next_log_seq(db, job_id)
-    db.add(JobLogLine(job_id=job_id, seq=seq, line=line, pair_index=pair_index))
+    """Queue one log line on the job's sink (written in batches, see ``webapp.job_log_sink``)."""
+    job_log_sink(job_id, db.get_bind()).write(line, pair_index)
+    # Callers rely on this committing their pending ORM changes; a no-op when there are none.
     db.commit()
 
 
 def append_logs_bulk(db: Session, job_id: str, lines: Iterable[str], pair_index: Optional[int] = None) -> None:
-    seq_start = next_log_seq(db, job_id)
-    for i, line in enumerate(lines):
-        db.add(JobLogLine(job_id=job_id, seq=seq_start + i, line=line, pair_index=pair_index))
+    job_log_sink(job_id, db.get_bind()).write_many(lines, pair_index)
     db.commit()
 
 
-def _sha256_file(path: str) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            h.update(chunk)
-    return h.hexdigest()
+# Rows inserted per commit, so the job page sees a large output directory appear progressively.
+_ARTIFACT_INSERT_BATCH = 500
+
+
+def _guess_artifact_role(rel_path: str, fn: str, role_guess: str) -> str:
+    low = rel_path.lower()
+    fn_low = fn.lower()
+    if "step1_combined" in low:
+        return "step1_combined"
+    if "prompt_input" in low and "stage_v_step2" in low and low.endswith(".txt"):
+        return "step2_prompt_input"
+    if "stage_v_step2" in low or "_stage_v_step2_" in low:
+        return "step2_topic"
+    if "step2_failed_topics" in low and low.endswith(".json"):
+        return "step2_failed_topics"
+    if fn_low.startswith("b") and fn_low.endswith(".json") and "+" in fn:
+        return "final_b_json"
+    if fn_low.startswith("voice_script_") and fn_low.endswith(".json"):
+        return "voice_script_json"
+    if "/tts_segments/" in low and fn_low.startswith("segment_") and fn_low.endswith(".wav"):
+        return "tts_segment"
+    if fn_low.startswith("final_voice_") and fn_low.endswith(".mp3"):
+        return "final_mp3"
+    if "/prompts/" in low and "llm_prompt" in low:
+        return "llm_prompt_step1" if "step1" in low else "llm_prompt_step2"
+    if low.endswith(".txt"):
+        return "txt_dump"
+    return role_guess
+
+
+def _scan_files(full_dir: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """(abs_path, name, stat) for every regular file under full_dir; one ``scandir`` per directory."""
+    stack = [full_dir]
+    while stack:
+        d = stack.pop()
+        try:
+            entries = list(os.scandir(d))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path, entry.name, entry.stat()
+            except OSError:
+                continue
+
+
+def _bump_artifacts_rev(db: Session, job_id: str) -> int:
+    """Increment ``Job.artifacts_rev`` in the caller's transaction and return the new value.
+
+    The UPDATE locks the job row (the database on SQLite) until commit, so revisions become
+    visible in increasing order.
+    """
+    db.query(Job).filter(Job.id == job_id).update(
+        {Job.artifacts_rev: func.coalesce(Job.artifacts_rev, 0) + 1}, synchronize_session=False
+    )
+    return int(db.query(Job.artifacts_rev).filter(Job.id == job_id).scalar() or 0)
 
 
 def register_artifacts_under(
@@ -69,60 +118,79 @@ def register_artifacts_under(
     relative_dir: str,
     role_guess: str = "output",
 ) -> None:
-    """Register every file under base_job_root/relative_dir as artifacts (skip duplicates by rel_path)."""
+    """Register files under base_job_root/relative_dir as artifacts.
+
+    New files are inserted, files whose size or mtime changed since registration get their row
+    updated, everything else is skipped. Digests are computed in the background
+    (``webapp.artifact_hashing``).
+    """
     full_dir = os.path.join(base_job_root, relative_dir)
     if not os.path.isdir(full_dir):
         return
 
-    existing = {a.rel_path for a in db.query(Artifact).filter(Artifact.job_id == job_id).all()}
-
-    for root, _, files in os.walk(full_dir):
-        for fn in files:
-            abs_path = os.path.join(root, fn)
-            rel_path = os.path.relpath(abs_path, base_job_root).replace("\\", "/")
-            if rel_path in existing:
-                continue
-            try:
-                size = os.path.getsize(abs_path)
-            except OSError:
+    prefix = os.path.relpath(full_dir, base_job_root).replace("\\", "/")
+    q = db.query(Artifact.id, Artifact.rel_path, Artifact.byte_size, Artifact.mtime_ns).filter(
+        Artifact.job_id == job_id
+    )
+    if prefix != ".":
+        q = q.filter(Artifact.rel_path.startswith(prefix.rstrip("/") + "/", autoescape=True))
+    existing = {rel: (aid, size, mtime_ns) for aid, rel, size, mtime_ns in q}
+
+    to_hash: List[HashJob] = []
+    batch: List[Tuple[Artifact, str]] = []
+    updates: List[dict] = []
+
+    def flush_batch() -> None:
+        if not batch and not updates:
+            return
+        db.add_all([art for art, _ in batch])
+        if updates:
+            # Stamp rows whose size changed so job page deltas (webapp.job_progress) resend them.
+            resized = [row for row in updates if "byte_size" in row]
+            if resized:
+                rev = _bump_artifacts_rev(db, job_id)
+                for row in resized:
+                    row["change_seq"] = rev
+            db.bulk_update_mappings(Artifact, updates)
+        db.flush()
+        to_hash.extend((art.id, path, art.byte_size, art.mtime_ns) for art, path in batch)
+        db.commit()
+        batch.clear()
+        updates.clear()
+
+    for abs_path, fn, st in _scan_files(full_dir):
+        rel_path = os.path.relpath(abs_path, base_job_root).replace("\\", "/")
+        size, mtime_ns = st.st_size, st.st_mtime_ns
+        known = existing.get(rel_path)
+        if known is not None:
+            aid, old_size, old_mtime = known
+            if old_size == size and old_mtime == mtime_ns:
                 continue
-            sha = _sha256_file(abs_path)
-            role = role_guess
-            low = rel_path.lower()
-            fn_low = fn.lower()
-            if "step1_combined" in low:
-                role = "step1_combined"
-            elif "prompt_input" in low and "stage_v_step2" in low and low.endswith(".txt"):
-                role = "step2_prompt_input"
-            elif "stage_v_step2" in low or "_stage_v_step2_" in low:
-                role = "step2_topic"
-            elif "step2_failed_topics" in low and low.endswith(".json"):
-                role = "step2_failed_topics"
-            elif fn_low.startswith("b") and fn_low.endswith(".json") and "+" in fn:
-                role = "final_b_json"
-            elif fn_low.startswith("voice_script_") and fn_low.endswith(".json"):
-                role = "voice_script_json"
-            elif "/tts_segments/" in low and fn_low.startswith("segment_") and fn_low.endswith(".wav"):
-                role = "tts_segment"
-            elif fn_low.startswith("final_voice_") and fn_low.endswith(".mp3"):
-                role = "final_mp3"
-            elif "/prompts/" in low and "llm_prompt" in low:
-                role = "llm_prompt_step1" if "step1" in low else "llm_prompt_step2"
-            elif low.endswith(".txt"):
-                role = "txt_dump"
-
-            db.add(
-                Artifact(
-                    job_id=job_id,
-                    pair_index=pair_index,
-                    rel_path=rel_path.replace("\\", "/"),
-                    role=role,
-                    byte_size=size,
-                    sha256=sha,
-                )
+            if old_mtime is None and old_size == size:
+                # Registered before mtimes were recorded: keep its digest, remember the mtime.
+                updates.append({"id": aid, "mtime_ns": mtime_ns})
+            else:
+                updates.append({"id": aid, "byte_size": size, "mtime_ns": mtime_ns, "sha256": None})
+                to_hash.append((aid, abs_path, size, mtime_ns))
+            existing[rel_path] = (aid, size, mtime_ns)
+        else:
+            art = Artifact(
+                job_id=job_id,
+                pair_index=pair_index,
+                rel_path=rel_path,
+                role=_guess_artifact_role(rel_path, fn, role_guess),
+                byte_size=size,
+                mtime_ns=mtime_ns,
             )
-            existing.add(rel_path)
+            batch.append((art, abs_path))
+            existing[rel_path] = (None, size, mtime_ns)
+        if len(batch) + len(updates) >= _ARTIFACT_INSERT_BATCH:
+            flush_batch()
+    flush_batch()
+    # Callers rely on this committing their pending ORM changes.
     db.commit()
+    if to_hash:
+        schedule_artifact_hashes(db.get_bind(), to_hash)
 
 
 def register_input_artifact(
@@ -144,19 +212,18 @@ def register_input_artifact(
     abs_path = os.path.join(base_job_root, rel_path)
     if not os.path.isfile(abs_path):
         return
-    size = os.path.getsize(abs_path)
-    sha = _sha256_file(abs_path)
-    db.add(
-        Artifact(
-            job_id=job_id,
-            pair_index=pair_index,
-            rel_path=rel_norm,
-            role=role,
-            byte_size=size,
-            sha256=sha,
-        )
+    st = os.stat(abs_path)
+    art = Artifact(
+        job_id=job_id,
+        pair_index=pair_index,
+        rel_path=rel_norm,
+        role=role,
+        byte_size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
     )
+    db.add(art)
     db.commit()
+    schedule_artifact_hashes(db.get_bind(), [(art.id, abs_path, st.st_size, st.st_mtime_ns)])
 
 
 def list_word_basenames_for_job(job_id: str) -> List[str]:
@@ -179,6 +246,8 @@ def list_word_basenames_for_job(job_id: str) -> List[str]:
 def delete_job_completely(db: Session, job: Job) -> None:
     """Remove DB rows (cascade) and the job directory under JOBS_ROOT."""
     job_id = job.id
+    # Buffered lines go in now so the cascade below removes them with the job.
+    flush_job_logs(job_id)
     db.query(InboxNotification).filter(InboxNotification.job_id == job_id).delete(
         synchronize_session=False
     )
@@ -187,6 +256,24 @@ def delete_job_completely(db: Session, job: Job) -> None:
     shutil.rmtree(job_root(job_id), ignore_errors=True)
 
 
+def recover_interrupted_outputs(db: Session) -> int:
+    """
+    Rebuild outputs whose run died without finalizing (worker killed, host restart) from the
+    journals they left behind. Jobs that are still queued or running keep their journals.
+    """
+    active = {
+        row.id
+        for row in db.query(Job.id).filter(Job.status.in_(("queued", "pending", "running"))).all()
+    }
+    if not os.path.isdir(JOBS_ROOT):
+        return 0
+    recovered = 0
+    for job_id in os.listdir(JOBS_ROOT):
+        if job_id not in active:
+            recovered += recover_journals_under(job_root(job_id))
+    return recovered
+
+
 def find_word_file_abs_for_basename(job_id: str, basename: str) -> Optional[str]:
     """Absolute path to a Word file under job with this basename (first match under */inputs/)."""
     base = job_root(job_id)
@@ -0,0 +1,178 @@
+"""
+Buffered, batched writer for ``job_log_lines``.
+
+Writing one log line used to cost a ``SELECT MAX(seq)`` plus a commit, so LLM workers that
+report progress per chunk queued up behind SQLite's write lock. Lines now go to a per-job
+:class:`JobLogSink` in memory and a single background thread writes them in batches: when a
+sink holds ``LOG_FLUSH_LINES`` lines, or at least every ``LOG_FLUSH_SECONDS``.
+
+Sequence numbers are allocated in memory, one block per batch. The block starts after the
+job's highest ``seq`` in the database (read once, in the batch's own transaction), so lines
+written by other processes (API, other Celery workers) never end up behind a poll cursor.
+
+Runners call :func:`flush_job_logs` when a job or task ends, the poll endpoint calls it
+before reading (inline mode shares the process), and an ``atexit`` hook flushes whatever is
+left when the process exits. A failed batch goes back to the front of its sink and is retried.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from webapp.config import LOG_FLUSH_LINES, LOG_FLUSH_SECONDS
+from webapp.models import JobLogLine
+
+logger = logging.getLogger(__name__)
+
+# Sinks with nothing buffered for this long are dropped from the registry.
+_IDLE_DROP_SECONDS = 60.0
+
+# Guards the registry and every sink's buffer; held only for list/dict operations.
+_lock = threading.Lock()
+_sinks: Dict[Tuple[Any, str], "JobLogSink"] = {}
+_wake = threading.Event()
+_flusher: Optional[threading.Thread] = None
+
+
+class JobLogSink:
+    """In-memory log buffer for one job on one database; thread-safe."""
+
+    def __init__(self, bind: Any, job_id: str):
+        self.bind = bind
+        self.job_id = job_id
+        self._buf: List[Tuple[str, Optional[int], datetime]] = []
+        # One flush at a time per sink, so seq blocks are written in allocation order.
+        self._flush_lock = threading.Lock()
+        self._next_seq = 0
+        self._dropped = False
+        self.last_write = time.monotonic()
+        self.lines_written = 0
+        self.batches_written = 0
+
+    def write(self, line: str, pair_index: Optional[int] = None) -> None:
+        self.write_many([line], pair_index)
+
+    def write_many(self, lines: Iterable[str], pair_index: Optional[int] = None) -> None:
+        ts = datetime.utcnow()
+        rows = [(line, pair_index, ts) for line in lines]
+        if not rows:
+            return
+        with _lock:
+            sink = self if not self._dropped else _sink_locked(self.bind, self.job_id)
+            sink._buf.extend(rows)
+            sink.last_write = time.monotonic()
+            full = len(sink._buf) >= LOG_FLUSH_LINES
+        _ensure_flusher()
+        if full:
+            _wake.set()
+
+    def pending(self) -> int:
+        with _lock:
+            return len(self._buf)
+
+    def flush(self) -> int:
+        """Write every buffered line in one transaction; returns the number of lines written."""
+        with self._flush_lock:
+            with _lock:
+                batch, self._buf = self._buf, []
+            if not batch:
+                return 0
+            s = None
+            try:
+                s = Session(bind=self.bind)
+                db_max = (
+                    s.query(func.max(JobLogLine.seq)).filter(JobLogLine.job_id == self.job_id).scalar() or 0
+                )
+                seq = max(self._next_seq, db_max + 1)
+                s.add_all(
+                    [
+                        JobLogLine(job_id=self.job_id, seq=seq + i, line=line, pair_index=pair_index, ts=ts)
+                        for i, (line, pair_index, ts) in enumerate(batch)
+                    ]
+                )
+                s.commit()
+            except Exception:
+                if s is not None:
+                    s.rollback()
+                with _lock:
+                    self._buf[:0] = batch
+                raise
+            finally:
+                if s is not None:
+                    s.close()
+            self._next_seq = seq + len(batch)
+            self.lines_written += len(batch)
+            self.batches_written += 1
+            return len(batch)
+
+
+def _sink_locked(bind: Any, job_id: str) -> JobLogSink:
+    key = (bind, job_id)
+    sink = _sinks.get(key)
+    if sink is None:
+        sink = _sinks[key] = JobLogSink(bind, job_id)
+    return sink
+
+
+def job_log_sink(job_id: str, bind: Any = None) -> JobLogSink:
+    """The shared sink for ``job_id`` on ``bind`` (default: the app engine)."""
+    if bind is None:
+        from webapp.database import engine
+
+        bind = engine
+    with _lock:
+        return _sink_locked(bind, job_id)
+
+
+def _flush_sink(sink: JobLogSink) -> None:
+    try:
+        sink.flush()
+    except Exception:
+        logger.exception("Flushing %d log line(s) of job %s failed; will retry", sink.pending(), sink.job_id)
+
+
+def flush_job_logs(job_id: Optional[str] = None) -> None:
+    """Write buffered lines now: of one job (every database), or of all jobs when None."""
+    with _lock:
+        sinks = [s for (_, jid), s in _sinks.items() if job_id is None or jid == job_id]
+    for sink in sinks:
+        _flush_sink(sink)
+
+
+def _drop_idle_sinks() -> None:
+    now = time.monotonic()
+    with _lock:
+        for key, sink in list(_sinks.items()):
+            if not sink._buf and not sink._flush_lock.locked() and now - sink.last_write > _IDLE_DROP_SECONDS:
+                sink._dropped = True
+                del _sinks[key]
+
+
+def _flush_loop() -> None:
+    while True:
+        _wake.wait(LOG_FLUSH_SECONDS)
+        _wake.clear()
+        flush_job_logs()
+        _drop_idle_sinks()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="job-log-flusher", daemon=True)
+        _flusher.start()
+
+
+atexit.register(flush_job_logs)
@@ -0,0 +1,212 @@
+"""
+Incremental job progress for the job page: ``/jobs/{job_id}/poll`` and ``/jobs/{job_id}/events``.
+
+A full poll returns every pair and every artifact, which for Voice Class jobs (thousands of TTS
+segments and prompt captures) is hundreds of KB every few seconds per open tab. Clients now send
+cursors and only get what changed:
+
+* ``after_seq``: log lines with a higher ``seq`` (as before);
+* ``after_artifact_id``: only artifacts with a higher id. ``artifact_count`` lets the client spot
+  deleted rows and reload the full list (``after_artifact_id`` omitted);
+* ``after_artifact_rev``: also resend older rows updated in place (a re-registered file's new
+  size) since that ``Job.artifacts_rev``; the client replaces them by id;
+* ``pairs_version``: a digest of every pair's status/error fields. ``pairs`` is ``None`` when it
+  matches the client's.
+
+``job_event_stream`` serves the same deltas as server-sent events, so an open job page holds one
+connection that the server tails (about every second while the job is active) instead of
+re-fetching everything.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from webapp.database import SessionLocal
+from webapp.job_log_sink import flush_job_logs
+from webapp.models import Artifact, Job, JobLogLine, JobPair
+
+# Seconds between SSE ticks while the job is queued/running, and while it is idle.
+EVENTS_ACTIVE_INTERVAL = 1.0
+EVENTS_IDLE_INTERVAL = 5.0
+# Comment line so proxies keep the stream open; the stream ends after EVENTS_MAX_SECONDS and
+# the browser reconnects with its current cursors.
+EVENTS_KEEPALIVE_SECONDS = 15.0
+EVENTS_MAX_SECONDS = 600.0
+
+_ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+def _pair_dict(p: JobPair) -> Dict[str, Any]:
+    return {
+        "pair_index": p.pair_index,
+        "step1_status": p.step1_status,
+        "step2_status": p.step2_status,
+        "step1_error": p.step1_error,
+        "step2_error": p.step2_error,
+        "stage_j": p.stage_j_filename,
+        "word": p.word_filename or "",
+    }
+
+
+def _artifact_dict(a: Artifact) -> Dict[str, Any]:
+    return {
+        "id": a.id,
+        "pair_index": a.pair_index,
+        "rel_path": a.rel_path,
+        "role": a.role,
+        "byte_size": a.byte_size,
+    }
+
+
+def pairs_version_of(pairs: List[Dict[str, Any]]) -> str:
+    raw = json.dumps(pairs, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def job_progress_delta(
+    db: Session,
+    job: Job,
+    *,
+    after_seq: int = 0,
+    limit: int = 500,
+    after_artifact_id: Optional[int] = None,
+    after_artifact_rev: Optional[int] = None,
+    pairs_version: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Poll payload for ``job``; artifacts and pairs are deltas when the client sent cursors."""
+    job_id = job.id
+    # Inline runners share this process: show their buffered lines right away.
+    flush_job_logs(job_id)
+    lines = (
+        db.query(JobLogLine)
+        .filter(JobLogLine.job_id == job_id, JobLogLine.seq > after_seq)
+        .order_by(JobLogLine.seq)
+        .limit(limit)
+        .all()
+    )
+    if len(lines) < limit:
+        max_seq = lines[-1].seq if lines else after_seq
+    else:
+        max_seq = db.query(func.max(JobLogLine.seq)).filter(JobLogLine.job_id == job_id).scalar() or 0
+
+    pairs = [
+        _pair_dict(p)
+        for p in db.query(JobPair).filter(JobPair.job_id == job_id).order_by(JobPair.pair_index).all()
+    ]
+    version = pairs_version_of(pairs)
+
+    # Read before the rows: an update committed in between is resent on the next delta.
+    artifacts_rev = int(job.artifacts_rev or 0)
+    art_q = db.query(Artifact).filter(Artifact.job_id == job_id)
+    if after_artifact_id is not None and after_artifact_rev is not None:
+        art_q = art_q.filter(
+            or_(Artifact.id > after_artifact_id, Artifact.change_seq > after_artifact_rev)
+        )
+    elif after_artifact_id is not None:
+        art_q = art_q.filter(Artifact.id > after_artifact_id)
+    arts = [_artifact_dict(a) for a in art_q.order_by(Artifact.id).all()]
+    if after_artifact_id is None:
+        artifact_count = len(arts)
+    else:
+        artifact_count = db.query(func.count(Artifact.id)).filter(Artifact.job_id == job_id).scalar() or 0
+    max_artifact_id = max([a["id"] for a in arts] + [after_artifact_id or 0])
+
+    return {
+        "job_id": job_id,
+        "job_type": job.type,
+        "status": job.status,
+        "cancel_requested": bool(getattr(job, "cancel_requested", False)),
+        "error_summary": job.error_summary,
+        "log_lines": [{"seq": ln.seq, "line": ln.line, "pair_index": ln.pair_index} for ln in lines],
+        "max_seq": max_seq,
+        "pairs": None if pairs_version == version else pairs,
+        "pairs_version": version,
+        "artifacts": arts,
+        "artifacts_delta": after_artifact_id is not None,
+        "max_artifact_id": max_artifact_id,
+        "artifacts_rev": artifacts_rev,
+        "artifact_count": artifact_count,
+    }
+
+
+def _job_state(job: Job) -> tuple:
+    return (job.status, bool(job.cancel_requested), job.error_summary)
+
+
+def _tick(job_id: str, cursors: Dict[str, Any], limit: int) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if not job:
+            return None
+        delta = job_progress_delta(
+            db,
+            job,
+            after_seq=cursors["after_seq"],
+            limit=limit,
+            after_artifact_id=cursors["after_artifact_id"],
+            after_artifact_rev=cursors["after_artifact_rev"],
+            pairs_version=cursors["pairs_version"],
+        )
+        delta["_state"] = _job_state(job)
+        return delta
+    finally:
+        db.close()
+
+
+async def job_event_stream(
+    job_id: str,
+    is_disconnected: Any,
+    *,
+    after_seq: int = 0,
+    after_artifact_id: Optional[int] = None,
+    after_artifact_rev: Optional[int] = None,
+    pairs_version: Optional[str] = None,
+    limit: int = 800,
+) -> AsyncIterator[str]:
+    """``text/event-stream`` body: one ``progress`` event (a poll delta) per change."""
+    cursors: Dict[str, Any] = {
+        "after_seq": after_seq,
+        "after_artifact_id": after_artifact_id,
+        "after_artifact_rev": after_artifact_rev,
+        "pairs_version": pairs_version,
+    }
+    started = last_sent = time.monotonic()
+    last_state: Optional[tuple] = None
+    while time.monotonic() - started < EVENTS_MAX_SECONDS:
+        if await is_disconnected():
+            return
+        delta = await run_in_threadpool(_tick, job_id, cursors, limit)
+        if delta is None:
+            yield "event: gone\ndata: {}\n\n"
+            return
+        state = delta.pop("_state")
+        changed = (
+            last_state is None
+            or state != last_state
+            or delta["log_lines"]
+            or delta["artifacts"]
+            or delta["pairs"] is not None
+        )
+        if changed:
+            cursors["after_seq"] = max(cursors["after_seq"], delta["max_seq"])
+            cursors["after_artifact_id"] = delta["max_artifact_id"]
+            cursors["after_artifact_rev"] = delta["artifacts_rev"]
+            cursors["pairs_version"] = delta["pairs_version"]
+            last_state = state
+            last_sent = time.monotonic()
+            yield f"event: progress\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+        elif time.monotonic() - last_sent >= EVENTS_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        active = state[0] in _ACTIVE_JOB_STATUSES
+        await asyncio.sleep(EVENTS_ACTIVE_INTERVAL if active else EVENTS_IDLE_INTERVAL)
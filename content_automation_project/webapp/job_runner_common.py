@@ -3,11 +3,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from sqlalchemy.orm import Session
 
-from webapp.database import SessionLocal
+from webapp.cancel_signal import clear_cancel, is_cancel_requested
 from webapp.job_files import append_log
 from webapp.models import Job, JobPair
 
@@ -43,19 +43,15 @@ SINGLE_STAGE_JOB_TYPES = frozenset(
 
 
 def _scalar_cancel_requested(db: Session, job_id: str) -> bool:
-    v = db.query(Job.cancel_requested).filter(Job.id == job_id).scalar()
-    return bool(v)
+    """Cached stop flag (see ``webapp.cancel_signal``); re-read on ``db``'s engine when stale."""
+    return is_cancel_requested(job_id, db.get_bind())
 
 
-def _cancel_check_session(job_id: str):
-    """Fresh SQLite read each call (safe with API commits and with Step 2 thread pool workers)."""
+def _cancel_check_session(job_id: str, bind: Any = None):
+    """Session-free stop check for streaming loops and thread pool workers (O(1) between DB refreshes)."""
 
     def check() -> bool:
-        s = SessionLocal()
-        try:
-            return _scalar_cancel_requested(s, job_id)
-        finally:
-            s.close()
+        return is_cancel_requested(job_id, bind)
 
     return check
 
@@ -72,6 +68,7 @@ def _finalize_step1_cancelled(db: Session, job_id: str, pairs: List[JobPair]) ->
     job.cancel_requested = False
     job.finished_at = datetime.utcnow()
     db.commit()
+    clear_cancel(job_id)
 
 
 def _finalize_step2_cancelled(db: Session, job_id: str, pairs: List[JobPair]) -> None:
@@ -86,3 +83,4 @@ def _finalize_step2_cancelled(db: Session, job_id: str, pairs: List[JobPair]) ->
     job.cancel_requested = False
     job.finished_at = datetime.utcnow()
     db.commit()
+    clear_cancel(job_id)
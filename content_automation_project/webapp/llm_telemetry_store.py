@@ -0,0 +1,258 @@
+"""
+``llm_requests`` table: the webapp's sink for :mod:`llm_telemetry` records.
+
+:func:`install_db_sink` is called once per process (API startup, Celery worker import); from
+then on every provider request made in that process is stored as one :class:`LLMRequestLog`
+row. Rows are never updated, so the table also backs the Prometheus counters served at
+``/metrics`` (:func:`prometheus_text`) and the per-job summary panel (:func:`job_llm_summary`).
+
+Like job log lines (``webapp.job_log_sink``), records are buffered in memory and a background
+thread inserts them in batches: when ``LLM_TELEMETRY_FLUSH_ROWS`` are pending, or at least
+every ``LLM_TELEMETRY_FLUSH_SECONDS``. The same thread deletes rows older than
+``LLM_REQUESTS_RETENTION_DAYS`` about once an hour, so scrapes aggregate a bounded table.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+import llm_telemetry
+from webapp.config import LLM_REQUESTS_RETENTION_DAYS, LLM_TELEMETRY_FLUSH_ROWS, LLM_TELEMETRY_FLUSH_SECONDS
+from webapp.models import LLMRequestLog
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency / TTFT histogram buckets
+LATENCY_BUCKETS: Tuple[float, ...] = (1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+# Records kept in memory while the database is unavailable; the oldest are dropped beyond this.
+_MAX_PENDING = 10_000
+_PRUNE_INTERVAL_S = 3600.0
+
+_install_lock = threading.Lock()
+_installed = False
+
+# Guards _pending; held only for list operations.
+_lock = threading.Lock()
+_pending: List[llm_telemetry.LLMRequestRecord] = []
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_flusher: Optional[threading.Thread] = None
+_last_prune = 0.0
+
+_LABELS = ("provider", "stage", "model")
+
+
+def _row_from_record(record: llm_telemetry.LLMRequestRecord) -> LLMRequestLog:
+    data = record.to_dict()
+    try:
+        ts = datetime.fromisoformat(data.pop("ts")).replace(tzinfo=None)
+    except ValueError:
+        ts = datetime.utcnow()
+    return LLMRequestLog(ts=ts, **data)
+
+
+def _default_bind() -> Any:
+    from webapp.database import engine
+
+    return engine
+
+
+def store_record(record: llm_telemetry.LLMRequestRecord) -> None:
+    """Queue ``record`` for the next batch insert (never touches the database)."""
+    with _lock:
+        _pending.append(record)
+        dropped = len(_pending) - _MAX_PENDING
+        if dropped > 0:
+            del _pending[:dropped]
+        full = len(_pending) >= LLM_TELEMETRY_FLUSH_ROWS
+    if dropped > 0:
+        logger.warning("LLM telemetry buffer full; dropped %d oldest record(s)", dropped)
+    _ensure_flusher()
+    if full:
+        _wake.set()
+
+
+def flush_llm_records(bind: Any = None) -> int:
+    """Insert every queued record in one transaction; returns the number written."""
+    with _flush_lock:
+        with _lock:
+            batch = _pending[:]
+            del _pending[:]
+        if not batch:
+            return 0
+        s = Session(bind=bind if bind is not None else _default_bind())
+        try:
+            s.add_all([_row_from_record(r) for r in batch])
+            s.commit()
+        except Exception:
+            s.rollback()
+            with _lock:
+                _pending[:0] = batch
+            raise
+        finally:
+            s.close()
+        return len(batch)
+
+
+def prune_llm_requests(bind: Any = None, now: Optional[datetime] = None) -> int:
+    """Delete rows older than ``LLM_REQUESTS_RETENTION_DAYS`` (0 keeps everything); returns the count."""
+    if LLM_REQUESTS_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=LLM_REQUESTS_RETENTION_DAYS)
+    s = Session(bind=bind if bind is not None else _default_bind())
+    try:
+        n = s.query(LLMRequestLog).filter(LLMRequestLog.ts < cutoff).delete(synchronize_session=False)
+        s.commit()
+        return n
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
+
+
+def _flush_loop() -> None:
+    global _last_prune
+    while True:
+        _wake.wait(LLM_TELEMETRY_FLUSH_SECONDS)
+        _wake.clear()
+        flush_pending_records()
+        if time.monotonic() - _last_prune >= _PRUNE_INTERVAL_S:
+            _last_prune = time.monotonic()
+            try:
+                n = prune_llm_requests()
+                if n:
+                    logger.info("Pruned %d llm_requests row(s) older than %s days", n, LLM_REQUESTS_RETENTION_DAYS)
+            except Exception:
+                logger.exception("Pruning llm_requests failed")
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="llm-telemetry-flusher", daemon=True)
+        _flusher.start()
+
+
+def flush_pending_records() -> None:
+    """Write queued records now (readers in this process, exit); failures are logged, not raised."""
+    try:
+        flush_llm_records()
+    except Exception:
+        logger.exception("Writing %d LLM telemetry record(s) failed; will retry", len(_pending))
+
+
+def install_db_sink() -> None:
+    """Store this process's LLM request records in ``llm_requests`` (idempotent)."""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            llm_telemetry.add_sink(store_record)
+            atexit.register(flush_pending_records)
+            _installed = True
+
+
+def _row_dict(row: LLMRequestLog) -> Dict[str, Any]:
+    return {c.name: getattr(row, c.name) for c in LLMRequestLog.__table__.columns}
+
+
+def job_llm_summary(db: Session, job_id: str) -> Dict[str, Any]:
+    """Per-stage p50/p95 latency, tokens and cost of one job's LLM requests."""
+    rows = db.query(LLMRequestLog).filter(LLMRequestLog.job_id == job_id).all()
+    records = [_row_dict(r) for r in rows]
+    stages = llm_telemetry.summarize(records)
+    costs = [s["cost"] for s in stages if s["cost"] is not None]
+    return {
+        "job_id": job_id,
+        "requests": len(records),
+        "prompt_tokens": sum(s["prompt_tokens"] for s in stages),
+        "completion_tokens": sum(s["completion_tokens"] for s in stages),
+        "cost": round(sum(costs), 6) if costs else None,
+        "stages": stages,
+    }
+
+
+def _escape(value: Any) -> str:
+    return str(value if value is not None else "").replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Sequence[Tuple[str, Any]]) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: Any) -> str:
+    if value is None:
+        return "0"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _histogram(db: Session, name: str, column: Any, help_text: str) -> List[str]:
+    """Cumulative buckets per (provider, stage, model) computed in SQL."""
+    label_cols = [getattr(LLMRequestLog, n) for n in _LABELS]
+    bucket_cols = [
+        func.sum(case((column <= int(b * 1000), 1), else_=0)) for b in LATENCY_BUCKETS
+    ]
+    q = (
+        db.query(*label_cols, func.count(column), func.sum(column), *bucket_cols)
+        .filter(column.isnot(None))
+        .group_by(*label_cols)
+    )
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for row in q:
+        labels = list(zip(_LABELS, row[: len(_LABELS)]))
+        count, total_ms = row[len(_LABELS)], row[len(_LABELS) + 1]
+        for b, n in zip(LATENCY_BUCKETS, row[len(_LABELS) + 2 :]):
+            lines.append(f"{name}_bucket{_labels(labels + [('le', _number(float(b)))])} {_number(n)}")
+        lines.append(f"{name}_bucket{_labels(labels + [('le', '+Inf')])} {_number(count)}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number((total_ms or 0) / 1000.0)}")
+        lines.append(f"{name}_count{_labels(labels)} {_number(count)}")
+    return lines
+
+
+def prometheus_text(db: Session) -> str:
+    """All-time LLM request metrics in the Prometheus text exposition format (0.0.4)."""
+    label_cols = [getattr(LLMRequestLog, n) for n in _LABELS]
+    lines: List[str] = [
+        "# HELP llm_requests_total LLM provider requests by outcome (ok, empty, error, aborted).",
+        "# TYPE llm_requests_total counter",
+    ]
+    q = db.query(*label_cols, LLMRequestLog.outcome, func.count(LLMRequestLog.id)).group_by(
+        *label_cols, LLMRequestLog.outcome
+    )
+    for *labels, outcome, n in q:
+        lines.append(f"llm_requests_total{_labels(list(zip(_LABELS, labels)) + [('outcome', outcome)])} {n}")
+
+    sums = (
+        ("llm_prompt_tokens_total", LLMRequestLog.prompt_tokens, "counter", "Prompt tokens reported by the provider."),
+        ("llm_completion_tokens_total", LLMRequestLog.completion_tokens, "counter", "Completion tokens reported by the provider."),
+        ("llm_prompt_chars_total", LLMRequestLog.prompt_chars, "counter", "Characters sent as system + user prompt."),
+        ("llm_cost_usd_total", LLMRequestLog.cost, "counter", "Cost reported by the provider (OpenRouter usage.cost)."),
+        ("llm_retries_total", LLMRequestLog.retries, "counter", "Retries within requests (429s, timeouts, transport errors)."),
+        ("llm_credit_cap_reductions_total", LLMRequestLog.credit_cap_reductions, "counter", "max_tokens reductions after a credit-cap error."),
+    )
+    q = db.query(*label_cols, *[func.coalesce(func.sum(col), 0) for _, col, _, _ in sums]).group_by(*label_cols)
+    rows = q.all()
+    for i, (name, _col, kind, help_text) in enumerate(sums):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for row in rows:
+            lines.append(f"{name}{_labels(list(zip(_LABELS, row[: len(_LABELS)])))} {_number(row[len(_LABELS) + i])}")
+
+    lines += _histogram(db, "llm_request_latency_seconds", LLMRequestLog.latency_ms, "Wall time of a request, retries and rate-limit waits included.")
+    lines += _histogram(db, "llm_request_ttft_seconds", LLMRequestLog.ttft_ms, "Time to the first streamed token (streamed requests only).")
+    return "\n".join(lines) + "\n"
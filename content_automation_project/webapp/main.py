@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import hmac
 import inspect
 import json
 import os
@@ -15,7 +16,7 @@ from typing import Any, List, Optional
 
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.templating import Jinja2Templates
 try:
@@ -31,6 +32,8 @@ except ImportError:
     HAS_CELERY = False
 from sqlalchemy import func, or_
 from sqlalchemy.orm import Session, joinedload
+from llm_response_cache import CACHE_DIR_ENV as LLM_CACHE_DIR_ENV
+from webapp.artifact_hashing import ensure_artifact_hash
 from webapp.auth_utils import COOKIE_NAME, create_access_token, verify_password
 from webapp.bootstrap import (
     bootstrap_admins,
@@ -48,6 +51,7 @@ from webapp.config import (
     GEMINI_TTS_DEFAULT_RPM,
     GEMINI_TTS_DEFAULT_RPD,
     JOBS_ROOT,
+    METRICS_TOKEN,
     PROJECT_ROOT,
     RUN_TASKS_INLINE,
     SONGS_DIR,
@@ -60,7 +64,7 @@ from webapp.config import (
 from webapp.database import Base, SessionLocal, engine, get_db
 from webapp.schema_migrate import apply_schema_migrations
 import webapp.models  # noqa: F401 — register models with metadata
-from webapp.deps import CurrentUser, is_admin_user, require_admin
+from webapp.deps import CurrentUser, get_current_user, is_admin_user, require_admin
 from webapp.datetime_jalali import format_tehran_shamsi
 from webapp.job_files import (
     append_log,
@@ -70,9 +74,15 @@ from webapp.job_files import (
     job_root,
     list_word_basenames_for_job,
     pair_inputs,
+    pair_output,
+    recover_interrupted_outputs,
     register_input_artifact,
 )
+from webapp.cancel_signal import clear_cancel, request_cancel
+from webapp.job_progress import job_event_stream, job_progress_delta
+from webapp.llm_telemetry_store import flush_pending_records, install_db_sink, job_llm_summary, prometheus_text
 from webapp.job_runner_common import SINGLE_STAGE_JOB_TYPES, _finalize_step2_cancelled
+from webapp.pair_dispatch import PAIR_CONCURRENCY_MAX, pair_concurrency_from_cfg
 from webapp.job_prompts import (
     apply_submitted_prompts_to_cfg,
     build_prompt_editor_rows,
@@ -86,8 +96,9 @@ from webapp.system_prompt_defaults import (
     resolve_prompt_for_job,
     seed_system_prompt_defaults,
 )
-from webapp.models import Artifact, GeminiTtsApiKey, InboxNotification, Job, JobLogLine, JobPair, User
+from webapp.models import Artifact, GeminiTtsApiKey, InboxNotification, Job, JobPair, User
 from webapp.tasks_stage_v import run_full_pipeline_job, run_step1_job, run_step2_job
+from webapp.tasks_single_stage import single_stage_spec
 from stage_v_pairing import (
     attach_step1_combined_uploads_to_pairs,
     auto_pair_chapter_summary_files,
@@ -586,8 +597,10 @@ def create_app() -> FastAPI:
         os.makedirs(PROJECT_ROOT / "data", exist_ok=True)
         Base.metadata.create_all(bind=engine)
         apply_schema_migrations(engine)
+        install_db_sink()
         db = SessionLocal()
         try:
+            recover_interrupted_outputs(db)
             bootstrap_admins(db)
             ensure_missing_env_admins(db)
             sync_admin_password_from_env(db)
@@ -612,6 +625,15 @@ def create_app() -> FastAPI:
     def health() -> dict:
         return {"ok": True}
 
+    @app.get("/metrics")
+    def metrics(request: Request, db: Session = Depends(get_db)) -> PlainTextResponse:
+        # Scrapers send the bearer token; otherwise only a logged-in admin may read usage and cost
+        auth = request.headers.get("authorization", "")
+        if not (METRICS_TOKEN and hmac.compare_digest(auth, f"Bearer {METRICS_TOKEN}")):
+            require_admin(get_current_user(db, request.cookies.get(COOKIE_NAME)))
+        flush_pending_records()
+        return PlainTextResponse(prometheus_text(db), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     @app.get("/", response_class=HTMLResponse)
     def root() -> RedirectResponse:
         return RedirectResponse("/login", status_code=302)
@@ -1348,6 +1370,7 @@ def create_app() -> FastAPI:
             model_2: str = Form(DEFAULT_TEST_BANK_MODEL),
             model_1: str = Form(DEFAULT_TEST_BANK_MODEL),
             delay_seconds: str = Form("5"),
+            step2_concurrency: str = Form("10"),
             job_name: str = Form(""),
         ) -> RedirectResponse:
             if not stage_j_files or not word_files or not step1_combined_files:
@@ -1416,6 +1439,10 @@ def create_app() -> FastAPI:
                     delay_val = float(delay_seconds)
                 except ValueError:
                     delay_val = 5.0
+                try:
+                    step2_concurrency_val = min(32, max(1, int(step2_concurrency)))
+                except ValueError:
+                    step2_concurrency_val = 10
 
                 step1_rel_by_pair: dict[str, str] = {}
                 prompt_2_eff = _prompt_for_new_job(db, "test_bank_2", prompt_2, "prompt_2")
@@ -1433,6 +1460,7 @@ def create_app() -> FastAPI:
                     "model_2": model_2_eff,
                     "model_1": model_1_eff_tb2,
                     "delay_seconds": delay_val,
+                    "step2_concurrency": step2_concurrency_val,
                     "step1_combined_relpaths": step1_rel_by_pair,
                 }
 
@@ -1593,6 +1621,8 @@ def create_app() -> FastAPI:
             provider: str = Form("openrouter"),
             model: str = Form("z-ai/glm-5"),
             delay_seconds: str = Form("5"),
+            subchapter_concurrency: str = Form("1"),
+            page_window_margin: str = Form(""),
             job_name: str = Form(""),
         ) -> RedirectResponse:
             name_stripped = (job_name or "").strip()
@@ -1640,6 +1670,16 @@ def create_app() -> FastAPI:
                     delay_val = float(delay_seconds)
                 except ValueError:
                     delay_val = 5.0
+                try:
+                    concurrency_val = min(16, max(1, int(subchapter_concurrency)))
+                except ValueError:
+                    concurrency_val = 1
+                try:
+                    margin_val: Optional[int] = int(page_window_margin) if page_window_margin.strip() else None
+                except ValueError:
+                    margin_val = None
+                if margin_val is not None and margin_val < 0:
+                    margin_val = None
 
                 prompt_eff = _prompt_for_new_job(db, "ocr_extraction", prompt, "prompt")
                 cfg = {
@@ -1648,6 +1688,8 @@ def create_app() -> FastAPI:
                     "provider": provider,
                     "model": model,
                     "delay_seconds": delay_val,
+                    "subchapter_concurrency": concurrency_val,
+                    "page_window_margin": margin_val,
                 }
                 job_id = str(uuid.uuid4())
                 root = job_root(job_id)
@@ -3042,6 +3084,10 @@ def create_app() -> FastAPI:
                 "renumber_scheme": renumber_scheme,
                 "is_voice_class": jt == "voice_class",
                 "is_admin": is_admin_user(user),
+                "llm_cache_enabled": bool((os.environ.get(LLM_CACHE_DIR_ENV) or "").strip()),
+                "pair_parallel_supported": single_stage_spec(jt) is not None,
+                "pair_concurrency": pair_concurrency_from_cfg(cfg_dict),
+                "pair_concurrency_max": PAIR_CONCURRENCY_MAX,
             },
         )
 
@@ -3169,6 +3215,56 @@ def create_app() -> FastAPI:
         append_log(db, job_id, "Job prompts updated and saved to database (config_json).", None)
         return RedirectResponse(f"/jobs/{job_id}", status_code=302)
 
+    @app.post("/jobs/{job_id}/llm-cache")
+    async def post_job_llm_cache(
+        job_id: str,
+        request: Request,
+        user: CurrentUser,
+        db: Session = Depends(get_db),
+    ) -> RedirectResponse:
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if not job:
+            raise HTTPException(404)
+        require_job_owner(job, user)
+        form = await request.form()
+        bypass = bool(form.get("llm_cache_bypass"))
+        cfg = json.loads(job.config_json or "{}")
+        cfg["llm_cache_bypass"] = bypass
+        job.config_json = json.dumps(cfg, ensure_ascii=False)
+        db.commit()
+        append_log(
+            db,
+            job_id,
+            "LLM response cache " + ("bypassed for this job." if bypass else "enabled for this job."),
+            None,
+        )
+        return RedirectResponse(f"/jobs/{job_id}", status_code=302)
+
+    @app.post("/jobs/{job_id}/pair-concurrency")
+    async def post_job_pair_concurrency(
+        job_id: str,
+        request: Request,
+        user: CurrentUser,
+        db: Session = Depends(get_db),
+    ) -> RedirectResponse:
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if not job:
+            raise HTTPException(404)
+        require_job_owner(job, user)
+        if single_stage_spec(job.type or "") is None:
+            raise HTTPException(400, "This job type runs its pairs one at a time.")
+        form = await request.form()
+        try:
+            n = min(PAIR_CONCURRENCY_MAX, max(1, int(str(form.get("pair_concurrency") or "1"))))
+        except ValueError:
+            raise HTTPException(400, "Parallel pairs must be a whole number.")
+        cfg = json.loads(job.config_json or "{}")
+        cfg["pair_concurrency"] = n
+        job.config_json = json.dumps(cfg, ensure_ascii=False)
+        db.commit()
+        append_log(db, job_id, f"Parallel pairs set to {n}.", None)
+        return RedirectResponse(f"/jobs/{job_id}", status_code=302)
+
     @app.post("/jobs/{job_id}/enqueue-step1")
     def enqueue_step1(
         job_id: str,
@@ -3184,6 +3280,7 @@ def create_app() -> FastAPI:
         job.cancel_requested = False
         append_log(db, job_id, "Queued Step 1." + queued_task_log_suffix(), None)
         db.commit()
+        clear_cancel(job_id)
         try:
             enqueue_task("step1", job_id, parse_pair_indices(pair_indices))
         except Exception as e:
@@ -3248,6 +3345,7 @@ def create_app() -> FastAPI:
         job.cancel_requested = False
         append_log(db, job_id, "Queued Step 2." + queued_task_log_suffix(), None)
         db.commit()
+        clear_cancel(job_id)
         try:
             enqueue_task("step2", job_id, parse_pair_indices(pair_indices))
         except Exception as e:
@@ -3277,6 +3375,7 @@ def create_app() -> FastAPI:
             None,
         )
         db.commit()
+        clear_cancel(job_id)
         try:
             enqueue_task("full", job_id, parse_pair_indices(pair_indices))
         except Exception as e:
@@ -3335,6 +3434,7 @@ def create_app() -> FastAPI:
             None,
         )
         db.commit()
+        request_cancel(job_id)
         return {"ok": True, "job_id": job_id}
 
     @app.post("/jobs/{job_id}/delete")
@@ -3457,7 +3557,14 @@ def create_app() -> FastAPI:
             return {"supported": False, "segments": []}
 
         from webapp.tasks_voice_class import _find_final_voice_mp3, _find_voice_script
-        from webapp.audio_merge import probe_audio_duration_seconds
+        from webapp.audio_merge import probe_audio_duration_seconds, wav_header_duration_seconds
+        from webapp.voice_segment_index import (
+            cached_audio_metadata,
+            load_audio_index,
+            record_audio_metadata,
+            rel_to_output,
+            segment_rel_path,
+        )
 
         base = job_root(job_id)
         script_path = _find_voice_script(base, pair_index)
@@ -3474,20 +3581,26 @@ def create_app() -> FastAPI:
             data = json.load(f)
         segments = data.get("segments") or []
         meta = data.get("metadata") or {}
+        out_dir = pair_output(job_id, pair_index)
+        audio_index = load_audio_index(out_dir)
+        rel_prefix = f"pair_{pair_index}/output/"
+        artifact_ids = dict(
+            db.query(Artifact.rel_path, Artifact.id)
+            .filter(Artifact.job_id == job_id, Artifact.rel_path.startswith(rel_prefix, autoescape=True))
+            .all()
+        )
         out = []
         for seg in segments:
             sid = int(seg.get("segment_id") or 0)
-            rel_wav = f"pair_{pair_index}/output/tts_segments/segment_{sid:03d}.wav"
+            rel_wav = rel_prefix + segment_rel_path(sid)
             abs_wav = os.path.join(base, rel_wav.replace("/", os.sep))
-            art = (
-                db.query(Artifact)
-                .filter(Artifact.job_id == job_id, Artifact.rel_path == rel_wav)
-                .one_or_none()
-            )
             has_wav = os.path.isfile(abs_wav)
-            duration_seconds = None
-            if has_wav:
-                duration_seconds = probe_audio_duration_seconds(abs_wav)
+            cached = cached_audio_metadata(audio_index, out_dir, segment_rel_path(sid)) if has_wav else None
+            if cached:
+                duration_seconds = cached.get("duration_seconds")
+            else:
+                # Not analyzed yet (older job, or regenerated outside Step 2): header duration only.
+                duration_seconds = wav_header_duration_seconds(abs_wav) if has_wav else None
             out.append(
                 {
                     "segment_id": sid,
@@ -3495,11 +3608,11 @@ def create_app() -> FastAPI:
                     "estimated_seconds": seg.get("estimated_seconds"),
                     "char_count": seg.get("char_count"),
                     "has_wav": has_wav,
-                    "artifact_id": art.id if art else None,
+                    "artifact_id": artifact_ids.get(rel_wav),
                     "rel_path": rel_wav if has_wav else None,
                     "duration_seconds": round(duration_seconds, 2) if duration_seconds is not None else None,
-                    "is_silent": None,
-                    "waveform_peaks": None,
+                    "is_silent": cached.get("is_silent") if cached else None,
+                    "waveform_peaks": cached.get("waveform_peaks") if cached else None,
                 }
             )
 
@@ -3507,19 +3620,21 @@ def create_app() -> FastAPI:
         final_mp3 = None
         if final_abs and os.path.isfile(final_abs):
             rel_mp3 = os.path.relpath(final_abs, base).replace("\\", "/")
-            art_mp3 = (
-                db.query(Artifact)
-                .filter(Artifact.job_id == job_id, Artifact.rel_path == rel_mp3)
-                .one_or_none()
-            )
-            mp3_duration = probe_audio_duration_seconds(final_abs)
+            rel_in_out = rel_to_output(out_dir, final_abs)
+            cached = cached_audio_metadata(audio_index, out_dir, rel_in_out) if rel_in_out else None
+            if cached:
+                mp3_duration = cached.get("duration_seconds")
+            else:
+                mp3_duration = probe_audio_duration_seconds(final_abs)
+                if rel_in_out and mp3_duration is not None:
+                    record_audio_metadata(out_dir, rel_in_out, {"duration_seconds": round(mp3_duration, 2)})
             final_mp3 = {
-                "artifact_id": art_mp3.id if art_mp3 else None,
+                "artifact_id": artifact_ids.get(rel_mp3),
                 "rel_path": rel_mp3,
                 "filename": os.path.basename(final_abs),
                 "has_mp3": True,
                 "duration_seconds": round(mp3_duration, 2) if mp3_duration is not None else None,
-                "is_silent": None,
+                "is_silent": cached.get("is_silent") if cached else None,
                 "waveform_peaks": None,
             }
 
@@ -3546,15 +3661,21 @@ def create_app() -> FastAPI:
         if (job.type or "").strip() != "voice_class":
             raise HTTPException(400, "Not a voice class job")
 
-        from webapp.audio_merge import analyze_audio_for_preview
+        from webapp.voice_segment_index import (
+            cached_audio_metadata,
+            load_audio_index,
+            record_audio_metadata,
+            segment_rel_path,
+        )
 
-        base = job_root(job_id)
-        rel_wav = f"pair_{pair_index}/output/tts_segments/segment_{segment_id:03d}.wav"
-        abs_wav = os.path.join(base, rel_wav.replace("/", os.sep))
-        if not os.path.isfile(abs_wav):
+        out_dir = pair_output(job_id, pair_index)
+        rel_wav = segment_rel_path(segment_id)
+        if not os.path.isfile(os.path.join(out_dir, rel_wav.replace("/", os.sep))):
             raise HTTPException(404, "Segment WAV not found")
 
-        preview = analyze_audio_for_preview(abs_wav)
+        preview = cached_audio_metadata(load_audio_index(out_dir), out_dir, rel_wav)
+        if not preview or preview.get("waveform_peaks") is None:
+            preview = record_audio_metadata(out_dir, rel_wav)
         if not preview:
             raise HTTPException(500, "Audio preview analysis failed")
 
@@ -3581,13 +3702,25 @@ def create_app() -> FastAPI:
 
         from webapp.tasks_voice_class import _find_final_voice_mp3
         from webapp.audio_merge import analyze_audio_for_preview
+        from webapp.voice_segment_index import (
+            cached_audio_metadata,
+            load_audio_index,
+            record_audio_metadata,
+            rel_to_output,
+        )
 
         base = job_root(job_id)
         final_abs = _find_final_voice_mp3(base, pair_index)
         if not final_abs or not os.path.isfile(final_abs):
             raise HTTPException(404, "Final MP3 not found")
 
-        preview = analyze_audio_for_preview(final_abs, bar_count=120)
+        out_dir = pair_output(job_id, pair_index)
+        rel_mp3 = rel_to_output(out_dir, final_abs)
+        preview = cached_audio_metadata(load_audio_index(out_dir), out_dir, rel_mp3) if rel_mp3 else None
+        if not preview or preview.get("waveform_peaks") is None:
+            preview = analyze_audio_for_preview(final_abs, bar_count=120)
+            if preview and rel_mp3:
+                record_audio_metadata(out_dir, rel_mp3, preview)
         if not preview:
             raise HTTPException(500, "Audio preview analysis failed")
 
@@ -3617,6 +3750,7 @@ def create_app() -> FastAPI:
         job.status = "queued"
         job.cancel_requested = False
         db.commit()
+        clear_cancel(job_id)
 
         def _run() -> None:
             from webapp.tasks_voice_class import run_voice_class_regenerate_segment
@@ -3687,6 +3821,7 @@ def create_app() -> FastAPI:
             pair_index,
         )
         db.commit()
+        clear_cancel(job_id)
 
         try:
             if tasks_use_celery_queue():
@@ -3775,55 +3910,59 @@ def create_app() -> FastAPI:
         db: Session = Depends(get_db),
         after_seq: int = 0,
         limit: int = 500,
+        after_artifact_id: Optional[int] = None,
+        after_artifact_rev: Optional[int] = None,
+        pairs_version: Optional[str] = None,
     ) -> dict:
         job = db.query(Job).filter(Job.id == job_id).one_or_none()
         if not job:
             raise HTTPException(404)
-
-        lines = (
-            db.query(JobLogLine)
-            .filter(JobLogLine.job_id == job_id, JobLogLine.seq > after_seq)
-            .order_by(JobLogLine.seq)
-            .limit(limit)
-            .all()
+        return job_progress_delta(
+            db,
+            job,
+            after_seq=after_seq,
+            limit=limit,
+            after_artifact_id=after_artifact_id,
+            after_artifact_rev=after_artifact_rev,
+            pairs_version=pairs_version,
         )
 
-        pairs = db.query(JobPair).filter(JobPair.job_id == job_id).order_by(JobPair.pair_index).all()
-        arts = db.query(Artifact).filter(Artifact.job_id == job_id).order_by(Artifact.id).all()
-
-        max_seq = db.query(func.max(JobLogLine.seq)).filter(JobLogLine.job_id == job_id).scalar() or 0
+    @app.get("/jobs/{job_id}/llm-summary")
+    def job_llm_summary_api(
+        job_id: str,
+        user: CurrentUser,
+        db: Session = Depends(get_db),
+    ) -> dict:
+        if not db.query(Job.id).filter(Job.id == job_id).scalar():
+            raise HTTPException(404)
+        flush_pending_records()
+        return job_llm_summary(db, job_id)
 
-        return {
-            "job_id": job_id,
-            "job_type": job.type,
-            "status": job.status,
-            "cancel_requested": bool(getattr(job, "cancel_requested", False)),
-            "error_summary": job.error_summary,
-            "log_lines": [{"seq": ln.seq, "line": ln.line, "pair_index": ln.pair_index} for ln in lines],
-            "max_seq": max_seq,
-            "pairs": [
-                {
-                    "pair_index": p.pair_index,
-                    "step1_status": p.step1_status,
-                    "step2_status": p.step2_status,
-                    "step1_error": p.step1_error,
-                    "step2_error": p.step2_error,
-                    "stage_j": p.stage_j_filename,
-                    "word": p.word_filename or "",
-                }
-                for p in pairs
-            ],
-            "artifacts": [
-                {
-                    "id": a.id,
-                    "pair_index": a.pair_index,
-                    "rel_path": a.rel_path,
-                    "role": a.role,
-                    "byte_size": a.byte_size,
-                }
-                for a in arts
-            ],
-        }
+    @app.get("/jobs/{job_id}/events")
+    def job_events(
+        job_id: str,
+        request: Request,
+        user: CurrentUser,
+        db: Session = Depends(get_db),
+        after_seq: int = 0,
+        after_artifact_id: Optional[int] = None,
+        after_artifact_rev: Optional[int] = None,
+        pairs_version: Optional[str] = None,
+    ) -> StreamingResponse:
+        if not db.query(Job.id).filter(Job.id == job_id).scalar():
+            raise HTTPException(404)
+        return StreamingResponse(
+            job_event_stream(
+                job_id,
+                request.is_disconnected,
+                after_seq=after_seq,
+                after_artifact_id=after_artifact_id,
+                after_artifact_rev=after_artifact_rev,
+                pairs_version=pairs_version,
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     @app.get("/artifacts/{artifact_id}/download")
     def download_artifact(
@@ -3837,6 +3976,7 @@ def create_app() -> FastAPI:
         path = os.path.join(job_root(art.job_id), art.rel_path.replace("/", os.sep))
         if not os.path.isfile(path):
             raise HTTPException(404, "File missing on disk")
+        ensure_artifact_hash(db, art, path)
         return FileResponse(path, filename=os.path.basename(path))
 
     @app.get("/artifacts/{artifact_id}/audio")
@@ -7,6 +7,7 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Integer,
     String,
@@ -47,6 +48,8 @@ class Job(Base):
     error_summary = Column(Text, nullable=True)
     config_json = Column(Text, default="{}")
     cancel_requested = Column(Boolean, default=False, nullable=False)
+    # Bumped whenever artifact rows are updated in place; see Artifact.change_seq.
+    artifacts_rev = Column(Integer, default=0, nullable=False)
 
     created_by_user = relationship("User", back_populates="jobs")
     pairs = relationship("JobPair", back_populates="job", cascade="all, delete-orphan")
@@ -82,7 +85,12 @@ class Artifact(Base):
     rel_path = Column(String(2048), nullable=False)
     role = Column(String(64), default="file")
     byte_size = Column(BigInteger, default=0)
+    # Filled in the background after registration (see webapp.artifact_hashing).
     sha256 = Column(String(64), nullable=True)
+    # st_mtime_ns when registered; with byte_size, tells register_artifacts_under what changed.
+    mtime_ns = Column(BigInteger, nullable=True)
+    # Job.artifacts_rev of the last in-place update (None until updated); the job page's delta cursor.
+    change_seq = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     job = relationship("Job", back_populates="artifacts")
@@ -151,3 +159,34 @@ class GeminiTtsApiKey(Base):
     last_used_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+
+class LLMRequestLog(Base):
+    """One LLM provider request (see llm_telemetry.LLMRequestRecord); written by API and workers."""
+
+    __tablename__ = "llm_requests"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ts = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    job_id = Column(String(36), nullable=True, index=True)
+    pair_index = Column(Integer, nullable=True)
+    unit_index = Column(Integer, nullable=True)
+    job_type = Column(String(32), nullable=True)
+    step = Column(String(32), nullable=True)
+    stage = Column(String(64), nullable=False, default="unknown")
+    provider = Column(String(32), nullable=False)
+    model = Column(String(255), nullable=False, default="")
+    outcome = Column(String(16), nullable=False)
+    prompt_chars = Column(Integer, nullable=False, default=0)
+    response_chars = Column(Integer, nullable=False, default=0)
+    max_tokens = Column(Integer, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    total_tokens = Column(Integer, nullable=True)
+    cost = Column(Float, nullable=True)
+    queue_ms = Column(Integer, nullable=True)
+    ttft_ms = Column(Integer, nullable=True)
+    latency_ms = Column(Integer, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0)
+    credit_cap_reductions = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
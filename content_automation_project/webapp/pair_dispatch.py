@@ -0,0 +1,384 @@
+"""
+Per-pair execution for single-stage web jobs (Pre-OCR … JSON to Word).
+
+Each runner in ``webapp.tasks_single_stage`` describes its work for one pair as a
+:class:`SingleStageSpec`. :func:`run_single_stage_job` then either walks the pairs one at a
+time (``pair_concurrency`` 1, the historical behaviour including ``delay_seconds``) or fans
+them out:
+
+* Celery: one ``webapp.run_single_stage_pair`` task per pair; parallelism is the worker
+  pool size (the compose worker uses ``--pool=solo``, so add workers to overlap pairs).
+* ``WEBAPP_RUN_TASKS_INLINE``: a bounded thread pool of ``pair_concurrency`` workers.
+
+Every pair gets its own DB session and LLM client and writes only under its own pair
+directory. There is no Celery result backend, so the chord is emulated in the DB: after a
+pair finishes, :func:`finalize_pair_batch` checks whether every pair of the batch is
+terminal and flips the job out of ``running`` with a conditional UPDATE, so exactly one
+finisher sets the job status and sends the inbox notification.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from webapp.cancel_signal import clear_cancel
+from webapp.database import SessionLocal
+from webapp.inbox import notify_job_crash, notify_step1_finished
+from webapp.job_files import append_log, job_root
+from webapp.job_log_sink import flush_job_logs
+from webapp.job_runner_common import (
+    JobCancelled,
+    _finalize_step1_cancelled,
+    _scalar_cancel_requested,
+)
+from webapp.models import Job, JobPair
+
+logger = logging.getLogger(__name__)
+
+# Server-wide default when a job has no ``pair_concurrency`` in config_json.
+PAIR_CONCURRENCY_ENV = "WEBAPP_PAIR_CONCURRENCY"
+PAIR_CONCURRENCY_MAX = 8
+
+_ACTIVE_PAIR_STATUSES = ("pending", "running")
+
+
+def _load_pairs(db: Session, job_id: str, pair_indices: Optional[List[int]]) -> List[JobPair]:
+    pairs = (
+        db.query(JobPair)
+        .filter(JobPair.job_id == job_id)
+        .order_by(JobPair.pair_index)
+        .all()
+    )
+    if pair_indices is not None:
+        wanted = set(pair_indices)
+        pairs = [p for p in pairs if p.pair_index in wanted]
+    return pairs
+
+
+def pair_concurrency_from_cfg(cfg: dict) -> int:
+    """``pair_concurrency`` from job config, else $WEBAPP_PAIR_CONCURRENCY, else 1 (clamped)."""
+    raw = cfg.get("pair_concurrency")
+    if raw in (None, ""):
+        raw = os.environ.get(PAIR_CONCURRENCY_ENV) or 1
+    try:
+        n = int(raw)
+    except (TypeError, ValueError):
+        n = 1
+    return min(PAIR_CONCURRENCY_MAX, max(1, n))
+
+
+@dataclass
+class PairRun:
+    """Everything one pair needs: its own session, the job config and (for LLM stages) a client."""
+
+    db: Session
+    job_id: str
+    job_type: str
+    cfg: dict
+    pair: JobPair
+    position: int
+    base: str
+    client: Any = None
+    started: bool = field(default=False, init=False)
+
+    def start(self) -> None:
+        """Inputs are valid: mark the pair running (serial runs only pause after started pairs)."""
+        self.pair.step1_status = "running"
+        self.pair.step1_error = None
+        self.db.commit()
+        self.started = True
+
+    def fail(self, error: str, log_line: Optional[str] = None) -> None:
+        self.pair.step1_status = "failed"
+        self.pair.step1_error = error
+        self.db.commit()
+        if log_line:
+            self.log(log_line)
+
+    def log(self, msg: str) -> None:
+        append_log(self.db, self.job_id, msg, self.pair.pair_index)
+
+    def progress(self, msg: str) -> None:
+        self.log(msg)
+        if _scalar_cancel_requested(self.db, self.job_id):
+            raise JobCancelled()
+
+    def cancel_check(self) -> bool:
+        return _scalar_cancel_requested(self.db, self.job_id)
+
+
+@dataclass(frozen=True)
+class SingleStageSpec:
+    """How to run one single-stage job type.
+
+    ``run_pair`` validates inputs (``run.fail`` + return when unusable), calls ``run.start()``,
+    runs the processor and sets ``step1_status``. It may raise :class:`JobCancelled`.
+    """
+
+    label: str
+    start_message: str
+    run_pair: Callable[[PairRun], None]
+    uses_llm: bool = True
+    delay_between_pairs: bool = True
+
+
+def _new_client(spec: SingleStageSpec) -> Any:
+    if not spec.uses_llm:
+        return None
+    from webapp.processor_context import build_unified_api_client
+
+    client, _ssm = build_unified_api_client()
+    return client
+
+
+def _celery_pair_task() -> Optional[Any]:
+    """The Celery per-pair task, or None when pairs run in this process (inline mode, no Celery)."""
+    from webapp.config import RUN_TASKS_INLINE
+
+    if RUN_TASKS_INLINE:
+        return None
+    try:
+        from webapp.celery_tasks import run_single_stage_pair_task
+    except ImportError:
+        return None
+    return run_single_stage_pair_task
+
+
+def run_single_stage_job(job_id: str, pair_indices: Optional[List[int]], spec: SingleStageSpec) -> None:
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if not job:
+            logger.error("Job not found: %s", job_id)
+            return
+
+        cfg = json.loads(job.config_json or "{}")
+        jt = (job.type or "").strip()
+        delay_seconds = float(cfg.get("delay_seconds", 5))
+
+        job.status = "running"
+        if not job.started_at:
+            job.started_at = datetime.utcnow()
+        db.commit()
+        append_log(db, job_id, spec.start_message, None)
+
+        pairs = _load_pairs(db, job_id, pair_indices)
+        if job.cancel_requested:
+            _finalize_step1_cancelled(db, job_id, pairs)
+            return
+
+        concurrency = pair_concurrency_from_cfg(cfg)
+        if concurrency > 1 and len(pairs) > 1:
+            _dispatch_parallel(db, job_id, pairs, spec, concurrency)
+            return
+
+        client = _new_client(spec)
+        base = job_root(job_id)
+
+        for i, pair in enumerate(pairs):
+            if _scalar_cancel_requested(db, job_id):
+                _finalize_step1_cancelled(db, job_id, pairs)
+                return
+
+            run = PairRun(db, job_id, jt, cfg, pair, i, base, client)
+            try:
+                spec.run_pair(run)
+            except JobCancelled:
+                _finalize_step1_cancelled(db, job_id, pairs)
+                return
+
+            db.commit()
+
+            if _scalar_cancel_requested(db, job_id):
+                _finalize_step1_cancelled(db, job_id, pairs)
+                return
+
+            if run.started and spec.delay_between_pairs and i < len(pairs) - 1 and delay_seconds > 0:
+                time.sleep(delay_seconds)
+
+        any_failed = any(p.step1_status == "failed" for p in pairs)
+        if any_failed:
+            job.status = "failed"
+            job.error_summary = "One or more pairs failed"
+        else:
+            job.status = "succeeded"
+            job.error_summary = None
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        append_log(db, job_id, f"--- {spec.label} job finished ---", None)
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if job:
+            notify_step1_finished(db, job, pairs)
+    except Exception as e:
+        logger.exception("run_single_stage_job (%s)", spec.label)
+        try:
+            job = db.query(Job).filter(Job.id == job_id).one_or_none()
+            if job:
+                job.status = "failed"
+                job.error_summary = str(e)
+                job.finished_at = datetime.utcnow()
+                db.commit()
+                notify_job_crash(db, job, spec.label, str(e))
+        except Exception:
+            db.rollback()
+    finally:
+        flush_job_logs(job_id)
+        db.close()
+
+
+def _dispatch_parallel(
+    db: Session,
+    job_id: str,
+    pairs: List[JobPair],
+    spec: SingleStageSpec,
+    concurrency: int,
+) -> None:
+    batch = [p.pair_index for p in pairs]
+    # Reset reruns to pending first: the finalizer waits until no batch pair is pending/running.
+    for p in pairs:
+        p.step1_status = "pending"
+        p.step1_error = None
+    db.commit()
+
+    pair_task = _celery_pair_task()
+    if pair_task is not None:
+        append_log(db, job_id, f"Dispatching {len(batch)} pairs as separate worker tasks.", None)
+        for position, pair_index in enumerate(batch):
+            pair_task.delay(job_id, pair_index, position, batch)
+        return
+
+    append_log(db, job_id, f"Running {len(batch)} pairs, up to {concurrency} at a time.", None)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"pairs-{job_id[:8]}") as pool:
+        futures = [
+            pool.submit(run_pair_isolated, job_id, pair_index, position, batch, spec)
+            for position, pair_index in enumerate(batch)
+        ]
+        for fut in futures:
+            fut.result()
+
+
+def run_pair_isolated(
+    job_id: str,
+    pair_index: int,
+    position: int,
+    batch: List[int],
+    spec: SingleStageSpec,
+) -> None:
+    """Run one pair in its own session, then try to finalize the batch. Never raises."""
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        pair = (
+            db.query(JobPair)
+            .filter(JobPair.job_id == job_id, JobPair.pair_index == pair_index)
+            .one_or_none()
+        )
+        if not job or not pair:
+            logger.error("Job pair not found: %s / %s", job_id, pair_index)
+        elif job.status != "running":
+            logger.info("Job %s is %s; skipping pair %s", job_id, job.status, pair_index)
+        elif _scalar_cancel_requested(db, job_id):
+            pair.step1_status = "failed"
+            pair.step1_error = "Cancelled by user"
+            db.commit()
+        else:
+            cfg = json.loads(job.config_json or "{}")
+            run = PairRun(
+                db,
+                job_id,
+                (job.type or "").strip(),
+                cfg,
+                pair,
+                position,
+                job_root(job_id),
+                _new_client(spec),
+            )
+            try:
+                spec.run_pair(run)
+            except JobCancelled:
+                pair.step1_status = "failed"
+                pair.step1_error = "Cancelled by user"
+            except Exception as e:
+                logger.exception("%s pair %s crashed", spec.label, pair_index)
+                pair.step1_status = "failed"
+                pair.step1_error = str(e)
+                run.log(f"pair {pair_index}: ERROR {e}")
+            if pair.step1_status in _ACTIVE_PAIR_STATUSES:
+                pair.step1_status = "failed"
+                pair.step1_error = pair.step1_error or f"{spec.label} did not finish"
+            db.commit()
+    except Exception:
+        logger.exception("run_pair_isolated %s / %s", job_id, pair_index)
+        db.rollback()
+        try:
+            db.query(JobPair).filter(
+                JobPair.job_id == job_id,
+                JobPair.pair_index == pair_index,
+                JobPair.step1_status.in_(_ACTIVE_PAIR_STATUSES),
+            ).update({"step1_status": "failed", "step1_error": "Pair worker crashed"}, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+    finally:
+        flush_job_logs(job_id)
+        db.close()
+
+    try:
+        finalize_pair_batch(job_id, batch, spec.label)
+    except Exception:
+        logger.exception("finalize_pair_batch %s", job_id)
+
+
+def finalize_pair_batch(job_id: str, batch: List[int], label: str) -> bool:
+    """Chord callback: set the job's final status once every batch pair is terminal.
+
+    Returns True only for the caller that actually finalized the job.
+    """
+    db = SessionLocal()
+    try:
+        pairs = _load_pairs(db, job_id, batch)
+        if any(p.step1_status in _ACTIVE_PAIR_STATUSES for p in pairs):
+            return False
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if not job:
+            return False
+
+        cancelled = bool(job.cancel_requested)
+        values: dict = {"finished_at": datetime.utcnow()}
+        if cancelled:
+            values.update(status="cancelled", error_summary="Stopped by user", cancel_requested=False)
+        elif any(p.step1_status == "failed" for p in pairs):
+            values.update(status="failed", error_summary="One or more pairs failed")
+        else:
+            values.update(status="succeeded", error_summary=None)
+        won = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == "running")
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        if won != 1:
+            return False
+
+        if cancelled:
+            clear_cancel(job_id)
+            append_log(db, job_id, "--- Step 1 stopped by user ---", None)
+            return True
+        append_log(db, job_id, f"--- {label} job finished ---", None)
+        db.expire_all()
+        job = db.query(Job).filter(Job.id == job_id).one_or_none()
+        if job:
+            notify_step1_finished(db, job, pairs)
+        return True
+    finally:
+        flush_job_logs(job_id)
+        db.close()
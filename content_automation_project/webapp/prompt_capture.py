@@ -6,17 +6,22 @@ Writes UTF-8 files under job_root/pair_N/prompts/ and registers artifacts with r
 
 from __future__ import annotations
 
+import json
 import logging
 import os
 import re
 import threading
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from sqlalchemy.orm import Session
 
+from llm_response_cache import CACHE_BYPASS, CACHE_USE, strictest_mode
+from llm_telemetry import request_context
 from unified_api_client import UnifiedAPIClient
 from webapp.database import SessionLocal
 from webapp.job_files import job_root, register_input_artifact
+from webapp.job_log_sink import job_log_sink
+from webapp.models import Job
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +42,7 @@ class PromptCapturingUnifiedClient:
         pair_index: int,
         job_type: str,
         pipeline_step: str,
+        response_cache_mode: Optional[str] = None,
     ):
         self._inner = inner
         self._db = db
@@ -48,24 +54,73 @@ class PromptCapturingUnifiedClient:
         self._seq_lock = threading.Lock()
         self._current_unit_index: Optional[int] = None
         self._current_unit_label: Optional[str] = None
+        # Worker threads running units in parallel set their own unit; others fall back to the shared one.
+        self._thread_unit = threading.local()
+        # LLM response cache: job config "llm_cache_bypass" turns it off for this job.
+        self._response_cache_mode = response_cache_mode or self._job_response_cache_mode()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def _job_response_cache_mode(self) -> str:
+        try:
+            job = self._db.query(Job).filter(Job.id == self._job_id).one_or_none()
+            cfg = json.loads(job.config_json or "{}") if job else {}
+        except Exception:
+            cfg = {}
+        return CACHE_BYPASS if cfg.get("llm_cache_bypass") else CACHE_USE
+
+    def _record_cache_status(self, seq: int) -> None:
+        status_fn = getattr(self._inner, "last_response_cache_status", None)
+        status = status_fn() if callable(status_fn) else None
+        if status not in ("hit", "miss"):
+            return
+        with self._seq_lock:
+            if status == "hit":
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+            hits, misses = self._cache_hits, self._cache_misses
+        if status != "hit":
+            return
+        job_log_sink(self._job_id).write(
+            f"LLM response cache hit for call {seq:04d} ({self._pipeline_step}): hits={hits} misses={misses}",
+            self._pair_index,
+        )
 
     def set_current_unit(self, unit_index: Optional[int], unit_label: Optional[str] = None) -> None:
         with self._seq_lock:
             self._current_unit_index = unit_index
             self._current_unit_label = unit_label
+        self._thread_unit.unit = (unit_index, unit_label)
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self._inner, name)
 
-    def process_text(self, *args: Any, **kwargs: Any) -> Optional[str]:
+    def _next_call(self) -> Tuple[int, Optional[int], Optional[str]]:
         with self._seq_lock:
             self._seq += 1
-            seq = self._seq
-            unit_index = self._current_unit_index
-            unit_label = self._current_unit_label
-        text = kwargs.get("text")
-        if text is None and args:
-            text = args[0]
+            unit_index, unit_label = getattr(
+                self._thread_unit, "unit", (self._current_unit_index, self._current_unit_label)
+            )
+            return self._seq, unit_index, unit_label
+
+    def _telemetry_context(self, unit_index: Optional[int]):
+        return request_context(
+            job_id=self._job_id,
+            pair_index=self._pair_index,
+            unit_index=unit_index,
+            job_type=self._job_type,
+            step=self._pipeline_step,
+        )
+
+    def _write_capture(
+        self,
+        seq: int,
+        unit_index: Optional[int],
+        unit_label: Optional[str],
+        text: Any,
+        kwargs: Dict[str, Any],
+    ) -> None:
         system_prompt = kwargs.get("system_prompt")
         model_name = kwargs.get("model_name")
         temperature = kwargs.get("temperature")
@@ -121,7 +176,29 @@ class PromptCapturingUnifiedClient:
         except Exception as e:
             logger.warning("Failed to save LLM prompt capture: %s", e)
 
-        return self._inner.process_text(*args, **kwargs)
+    def process_text(self, *args: Any, **kwargs: Any) -> Optional[str]:
+        seq, unit_index, unit_label = self._next_call()
+        text = kwargs.get("text")
+        if text is None and args:
+            text = args[0]
+        self._write_capture(seq, unit_index, unit_label, text, kwargs)
+
+        # The job mode (bypass / refresh) wins over a caller's per-attempt "use"
+        kwargs["response_cache"] = strictest_mode(self._response_cache_mode, kwargs.get("response_cache"))
+        with self._telemetry_context(unit_index):
+            result = self._inner.process_text(*args, **kwargs)
+        self._record_cache_status(seq)
+        return result
+
+    def process_text_many(self, requests: Sequence[Dict[str, Any]], **kwargs: Any) -> List[Any]:
+        """Capture every request of the batch (one file each), then delegate to UnifiedAPIClient.process_text_many."""
+        unit_index = None
+        for request in requests:
+            seq, unit_index, unit_label = self._next_call()
+            self._write_capture(seq, unit_index, unit_label, request.get("text"), request)
+        kwargs["response_cache"] = strictest_mode(self._response_cache_mode, kwargs.get("response_cache"))
+        with self._telemetry_context(unit_index):
+            return self._inner.process_text_many(requests, **kwargs)
 
 
 def wrap_prompt_capture(
@@ -131,8 +208,12 @@ def wrap_prompt_capture(
     pair_index: int,
     job_type: str,
     pipeline_step: str,
+    response_cache_mode: Optional[str] = None,
 ) -> PromptCapturingUnifiedClient:
-    """pipeline_step: step1 | step2 (matches artifact role llm_prompt_step1 / llm_prompt_step2)."""
+    """
+    pipeline_step: step1 | step2 (matches artifact role llm_prompt_step1 / llm_prompt_step2).
+    response_cache_mode: override the job's LLM response cache mode ("use" | "refresh" | "bypass").
+    """
     return PromptCapturingUnifiedClient(
-        client, db, job_id, pair_index, job_type, pipeline_step
+        client, db, job_id, pair_index, job_type, pipeline_step, response_cache_mode
     )
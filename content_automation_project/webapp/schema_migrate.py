@@ -19,8 +19,12 @@ def apply_schema_migrations(engine: Engine) -> None:
                 )
             )
             conn.commit()
+        if "artifacts_rev" not in colnames:
+            conn.execute(text("ALTER TABLE jobs ADD COLUMN artifacts_rev INTEGER NOT NULL DEFAULT 0"))
+            conn.commit()
 
     _ensure_gemini_tts_rate_columns(engine)
+    _ensure_artifact_index_columns(engine)
 
     with engine.begin() as conn:
         conn.execute(
@@ -61,3 +65,20 @@ def _ensure_gemini_tts_rate_columns(engine: Engine) -> None:
                 conn.execute(
                     text(f"ALTER TABLE gemini_tts_api_keys ADD COLUMN {col} {typedef}")
                 )
+
+
+def _ensure_artifact_index_columns(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        rows = conn.execute(text("PRAGMA table_info(artifacts)")).fetchall()
+        if not rows:
+            return
+        colnames = {r[1] for r in rows}
+        if "mtime_ns" not in colnames:
+            conn.execute(text("ALTER TABLE artifacts ADD COLUMN mtime_ns BIGINT"))
+        if "change_seq" not in colnames:
+            conn.execute(text("ALTER TABLE artifacts ADD COLUMN change_seq INTEGER"))
+        conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_artifacts_job_rel_path ON artifacts (job_id, rel_path)")
+        )
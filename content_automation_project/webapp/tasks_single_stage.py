@@ -1,5 +1,8 @@
 """
 Pre-OCR, OCR Extraction, and Document Processing job runners (web worker / Celery).
+
+Each job type is a :class:`~webapp.pair_dispatch.SingleStageSpec` whose ``run_pair`` handles
+one pair; ``webapp.pair_dispatch`` runs the pairs serially or in parallel and finalizes the job.
 """
 
 from __future__ import annotations
@@ -8,1375 +11,588 @@ import json
 import logging
 import os
 import tempfile
-import time
-from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy.orm import Session
-
+from journaled_json_writer import recover_journals_under
 from webapp.database import SessionLocal
-from webapp.inbox import notify_job_crash, notify_step1_finished
-from webapp.job_files import append_log, job_root, pair_output, register_artifacts_under
-from webapp.models import Job, JobPair
-from webapp.job_runner_common import (
-    JobCancelled,
-    _cancel_check_session,
-    _finalize_step1_cancelled,
-    _scalar_cancel_requested,
-)
-from webapp.processor_context import build_unified_api_client
+from webapp.job_files import pair_output, register_artifacts_under
+from webapp.job_runner_common import JobCancelled
+from webapp.models import Job
+from webapp.pair_dispatch import PairRun, SingleStageSpec, run_pair_isolated, run_single_stage_job
 from webapp.prompt_capture import wrap_prompt_capture
 from webapp.system_prompt_defaults import resolve_prompt_for_job
 
 logger = logging.getLogger(__name__)
 
 
-def _load_pairs(db: Session, job_id: str, pair_indices: Optional[List[int]]) -> List[JobPair]:
-    pairs = (
-        db.query(JobPair)
-        .filter(JobPair.job_id == job_id)
-        .order_by(JobPair.pair_index)
-        .all()
-    )
-    if pair_indices is not None:
-        wanted = set(pair_indices)
-        pairs = [p for p in pairs if p.pair_index in wanted]
-    return pairs
+def _model_name(cfg: dict) -> str:
+    return (cfg.get("model") or "z-ai/glm-5").strip()
 
 
-def run_pre_ocr_topic_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    from pre_ocr_topic_processor import PreOCRTopicProcessor
+def _chunk_checkpoint_dir(run: PairRun) -> str:
+    """Per-pair directory for resumable LLM chunk results (removed by the processor on success)."""
+    return os.path.join(pair_output(run.job_id, run.pair.pair_index), ".chunk_checkpoints", run.job_type)
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
 
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "pre_ocr_topic").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(
-            db,
-            job_id,
-            "Pre-OCR runner started (PDF → topic JSON per pair).",
-            None,
-        )
+def _pre_ocr_topic_pair(run: PairRun) -> None:
+    from pre_ocr_topic_processor import PreOCRTopicProcessor
 
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
+    pair = run.pair
+    abs_pdf = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    if not pair.stage_j_relpath or not os.path.isfile(abs_pdf):
+        run.fail("No PDF input", f"pair {pair.pair_index}: skipped (no PDF)")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    processor = PreOCRTopicProcessor(
+        wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    )
 
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "pre_ocr_topic").strip()
-        base = job_root(job_id)
-        cancel_check = _cancel_check_session(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            abs_pdf = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            if not pair.stage_j_relpath or not os.path.isfile(abs_pdf):
-                pair.step1_status = "failed"
-                pair.step1_error = "No PDF input"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (no PDF)", pair.pair_index)
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            out_dir = pair_output(job_id, pair.pair_index)
-            processor = PreOCRTopicProcessor(
-                wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
+    try:
+        run.log(f"--- Pre-OCR start pair {pair.pair_index} ---")
+        result = processor.process_pre_ocr_topic(
+            pdf_path=abs_pdf,
+            prompt=prompt,
+            model_name=_model_name(run.cfg),
+            output_dir=out_dir,
+            progress_callback=run.progress,
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            register_artifacts_under(
+                run.db, run.job_id, pair.pair_index, run.base, os.path.relpath(out_dir, run.base)
             )
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
-
-            try:
-                append_log(db, job_id, f"--- Pre-OCR start pair {pair.pair_index} ---", pair.pair_index)
-                try:
-                    result = processor.process_pre_ocr_topic(
-                        pdf_path=abs_pdf,
-                        prompt=prompt,
-                        model_name=model_name,
-                        output_dir=out_dir,
-                        progress_callback=progress,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    register_artifacts_under(
-                        db, job_id, pair.pair_index, base, os.path.relpath(out_dir, base)
-                    )
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Pre-OCR returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Pre-OCR failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("Pre-OCR error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Pre-OCR job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Pre-OCR returned no output"
+            run.log(f"pair {pair.pair_index}: Pre-OCR failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_pre_ocr_topic_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Pre-OCR", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Pre-OCR error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
 
 
-def run_ocr_extraction_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+def _ocr_extraction_pair(run: PairRun) -> None:
     from multi_part_processor import MultiPartProcessor
+    from webapp.unit_repair.ocr_extraction import (
+        hooks_for_pair,
+        page_window_margin_from_cfg,
+        subchapter_units_from_topic,
+    )
 
-    db = SessionLocal()
+    pair = run.pair
+    abs_pdf = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    if not pair.word_relpath:
+        run.fail("No topic JSON paired", f"pair {pair.pair_index}: skipped (no topic JSON)")
+        return
+    abs_topic = os.path.join(run.base, pair.word_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_pdf) or not os.path.isfile(abs_topic):
+        run.fail("Missing PDF or topic JSON on disk")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    subchapter_concurrency = max(1, int(run.cfg.get("subchapter_concurrency") or 1))
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    os.makedirs(out_dir, exist_ok=True)
+    cap = wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+
+    unit_hooks = hooks_for_pair(run.db, run.job_id, pair.pair_index, run.job_type, run.cfg, cap)
     try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
-
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "ocr_extraction").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "OCR Extraction runner started (PDF + topic JSON per pair).", None)
-
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "ocr_extraction").strip()
-        base = job_root(job_id)
-        cancel_check = _cancel_check_session(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            abs_pdf = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            if not pair.word_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "No topic JSON paired"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (no topic JSON)", pair.pair_index)
-                continue
-            abs_topic = os.path.join(base, pair.word_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_pdf) or not os.path.isfile(abs_topic):
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing PDF or topic JSON on disk"
-                db.commit()
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            out_dir = pair_output(job_id, pair.pair_index)
-            os.makedirs(out_dir, exist_ok=True)
-            cap = wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            from webapp.unit_repair.ocr_extraction import hooks_for_pair, subchapter_units_from_topic
-
-            unit_hooks = hooks_for_pair(db, job_id, pair.pair_index, jt, cfg, cap)
-            try:
-                with open(abs_topic, "r", encoding="utf-8") as tf:
-                    topic_items = json.load(tf).get("data") or []
-            except (OSError, json.JSONDecodeError):
-                topic_items = []
-            units = subchapter_units_from_topic(topic_items)
-            if units:
-                unit_hooks.seed_units(units)
+        with open(abs_topic, "r", encoding="utf-8") as tf:
+            topic_items = json.load(tf).get("data") or []
+    except (OSError, json.JSONDecodeError):
+        topic_items = []
+    units = subchapter_units_from_topic(topic_items)
+    if units:
+        unit_hooks.seed_units(units)
 
-            mproc = MultiPartProcessor(cap, output_dir=None)
+    mproc = MultiPartProcessor(cap, output_dir=None)
 
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
-
-            try:
-                append_log(db, job_id, f"--- OCR Extraction start pair {pair.pair_index} ---", pair.pair_index)
-                try:
-                    result = mproc.process_ocr_extraction_with_topics(
-                        pdf_path=abs_pdf,
-                        topic_file_path=abs_topic,
-                        base_prompt=prompt,
-                        model_name=model_name,
-                        progress_callback=progress,
-                        output_dir=out_dir,
-                        unit_hooks=unit_hooks,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(out_dir, base).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "OCR Extraction returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: OCR Extraction failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("OCR Extraction error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- OCR Extraction start pair {pair.pair_index} ---")
+        result = mproc.process_ocr_extraction_with_topics(
+            pdf_path=abs_pdf,
+            topic_file_path=abs_topic,
+            base_prompt=prompt,
+            model_name=_model_name(run.cfg),
+            progress_callback=run.progress,
+            output_dir=out_dir,
+            unit_hooks=unit_hooks,
+            concurrency=subchapter_concurrency,
+            page_window_margin=page_window_margin_from_cfg(run.cfg),
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(out_dir, run.base).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- OCR Extraction job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "OCR Extraction returned no output"
+            run.log(f"pair {pair.pair_index}: OCR Extraction failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_ocr_extraction_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "OCR Extraction", str(e))
-        except Exception:
-            db.rollback()
+        logger.exception("OCR Extraction error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
     finally:
-        db.close()
+        # Cancelled or failed mid-run: rebuild the partial output from its journal
+        recover_journals_under(out_dir, recursive=False)
 
 
-def run_document_processing_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+def _document_processing_pair(run: PairRun) -> None:
     from multi_part_post_processor import MultiPartPostProcessor
+    from webapp.unit_repair.docproc import hooks_for_pair
+
+    pair = run.pair
+    cfg = run.cfg
+    abs_json = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    if not pair.stage_j_relpath or not os.path.isfile(abs_json):
+        run.fail("No OCR JSON input", f"pair {pair.pair_index}: skipped (no JSON)")
+        return
+
+    run.start()
+    user_prompt = resolve_prompt_for_job(run.db, run.job_type, cfg, "prompt")
+    book_id = cfg.get("book_id")
+    chapter_id = cfg.get("chapter_id")
+    start_point_index = int(cfg.get("start_point_index") or 1)
+    if book_id is not None:
+        book_id = int(book_id)
+    if chapter_id is not None:
+        chapter_id = int(chapter_id)
+
+    cap = wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    unit_hooks = hooks_for_pair(run.db, run.job_id, pair.pair_index, run.job_type, cfg, cap)
+    post = MultiPartPostProcessor(cap)
+
+    # The i-th PointId of the uploaded mapping belongs to the i-th pair of this run.
+    pointid_rel = (cfg.get("pointid_mapping_relpath") or "").strip()
+    pointid_full = (
+        os.path.join(run.base, pointid_rel.replace("/", os.sep)) if pointid_rel else ""
+    )
+    all_pointids: List[str] = []
+    if pointid_full and os.path.isfile(pointid_full):
+        all_pointids = post.load_chapter_pointid_mapping(pointid_full)
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
-
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "document_processing").strip()
-        user_prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-        book_id = cfg.get("book_id")
-        chapter_id = cfg.get("chapter_id")
-        start_point_index = int(cfg.get("start_point_index") or 1)
-        if book_id is not None:
-            book_id = int(book_id)
-        if chapter_id is not None:
-            chapter_id = int(chapter_id)
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "Document Processing runner started (OCR JSON → lesson JSON per pair).", None)
-
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "document_processing").strip()
-        base = job_root(job_id)
+    file_pointid_txt: Optional[str] = None
+    if all_pointids and run.position < len(all_pointids):
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix="pid_", suffix=".txt", text=True)
+            with os.fdopen(fd, "w", encoding="utf-8") as tf:
+                tf.write(all_pointids[run.position] + "\n")
+            file_pointid_txt = tmp_path
+        except OSError as e:
+            run.log(f"pair {pair.pair_index}: could not write PointId temp file: {e}")
 
-        pointid_rel = (cfg.get("pointid_mapping_relpath") or "").strip()
-        pointid_full = (
-            os.path.join(base, pointid_rel.replace("/", os.sep)) if pointid_rel else ""
+    try:
+        run.log(f"--- Document Processing start pair {pair.pair_index} ---")
+        final_output_path = post.process_document_processing_from_ocr_json(
+            ocr_json_path=abs_json,
+            user_prompt=user_prompt,
+            model_name=_model_name(cfg),
+            book_id=book_id,
+            chapter_id=chapter_id,
+            start_point_index=start_point_index,
+            pointid_mapping_txt=file_pointid_txt,
+            progress_callback=run.progress,
+            unit_hooks=unit_hooks,
+            assign_pointids=True,
         )
-        all_pointids: List[str] = []
-        if pointid_full and os.path.isfile(pointid_full):
-            all_pointids = post.load_chapter_pointid_mapping(pointid_full)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            abs_json = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            if not pair.stage_j_relpath or not os.path.isfile(abs_json):
-                pair.step1_status = "failed"
-                pair.step1_error = "No OCR JSON input"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (no JSON)", pair.pair_index)
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            cap = wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            from webapp.unit_repair.docproc import hooks_for_pair
-
-            unit_hooks = hooks_for_pair(db, job_id, pair.pair_index, jt, cfg, cap)
-            post = MultiPartPostProcessor(cap)
-
-            file_pointid_txt: Optional[str] = None
-            if all_pointids and i < len(all_pointids):
-                try:
-                    fd, tmp_path = tempfile.mkstemp(prefix="pid_", suffix=".txt", text=True)
-                    with os.fdopen(fd, "w", encoding="utf-8") as tf:
-                        tf.write(all_pointids[i] + "\n")
-                    file_pointid_txt = tmp_path
-                except OSError as e:
-                    append_log(
-                        db,
-                        job_id,
-                        f"pair {pair.pair_index}: could not write PointId temp file: {e}",
-                        pair.pair_index,
-                    )
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
-
-            final_output_path: Optional[str] = None
-            try:
-                append_log(db, job_id, f"--- Document Processing start pair {pair.pair_index} ---", pair.pair_index)
-                final_output_path = post.process_document_processing_from_ocr_json(
-                    ocr_json_path=abs_json,
-                    user_prompt=user_prompt,
-                    model_name=model_name,
-                    book_id=book_id,
-                    chapter_id=chapter_id,
-                    start_point_index=start_point_index,
-                    pointid_mapping_txt=file_pointid_txt,
-                    progress_callback=progress,
-                    unit_hooks=unit_hooks,
-                    assign_pointids=True,
-                )
-            except JobCancelled:
-                if file_pointid_txt and os.path.isfile(file_pointid_txt):
-                    try:
-                        os.remove(file_pointid_txt)
-                    except OSError:
-                        pass
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-            except Exception as e:
-                logger.exception("Document Processing error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-            else:
-                if final_output_path and os.path.isfile(final_output_path):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(
-                        os.path.dirname(os.path.abspath(final_output_path)),
-                        base,
-                    ).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Document Processing returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: failed", pair.pair_index)
-            finally:
-                if file_pointid_txt and os.path.isfile(file_pointid_txt):
-                    try:
-                        os.remove(file_pointid_txt)
-                    except OSError:
-                        pass
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
-        else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Document Processing job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_document_processing_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Document Processing", str(e))
-        except Exception:
-            db.rollback()
+        logger.exception("Document Processing error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
+    else:
+        if final_output_path and os.path.isfile(final_output_path):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(
+                os.path.dirname(os.path.abspath(final_output_path)),
+                run.base,
+            ).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
+        else:
+            pair.step1_status = "failed"
+            pair.step1_error = "Document Processing returned no output"
+            run.log(f"pair {pair.pair_index}: failed")
     finally:
-        db.close()
+        recover_journals_under(os.path.dirname(abs_json), recursive=False)
+        if file_pointid_txt and os.path.isfile(file_pointid_txt):
+            try:
+                os.remove(file_pointid_txt)
+            except OSError:
+                pass
 
 
-def run_image_notes_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Stage E: document processing (Stage 4) JSON + OCR extraction JSON → image notes JSON (writes beside inputs)."""
+def _image_notes_pair(run: PairRun) -> None:
     from stage_e_processor import StageEProcessor
+    from webapp.unit_repair.image_notes import hooks_for_pair, topic_unit_map, topic_units_from_points
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
-
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "image_notes").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "Image Notes runner started (document processing / Stage 4 JSON + OCR extraction JSON per pair).", None)
-
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "image_notes").strip()
-        base = job_root(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if not pair.stage_j_relpath or not pair.word_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing document processing (Stage 4) or OCR extraction JSON path"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (incomplete pair)", pair.pair_index)
-                continue
-
-            abs_stage4 = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            abs_ocr = os.path.join(base, pair.word_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_stage4) or not os.path.isfile(abs_ocr):
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing document processing (Stage 4) or OCR JSON on disk"
-                db.commit()
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            cap = wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            from webapp.unit_repair.image_notes import hooks_for_pair, topic_unit_map, topic_units_from_points
-
-            unit_hooks = hooks_for_pair(db, job_id, pair.pair_index, jt, cfg, cap)
-            processor = StageEProcessor(cap)
-            stage4_data = processor.load_json_file(abs_stage4)
-            stage4_points = processor.get_data_from_json(stage4_data) if stage4_data else []
-            units = topic_units_from_points(stage4_points or [])
-            if units:
-                unit_hooks.seed_units(units)
-            tmap = topic_unit_map(units)
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
+    pair = run.pair
+    if not pair.stage_j_relpath or not pair.word_relpath:
+        run.fail(
+            "Missing document processing (Stage 4) or OCR extraction JSON path",
+            f"pair {pair.pair_index}: skipped (incomplete pair)",
+        )
+        return
+
+    abs_stage4 = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    abs_ocr = os.path.join(run.base, pair.word_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_stage4) or not os.path.isfile(abs_ocr):
+        run.fail("Missing document processing (Stage 4) or OCR JSON on disk")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    cap = wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    unit_hooks = hooks_for_pair(run.db, run.job_id, pair.pair_index, run.job_type, run.cfg, cap)
+    processor = StageEProcessor(cap)
+    stage4_data = processor.load_json_file(abs_stage4)
+    stage4_points = processor.get_data_from_json(stage4_data) if stage4_data else []
+    units = topic_units_from_points(stage4_points or [])
+    if units:
+        unit_hooks.seed_units(units)
+    tmap = topic_unit_map(units)
 
-            try:
-                append_log(db, job_id, f"--- Image Notes (Stage E) start pair {pair.pair_index} ---", pair.pair_index)
-                try:
-                    result = processor.process_stage_e(
-                        stage4_path=abs_stage4,
-                        ocr_extraction_json_path=abs_ocr,
-                        prompt=prompt,
-                        model_name=model_name,
-                        output_dir=None,
-                        progress_callback=progress,
-                        unit_hooks=unit_hooks,
-                        topic_unit_map=tmap,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_inputs = f"pair_{pair.pair_index}/inputs"
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_inputs)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Image Notes returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Image Notes failed", pair.pair_index)
-                    if hasattr(unit_hooks, "finalize_stale_units"):
-                        unit_hooks.finalize_stale_units("failed")
-            except Exception as e:
-                logger.exception("Image Notes error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-                if hasattr(unit_hooks, "finalize_stale_units"):
-                    unit_hooks.finalize_stale_units("failed")
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- Image Notes (Stage E) start pair {pair.pair_index} ---")
+        result = processor.process_stage_e(
+            stage4_path=abs_stage4,
+            ocr_extraction_json_path=abs_ocr,
+            prompt=prompt,
+            model_name=_model_name(run.cfg),
+            output_dir=None,
+            progress_callback=run.progress,
+            unit_hooks=unit_hooks,
+            topic_unit_map=tmap,
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_inputs = f"pair_{pair.pair_index}/inputs"
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_inputs)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Image Notes job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Image Notes returned no output"
+            run.log(f"pair {pair.pair_index}: Image Notes failed")
+            if hasattr(unit_hooks, "finalize_stale_units"):
+                unit_hooks.finalize_stale_units("failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_image_notes_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Image Notes", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Image Notes error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
+        if hasattr(unit_hooks, "finalize_stale_units"):
+            unit_hooks.finalize_stale_units("failed")
 
 
-def run_table_notes_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Stage TA: image notes (Stage E) JSON + OCR extraction JSON → table notes JSON (writes beside inputs)."""
+def _table_notes_pair(run: PairRun) -> None:
     from stage_ta_processor import StageTAProcessor
+    from webapp.unit_repair.table_notes import hooks_for_pair, topic_unit_map, topic_units_from_points
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
-
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "table_notes").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "Table Notes runner started (image notes / Stage E JSON + OCR extraction JSON per pair).", None)
-
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "table_notes").strip()
-        base = job_root(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if not pair.stage_j_relpath or not pair.word_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing image notes (Stage E) or OCR extraction JSON path"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (incomplete pair)", pair.pair_index)
-                continue
-
-            abs_stage_e = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            abs_ocr = os.path.join(base, pair.word_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_stage_e) or not os.path.isfile(abs_ocr):
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing image notes (Stage E) or OCR JSON on disk"
-                db.commit()
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            cap = wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            from webapp.unit_repair.table_notes import hooks_for_pair, topic_unit_map, topic_units_from_points
-
-            unit_hooks = hooks_for_pair(db, job_id, pair.pair_index, jt, cfg, cap)
-            processor = StageTAProcessor(cap)
-            stage_e_data = processor.load_json_file(abs_stage_e)
-            e_points = processor.get_data_from_json(stage_e_data) if stage_e_data else []
-            units = topic_units_from_points(e_points or [])
-            if units:
-                unit_hooks.seed_units(units)
-            tmap = topic_unit_map(units)
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
+    pair = run.pair
+    if not pair.stage_j_relpath or not pair.word_relpath:
+        run.fail(
+            "Missing image notes (Stage E) or OCR extraction JSON path",
+            f"pair {pair.pair_index}: skipped (incomplete pair)",
+        )
+        return
+
+    abs_stage_e = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    abs_ocr = os.path.join(run.base, pair.word_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_stage_e) or not os.path.isfile(abs_ocr):
+        run.fail("Missing image notes (Stage E) or OCR JSON on disk")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    cap = wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    unit_hooks = hooks_for_pair(run.db, run.job_id, pair.pair_index, run.job_type, run.cfg, cap)
+    processor = StageTAProcessor(cap)
+    stage_e_data = processor.load_json_file(abs_stage_e)
+    e_points = processor.get_data_from_json(stage_e_data) if stage_e_data else []
+    units = topic_units_from_points(e_points or [])
+    if units:
+        unit_hooks.seed_units(units)
+    tmap = topic_unit_map(units)
 
-            try:
-                append_log(db, job_id, f"--- Table Notes (Stage TA) start pair {pair.pair_index} ---", pair.pair_index)
-                try:
-                    result = processor.process_stage_ta(
-                        stage_e_path=abs_stage_e,
-                        ocr_extraction_json_path=abs_ocr,
-                        prompt=prompt,
-                        model_name=model_name,
-                        output_dir=None,
-                        progress_callback=progress,
-                        unit_hooks=unit_hooks,
-                        topic_unit_map=tmap,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_inputs = f"pair_{pair.pair_index}/inputs"
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_inputs)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Table Notes returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Table Notes failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("Table Notes error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- Table Notes (Stage TA) start pair {pair.pair_index} ---")
+        result = processor.process_stage_ta(
+            stage_e_path=abs_stage_e,
+            ocr_extraction_json_path=abs_ocr,
+            prompt=prompt,
+            model_name=_model_name(run.cfg),
+            output_dir=None,
+            progress_callback=run.progress,
+            unit_hooks=unit_hooks,
+            topic_unit_map=tmap,
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_inputs = f"pair_{pair.pair_index}/inputs"
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_inputs)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Table Notes job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Table Notes returned no output"
+            run.log(f"pair {pair.pair_index}: Table Notes failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_table_notes_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Table Notes", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Table Notes error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
 
 
-def run_importance_type_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Web Stage J: TA merged JSON + tablepic + filepic + Step 1 combined → a*.json (parallel chunk LLM calls)."""
+def _importance_type_pair(run: PairRun) -> None:
     from stage_j_processor import StageJProcessor
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
+    pair = run.pair
+    pm = (run.cfg.get("pair_media") or {}).get(str(pair.pair_index), {})
+    rel_tp = (pm.get("tablepic_relpath") or "").strip()
+    rel_fp = (pm.get("filepic_relpath") or "").strip()
 
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "importance_type").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(
-            db,
-            job_id,
-            "Importance & Type runner started (TA merged + tablepic + filepic + Step 1 combined per pair).",
-            None,
+    if not pair.stage_j_relpath or not pair.word_relpath or not rel_tp or not rel_fp:
+        run.fail(
+            "Missing TA merged JSON, Step 1 combined, tablepic, or filepic path",
+            f"pair {pair.pair_index}: skipped (incomplete pair)",
         )
+        return
+
+    abs_ta = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    abs_s1 = os.path.join(run.base, pair.word_relpath.replace("/", os.sep))
+    abs_tp = os.path.join(run.base, rel_tp.replace("/", os.sep))
+    abs_fp = os.path.join(run.base, rel_fp.replace("/", os.sep))
+    if not os.path.isfile(abs_ta) or not os.path.isfile(abs_s1) or not os.path.isfile(abs_tp) or not os.path.isfile(abs_fp):
+        run.fail("Missing input JSON on disk", f"pair {pair.pair_index}: input file missing on disk")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    processor = StageJProcessor(
+        wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    )
 
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "importance_type").strip()
-        base = job_root(job_id)
-        cancel_check = _cancel_check_session(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            pm = (cfg.get("pair_media") or {}).get(str(pair.pair_index), {})
-            rel_tp = (pm.get("tablepic_relpath") or "").strip()
-            rel_fp = (pm.get("filepic_relpath") or "").strip()
-
-            if not pair.stage_j_relpath or not pair.word_relpath or not rel_tp or not rel_fp:
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing TA merged JSON, Step 1 combined, tablepic, or filepic path"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (incomplete pair)", pair.pair_index)
-                continue
-
-            abs_ta = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            abs_s1 = os.path.join(base, pair.word_relpath.replace("/", os.sep))
-            abs_tp = os.path.join(base, rel_tp.replace("/", os.sep))
-            abs_fp = os.path.join(base, rel_fp.replace("/", os.sep))
-            if not os.path.isfile(abs_ta) or not os.path.isfile(abs_s1) or not os.path.isfile(abs_tp) or not os.path.isfile(abs_fp):
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing input JSON on disk"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: input file missing on disk", pair.pair_index)
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            processor = StageJProcessor(
-                wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            )
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
-
-            try:
-                append_log(
-                    db,
-                    job_id,
-                    f"--- Importance & Type (Stage J web) start pair {pair.pair_index} ---",
-                    pair.pair_index,
-                )
-                try:
-                    result = processor.process_stage_j_web_four_json(
-                        ta_json_path=abs_ta,
-                        tablepic_json_path=abs_tp,
-                        filepic_json_path=abs_fp,
-                        step1_combined_path=abs_s1,
-                        prompt=prompt,
-                        model_name=model_name,
-                        output_dir=os.path.dirname(abs_ta),
-                        progress_callback=progress,
-                        cancel_check=cancel_check,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_inputs = f"pair_{pair.pair_index}/inputs"
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_inputs)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Importance & Type returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Importance & Type failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("Importance & Type error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- Importance & Type (Stage J web) start pair {pair.pair_index} ---")
+        result = processor.process_stage_j_web_four_json(
+            ta_json_path=abs_ta,
+            tablepic_json_path=abs_tp,
+            filepic_json_path=abs_fp,
+            step1_combined_path=abs_s1,
+            prompt=prompt,
+            model_name=_model_name(run.cfg),
+            output_dir=os.path.dirname(abs_ta),
+            progress_callback=run.progress,
+            cancel_check=run.cancel_check,
+            checkpoint_dir=_chunk_checkpoint_dir(run),
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_inputs = f"pair_{pair.pair_index}/inputs"
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_inputs)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Importance & Type job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Importance & Type returned no output"
+            run.log(f"pair {pair.pair_index}: Importance & Type failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_importance_type_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Importance & Type", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Importance & Type error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
 
 
-def run_flashcard_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Web Stage H: tagged a*.json + image catalog f*.json → ac*.json (parallel chunk LLM calls)."""
+def _flashcard_pair(run: PairRun) -> None:
     from stage_h_processor import StageHProcessor
+    from webapp.unit_repair.flashcard import hooks_for_pair, topic_units_from_points
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
-
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "flashcard").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        model_name = (cfg.get("model") or "z-ai/glm-5").strip()
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(
-            db,
-            job_id,
-            "Flashcard Generation runner started (tagged JSON + image catalog per pair).",
-            None,
+    pair = run.pair
+    if not pair.stage_j_relpath or not pair.word_relpath:
+        run.fail(
+            "Missing tagged JSON or image catalog path",
+            f"pair {pair.pair_index}: skipped (incomplete pair)",
         )
+        return
+
+    abs_tagged = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    abs_catalog = os.path.join(run.base, pair.word_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_tagged) or not os.path.isfile(abs_catalog):
+        run.fail("Missing input JSON on disk", f"pair {pair.pair_index}: input file missing on disk")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    os.makedirs(out_dir, exist_ok=True)
+
+    cap = wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    unit_hooks = hooks_for_pair(run.db, run.job_id, pair.pair_index, run.job_type, run.cfg, cap)
+    processor = StageHProcessor(cap)
+    tagged_data = processor.load_json_file(abs_tagged)
+    tagged_rows = processor.get_data_from_json(tagged_data) if tagged_data else []
+    units = topic_units_from_points(tagged_rows or [])
+    if units:
+        unit_hooks.seed_units(units)
 
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "flashcard").strip()
-        base = job_root(job_id)
-        cancel_check = _cancel_check_session(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if not pair.stage_j_relpath or not pair.word_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing tagged JSON or image catalog path"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (incomplete pair)", pair.pair_index)
-                continue
-
-            abs_tagged = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            abs_catalog = os.path.join(base, pair.word_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_tagged) or not os.path.isfile(abs_catalog):
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing input JSON on disk"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: input file missing on disk", pair.pair_index)
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            out_dir = pair_output(job_id, pair.pair_index)
-            os.makedirs(out_dir, exist_ok=True)
-
-            cap = wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            from webapp.unit_repair.flashcard import hooks_for_pair, topic_units_from_points
-
-            unit_hooks = hooks_for_pair(db, job_id, pair.pair_index, jt, cfg, cap)
-            processor = StageHProcessor(cap)
-            tagged_data = processor.load_json_file(abs_tagged)
-            tagged_rows = processor.get_data_from_json(tagged_data) if tagged_data else []
-            units = topic_units_from_points(tagged_rows or [])
-            if units:
-                unit_hooks.seed_units(units)
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
-
-            try:
-                append_log(
-                    db,
-                    job_id,
-                    f"--- Flashcard Generation (Stage H web) start pair {pair.pair_index} ---",
-                    pair.pair_index,
-                )
-                try:
-                    result = processor.process_stage_h_web_two_json(
-                        tagged_json_path=abs_tagged,
-                        catalog_json_path=abs_catalog,
-                        prompt=prompt,
-                        model_name=model_name,
-                        output_dir=out_dir,
-                        progress_callback=progress,
-                        cancel_check=cancel_check,
-                        unit_hooks=unit_hooks,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(out_dir, base).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Flashcard Generation returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Flashcard Generation failed", pair.pair_index)
-                    if hasattr(unit_hooks, "finalize_stale_units"):
-                        unit_hooks.finalize_stale_units("failed")
-            except Exception as e:
-                logger.exception("Flashcard Generation error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-                if hasattr(unit_hooks, "finalize_stale_units"):
-                    unit_hooks.finalize_stale_units("failed")
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- Flashcard Generation (Stage H web) start pair {pair.pair_index} ---")
+        result = processor.process_stage_h_web_two_json(
+            tagged_json_path=abs_tagged,
+            catalog_json_path=abs_catalog,
+            prompt=prompt,
+            model_name=_model_name(run.cfg),
+            output_dir=out_dir,
+            progress_callback=run.progress,
+            cancel_check=run.cancel_check,
+            unit_hooks=unit_hooks,
+            checkpoint_dir=_chunk_checkpoint_dir(run),
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(out_dir, run.base).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Flashcard Generation job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Flashcard Generation returned no output"
+            run.log(f"pair {pair.pair_index}: Flashcard Generation failed")
+            if hasattr(unit_hooks, "finalize_stale_units"):
+                unit_hooks.finalize_stale_units("failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_flashcard_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Flashcard Generation", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Flashcard Generation error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
+        if hasattr(unit_hooks, "finalize_stale_units"):
+            unit_hooks.finalize_stale_units("failed")
 
 
-def run_chapter_summary_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Web Stage L: Importance & Type a*.json + Test Bank 1 step1_combined → o*.json (chapter_name + summary)."""
+def _chapter_summary_pair(run: PairRun) -> None:
     from stage_l_processor import StageLProcessor
+    from webapp.config import DEFAULT_TEST_BANK_MODEL, normalize_test_bank_model
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
-
-        cfg = json.loads(job.config_json or "{}")
-        jt = (job.type or "chapter_summary").strip()
-        prompt = resolve_prompt_for_job(db, jt, cfg, "prompt")
-        from webapp.config import DEFAULT_TEST_BANK_MODEL, normalize_test_bank_model
-
-        model_name = normalize_test_bank_model(cfg.get("model_1"), DEFAULT_TEST_BANK_MODEL)
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(
-            db,
-            job_id,
-            "Chapter Summary runner started (Importance & Type + Test Bank 1 combined per pair).",
-            None,
+    pair = run.pair
+    if not pair.stage_j_relpath or not pair.word_relpath:
+        run.fail(
+            "Missing Importance & Type or Test Bank 1 combined path",
+            f"pair {pair.pair_index}: skipped (incomplete pair)",
         )
+        return
+
+    abs_tagged = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    abs_step1 = os.path.join(run.base, pair.word_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_tagged) or not os.path.isfile(abs_step1):
+        run.fail("Missing input JSON on disk", f"pair {pair.pair_index}: input file missing on disk")
+        return
+
+    run.start()
+    prompt = resolve_prompt_for_job(run.db, run.job_type, run.cfg, "prompt")
+    model_name = normalize_test_bank_model(run.cfg.get("model_1"), DEFAULT_TEST_BANK_MODEL)
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    os.makedirs(out_dir, exist_ok=True)
+
+    processor = StageLProcessor(
+        wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    )
 
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
-
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "chapter_summary").strip()
-        base = job_root(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if not pair.stage_j_relpath or not pair.word_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing Importance & Type or Test Bank 1 combined path"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (incomplete pair)", pair.pair_index)
-                continue
-
-            abs_tagged = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            abs_step1 = os.path.join(base, pair.word_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_tagged) or not os.path.isfile(abs_step1):
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing input JSON on disk"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: input file missing on disk", pair.pair_index)
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            out_dir = pair_output(job_id, pair.pair_index)
-            os.makedirs(out_dir, exist_ok=True)
-
-            processor = StageLProcessor(
-                wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            )
-
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
-
-            try:
-                append_log(
-                    db,
-                    job_id,
-                    f"--- Chapter Summary (Stage L) start pair {pair.pair_index} ---",
-                    pair.pair_index,
-                )
-                try:
-                    result = processor.process_stage_l_web_chapter_summary(
-                        importance_type_path=abs_tagged,
-                        step1_combined_path=abs_step1,
-                        prompt=prompt,
-                        model_name=model_name,
-                        output_dir=out_dir,
-                        progress_callback=progress,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(out_dir, base).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Chapter Summary returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Chapter Summary failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("Chapter Summary error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- Chapter Summary (Stage L) start pair {pair.pair_index} ---")
+        result = processor.process_stage_l_web_chapter_summary(
+            importance_type_path=abs_tagged,
+            step1_combined_path=abs_step1,
+            prompt=prompt,
+            model_name=model_name,
+            output_dir=out_dir,
+            progress_callback=run.progress,
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(out_dir, run.base).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Chapter Summary job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Chapter Summary returned no output"
+            run.log(f"pair {pair.pair_index}: Chapter Summary failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_chapter_summary_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Chapter Summary", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Chapter Summary error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
 
 
-def run_image_file_catalog_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Stage F: Table notes (TA merged) + filepic + tablepic → catalog JSON f_*.json."""
+def _image_file_catalog_pair(run: PairRun) -> None:
     from stage_f_processor import StageFProcessor
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
+    pair = run.pair
+    pm = (run.cfg.get("pair_media") or {}).get(str(pair.pair_index), {})
+    rel_fp = (pm.get("filepic_relpath") or "").strip()
+    rel_tp = (pm.get("tablepic_relpath") or "").strip()
 
-        cfg = json.loads(job.config_json or "{}")
-        delay_seconds = float(cfg.get("delay_seconds", 5))
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(
-            db,
-            job_id,
-            "Image File Catalog runner started (Table notes / TA merged + filepic + tablepic → f_*.json per pair).",
-            None,
+    if not pair.stage_j_relpath or not rel_fp or not rel_tp:
+        run.fail(
+            "Missing Table notes JSON, filepic, or tablepic path",
+            f"pair {pair.pair_index}: skipped (incomplete pair)",
         )
+        return
 
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
+    abs_notes = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    abs_filepic = os.path.join(run.base, rel_fp.replace("/", os.sep))
+    abs_tablepic = os.path.join(run.base, rel_tp.replace("/", os.sep))
+    if not os.path.isfile(abs_notes) or not os.path.isfile(abs_filepic) or not os.path.isfile(abs_tablepic):
+        run.fail("Table notes, filepic, or tablepic JSON missing on disk")
+        return
 
-        client, _ssm = build_unified_api_client()
-        jt = (job.type or "image_file_catalog").strip()
-        base = job_root(job_id)
-
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            pm = (cfg.get("pair_media") or {}).get(str(pair.pair_index), {})
-            rel_fp = (pm.get("filepic_relpath") or "").strip()
-            rel_tp = (pm.get("tablepic_relpath") or "").strip()
-
-            if not pair.stage_j_relpath or not rel_fp or not rel_tp:
-                pair.step1_status = "failed"
-                pair.step1_error = "Missing Table notes JSON, filepic, or tablepic path"
-                db.commit()
-                append_log(db, job_id, f"pair {pair.pair_index}: skipped (incomplete pair)", pair.pair_index)
-                continue
-
-            abs_notes = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            abs_filepic = os.path.join(base, rel_fp.replace("/", os.sep))
-            abs_tablepic = os.path.join(base, rel_tp.replace("/", os.sep))
-            if not os.path.isfile(abs_notes) or not os.path.isfile(abs_filepic) or not os.path.isfile(abs_tablepic):
-                pair.step1_status = "failed"
-                pair.step1_error = "Table notes, filepic, or tablepic JSON missing on disk"
-                db.commit()
-                continue
-
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
-
-            out_dir = pair_output(job_id, pair.pair_index)
-            os.makedirs(out_dir, exist_ok=True)
-
-            processor = StageFProcessor(
-                wrap_prompt_capture(client, db, job_id, pair.pair_index, jt, "step1")
-            )
+    run.start()
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    os.makedirs(out_dir, exist_ok=True)
 
-            def progress(msg: str) -> None:
-                append_log(db, job_id, msg, pair.pair_index)
-                if _scalar_cancel_requested(db, job_id):
-                    raise JobCancelled()
+    processor = StageFProcessor(
+        wrap_prompt_capture(run.client, run.db, run.job_id, pair.pair_index, run.job_type, "step1")
+    )
 
-            try:
-                append_log(db, job_id, f"--- Image File Catalog (Stage F) start pair {pair.pair_index} ---", pair.pair_index)
-                try:
-                    result = processor.process_stage_f(
-                        stage_e_path=abs_notes,
-                        output_dir=out_dir,
-                        progress_callback=progress,
-                        filepic_json_path=abs_filepic,
-                        tablepic_json_path=abs_tablepic,
-                    )
-                except JobCancelled:
-                    _finalize_step1_cancelled(db, job_id, pairs)
-                    return
-                if result and os.path.isfile(result):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(out_dir, base).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Image File Catalog returned no output"
-                    append_log(db, job_id, f"pair {pair.pair_index}: Stage F failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("Image File Catalog error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-            if i < len(pairs) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+    try:
+        run.log(f"--- Image File Catalog (Stage F) start pair {pair.pair_index} ---")
+        result = processor.process_stage_f(
+            stage_e_path=abs_notes,
+            output_dir=out_dir,
+            progress_callback=run.progress,
+            filepic_json_path=abs_filepic,
+            tablepic_json_path=abs_tablepic,
+        )
+        if result and os.path.isfile(result):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(out_dir, run.base).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, "--- Image File Catalog job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Image File Catalog returned no output"
+            run.log(f"pair {pair.pair_index}: Stage F failed")
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.exception("run_image_file_catalog_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                notify_job_crash(db, job, "Image File Catalog", str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
+        logger.exception("Image File Catalog error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
 
-def run_json_to_csv_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Convert uploaded JSON files to CSV (no LLM). Only flashcard_json_to_csv adds five empty trailing columns."""
+
+def _json_to_csv_pair(run: PairRun) -> None:
     from json_to_csv_converter import convert_json_file_to_csv
     from webapp.json_to_csv_jobs import (
         JSON_TO_CSV_JOB_LABELS,
@@ -1384,270 +600,251 @@ def run_json_to_csv_step1_job(job_id: str, pair_indices: Optional[List[int]] = N
         json_to_csv_uses_flashcard_trailing_columns,
     )
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
+    pair = run.pair
+    if not pair.stage_j_relpath:
+        run.fail("No JSON input")
+        return
+
+    abs_json = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_json):
+        run.fail("JSON file missing on disk")
+        return
+
+    run.start()
+    delimiter = (run.cfg.get("delimiter") or ",").strip() or ","
+    flashcard_cols = json_to_csv_uses_flashcard_trailing_columns(run.job_type)
+    conv_mode = conversion_mode_for_job_type(run.job_type)
+    stage_label = JSON_TO_CSV_JOB_LABELS.get(run.job_type, "JSON to CSV")
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    os.makedirs(out_dir, exist_ok=True)
+
+    json_basename = os.path.basename(abs_json)
+    stem = os.path.splitext(json_basename)[0]
+    csv_name = f"{stem}.csv"
+    csv_path = os.path.join(out_dir, csv_name)
 
-        jt = (job.type or "").strip()
-        cfg = json.loads(job.config_json or "{}")
-        delimiter = (cfg.get("delimiter") or ",").strip() or ","
-        flashcard_cols = json_to_csv_uses_flashcard_trailing_columns(jt)
-        conv_mode = conversion_mode_for_job_type(jt)
-        stage_label = JSON_TO_CSV_JOB_LABELS.get(jt, "JSON to CSV")
-
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, f"{stage_label} runner started.", None)
-
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
+    try:
+        run.log(f"--- {stage_label} start pair {pair.pair_index}: {json_basename} ---")
+        ok = convert_json_file_to_csv(
+            abs_json,
+            csv_path,
+            delimiter=delimiter,
+            flashcard_trailing_columns=flashcard_cols,
+            conversion_mode=conv_mode,
+        )
+        if ok and os.path.isfile(csv_path):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(out_dir, run.base).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
+            run.log(
+                f"pair {pair.pair_index}: {json_basename} → {csv_name} (flashcard import columns: {'yes' if flashcard_cols else 'no'})"
+            )
+        else:
+            pair.step1_status = "failed"
+            pair.step1_error = "Conversion failed or produced no rows"
+            run.log(f"pair {pair.pair_index}: conversion failed")
+    except Exception as e:
+        logger.exception("JSON to CSV error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
 
-        base = job_root(job_id)
 
-        for i, pair in enumerate(pairs):
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
+def _json_to_word_pair(run: PairRun) -> None:
+    from json_to_word_converter import (
+        TableNotesJsonError,
+        convert_points_to_docx,
+        validate_table_notes_json,
+    )
+    from webapp.json_to_word_jobs import JSON_TO_WORD_JOB_LABELS
 
-            if not pair.stage_j_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "No JSON input"
-                db.commit()
-                continue
+    pair = run.pair
+    if not pair.stage_j_relpath:
+        run.fail("No JSON input")
+        return
 
-            abs_json = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_json):
-                pair.step1_status = "failed"
-                pair.step1_error = "JSON file missing on disk"
-                db.commit()
-                continue
+    abs_json = os.path.join(run.base, pair.stage_j_relpath.replace("/", os.sep))
+    if not os.path.isfile(abs_json):
+        run.fail("JSON file missing on disk")
+        return
 
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
+    run.start()
+    stage_label = JSON_TO_WORD_JOB_LABELS.get(run.job_type, "JSON to Word")
+    out_dir = pair_output(run.job_id, pair.pair_index)
+    os.makedirs(out_dir, exist_ok=True)
 
-            out_dir = pair_output(job_id, pair.pair_index)
-            os.makedirs(out_dir, exist_ok=True)
+    json_basename = os.path.basename(abs_json)
+    stem = os.path.splitext(json_basename)[0]
+    docx_name = f"{stem}.docx"
+    docx_path = os.path.join(out_dir, docx_name)
 
-            json_basename = os.path.basename(abs_json)
-            stem = os.path.splitext(json_basename)[0]
-            csv_name = f"{stem}.csv"
-            csv_path = os.path.join(out_dir, csv_name)
+    try:
+        run.log(f"--- {stage_label} start pair {pair.pair_index}: {json_basename} ---")
+        with open(abs_json, "r", encoding="utf-8") as jf:
+            data = json.load(jf)
+        try:
+            points, _meta = validate_table_notes_json(
+                data, source_filename=json_basename
+            )
+        except TableNotesJsonError as e:
+            pair.step1_status = "failed"
+            pair.step1_error = str(e)
+            run.log(f"pair {pair.pair_index}: {e}")
+            return
 
-            try:
-                append_log(
-                    db,
-                    job_id,
-                    f"--- {stage_label} start pair {pair.pair_index}: {json_basename} ---",
-                    pair.pair_index,
-                )
-                ok = convert_json_file_to_csv(
-                    abs_json,
-                    csv_path,
-                    delimiter=delimiter,
-                    flashcard_trailing_columns=flashcard_cols,
-                    conversion_mode=conv_mode,
-                )
-                if ok and os.path.isfile(csv_path):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(out_dir, base).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                    append_log(
-                        db,
-                        job_id,
-                        f"pair {pair.pair_index}: {json_basename} → {csv_name} (flashcard import columns: {'yes' if flashcard_cols else 'no'})",
-                        pair.pair_index,
-                    )
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Conversion failed or produced no rows"
-                    append_log(db, job_id, f"pair {pair.pair_index}: conversion failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("JSON to CSV error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
+        ok = convert_points_to_docx(points, docx_path)
+        if ok and os.path.isfile(docx_path):
+            pair.step1_status = "succeeded"
+            rel_out = os.path.relpath(out_dir, run.base).replace("\\", "/")
+            register_artifacts_under(run.db, run.job_id, pair.pair_index, run.base, rel_out)
+            run.log(f"pair {pair.pair_index}: {json_basename} → {docx_name}")
         else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, f"--- {stage_label} job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
+            pair.step1_status = "failed"
+            pair.step1_error = "Conversion failed or produced no content"
+            run.log(f"pair {pair.pair_index}: conversion failed")
     except Exception as e:
-        logger.exception("run_json_to_csv_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                crash_label = JSON_TO_CSV_JOB_LABELS.get((job.type or "").strip(), "JSON to CSV")
-                notify_job_crash(db, job, crash_label, str(e))
-        except Exception:
-            db.rollback()
+        logger.exception("JSON to Word error")
+        pair.step1_status = "failed"
+        pair.step1_error = str(e)
+        run.log(f"pair {pair.pair_index}: ERROR {e}")
+
+
+_SPECS = {
+    "pre_ocr_topic": SingleStageSpec(
+        label="Pre-OCR",
+        start_message="Pre-OCR runner started (PDF → topic JSON per pair).",
+        run_pair=_pre_ocr_topic_pair,
+    ),
+    "ocr_extraction": SingleStageSpec(
+        label="OCR Extraction",
+        start_message="OCR Extraction runner started (PDF + topic JSON per pair).",
+        run_pair=_ocr_extraction_pair,
+    ),
+    "document_processing": SingleStageSpec(
+        label="Document Processing",
+        start_message="Document Processing runner started (OCR JSON → lesson JSON per pair).",
+        run_pair=_document_processing_pair,
+    ),
+    "image_notes": SingleStageSpec(
+        label="Image Notes",
+        start_message="Image Notes runner started (document processing / Stage 4 JSON + OCR extraction JSON per pair).",
+        run_pair=_image_notes_pair,
+    ),
+    "table_notes": SingleStageSpec(
+        label="Table Notes",
+        start_message="Table Notes runner started (image notes / Stage E JSON + OCR extraction JSON per pair).",
+        run_pair=_table_notes_pair,
+    ),
+    "importance_type": SingleStageSpec(
+        label="Importance & Type",
+        start_message="Importance & Type runner started (TA merged + tablepic + filepic + Step 1 combined per pair).",
+        run_pair=_importance_type_pair,
+    ),
+    "flashcard": SingleStageSpec(
+        label="Flashcard Generation",
+        start_message="Flashcard Generation runner started (tagged JSON + image catalog per pair).",
+        run_pair=_flashcard_pair,
+    ),
+    "chapter_summary": SingleStageSpec(
+        label="Chapter Summary",
+        start_message="Chapter Summary runner started (Importance & Type + Test Bank 1 combined per pair).",
+        run_pair=_chapter_summary_pair,
+    ),
+    "image_file_catalog": SingleStageSpec(
+        label="Image File Catalog",
+        start_message="Image File Catalog runner started (Table notes / TA merged + filepic + tablepic → f_*.json per pair).",
+        run_pair=_image_file_catalog_pair,
+    ),
+}
+
+
+def single_stage_spec(job_type: str) -> Optional[SingleStageSpec]:
+    """Spec for a job type handled by this module (JSON to CSV / Word labels depend on the type)."""
+    jt = (job_type or "").strip()
+    if jt in _SPECS:
+        return _SPECS[jt]
+    from webapp.json_to_csv_jobs import JSON_TO_CSV_JOB_LABELS
+    from webapp.json_to_word_jobs import JSON_TO_WORD_JOB_LABELS
+
+    if jt in JSON_TO_CSV_JOB_LABELS:
+        label = JSON_TO_CSV_JOB_LABELS[jt]
+        return SingleStageSpec(label, f"{label} runner started.", _json_to_csv_pair, uses_llm=False, delay_between_pairs=False)
+    if jt in JSON_TO_WORD_JOB_LABELS:
+        label = JSON_TO_WORD_JOB_LABELS[jt]
+        return SingleStageSpec(label, f"{label} runner started.", _json_to_word_pair, uses_llm=False, delay_between_pairs=False)
+    return None
+
+
+def _job_type(job_id: str) -> str:
+    db = SessionLocal()
+    try:
+        return (db.query(Job.type).filter(Job.id == job_id).scalar() or "").strip()
     finally:
         db.close()
 
 
-def run_json_to_word_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
-    """Convert Document Processing JSON (points array) to Word (.docx). No LLM."""
-    import json as _json
+def run_single_stage_pair(job_id: str, pair_index: int, position: int, batch: List[int]) -> None:
+    """Celery subtask body: one pair of a parallel single-stage run (see webapp.pair_dispatch)."""
+    spec = single_stage_spec(_job_type(job_id))
+    if spec is None:
+        logger.error("No single-stage runner for job %s", job_id)
+        return
+    run_pair_isolated(job_id, pair_index, position, batch, spec)
 
-    from json_to_word_converter import (
-        TableNotesJsonError,
-        convert_points_to_docx,
-        validate_table_notes_json,
-    )
-    from webapp.json_to_word_jobs import JSON_TO_WORD_JOB_LABELS
 
-    db = SessionLocal()
-    try:
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if not job:
-            logger.error("Job not found: %s", job_id)
-            return
+def run_pre_ocr_topic_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    run_single_stage_job(job_id, pair_indices, _SPECS["pre_ocr_topic"])
 
-        jt = (job.type or "").strip()
-        stage_label = JSON_TO_WORD_JOB_LABELS.get(jt, "JSON to Word")
 
-        job.status = "running"
-        if not job.started_at:
-            job.started_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, f"{stage_label} runner started.", None)
+def run_ocr_extraction_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    run_single_stage_job(job_id, pair_indices, _SPECS["ocr_extraction"])
 
-        pairs = _load_pairs(db, job_id, pair_indices)
-        if job.cancel_requested:
-            _finalize_step1_cancelled(db, job_id, pairs)
-            return
 
-        base = job_root(job_id)
+def run_document_processing_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    run_single_stage_job(job_id, pair_indices, _SPECS["document_processing"])
 
-        for pair in pairs:
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
 
-            if not pair.stage_j_relpath:
-                pair.step1_status = "failed"
-                pair.step1_error = "No JSON input"
-                db.commit()
-                continue
+def run_image_notes_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Stage E: document processing (Stage 4) JSON + OCR extraction JSON → image notes JSON (writes beside inputs)."""
+    run_single_stage_job(job_id, pair_indices, _SPECS["image_notes"])
 
-            abs_json = os.path.join(base, pair.stage_j_relpath.replace("/", os.sep))
-            if not os.path.isfile(abs_json):
-                pair.step1_status = "failed"
-                pair.step1_error = "JSON file missing on disk"
-                db.commit()
-                continue
 
-            pair.step1_status = "running"
-            pair.step1_error = None
-            db.commit()
+def run_table_notes_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Stage TA: image notes (Stage E) JSON + OCR extraction JSON → table notes JSON (writes beside inputs)."""
+    run_single_stage_job(job_id, pair_indices, _SPECS["table_notes"])
 
-            out_dir = pair_output(job_id, pair.pair_index)
-            os.makedirs(out_dir, exist_ok=True)
 
-            json_basename = os.path.basename(abs_json)
-            stem = os.path.splitext(json_basename)[0]
-            docx_name = f"{stem}.docx"
-            docx_path = os.path.join(out_dir, docx_name)
+def run_importance_type_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Web Stage J: TA merged JSON + tablepic + filepic + Step 1 combined → a*.json (parallel chunk LLM calls)."""
+    run_single_stage_job(job_id, pair_indices, _SPECS["importance_type"])
 
-            try:
-                append_log(
-                    db,
-                    job_id,
-                    f"--- {stage_label} start pair {pair.pair_index}: {json_basename} ---",
-                    pair.pair_index,
-                )
-                with open(abs_json, "r", encoding="utf-8") as jf:
-                    data = _json.load(jf)
-                try:
-                    points, _meta = validate_table_notes_json(
-                        data, source_filename=json_basename
-                    )
-                except TableNotesJsonError as e:
-                    pair.step1_status = "failed"
-                    pair.step1_error = str(e)
-                    append_log(db, job_id, f"pair {pair.pair_index}: {e}", pair.pair_index)
-                    db.commit()
-                    continue
-
-                ok = convert_points_to_docx(points, docx_path)
-                if ok and os.path.isfile(docx_path):
-                    pair.step1_status = "succeeded"
-                    rel_out = os.path.relpath(out_dir, base).replace("\\", "/")
-                    register_artifacts_under(db, job_id, pair.pair_index, base, rel_out)
-                    append_log(
-                        db,
-                        job_id,
-                        f"pair {pair.pair_index}: {json_basename} → {docx_name}",
-                        pair.pair_index,
-                    )
-                else:
-                    pair.step1_status = "failed"
-                    pair.step1_error = "Conversion failed or produced no content"
-                    append_log(db, job_id, f"pair {pair.pair_index}: conversion failed", pair.pair_index)
-            except Exception as e:
-                logger.exception("JSON to Word error")
-                pair.step1_status = "failed"
-                pair.step1_error = str(e)
-                append_log(db, job_id, f"pair {pair.pair_index}: ERROR {e}", pair.pair_index)
-
-            db.commit()
-
-            if _scalar_cancel_requested(db, job_id):
-                _finalize_step1_cancelled(db, job_id, pairs)
-                return
-
-        any_failed = any(p.step1_status == "failed" for p in pairs)
-        if any_failed:
-            job.status = "failed"
-            job.error_summary = "One or more pairs failed"
-        else:
-            job.status = "succeeded"
-            job.error_summary = None
-        job.finished_at = datetime.utcnow()
-        db.commit()
-        append_log(db, job_id, f"--- {stage_label} job finished ---", None)
-        job = db.query(Job).filter(Job.id == job_id).one_or_none()
-        if job:
-            notify_step1_finished(db, job, pairs)
-    except Exception as e:
-        logger.exception("run_json_to_word_step1_job")
-        try:
-            job = db.query(Job).filter(Job.id == job_id).one_or_none()
-            if job:
-                job.status = "failed"
-                job.error_summary = str(e)
-                job.finished_at = datetime.utcnow()
-                db.commit()
-                crash_label = JSON_TO_WORD_JOB_LABELS.get((job.type or "").strip(), "JSON to Word")
-                notify_job_crash(db, job, crash_label, str(e))
-        except Exception:
-            db.rollback()
-    finally:
-        db.close()
 
+def run_flashcard_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Web Stage H: tagged a*.json + image catalog f*.json → ac*.json (parallel chunk LLM calls)."""
+    run_single_stage_job(job_id, pair_indices, _SPECS["flashcard"])
+
+
+def run_chapter_summary_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Web Stage L: Importance & Type a*.json + Test Bank 1 step1_combined → o*.json (chapter_name + summary)."""
+    run_single_stage_job(job_id, pair_indices, _SPECS["chapter_summary"])
+
+
+def run_image_file_catalog_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Stage F: Table notes (TA merged) + filepic + tablepic → catalog JSON f_*.json."""
+    run_single_stage_job(job_id, pair_indices, _SPECS["image_file_catalog"])
+
+
+def run_json_to_csv_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Convert uploaded JSON files to CSV (no LLM). Only flashcard_json_to_csv adds five empty trailing columns."""
+    spec = single_stage_spec(_job_type(job_id)) or SingleStageSpec(
+        "JSON to CSV", "JSON to CSV runner started.", _json_to_csv_pair, uses_llm=False, delay_between_pairs=False
+    )
+    run_single_stage_job(job_id, pair_indices, spec)
+
+
+def run_json_to_word_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
+    """Convert Document Processing JSON (points array) to Word (.docx). No LLM."""
+    spec = single_stage_spec(_job_type(job_id)) or SingleStageSpec(
+        "JSON to Word", "JSON to Word runner started.", _json_to_word_pair, uses_llm=False, delay_between_pairs=False
+    )
+    run_single_stage_job(job_id, pair_indices, spec)
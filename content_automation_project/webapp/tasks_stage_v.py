@@ -9,9 +9,7 @@ from __future__ import annotations
 import json
 import logging
 import os
-import queue
 import sys
-import threading
 import time
 from datetime import datetime
 from pathlib import Path
@@ -25,8 +23,6 @@ if str(_ROOT) not in sys.path:
 
 load_dotenv(_ROOT / ".env")
 
-from sqlalchemy.orm import Session
-
 from webapp.config import (
     DEFAULT_TEST_BANK_MODEL,
     DEFAULT_TEST_BANK_PROVIDER,
@@ -36,11 +32,11 @@ from webapp.config import (
 from webapp.database import SessionLocal
 from webapp.job_files import (
     append_log,
-    append_logs_bulk,
     job_root,
     pair_output,
     register_artifacts_under,
 )
+from webapp.job_log_sink import flush_job_logs, job_log_sink
 from webapp.system_prompt_defaults import resolve_prompt_for_job
 from webapp.inbox import notify_job_crash, notify_step1_finished, notify_step2_finished
 from webapp.models import Job, JobPair
@@ -60,13 +56,6 @@ from openrouter_api_client import OpenRouterRequestAborted
 logger = logging.getLogger(__name__)
 
 
-def _flush_log_buf(db: Session, job_id: str, buf: List[str], pair_index: Optional[int]) -> None:
-    if not buf:
-        return
-    append_logs_bulk(db, job_id, buf, pair_index=pair_index)
-    buf.clear()
-
-
 def run_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None:
     db = SessionLocal()
     try:
@@ -295,6 +284,7 @@ def run_step1_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None
         except Exception:
             db.rollback()
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -324,6 +314,7 @@ def run_step2_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None
         provider_2 = normalize_test_bank_provider(cfg.get("provider_2"))
         model_1 = normalize_test_bank_model(cfg.get("model_1"))
         delay_seconds = float(cfg.get("delay_seconds", 5))
+        step2_concurrency = int(cfg.get("step2_concurrency") or 0) or None
 
         if job.status == "cancelled":
             return
@@ -385,44 +376,11 @@ def run_step2_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None
             abs_w = os.path.join(base, pair.word_relpath.replace("/", os.sep))
             out_dir = pair_output(job_id, pair.pair_index)
             pair_index = pair.pair_index
-            progress_queue: "queue.Queue[str]" = queue.Queue()
-            stop_flush = threading.Event()
-            flush_errors: List[Exception] = []
-
-            def _flush_worker() -> None:
-                """Flush Step 2 progress logs using an isolated DB session (thread-safe)."""
-                s = SessionLocal()
-                buf: List[str] = []
-                try:
-                    while True:
-                        try:
-                            msg = progress_queue.get(timeout=0.2)
-                            buf.append(msg)
-                        except queue.Empty:
-                            pass
-                        if len(buf) >= 25:
-                            append_logs_bulk(s, job_id, buf, pair_index=pair_index)
-                            buf.clear()
-                        if stop_flush.is_set() and progress_queue.empty():
-                            if buf:
-                                append_logs_bulk(s, job_id, buf, pair_index=pair_index)
-                                buf.clear()
-                            break
-                except Exception as e:
-                    try:
-                        s.rollback()
-                    except Exception:
-                        pass
-                    logger.exception("Step 2 log flush worker failed")
-                    flush_errors.append(e)
-                finally:
-                    s.close()
-
-            flush_thread = threading.Thread(target=_flush_worker, daemon=True)
-            flush_thread.start()
+            # Session-free and thread-safe: Step 2 pool threads log through the job's sink.
+            log_sink = job_log_sink(job_id, db.get_bind())
 
             def progress(msg: str) -> None:
-                progress_queue.put(msg)
+                log_sink.write(msg, pair_index)
                 # Use fresh-session cancel checker; never use shared worker session from pool threads.
                 if cancel_check and cancel_check():
                     raise JobCancelled()
@@ -460,18 +418,13 @@ def run_step2_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None
                         cancel_check=cancel_check,
                         unit_hooks=unit_hooks,
                         keep_unit_artifacts=bool(unit_hooks),
+                        step2_concurrency=step2_concurrency,
                     )
                 except (JobCancelled, OpenRouterRequestAborted):
-                    stop_flush.set()
-                    flush_thread.join(timeout=10)
-                    if flush_errors:
-                        raise flush_errors[0]
+                    log_sink.flush()
                     _finalize_step2_cancelled(db, job_id, pairs)
                     return
-                stop_flush.set()
-                flush_thread.join(timeout=10)
-                if flush_errors:
-                    raise flush_errors[0]
+                log_sink.flush()
                 if result:
                     pair.step2_status = "succeeded"
                     register_artifacts_under(db, job_id, pair.pair_index, base, os.path.relpath(out_dir, base))
@@ -480,8 +433,7 @@ def run_step2_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None
                     pair.step2_error = "Step 2 returned no output"
                     append_log(db, job_id, f"pair {pair.pair_index}: Step 2 failed", pair.pair_index)
             except Exception as e:
-                stop_flush.set()
-                flush_thread.join(timeout=10)
+                flush_job_logs(job_id)
                 logger.exception("Step 2 error")
                 pair.step2_status = "failed"
                 pair.step2_error = str(e)
@@ -528,6 +480,7 @@ def run_step2_job(job_id: str, pair_indices: Optional[List[int]] = None) -> None
         except Exception:
             db.rollback()
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -549,6 +502,7 @@ def run_test_bank_step2_only_job(job_id: str, pair_indices: Optional[List[int]]
         provider_2 = normalize_test_bank_provider(cfg.get("provider_2"))
         model_1 = normalize_test_bank_model(cfg.get("model_1"))
         delay_seconds = float(cfg.get("delay_seconds", 5))
+        step2_concurrency = int(cfg.get("step2_concurrency") or 0) or None
         step1_rel_by_pair = cfg.get("step1_combined_relpaths") or {}
 
         job.status = "running"
@@ -623,43 +577,11 @@ def run_test_bank_step2_only_job(job_id: str, pair_indices: Optional[List[int]]
             abs_w = os.path.join(base, pair.word_relpath.replace("/", os.sep))
             out_dir = pair_output(job_id, pair.pair_index)
             pair_index = pair.pair_index
-            progress_queue: "queue.Queue[str]" = queue.Queue()
-            stop_flush = threading.Event()
-            flush_errors: List[Exception] = []
-
-            def _flush_worker() -> None:
-                s = SessionLocal()
-                buf: List[str] = []
-                try:
-                    while True:
-                        try:
-                            msg = progress_queue.get(timeout=0.2)
-                            buf.append(msg)
-                        except queue.Empty:
-                            pass
-                        if len(buf) >= 25:
-                            append_logs_bulk(s, job_id, buf, pair_index=pair_index)
-                            buf.clear()
-                        if stop_flush.is_set() and progress_queue.empty():
-                            if buf:
-                                append_logs_bulk(s, job_id, buf, pair_index=pair_index)
-                                buf.clear()
-                            break
-                except Exception as e:
-                    try:
-                        s.rollback()
-                    except Exception:
-                        pass
-                    logger.exception("Test Bank 2 log flush worker failed")
-                    flush_errors.append(e)
-                finally:
-                    s.close()
-
-            flush_thread = threading.Thread(target=_flush_worker, daemon=True)
-            flush_thread.start()
+            # Session-free and thread-safe: Step 2 pool threads log through the job's sink.
+            log_sink = job_log_sink(job_id, db.get_bind())
 
             def progress(msg: str) -> None:
-                progress_queue.put(msg)
+                log_sink.write(msg, pair_index)
                 if cancel_check and cancel_check():
                     raise JobCancelled()
 
@@ -696,18 +618,13 @@ def run_test_bank_step2_only_job(job_id: str, pair_indices: Optional[List[int]]
                         cancel_check=cancel_check,
                         unit_hooks=unit_hooks,
                         keep_unit_artifacts=bool(unit_hooks),
+                        step2_concurrency=step2_concurrency,
                     )
                 except (JobCancelled, OpenRouterRequestAborted):
-                    stop_flush.set()
-                    flush_thread.join(timeout=10)
-                    if flush_errors:
-                        raise flush_errors[0]
+                    log_sink.flush()
                     _finalize_step1_cancelled(db, job_id, pairs)
                     return
-                stop_flush.set()
-                flush_thread.join(timeout=10)
-                if flush_errors:
-                    raise flush_errors[0]
+                log_sink.flush()
                 if result:
                     pair.step1_status = "succeeded"
                     register_artifacts_under(db, job_id, pair.pair_index, base, os.path.relpath(out_dir, base))
@@ -716,8 +633,7 @@ def run_test_bank_step2_only_job(job_id: str, pair_indices: Optional[List[int]]
                     pair.step1_error = "Test Bank 2 returned no output"
                     append_log(db, job_id, f"pair {pair.pair_index}: Test Bank 2 failed (no output)", pair.pair_index)
             except Exception as e:
-                stop_flush.set()
-                flush_thread.join(timeout=10)
+                flush_job_logs(job_id)
                 logger.exception("Test Bank 2 error")
                 pair.step1_status = "failed"
                 pair.step1_error = str(e)
@@ -758,6 +674,7 @@ def run_test_bank_step2_only_job(job_id: str, pair_indices: Optional[List[int]]
         except Exception:
             db.rollback()
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
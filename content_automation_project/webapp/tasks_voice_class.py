@@ -25,7 +25,9 @@ from webapp.config import (
 from webapp.database import SessionLocal
 from webapp.gemini_tts_key_manager import GeminiTtsKeyManager
 from webapp.inbox import notify_job_crash, notify_step1_finished, notify_step2_finished
+from webapp.cancel_signal import clear_cancel
 from webapp.job_files import append_log, job_root, pair_output, register_artifacts_under
+from webapp.job_log_sink import flush_job_logs, job_log_sink
 from webapp.job_runner_common import (
     JobCancelled,
     _cancel_check_session,
@@ -34,10 +36,10 @@ from webapp.job_runner_common import (
     _scalar_cancel_requested,
 )
 from webapp.models import Job, JobPair
+from webapp.pair_dispatch import _load_pairs
 from webapp.processor_context import build_unified_api_client
 from webapp.prompt_capture import wrap_prompt_capture
 from webapp.system_prompt_defaults import resolve_prompt_for_job
-from webapp.tasks_single_stage import _load_pairs
 from webapp.voice_class_inputs import (
     VoiceClassPairInputError,
     pair_media_entry,
@@ -228,6 +230,7 @@ def run_voice_class_step1_job(job_id: str, pair_indices: Optional[List[int]] = N
         except Exception:
             db.rollback()
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -247,6 +250,7 @@ def _run_voice_class_step2_pairs(
     tts_model = (cfg.get("tts_model") or DEFAULT_VOICE_CLASS_TTS_MODEL).strip()
     tts_voice = (cfg.get("tts_voice") or DEFAULT_VOICE_CLASS_TTS_VOICE).strip()
     delay_seconds = float(cfg.get("delay_seconds", 5))
+    tts_concurrency = int(cfg["tts_concurrency"]) if cfg.get("tts_concurrency") else None
 
     intro, outro = get_voice_class_song_paths()
     songs = voice_class_songs_status()
@@ -339,6 +343,7 @@ def _run_voice_class_step2_pairs(
                 tts_instruction=tts_instruction,
                 segment_indices=seg_indices,
                 skip_merge=skip_merge,
+                tts_concurrency=tts_concurrency,
                 progress_callback=progress,
                 cancel_check=cancel_check,
             )
@@ -442,6 +447,7 @@ def run_voice_class_step2_job(job_id: str, pair_indices: Optional[List[int]] = N
         except Exception:
             db.rollback()
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -458,6 +464,7 @@ def run_voice_class_regenerate_segment(
         job.status = "running"
         job.cancel_requested = False
         db.commit()
+        clear_cancel(job_id)
 
         pair = (
             db.query(JobPair)
@@ -485,6 +492,7 @@ def run_voice_class_regenerate_segment(
         job.finished_at = datetime.utcnow()
         db.commit()
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -552,16 +560,15 @@ def run_voice_class_merge_only(
         job.status = "running"
         job.cancel_requested = False
         db.commit()
+        clear_cancel(job_id)
         append_log(db, job_id, f"Re-merging voice tracks for pair {pair_index}…", pair_index)
 
         cancel_check = _cancel_check_session(job_id)
 
+        log_sink = job_log_sink(job_id, db.get_bind())
+
         def progress(msg: str) -> None:
-            s = SessionLocal()
-            try:
-                append_log(s, job_id, msg, pair_index)
-            finally:
-                s.close()
+            log_sink.write(msg, pair_index)
 
         processor = StageVoiceProcessor(None)
         try:
@@ -611,4 +618,5 @@ def run_voice_class_merge_only(
             append_log(db, job_id, f"Pair {pair_index}: merge failed.", pair_index)
         db.commit()
     finally:
+        flush_job_logs(job_id)
         db.close()
@@ -38,6 +38,18 @@ def _load_topic_items(topic_path: str) -> List[Dict[str, Any]]:
     return [x for x in items if isinstance(x, dict)]
 
 
+def page_window_margin_from_cfg(cfg: Dict[str, Any]) -> Optional[int]:
+    """Pages of context around each located subchapter, or None to send the whole PDF text."""
+    raw = cfg.get("page_window_margin")
+    if raw is None or raw == "":
+        return None
+    try:
+        margin = int(raw)
+    except (TypeError, ValueError):
+        return None
+    return margin if margin >= 0 else None
+
+
 def subchapter_units_from_topic(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """One unit per subchapter row in the Pre-OCR topic file (1-based unit_index)."""
     units: List[Dict[str, Any]] = []
@@ -136,6 +148,7 @@ def regenerate_unit(
         subchapter_index=unit_index,
         output_json_path=str(out_path),
         progress_callback=None,
+        page_window_margin=page_window_margin_from_cfg(cfg),
     )
     if not ok:
         raise RuntimeError(f"OCR regenerate failed for subchapter unit {unit_index}")
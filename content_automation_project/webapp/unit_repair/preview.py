@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional
 
 from webapp.job_files import job_root, pair_dir
 from webapp.unit_repair.manifest import abs_from_relpath, get_unit, load_manifest
+from webapp.unit_repair.shards import load_unit_shard
 
 
 def _read_text_slice(path: str, limit: int = 120_000) -> str:
@@ -54,84 +55,6 @@ def _find_prompt_file(job_id: str, pair_index: int, unit_index: int, prompt_seq:
     return candidates[0] if candidates else None
 
 
-def _slice_from_output(job_type: str, output_path: str, unit: Dict[str, Any]) -> Optional[str]:
-    if not os.path.isfile(output_path):
-        return None
-    raw = _read_text_slice(output_path)
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError:
-        return raw[:80_000] if raw else None
-
-    jt = (job_type or "").strip()
-    if jt == "voice_class":
-        paragraphs = data.get("paragraphs") if isinstance(data, dict) else None
-        if not isinstance(paragraphs, list):
-            return None
-        ch = (unit.get("chapter") or "").strip()
-        sub = (unit.get("subchapter") or "").strip()
-        top = (unit.get("topic") or unit.get("paragraph") or "").strip()
-        matched = [
-            p
-            for p in paragraphs
-            if isinstance(p, dict)
-            and (p.get("chapter") or "").strip() == ch
-            and (p.get("subchapter") or "").strip() == sub
-            and (p.get("topic") or "").strip() == top
-        ]
-        if matched:
-            return json.dumps({"paragraphs": matched}, ensure_ascii=False, indent=2)
-        return None
-
-    if jt == "document_processing" or jt in ("image_notes", "table_notes", "flashcard"):
-        points = data.get("points") if isinstance(data, dict) else None
-        if not isinstance(points, list):
-            return None
-        ch = (unit.get("chapter") or "").strip()
-        sub = (unit.get("subchapter") or "").strip()
-        top = (unit.get("topic") or unit.get("paragraph") or "").strip()
-        matched = [
-            p
-            for p in points
-            if isinstance(p, dict)
-            and (p.get("chapter") or "").strip() == ch
-            and (p.get("subchapter") or "").strip() == sub
-            and (p.get("topic") or "").strip() == top
-        ]
-        if matched:
-            return json.dumps({"points": matched}, ensure_ascii=False, indent=2)
-        return None
-
-    if jt == "ocr_extraction":
-        subs = (data.get("chapters") or [{}])[0].get("subchapters") or []
-        name = (unit.get("subchapter") or "").strip()
-        ui = int(unit.get("unit_index") or 0)
-        for s in subs:
-            if isinstance(s, dict) and (s.get("subchapter") or "").strip() == name:
-                return json.dumps(s, ensure_ascii=False, indent=2)
-        if 0 < ui <= len(subs):
-            return json.dumps(subs[ui - 1], ensure_ascii=False, indent=2)
-        return None
-
-    if jt in ("test_bank", "test_bank_2"):
-        rows = data if isinstance(data, list) else data.get("data") or data.get("questions")
-        if isinstance(rows, list):
-            topic = (unit.get("topic") or unit.get("topic_name") or "").strip()
-            sub = (unit.get("subchapter") or unit.get("subchapter_name") or "").strip()
-            matched = [
-                r
-                for r in rows
-                if isinstance(r, dict)
-                and (r.get("Topic") or r.get("topic") or "").strip() == topic
-                and (not sub or (r.get("Subchapter") or r.get("subchapter") or "").strip() == sub)
-            ]
-            if matched:
-                return json.dumps(matched, ensure_ascii=False, indent=2)
-        return None
-
-    return None
-
-
 def get_unit_preview_payload(
     job_id: str,
     pair_index: int,
@@ -146,33 +69,30 @@ def get_unit_preview_payload(
         raise ValueError(f"Unknown unit_index {unit_index}")
 
     sections: List[Dict[str, Any]] = []
-    artifact_rel = (unit.get("artifact_relpath") or "").strip()
-    if artifact_rel:
-        abs_path = abs_from_relpath(job_id, artifact_rel)
-        if os.path.isfile(abs_path):
-            content = _pretty_json_text(_read_text_slice(abs_path))
+    # The combined output is authoritative (renumber rewrites ids there); the per-unit file the
+    # run saved is the fallback for units the combined file does not have yet.
+    output_rel = (manifest.get("output_relpath") or "").strip()
+    sliced = load_unit_shard(job_id, pair_index, job_type, unit_index, manifest) if output_rel else None
+    if sliced is not None:
+        sections.append(
+            {
+                "title": "Unit output (from combined file)",
+                "content": json.dumps(sliced, ensure_ascii=False, indent=2),
+                "rel_path": output_rel,
+            }
+        )
+    else:
+        artifact_rel = (unit.get("artifact_relpath") or "").strip()
+        abs_path = abs_from_relpath(job_id, artifact_rel) if artifact_rel else ""
+        if abs_path and os.path.isfile(abs_path):
             sections.append(
                 {
                     "title": "Unit output (saved slice)",
-                    "content": content,
+                    "content": _pretty_json_text(_read_text_slice(abs_path)),
                     "rel_path": artifact_rel,
                 }
             )
 
-    output_rel = (manifest.get("output_relpath") or "").strip()
-    if output_rel:
-        output_path = abs_from_relpath(job_id, output_rel)
-        sliced = _slice_from_output(job_type, output_path, unit)
-        has_saved = any(s.get("title") == "Unit output (saved slice)" for s in sections)
-        if sliced and not has_saved:
-            sections.append(
-                {
-                    "title": "Unit output (from combined file)",
-                    "content": sliced,
-                    "rel_path": output_rel,
-                }
-            )
-
     prompt_seq = unit.get("prompt_seq")
     prompt_path = _find_prompt_file(job_id, pair_index, unit_index, prompt_seq)
     if prompt_path:
@@ -8,6 +8,7 @@ from typing import Any, Dict, Optional
 
 from sqlalchemy.orm import Session
 
+from llm_response_cache import CACHE_REFRESH
 from webapp.job_files import append_log, job_root
 from webapp.models import Job, JobPair
 from webapp.processor_context import build_unified_api_client
@@ -16,6 +17,7 @@ from webapp.system_prompt_defaults import resolve_prompt_for_job
 from webapp.unit_repair.lock import pair_repair_lock
 from webapp.unit_repair.manifest import load_manifest
 from webapp.unit_repair.registry import job_supports_unit_repair, renumber_scheme_for_job
+from webapp.unit_repair.shards import refresh_unit_shards
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +51,10 @@ def run_regenerate_unit(db: Session, job_id: str, pair_index: int, unit_index: i
     with pair_repair_lock(job_id, pair_index):
         append_log(db, job_id, f"Regenerate unit {unit_index} started for pair {pair_index}.", pair_index)
         client, _ssm = build_unified_api_client()
-        cap = wrap_prompt_capture(client, db, job_id, pair_index, jt, _pipeline_step(jt))
+        # A regenerate asks for a fresh answer; the new response replaces any cached one.
+        cap = wrap_prompt_capture(
+            client, db, job_id, pair_index, jt, _pipeline_step(jt), response_cache_mode=CACHE_REFRESH
+        )
 
         if jt == "document_processing":
             from webapp.unit_repair import docproc
@@ -112,6 +117,7 @@ def run_regenerate_unit(db: Session, job_id: str, pair_index: int, unit_index: i
         else:
             raise ValueError(f"No regenerate adapter for {jt}")
 
+        refresh_unit_shards(job_id, pair_index, jt)
         append_log(db, job_id, f"Regenerate unit {unit_index} finished for pair {pair_index}.", pair_index)
 
 
@@ -153,6 +159,7 @@ def run_renumber_pair(db: Session, job_id: str, pair_index: int) -> int:
                 n = img_rep.renumber_pair(db, job_id, pair_index, cfg)
         else:
             raise ValueError(f"No renumber adapter for {jt}")
+        refresh_unit_shards(job_id, pair_index, jt)
         append_log(db, job_id, f"Renumber finished: {n} row(s) for pair {pair_index}.", pair_index)
         return n
 
@@ -0,0 +1,223 @@
+"""Per-unit shards of a pair's combined output under pair_N/units/shards/.
+
+Unit preview used to read the first 120,000 characters of the combined output, try to parse
+them (which fails on real chapters) and then scan every row for one unit. The combined file
+is now split once into one small JSON file per unit::
+
+    pair_N/units/shards/index.json     {"output_relpath", "size", "mtime_ns", "units": {...}}
+    pair_N/units/shards/u007.json      the unit's rows, in the shape preview shows
+
+The index records the size and mtime of the combined file it was built from and a digest of
+the manifest's unit keys. Anything that rewrites that file (a run, regenerate, renumber) or
+changes the units makes the shards stale, and the next :func:`load_unit_shard` rebuilds them;
+regenerate and renumber refresh them right away (``service.py``). Shard files are written
+atomically, the index last.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from webapp.unit_repair.manifest import abs_from_relpath, load_manifest, units_dir
+from webapp.unit_repair.renumber import _row_topic_key, _unit_topic_key
+
+logger = logging.getLogger(__name__)
+
+_POINT_JOB_TYPES = ("document_processing", "image_notes", "table_notes", "flashcard")
+
+
+def shards_dir(job_id: str, pair_index: int) -> str:
+    return os.path.join(units_dir(job_id, pair_index), "shards")
+
+
+def _shard_name(unit_index: int) -> str:
+    return f"u{int(unit_index):03d}.json"
+
+
+def _write_atomic(path: str, obj: Any) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _units_fingerprint(units: List[Dict[str, Any]]) -> str:
+    """Changes when units are added, removed or re-keyed, so the shards are rebuilt."""
+    keys = [
+        (
+            int(u.get("unit_index") or 0),
+            _unit_topic_key(u),
+            (u.get("topic_name") or "").strip(),
+            (u.get("subchapter_name") or "").strip(),
+        )
+        for u in units
+    ]
+    raw = json.dumps(sorted(keys), ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def unit_payloads(job_type: str, data: Any, units: List[Dict[str, Any]]) -> Dict[int, Any]:
+    """``{unit_index: payload}`` for every unit with rows in ``data``, in one pass over the rows."""
+    jt = (job_type or "").strip()
+    out: Dict[int, Any] = {}
+
+    if jt == "voice_class" or jt in _POINT_JOB_TYPES:
+        field = "paragraphs" if jt == "voice_class" else "points"
+        rows = data.get(field) if isinstance(data, dict) else None
+        if not isinstance(rows, list):
+            return out
+        groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for r in rows:
+            if isinstance(r, dict):
+                groups[_row_topic_key(r)].append(r)
+        for u in units:
+            matched = groups.get(_unit_topic_key(u))
+            if matched:
+                out[int(u["unit_index"])] = {field: matched}
+        return out
+
+    if jt == "ocr_extraction":
+        chapters = data.get("chapters") if isinstance(data, dict) else None
+        subs = ((chapters or [{}])[0] or {}).get("subchapters") or []
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for s in subs:
+            if isinstance(s, dict):
+                by_name.setdefault((s.get("subchapter") or "").strip(), s)
+        for u in units:
+            ui = int(u.get("unit_index") or 0)
+            hit = by_name.get((u.get("subchapter") or "").strip())
+            if hit is None and 0 < ui <= len(subs):
+                hit = subs[ui - 1]
+            if hit is not None:
+                out[ui] = hit
+        return out
+
+    if jt in ("test_bank", "test_bank_2"):
+        rows = data
+        if isinstance(data, dict):
+            rows = data.get("data") or data.get("questions")
+        if not isinstance(rows, list):
+            return out
+        by_topic: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for r in rows:
+            if isinstance(r, dict):
+                by_topic[(r.get("Topic") or r.get("topic") or "").strip()].append(r)
+        for u in units:
+            topic = (u.get("topic") or u.get("topic_name") or "").strip()
+            sub = (u.get("subchapter") or u.get("subchapter_name") or "").strip()
+            matched = [
+                r
+                for r in by_topic.get(topic, [])
+                if not sub or (r.get("Subchapter") or r.get("subchapter") or "").strip() == sub
+            ]
+            if matched:
+                out[int(u["unit_index"])] = matched
+        return out
+
+    return out
+
+
+def refresh_unit_shards(
+    job_id: str,
+    pair_index: int,
+    job_type: str,
+    manifest: Optional[Dict[str, Any]] = None,
+    data: Any = None,
+) -> Optional[Dict[str, Any]]:
+    """Rebuild the shards from the combined output (``data`` if the caller already parsed it); returns the index."""
+    manifest = manifest if manifest is not None else load_manifest(job_id, pair_index)
+    output_rel = ((manifest or {}).get("output_relpath") or "").strip()
+    if not output_rel:
+        return None
+    output_path = abs_from_relpath(job_id, output_rel)
+    stamp = _stamp(output_path)
+    if stamp is None:
+        return None
+    if data is None:
+        try:
+            with open(output_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Cannot shard %s for job=%s pair=%s: %s", output_rel, job_id, pair_index, e)
+            return None
+
+    units = list(manifest.get("units") or [])
+    payloads = unit_payloads(job_type, data, units)
+    sd = shards_dir(job_id, pair_index)
+    os.makedirs(sd, exist_ok=True)
+    names = {str(ui): _shard_name(ui) for ui in payloads}
+    for ui, payload in payloads.items():
+        _write_atomic(os.path.join(sd, names[str(ui)]), payload)
+    index = {
+        "job_type": (job_type or "").strip(),
+        "output_relpath": output_rel,
+        "size": stamp[0],
+        "mtime_ns": stamp[1],
+        "units_key": _units_fingerprint(units),
+        "units": names,
+    }
+    _write_atomic(os.path.join(sd, "index.json"), index)
+    keep = set(names.values()) | {"index.json"}
+    for fn in os.listdir(sd):
+        if fn.endswith(".json") and fn not in keep:
+            try:
+                os.remove(os.path.join(sd, fn))
+            except OSError:
+                pass
+    return index
+
+
+def _current_index(job_id: str, pair_index: int, manifest: Dict[str, Any], output_rel: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(shards_dir(job_id, pair_index), "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("output_relpath") != output_rel:
+        return None
+    if index.get("units_key") != _units_fingerprint(list(manifest.get("units") or [])):
+        return None
+    if _stamp(abs_from_relpath(job_id, output_rel)) != (index.get("size"), index.get("mtime_ns")):
+        return None
+    return index
+
+
+def load_unit_shard(
+    job_id: str,
+    pair_index: int,
+    job_type: str,
+    unit_index: int,
+    manifest: Optional[Dict[str, Any]] = None,
+) -> Optional[Any]:
+    """One unit's rows from the combined output, rebuilding stale shards first; None if it has none."""
+    manifest = manifest if manifest is not None else load_manifest(job_id, pair_index)
+    output_rel = ((manifest or {}).get("output_relpath") or "").strip()
+    if not output_rel:
+        return None
+    index = _current_index(job_id, pair_index, manifest, output_rel)
+    if index is None:
+        index = refresh_unit_shards(job_id, pair_index, job_type, manifest)
+        if index is None:
+            return None
+    name = (index.get("units") or {}).get(str(int(unit_index)))
+    if not name:
+        return None
+    try:
+        with open(os.path.join(shards_dir(job_id, pair_index), name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
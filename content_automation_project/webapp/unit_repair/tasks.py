@@ -6,6 +6,7 @@ import logging
 
 from webapp.database import SessionLocal
 from webapp.job_files import append_log
+from webapp.job_log_sink import flush_job_logs
 from webapp.models import Job
 from webapp.unit_repair.lock import is_locked, pair_repair_lock
 from webapp.unit_repair.service import run_regenerate_unit, run_renumber_pair
@@ -41,6 +42,7 @@ def run_regenerate_unit_task(job_id: str, pair_index: int, unit_index: int) -> N
         except Exception:
             pass
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -61,6 +63,7 @@ def run_renumber_pair_task(job_id: str, pair_index: int) -> None:
         except Exception:
             pass
     finally:
+        flush_job_logs(job_id)
         db.close()
 
 
@@ -10,6 +10,7 @@ from typing import Any, Callable, Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
+from prompt_payload import encode_payload
 from webapp.job_files import job_root, pair_output, register_artifacts_under
 from webapp.unit_repair.manifest import (
     abs_from_relpath,
@@ -297,10 +298,10 @@ def regenerate_unit(
     path, _n = processor._step2_refine_questions_and_add_qid(
         stage_j_path=stage_j_path,
         word_file_path=word_path,
-        full_stage_j_json=json.dumps(filtered_stage_j, ensure_ascii=False, indent=2),
+        full_stage_j_json=encode_payload(filtered_stage_j, stage="stage_v", label="stage J"),
         current_topic_name=topic_name,
         current_topic_subchapter=subchapter_name,
-        topic_step1_json=json.dumps(filtered_step1, ensure_ascii=False, indent=2),
+        topic_step1_json=encode_payload(filtered_step1, stage="stage_v", label="step 1"),
         step1_output_path=step1_path,
         prompt=prompt_2,
         model_name=model_name,
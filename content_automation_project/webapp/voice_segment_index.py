@@ -0,0 +1,135 @@
+"""
+Sidecar index of Voice Class audio metadata: ``<pair output>/tts_segments_index.json``.
+
+The voice-segments endpoint used to spawn one ``ffprobe`` per segment on every page refresh.
+Duration, peaks and the silence flag are now computed once, when Step 2 writes a segment WAV
+(see ``StageVoiceProcessor._synthesize_segments``), and stored here keyed by the file's path
+relative to the pair output directory. Each entry carries the file's size and mtime; an entry
+whose file has changed since is ignored (:func:`cached_audio_metadata` returns None).
+
+Step 2 writes one batch of entries at the end of a run; the API adds entries on demand. Both
+read-modify-write the index under an exclusive ``flock`` on ``tts_segments_index.json.lock``
+(where ``fcntl`` exists), so the web app and a worker do not overwrite each other's entries.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "tts_segments_index.json"
+
+_lock = threading.Lock()
+
+
+def index_path(output_dir: str) -> str:
+    return os.path.join(output_dir, INDEX_FILENAME)
+
+
+@contextmanager
+def _index_lock(output_dir: str) -> Iterator[None]:
+    lock_file = None
+    if fcntl is not None:
+        try:
+            lock_file = open(f"{index_path(output_dir)}.lock", "a")
+        except OSError as e:
+            logger.warning("Could not open audio index lock in %s: %s", output_dir, e)
+    with _lock:
+        try:
+            if lock_file is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()  # releases the flock
+
+
+def segment_rel_path(segment_id: int) -> str:
+    return f"tts_segments/segment_{int(segment_id):03d}.wav"
+
+
+def rel_to_output(output_dir: str, abs_path: str) -> Optional[str]:
+    """``abs_path`` relative to ``output_dir`` in index form, or None when it lies outside."""
+    rel = os.path.relpath(abs_path, output_dir).replace("\\", "/")
+    return None if rel.startswith("../") or rel == ".." else rel
+
+
+def load_audio_index(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """``{rel_path: entry}``; empty when the index is missing or unreadable."""
+    try:
+        with open(index_path(output_dir), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    files = data.get("files") if isinstance(data, dict) else None
+    return files if isinstance(files, dict) else {}
+
+
+def _stamp(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def cached_audio_metadata(
+    files: Mapping[str, Dict[str, Any]], output_dir: str, rel_path: str
+) -> Optional[Dict[str, Any]]:
+    """The index entry for ``rel_path`` if the file still has the recorded size and mtime."""
+    entry = files.get(rel_path)
+    if not entry:
+        return None
+    stamp = _stamp(os.path.join(output_dir, rel_path.replace("/", os.sep)))
+    if stamp is None or stamp != (entry.get("size"), entry.get("mtime_ns")):
+        return None
+    return entry
+
+
+def store_audio_metadata(output_dir: str, entries: Mapping[str, Mapping[str, Any]]) -> None:
+    """Merge ``{rel_path: metadata}`` into the index, stamping each with the file's current size/mtime."""
+    with _index_lock(output_dir):
+        files = load_audio_index(output_dir)
+        for rel_path, meta in entries.items():
+            stamp = _stamp(os.path.join(output_dir, rel_path.replace("/", os.sep)))
+            if stamp is None:
+                files.pop(rel_path, None)
+                continue
+            files[rel_path] = {**meta, "size": stamp[0], "mtime_ns": stamp[1]}
+        path = index_path(output_dir)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "files": files}, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write audio index %s: %s", path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+def record_audio_metadata(
+    output_dir: str, rel_path: str, meta: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Analyze ``rel_path`` (unless ``meta`` is given) and store the result; returns the metadata."""
+    if meta is None:
+        from webapp.audio_merge import analyze_audio_for_preview
+
+        meta = analyze_audio_for_preview(os.path.join(output_dir, rel_path.replace("/", os.sep)))
+        if not meta:
+            return None
+    store_audio_metadata(output_dir, {rel_path: meta})
+    return meta
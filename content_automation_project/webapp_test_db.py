@@ -0,0 +1,51 @@
+"""Shared test fixture: a throwaway SQLite web-app database holding one user and one job."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from webapp.database import Base
+from webapp.models import Job, User
+
+
+def make_job_database(
+    test: unittest.TestCase,
+    prefix: str,
+    *,
+    job_id: str = "job-1",
+    job_type: str = "flashcard",
+    status: str = "running",
+) -> Tuple[str, Engine, sessionmaker]:
+    """
+    Create every table in a temp-dir SQLite file and add ``owner@example.com`` with job ``job_id``.
+
+    The engine is disposed and the directory removed when ``test`` cleans up (after its tearDown).
+
+    Returns:
+        ``(tmp_dir, engine, Session)``
+    """
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    test.addCleanup(shutil.rmtree, tmp, True)
+    engine = create_engine(
+        f"sqlite:///{os.path.join(tmp, 'test.db')}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    test.addCleanup(engine.dispose)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    try:
+        user = User(email="owner@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        db.add(Job(id=job_id, type=job_type, status=status, created_by_id=user.id, config_json="{}"))
+        db.commit()
+    finally:
+        db.close()
+    return tmp, engine, Session